@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Benchmark sequential generate() against concurrent agenerate() fan-out.
+
+The mission TEST_CASES are sent to a local completions stand-in that answers
+after a fixed delay, first one after another and then all at once with
+several concurrency limits.
+
+Usage: python -m benchmarks.bench_async_models [--latency 0.5] [--repeat 4]
+"""
+
+import time
+import asyncio
+import argparse
+from tests.test_agent_mission import TEST_CASES, plan_all_concurrently
+from tests.test_glm_transport import CompletionsStandIn, make_model
+
+def main():
+    parser = argparse.ArgumentParser(description="Async model fan-out benchmark")
+    parser.add_argument("--latency", type=float, default=0.5, help="Stand-in reply delay in seconds")
+    parser.add_argument("--repeat", type=int, default=4, help="Copies of the test case list")
+    args = parser.parse_args()
+    cases = TEST_CASES * args.repeat
+
+    with CompletionsStandIn() as server:
+        def script():
+            server.script = [(200, CompletionsStandIn.completion("plan"), {}, args.latency)] * len(cases)
+
+        print(f"{len(cases)} requests, {args.latency * 1000:.0f} ms each")
+        print(f"{'mode':<22} {'time (s)':>9} {'connections':>12}")
+
+        script()
+        model = make_model(server.url, max_concurrency=1)
+        start = time.monotonic()
+        for case in cases:
+            model.generate([{"role": "user", "content": case}])
+        print(f"{'sequential generate':<22} {time.monotonic() - start:>9.2f} {len(set(server.client_ports)):>12}")
+
+        for limit in (2, 4, 8, 16):
+            server.client_ports.clear()
+            script()
+            model = make_model(server.url, max_concurrency=limit)
+            start = time.monotonic()
+            asyncio.run(plan_all_concurrently(model, cases))
+            print(f"{f'agenerate, limit {limit}':<22} {time.monotonic() - start:>9.2f} "
+                  f"{len(set(server.client_ports)):>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark request size and latency against session length, with the whole
+history sent every turn versus the token-budgeted ChatHistory.
+
+Requests go to the local completions stand-in, which delays each reply in
+proportion to the prompt tokens to model the provider's prefill cost.
+
+Usage: python -m benchmarks.bench_chat_history [--turns 200] [--budget 6000] [--ms-per-1k 40]
+"""
+
+import time
+import argparse
+from drone.chat_history import ChatHistory, estimate_tokens
+from tests.test_glm_transport import CompletionsStandIn, make_model
+
+SYSTEM = {"role": "system", "content": "You are deepdrone-old, a drone operations assistant."}
+ANSWER = ("Flight summary: climbed to 40 m, surveyed the north field along six legs, "
+          "battery at 62% on landing, no geofence excursions. ") * 6
+
+class PrefillStandIn(CompletionsStandIn):
+    """Stand-in whose reply delay grows with the prompt tokens."""
+
+    def __init__(self, seconds_per_token):
+        super().__init__()
+        self.seconds_per_token = seconds_per_token
+
+    def next_reply(self, body):
+        tokens = sum(estimate_tokens(message["content"]) for message in body["messages"])
+        return 200, self.completion(ANSWER), {}, tokens * self.seconds_per_token
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat history compaction benchmark")
+    parser.add_argument("--turns", type=int, default=200, help="Operator turns per session")
+    parser.add_argument("--budget", type=int, default=6000, help="ChatHistory token budget")
+    parser.add_argument("--ms-per-1k", type=float, default=40.0, help="Stand-in delay per 1k prompt tokens")
+    args = parser.parse_args()
+    checkpoints = {turn for turn in (1, 10, 25, 50, 100, 200, 400) if turn <= args.turns}
+
+    with PrefillStandIn(args.ms_per_1k / 1000 / 1000) as server:
+        model = make_model(server.url)
+        full, history = [], ChatHistory(budget_tokens=args.budget)
+        print(f"{'turn':>5} {'full tokens':>12} {'full ms':>8} {'budgeted tokens':>16} {'budgeted ms':>12}")
+        for turn in range(1, args.turns + 1):
+            question = f"Turn {turn}: how did flight_{turn:03d} go over the north field?"
+            row = []
+            for messages in (full, None):
+                if messages is None:
+                    history.append("user", question)
+                    request = history.build(SYSTEM)
+                else:
+                    messages.append({"role": "user", "content": question})
+                    request = [SYSTEM] + messages
+                start = time.monotonic()
+                reply = model.generate(request).content
+                row += [history.count_messages(request), (time.monotonic() - start) * 1000]
+                if messages is None:
+                    history.append("assistant", reply)
+                else:
+                    messages.append({"role": "assistant", "content": reply})
+            if turn in checkpoints:
+                print(f"{turn:>5} {row[0]:>12} {row[1]:>8.0f} {row[2]:>16} {row[3]:>12.0f}")
+        stats = history.stats()
+        print(f"\n{stats['compactions']} compactions, {stats['folded_messages']} of {stats['messages']} "
+              f"messages summarised, {stats['pins']} pinned facts")
+
+if __name__ == "__main__":
+    main()
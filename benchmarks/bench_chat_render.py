@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark the time one Streamlit rerun spends drawing the chat transcript,
+against session length: one inline-styled st.markdown per message (the old
+loop in drone_chat.main) versus ChatView.
+
+Runs Streamlit in bare mode, so it measures building and queueing the
+elements on the server, not the browser.
+
+Usage: python -m benchmarks.bench_chat_render [--reruns 5]
+"""
+
+import time
+import logging
+import argparse
+import streamlit as st
+from drone.chat_view import RENDER_BUDGET_S, ChatView
+
+LENGTHS = (100, 1_000, 10_000)
+
+def session(length):
+    roles = ("user", "assistant", "system")
+    return [{"role": roles[idx % 3], "content": f"[12:00:{idx % 60:02d}] message {idx} " + "telemetry " * 8}
+            for idx in range(length)]
+
+def render_inline(messages):
+    """The per-message loop ChatView replaced, with its inline styles."""
+    for message in messages:
+        if message["role"] == "user":
+            st.markdown(f"""
+            <div style="display: flex; align-items: flex-start; justify-content: flex-end; margin-bottom: 8px;">
+                <div style="background-color: rgba(10, 25, 41, 0.9); border: 1px solid #00ffff; border-radius: 10px; padding: 12px; color: #FFFFFF; max-width: 85%; font-family: 'Orbitron', sans-serif; box-shadow: 0 0 15px rgba(0, 255, 255, 0.1); backdrop-filter: blur(5px);">
+                    {message["content"]}
+                </div>
+                <div style="font-size: 24px; margin-left: 8px; color: #00ffff; text-shadow: 0 0 10px #00ffff;">👤</div>
+            </div>
+            """, unsafe_allow_html=True)
+        elif message["role"] == "system":
+            st.markdown(f"""
+            <div style="display: flex; justify-content: center; align-items: center; margin: 4px 0;">
+                <div style="background-color: rgba(10, 25, 41, 0.9); border: 1px solid #00ffff; border-radius: 5px; padding: 8px 15px; font-family: 'Orbitron', sans-serif; font-size: 12px; text-align: center; max-width: 90%; box-shadow: 0 0 15px rgba(0, 255, 255, 0.1); backdrop-filter: blur(5px);"><span class='status-indicator status-active'></span>{message["content"]}</div>
+            </div>
+            """, unsafe_allow_html=True)
+        else:
+            st.markdown(f"""
+            <div style="display: flex; align-items: flex-start; margin-bottom: 8px;">
+                <div style="font-size: 24px; margin-right: 8px; color: #00ffff; text-shadow: 0 0 10px #00ffff;">🚁</div>
+                <div style="background-color: rgba(10, 25, 41, 0.9); border: 1px solid #00ffff; border-radius: 10px; padding: 12px; color: #00ffff; max-width: 85%; font-family: 'Orbitron', sans-serif; box-shadow: 0 0 15px rgba(0, 255, 255, 0.1); backdrop-filter: blur(5px);">
+                    {message["content"]}
+                </div>
+            </div>
+            """, unsafe_allow_html=True)
+
+def timed(fn, reruns):
+    """Median wall time of ``reruns`` calls, in ms."""
+    samples = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return sorted(samples)[len(samples) // 2]
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat transcript render benchmark")
+    parser.add_argument("--reruns", type=int, default=5, help="Reruns timed per session length")
+    args = parser.parse_args()
+    # Bare mode warns about the missing script context on every element
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    print(f"{'messages':>9} {'inline ms':>10} {'ChatView first ms':>18} {'ChatView rerun ms':>18}")
+    for length in LENGTHS:
+        messages = session(length)
+        inline_ms = timed(lambda: render_inline(messages), args.reruns)
+        view = ChatView()
+        first_ms = timed(lambda: view.render(st, messages), 1)
+        rerun_ms = timed(lambda: view.render(st, messages), args.reruns)
+        print(f"{length:>9} {inline_ms:>10.1f} {first_ms:>18.2f} {rerun_ms:>18.2f}")
+    print(f"\nbudget {RENDER_BUDGET_S * 1000:.0f} ms per rerun; "
+          f"{view.render_stats()['over_budget']} ChatView renders over budget")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Fleet-scale benchmark of DroneController against simulated vehicles.
+
+Starts N in-process simulated copters, then times connecting the fleet,
+taking off, uploading a mission to every vehicle and reading fleet
+telemetry. No SITL is needed.
+
+Usage: python -m benchmarks.bench_fleet [--vehicles 24] [--time-scale 20]
+"""
+
+import time
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from drone import compatibility_fix  # Import for Python 3.10+ compatibility
+from drone.drone_control import FleetManager
+from drone.simulator import SimulatedFleet
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def timed(label, fn, *args, **kwargs):
+    start = time.monotonic()
+    result = fn(*args, **kwargs)
+    print(f"{label:<28} {time.monotonic() - start:8.3f}s")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Fleet benchmark against simulated vehicles")
+    parser.add_argument("--vehicles", type=int, default=24, help="Number of simulated vehicles")
+    parser.add_argument("--time-scale", type=float, default=20.0, help="Simulated seconds per wall second")
+    parser.add_argument("--waypoints", type=int, default=50, help="Mission length per vehicle")
+    args = parser.parse_args()
+
+    with SimulatedFleet(args.vehicles, time_scale=args.time_scale) as sims:
+        fleet = FleetManager(max_workers=args.vehicles)
+        try:
+            results = timed(f"connect {args.vehicles} vehicles", fleet.connect_all, sims.connection_strings())
+            connected = [vehicle_id for vehicle_id, ok in results.items() if ok]
+            print(f"  connected: {len(connected)}/{args.vehicles}")
+            for group in ("flight", "parameters"):
+                samples = [fleet.get(v).get_connect_metrics().get(f"{group}_s") for v in connected]
+                samples = [s for s in samples if s is not None]
+                if samples:
+                    print(f"  {group:<10} p50 {statistics.median(samples):.3f}s  p95 {percentile(samples, 95):.3f}s")
+
+            results = timed("arm and take off to 10 m", fleet.run_all, "arm_and_takeoff", 10, timeout=60)
+            print(f"  airborne: {sum(1 for ok in results.values() if ok)}/{len(results)}")
+
+            missions = {}
+            for vehicle_id, sim in sims.vehicles.items():
+                lat, lon, _ = sim.location
+                missions[vehicle_id] = [{"lat": lat + idx * 1e-5, "lon": lon, "alt": 10}
+                                        for idx in range(args.waypoints)]
+
+            def upload(vehicle_id):
+                return fleet.get(vehicle_id).upload_mission(missions[vehicle_id])
+
+            start = time.monotonic()
+            with ThreadPoolExecutor(max_workers=args.vehicles) as executor:
+                uploads = list(executor.map(upload, connected))
+            print(f"{'upload ' + str(args.waypoints) + '-item missions':<28} {time.monotonic() - start:8.3f}s")
+            print(f"  verified: {sum(uploads)}/{len(uploads)}")
+
+            samples = []
+            for _ in range(200):
+                start = time.perf_counter()
+                fleet.telemetry()
+                samples.append((time.perf_counter() - start) * 1e6)
+            print(f"fleet telemetry read         p50 {statistics.median(samples):.0f}us  "
+                  f"p95 {percentile(samples, 95):.0f}us")
+        finally:
+            fleet.disconnect_all()
+
+if __name__ == "__main__":
+    main()
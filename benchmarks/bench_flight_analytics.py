@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark the vectorized flight-path analytics against a per-row loop.
+
+For each log size this times the per-row reference from the tests (up to
+--naive-max samples, it is slow), analyze_path on in-memory arrays, and
+analyze_flight_log streaming a multi-chunk on-disk log, and reports the peak
+memory allocated while streaming.
+
+Usage: python -m benchmarks.bench_flight_analytics [--sizes 10000 100000 1000000] [--chunk-rows 65536]
+"""
+
+import os
+import time
+import argparse
+import tempfile
+import tracemalloc
+from drone.flight_analytics import analyze_flight_log, analyze_path
+from drone.flight_log import FlightLog, FlightLogWriter
+from tests.test_flight_analytics import HOME, make_track, naive_analyze
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def run(size, chunk_rows, naive_max, directory):
+    data = make_track(size)
+    fence = {"latitude": HOME[0], "longitude": HOME[1], "radius_m": 1500.0}
+
+    naive_s = None
+    if size <= naive_max:
+        expected, naive_s = timed(naive_analyze, data, fence)
+    vectorized, vectorized_s = timed(analyze_path, data, chunk_rows=chunk_rows, geofence=fence)
+    if naive_s is not None:
+        assert abs(vectorized["distance_m"] - expected["distance_m"]) < 1e-6 * expected["distance_m"]
+
+    path = os.path.join(directory, f"bench_{size}.ddlog")
+    with FlightLogWriter(path, list(data)) as writer:
+        for first in range(0, size, 100000):
+            writer.write_chunk({name: values[first:first + 100000] for name, values in data.items()})
+    del data
+
+    log = FlightLog(path)
+    tracemalloc.start()
+    streamed, streamed_s = timed(analyze_flight_log, log, chunk_rows=chunk_rows, geofence=fence)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert abs(streamed["distance_m"] - vectorized["distance_m"]) < 1e-6 * vectorized["distance_m"]
+    return naive_s, vectorized_s, streamed_s, peak, streamed["distance_m"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Flight-path analytics benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000],
+                        help="Samples per log")
+    parser.add_argument("--chunk-rows", type=int, default=65536, help="Samples processed per step")
+    parser.add_argument("--naive-max", type=int, default=200000,
+                        help="Largest log to run the per-row loop on")
+    args = parser.parse_args()
+
+    print(f"chunk_rows={args.chunk_rows}")
+    print(f"{'samples':>9} {'naive (s)':>10} {'numpy (s)':>10} {'speedup':>8} "
+          f"{'mmap (s)':>9} {'peak MiB':>9} {'distance (km)':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            naive_s, vectorized_s, streamed_s, peak, distance = run(size, args.chunk_rows, args.naive_max, tmp)
+            naive = f"{naive_s:>10.3f}" if naive_s is not None else f"{'-':>10}"
+            speedup = f"{naive_s / vectorized_s:>7.0f}x" if naive_s is not None else f"{'-':>8}"
+            print(f"{size:>9} {naive} {vectorized_s:>10.3f} {speedup} "
+                  f"{streamed_s:>9.3f} {peak / 2**20:>9.1f} {distance / 1000:>14.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark cold start: the time a fresh interpreter takes to run each import,
+and which heavy dependencies the import loads.
+
+Each import runs in its own subprocess, so nothing is cached in sys.modules
+between samples (the OS file cache stays warm after the first run).
+
+Usage: python -m benchmarks.bench_import [--runs 5]
+"""
+
+import sys
+import time
+import argparse
+import subprocess
+
+IMPORTS = (
+    "import drone",
+    "from drone import DroneController",
+    "from drone import drone_chat",
+)
+
+HEAVY = ("streamlit", "smolagents", "pandas", "matplotlib", "dronekit", "openai")
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(elapsed, ",".join(name for name in {heavy!r} if name in sys.modules))
+"""
+
+def sample(statement):
+    """(import seconds, heavy modules loaded, lines printed by the import) in a fresh interpreter."""
+    result = subprocess.run([sys.executable, "-c", PROBE.format(statement=statement, heavy=HEAVY)],
+                            capture_output=True, text=True, check=True)
+    *printed, last = result.stdout.strip().splitlines()
+    seconds, loaded = (last.split(" ", 1) + [""])[:2]
+    return float(seconds), loaded, printed
+
+def main():
+    parser = argparse.ArgumentParser(description="Package import time benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per import")
+    args = parser.parse_args()
+
+    print(f"{'import':<36} {'median ms':>10} {'process ms':>11}  heavy modules loaded")
+    for statement in IMPORTS:
+        imports, processes = [], []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            seconds, loaded, printed = sample(statement)
+            processes.append((time.perf_counter() - start) * 1000)
+            imports.append(seconds * 1000)
+        imports.sort()
+        processes.sort()
+        print(f"{statement:<36} {imports[len(imports) // 2]:>10.0f} {processes[len(processes) // 2]:>11.0f}  "
+              f"{loaded or '-'}{'  (prints: ' + printed[0] + ')' if printed else ''}")
+
+if __name__ == "__main__":
+    main()
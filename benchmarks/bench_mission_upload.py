@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Benchmark mission uploads over a lossy link stand-in.
+
+For 10, 100 and 700-item missions this times a full upload, an unchanged
+re-upload and a partial re-upload after one waypoint moved, and reports the
+number of messages sent to the vehicle.
+
+Usage: python -m benchmarks.bench_mission_upload [--loss 0.05] [--latency 0.001]
+"""
+
+import argparse
+from drone import compatibility_fix  # Import for Python 3.10+ compatibility
+from drone.mission_upload import MissionUploader
+from tests.test_mission_upload import MissionLinkVehicle, make_waypoints
+
+SIZES = (10, 100, 700)
+
+def run(size, loss, latency, seed=0):
+    vehicle = MissionLinkVehicle(loss=loss, latency=latency, seed=seed)
+    uploader = MissionUploader(vehicle, timeout=max(latency * 20, 0.02), retries=50)
+    waypoints = make_waypoints(size)
+    rows = []
+
+    for label in ("full", "unchanged", "one changed"):
+        if label == "one changed":
+            waypoints[size // 2] = dict(waypoints[size // 2], alt=45.0)
+        before = vehicle.uplink
+        result = uploader.upload(waypoints)
+        assert result["success"], result.get("error")
+        rows.append((size, label, result["mode"], result["items_sent"],
+                     vehicle.uplink - before, result["elapsed_s"]))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Mission upload benchmark")
+    parser.add_argument("--loss", type=float, default=0.05, help="Drop probability per message")
+    parser.add_argument("--latency", type=float, default=0.001, help="One-way delay per message in seconds")
+    args = parser.parse_args()
+
+    print(f"loss={args.loss:.0%} latency={args.latency * 1000:.1f}ms")
+    print(f"{'items':>6} {'upload':<12} {'mode':<10} {'sent':>6} {'uplink':>7} {'time (s)':>9}")
+    for size in SIZES:
+        for size_, label, mode, sent, uplink, elapsed in run(size, args.loss, args.latency):
+            print(f"{size_:>6} {label:<12} {mode:<10} {sent:>6} {uplink:>7} {elapsed:>9.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark one tool-calling step on the CodeAgent path against the native
+tool-calling path.
+
+The local completions stand-in returns the same structured tool_calls (two
+independent reads) to both. On the CodeAgent path GLMModel rewrites them as a
+``Code:`` block that smolagents parses and runs in its interpreter; on the
+native path ToolCallLoop dispatches them directly, concurrently.
+
+Usage: python -m benchmarks.bench_tool_calling [--latency 0.05] [--repeat 10]
+"""
+
+import time
+import argparse
+import logging
+from smolagents import CodeAgent
+from drone.tool_calling import ToolCallLoop
+from tests.test_glm_transport import CompletionsStandIn, make_model
+from tests.test_tool_calling import READS, TOOLS
+
+TOOL_CALLS = [("read_position", {}), ("read_battery", {})]
+
+def timed(model):
+    """Wrap model.generate so the time spent in model requests is recorded."""
+    spent = []
+    generate = model.generate
+
+    def wrapper(*args, **kwargs):
+        start = time.monotonic()
+        try:
+            return generate(*args, **kwargs)
+        finally:
+            spent.append(time.monotonic() - start)
+
+    model.generate = wrapper
+    return spent
+
+def main():
+    parser = argparse.ArgumentParser(description="CodeAgent versus native tool-calling benchmark")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stand-in reply delay in seconds")
+    parser.add_argument("--repeat", type=int, default=10, help="Steps measured per path")
+    args = parser.parse_args()
+    logging.getLogger('drone_control').setLevel(logging.WARNING)
+    tool_calls = CompletionsStandIn.tool_call_completion(TOOL_CALLS)
+
+    with CompletionsStandIn() as server:
+        model = make_model(server.url)
+        model_time = timed(model)
+
+        code_steps = []
+        for _ in range(args.repeat):
+            server.script = [(200, tool_calls, {}, args.latency)]
+            agent = CodeAgent(tools=TOOLS, model=model, max_steps=1, verbosity_level=0)
+            model_time.clear()
+            start = time.monotonic()
+            agent.run("Where are you and how is the battery?")
+            code_steps.append((time.monotonic() - start, sum(model_time)))
+
+        native_steps = []
+        loop = ToolCallLoop(model, TOOLS, read_only=READS)
+        for _ in range(args.repeat):
+            server.script = [(200, tool_calls, {}, args.latency),
+                             (200, CompletionsStandIn.completion("done"), {}, args.latency)]
+            loop.run([{"role": "user", "content": "Where are you and how is the battery?"}])
+            step = loop.last_run["steps"][0]
+            native_steps.append((step["total_s"], step["model_s"]))
+
+    print(f"{args.repeat} steps per path, stand-in latency {args.latency * 1000:.0f} ms, "
+          f"two 200 ms reads per step")
+    print(f"{'path':<10} {'step ms':>8} {'model ms':>9} {'tools+overhead ms':>18}")
+    for name, steps in (("CodeAgent", code_steps), ("native", native_steps)):
+        total = sorted(step for step, _ in steps)[len(steps) // 2]
+        model_s = sorted(model for _, model in steps)[len(steps) // 2]
+        print(f"{name:<10} {total * 1000:>8.0f} {model_s * 1000:>9.0f} {(total - model_s) * 1000:>18.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,39 @@ This package contains all the drone-related functionality including:
 - DroneKit integration
 - Drone control and mission planning
 - Chat interface for natural language interactions with the drone
+
+Submodules and the names below are imported on first access, so
+``from drone import DroneController`` loads DroneKit but not Streamlit,
+the agent or the plotting libraries.
 """
 
-# Import main components for easier access
-from .drone_control import DroneController, connect_drone, disconnect_drone, takeoff, land, return_home
-from .drone_chat import DroneAssistant, generate_mission_plan 
\ No newline at end of file
+import importlib
+import importlib.util
+
+# Public name -> submodule defining it
+_EXPORTS = {
+    "DroneController": "drone_control",
+    "FleetManager": "drone_control",
+    "connect_drone": "drone_control",
+    "disconnect_drone": "drone_control",
+    "takeoff": "drone_control",
+    "land": "drone_control",
+    "return_home": "drone_control",
+    "DroneAssistant": "drone_chat",
+    "generate_mission_plan": "drone_chat",
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    elif importlib.util.find_spec(f"{__name__}.{name}") is not None:
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
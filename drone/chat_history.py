@@ -0,0 +1,291 @@
+"""
+Token-budgeted chat history for DroneAssistant.chat.
+
+ChatHistory keeps every message of a session (the UI shows them all), but
+the messages it sends to the model stay under a token budget. When the
+history no longer fits, the oldest turns are folded into a rolling
+extractive summary. Mission-critical facts from those turns, such as
+connection strings, coordinates, altitudes, flight IDs and sensor names, are
+pinned so they survive. The most recent turns are always sent verbatim.
+
+Compaction folds turns down to a low-water mark rather than one at a time.
+The front of the request (system message, summary, older turns) therefore
+changes only every few turns, which keeps the prompt prefix stable between
+requests.
+
+Tokens are counted with a script-aware estimate (CJK characters, words, digit
+groups, punctuation). Each model reply's reported prompt_tokens calibrates
+the estimate to the provider's tokenizer.
+"""
+
+import re
+import math
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tokens a chat API adds around every message (role and separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_TOKEN_PATTERN = re.compile(
+    r"(?P<cjk>[぀-ヿ㐀-䶿一-鿿가-힯　-〿＀-￯])|"
+    r"(?P<word>[A-Za-z]+)|(?P<digits>\d+)|(?P<other>[^\sA-Za-z\d])")
+
+# Facts worth keeping after the turn that mentioned them is summarised
+PIN_PATTERNS = (
+    ("connection", re.compile(r"\b(?:udp|tcp|udpin|udpout|tcpin):[\w.\-]+:\d+|/dev/tty\w+|\bCOM\d+\b")),
+    ("position", re.compile(r"-?\d{1,3}\.\d{3,}\s*[,，]\s*-?\d{1,3}\.\d{3,}")),
+    ("altitude", re.compile(r"\b\d+(?:\.\d+)?\s*(?:m|meters|metres|ft|feet|米)(?![A-Za-z])", re.IGNORECASE)),
+    ("flight", re.compile(r"\bflight_\w+")),
+    ("sensor", re.compile(r"\b(?:sensor|传感器)[\s:：]*['\"]?(\w+)", re.IGNORECASE)),
+)
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the tokens of a text for BPE tokenizers such as GLM's.
+
+    CJK characters and punctuation count one token each, words one token per
+    seven letters (rounded up), and digit runs one token per three digits.
+    Whitespace is folded into the neighbouring token.
+    """
+    tokens = 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        kind = match.lastgroup
+        if kind == "word":
+            tokens += math.ceil(len(match.group()) / 7)
+        elif kind == "digits":
+            tokens += math.ceil(len(match.group()) / 3)
+        else:
+            tokens += 1
+    return tokens
+
+def clip_text(text: str, max_tokens: int, counter: Callable[[str], int] = estimate_tokens) -> str:
+    """Shorten a text to about ``max_tokens``, keeping its start and end."""
+    tokens = counter(text)
+    if tokens <= max_tokens:
+        return text
+    keep = max(1, int(len(text) * max_tokens / tokens) // 2)
+    return text[:keep] + " ... [truncated] ... " + text[-keep:]
+
+class ChatHistory:
+    """
+    Session messages plus the compacted view sent to the model.
+
+    Thread-safe; one instance belongs to one DroneAssistant.
+    """
+
+    def __init__(self, budget_tokens: int = 6000, keep_recent: int = 4, summary_tokens: int = 600,
+                 max_pins: int = 20, low_water: float = 0.6,
+                 summarize: Optional[Callable[[str, List[Dict]], str]] = None):
+        """
+        Create an empty history.
+
+        Args:
+            budget_tokens: Upper bound for the prompt tokens of a request
+            keep_recent: Most recent messages that are never summarised
+            summary_tokens: Upper bound for the rolling summary
+            max_pins: Facts pinned from folded turns (oldest of a kind are dropped first)
+            low_water: Fraction of the budget compaction folds down to
+            summarize: Optional ``summarize(summary, messages) -> summary``
+                replacing the built-in extractive summary, e.g. a model call
+        """
+        self.budget_tokens = budget_tokens
+        self.keep_recent = keep_recent
+        self.summary_tokens = summary_tokens
+        self.max_pins = max_pins
+        self.low_water = low_water
+        self.summarize = summarize
+        self.scale = 1.0  # provider tokens per estimated token
+        self._messages = []
+        self._folded = 0  # messages before this index are in the summary
+        self._summary_lines = []
+        self._pins = []  # pinned by the caller, always kept
+        self._facts = []  # (kind, fact) pinned from folded turns
+        self._lock = threading.Lock()
+        self._stats = {"compactions": 0, "last_request_tokens": 0}
+
+    def count(self, text: str) -> int:
+        """Tokens of a text, calibrated to the provider."""
+        return math.ceil(estimate_tokens(text) * self.scale)
+
+    def count_messages(self, messages: List[Dict]) -> int:
+        """Prompt tokens of a list of chat messages."""
+        return sum(self.count(str(message.get('content', ''))) + MESSAGE_OVERHEAD_TOKENS
+                   for message in messages)
+
+    def append(self, role: str, content: str) -> None:
+        """Add a message to the session."""
+        with self._lock:
+            self._messages.append({"role": role, "content": content})
+
+    def pin(self, fact: str) -> None:
+        """Keep a fact in every request, however long the session grows."""
+        with self._lock:
+            if fact not in self._pins:
+                self._pins.append(fact)
+
+    @property
+    def messages(self) -> List[Dict]:
+        """Every message of the session, oldest first."""
+        return self._messages
+
+    @property
+    def pins(self) -> List[str]:
+        """Pinned facts, the caller's first, then those from folded turns, oldest first."""
+        return self._pins + [fact for _, fact in self._facts]
+
+    @property
+    def summary(self) -> str:
+        """Rolling summary of the folded turns."""
+        return "\n".join(self._summary_lines)
+
+    def build(self, system_message: Dict, reserve_tokens: int = 0) -> List[Dict]:
+        """
+        Messages for the next request: the system message, a summary of folded
+        turns with the pinned facts, then the unfolded turns ending with the
+        latest message.
+
+        Args:
+            system_message: System prompt sent first
+            reserve_tokens: Budget kept free, e.g. for tools or the reply
+
+        Returns:
+            List of chat messages within ``budget_tokens - reserve_tokens``
+            (unless the system message and latest message alone exceed it)
+        """
+        budget = self.budget_tokens - reserve_tokens
+        with self._lock:
+            if self._request_tokens(system_message) > budget:
+                self._compact(system_message, int(budget * self.low_water))
+            request = [system_message] + self._context_messages() + self._messages[self._folded:]
+            tokens = self.count_messages(request)
+            if tokens > budget:
+                # The pinned recent turns alone are too long: clip the longest until they fit
+                request = self._clip_recent(request, budget)
+                tokens = self.count_messages(request)
+            self._stats["last_request_tokens"] = tokens
+        return request
+
+    def record_usage(self, messages: List[Dict], prompt_tokens: int) -> None:
+        """Calibrate the token estimate with the provider's count for a request."""
+        if not prompt_tokens:
+            return
+        with self._lock:
+            estimated = sum(estimate_tokens(str(message.get('content', ''))) + MESSAGE_OVERHEAD_TOKENS
+                            for message in messages)
+            if estimated:
+                # Smoothed, so one unusual request does not swing the budget
+                self.scale = 0.7 * self.scale + 0.3 * (prompt_tokens / estimated)
+
+    def stats(self) -> Dict:
+        """Message, folded, pin and summary sizes plus compaction counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                "messages": len(self._messages),
+                "folded_messages": self._folded,
+                "pins": len(self._pins) + len(self._facts),
+                "summary_tokens": self.count(self.summary),
+                "budget_tokens": self.budget_tokens,
+                "scale": self.scale,
+            })
+        return stats
+
+    def _request_tokens(self, system_message: Dict) -> int:
+        return self.count_messages([system_message] + self._context_messages() + self._messages[self._folded:])
+
+    def _context_messages(self) -> List[Dict]:
+        """The summary and pins as one system message, or nothing before the first fold."""
+        pins = self.pins
+        if not self._summary_lines and not pins:
+            return []
+        parts = []
+        if self._summary_lines:
+            parts.append("Summary of the earlier conversation:\n" + self.summary)
+        if pins:
+            parts.append("Facts to keep in mind:\n" + "\n".join(f"- {fact}" for fact in pins))
+        return [{"role": "system", "content": "\n\n".join(parts)}]
+
+    def _compact(self, system_message: Dict, target: int) -> None:
+        """Fold the oldest unfolded turns into the summary until the request fits ``target``."""
+        last_foldable = len(self._messages) - self.keep_recent
+        start = self._folded
+        end = start
+        tokens = self._request_tokens(system_message)
+        while end < last_foldable and tokens > target:
+            tokens -= self.count_messages([self._messages[end]])
+            end += 1
+        if end == start:
+            return
+
+        folded = self._messages[start:end]
+        for message in folded:
+            for kind, fact in extract_facts(str(message.get('content', ''))):
+                self._add_fact(kind, fact)
+        if self.summarize is not None:
+            try:
+                self._summary_lines = self.summarize(self.summary, folded).splitlines()
+            except Exception as e:
+                logger.warning(f"Chat summary failed, using extractive summary: {e}")
+                self._summary_lines.extend(self._summary_line(message) for message in folded)
+        else:
+            self._summary_lines.extend(self._summary_line(message) for message in folded)
+        self._trim_summary()
+        self._folded = end
+        self._stats["compactions"] += 1
+        logger.info(f"Chat history compacted: {end - start} messages folded, {self._folded} of "
+                    f"{len(self._messages)} summarised")
+
+    def _summary_line(self, message: Dict) -> str:
+        content = " ".join(str(message.get('content', '')).split())
+        return f"{message.get('role', 'user')}: {clip_text(content, 60, self.count)}"
+
+    def _trim_summary(self) -> None:
+        """Drop the oldest summary lines beyond summary_tokens."""
+        while len(self._summary_lines) > 1 and self.count(self.summary) > self.summary_tokens:
+            self._summary_lines.pop(0)
+
+    def _add_fact(self, kind: str, fact: str) -> None:
+        """Pin a fact, keeping at most an equal share of max_pins per kind."""
+        if (kind, fact) in self._facts:
+            self._facts.remove((kind, fact))
+        self._facts.append((kind, fact))
+        per_kind = max(1, self.max_pins // len(PIN_PATTERNS))
+        same_kind = [entry for entry in self._facts if entry[0] == kind]
+        for entry in same_kind[:-per_kind]:
+            self._facts.remove(entry)
+
+    def _clip_recent(self, request: List[Dict], budget: int) -> List[Dict]:
+        request = [dict(message) for message in request]
+        # Never clip the system message or the latest message
+        clippable = set(range(1, len(request) - 1))
+        while clippable and self.count_messages(request) > budget:
+            longest = max(clippable, key=lambda idx: len(request[idx]['content']))
+            excess = self.count_messages(request) - budget
+            current = self.count(request[longest]['content'])
+            if current <= 16:
+                clippable.discard(longest)
+                continue
+            # clip_text is approximate, so aim a little lower than the excess
+            request[longest]['content'] = clip_text(request[longest]['content'],
+                                                    max(16, current - excess - 8), self.count)
+        return request
+
+def extract_facts(text: str) -> List[tuple]:
+    """
+    Mission-critical facts in a message.
+
+    Returns:
+        List of (kind, fact) for connection strings, positions, altitudes,
+        flight IDs and sensor names, e.g. ("flight", "flight: flight_001")
+    """
+    facts = []
+    for kind, pattern in PIN_PATTERNS:
+        for match in pattern.finditer(text):
+            value = match.group(match.lastindex or 0).strip()
+            fact = (kind, f"{kind}: {value}")
+            if fact not in facts:
+                facts.append(fact)
+    return facts
@@ -0,0 +1,178 @@
+"""
+Incremental rendering of the chat transcript.
+
+Streamlit reruns the whole script on every interaction, and the chat used to
+emit one inline-styled st.markdown block per message each time, so a rerun
+cost grew with the length of the session. ChatView keeps that cost flat:
+
+- Only the most recent page of messages is emitted, as one HTML block.
+  Older pages are shown on request (show_older()).
+- A message's HTML is built once and reused on later reruns. Messages that
+  fall out of the visible window are forgotten.
+- Styling lives in the STYLESHEET classes, emitted once with the page CSS,
+  instead of being repeated inline in every message.
+- Messages added during a run are appended below the transcript already on
+  screen (append()), so the page does not need an st.rerun() to show them.
+- Mission log entries hold a MissionLogRecord, formatted here by
+  record_html(); entries the log has expired are skipped.
+
+Every render is timed against a budget (RENDER_BUDGET_S); render_stats()
+returns the timings of the last render.
+"""
+
+import time
+import logging
+from typing import Dict, List
+from .mission_log import record_html
+
+logger = logging.getLogger(__name__)
+
+# Messages per page of the transcript
+PAGE_SIZE = 50
+
+# Time one rerun may spend rendering the transcript, whatever its length
+RENDER_BUDGET_S = 0.02
+
+AVATARS = {"user": "👤", "assistant": "🚁"}
+
+STYLESHEET = """
+    /* Chat transcript (see drone/chat_view.py) */
+    .chat-row {
+        display: flex;
+        align-items: flex-start;
+        margin-bottom: 8px;
+    }
+    .chat-row.chat-user {
+        justify-content: flex-end;
+    }
+    .chat-row.chat-system {
+        justify-content: center;
+        align-items: center;
+        margin: 4px 0;
+    }
+    .chat-bubble {
+        background-color: rgba(10, 25, 41, 0.9);
+        border: 1px solid #00ffff;
+        border-radius: 10px;
+        padding: 12px;
+        max-width: 85%;
+        font-family: 'Orbitron', sans-serif;
+        box-shadow: 0 0 15px rgba(0, 255, 255, 0.1);
+        backdrop-filter: blur(5px);
+    }
+    .chat-user .chat-bubble {
+        color: #FFFFFF !important;
+    }
+    .chat-system .chat-bubble {
+        border-radius: 5px;
+        padding: 8px 15px;
+        font-size: 12px;
+        text-align: center;
+        max-width: 90%;
+    }
+    .chat-avatar {
+        font-size: 24px;
+        color: #00ffff;
+        text-shadow: 0 0 10px #00ffff;
+    }
+    .chat-assistant .chat-avatar {
+        margin-right: 8px;
+    }
+    .chat-user .chat-avatar {
+        margin-left: 8px;
+    }
+"""
+
+def message_html(message: Dict) -> str:
+    """
+    HTML of one transcript entry.
+
+    Line breaks become <br>, so a message never contains a blank line that
+    would end the HTML block of the whole page early.
+    """
+    role = message.get("role", "assistant")
+    if "record" in message:
+        content = record_html(message["record"])
+    else:
+        content = str(message.get("content", "")).replace("\r\n", "\n").replace("\n", "<br>")
+    if role == "user":
+        return (f'<div class="chat-row chat-user"><div class="chat-bubble">{content}</div>'
+                f'<div class="chat-avatar">{AVATARS["user"]}</div></div>')
+    if role == "system":
+        return (f'<div class="chat-row chat-system"><div class="chat-bubble">'
+                f"<span class='status-indicator status-active'></span>{content}</div></div>")
+    return (f'<div class="chat-row chat-assistant"><div class="chat-avatar">{AVATARS["assistant"]}</div>'
+            f'<div class="chat-bubble">{content}</div></div>')
+
+class ChatView:
+    """Paged, incrementally formatted view of one session's transcript."""
+
+    def __init__(self, page_size: int = PAGE_SIZE, budget_s: float = RENDER_BUDGET_S):
+        self.page_size = page_size
+        self.budget_s = budget_s
+        self.pages = 1
+        # id(message) -> (message, html); the message is held so its id is not reused
+        self._html: Dict[int, tuple] = {}
+        self._formatted = 0  # messages formatted by the current render
+        self._stats = {"renders": 0, "formatted": 0, "over_budget": 0, "last": None}
+
+    def show_older(self) -> None:
+        """Show one more page of older messages on the next render."""
+        self.pages += 1
+
+    def _fragment(self, message: Dict) -> str:
+        entry = self._html.get(id(message))
+        if entry is None or entry[0] is not message:
+            entry = (message, message_html(message))
+            self._html[id(message)] = entry
+            self._formatted += 1
+        return entry[1]
+
+    def html(self, messages: List[Dict]) -> str:
+        """HTML of the visible window of ``messages``, formatting only messages not seen before."""
+        window = messages[-self.page_size * self.pages:]
+        self._formatted = 0
+        fragments = [self._fragment(message) for message in window if not message.get("expired")]
+        if len(self._html) > len(window):
+            # Forget messages that scrolled out of the window (or were removed)
+            visible = {id(message) for message in window}
+            self._html = {key: entry for key, entry in self._html.items() if key in visible}
+        return '<div class="chat-log">' + "".join(fragments) + "</div>"
+
+    def render(self, target, messages: List[Dict]) -> None:
+        """
+        Emit the transcript into ``target`` (st, a container or anything with markdown/button).
+
+        Args:
+            target: Where to draw
+            messages: Transcript entries with 'role' and 'content' (or a mission log 'record'), oldest first
+        """
+        start = time.perf_counter()
+        hidden = max(0, len(messages) - self.page_size * self.pages)
+        if hidden:
+            target.button(f"显示更早的消息 ({hidden})", key="chat_show_older", on_click=self.show_older)
+        target.markdown(self.html(messages), unsafe_allow_html=True)
+        self._record(start, len(messages), min(len(messages), self.page_size * self.pages))
+
+    def append(self, target, messages: List[Dict]) -> None:
+        """Emit messages added after render() below the transcript already drawn."""
+        start = time.perf_counter()
+        self._formatted = 0
+        target.markdown("".join(self._fragment(message) for message in messages if not message.get("expired")),
+                        unsafe_allow_html=True)
+        self._record(start, len(messages), len(messages))
+
+    def _record(self, start: float, messages: int, shown: int) -> None:
+        elapsed = time.perf_counter() - start
+        self._stats["renders"] += 1
+        self._stats["formatted"] += self._formatted
+        self._stats["last"] = {"messages": messages, "shown": shown,
+                               "formatted": self._formatted, "seconds": elapsed}
+        if elapsed > self.budget_s:
+            self._stats["over_budget"] += 1
+            logger.warning(f"Chat render took {elapsed * 1000:.1f} ms for {shown} of {messages} messages "
+                           f"(budget {self.budget_s * 1000:.0f} ms)")
+
+    def render_stats(self) -> Dict:
+        """Render count, messages formatted so far, renders over budget and the last render's timings."""
+        return dict(self._stats)
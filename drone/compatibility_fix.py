@@ -6,11 +6,12 @@ for libraries that import it directly from collections rather than collections.a
 """
 
 import sys
+import logging
 import collections
 import collections.abc
 
 # Only apply the patch for Python 3.10 and above
-if sys.version_info >= (3, 10):
+if sys.version_info >= (3, 10) and not hasattr(collections, "MutableMapping"):
     # Add MutableMapping to collections for backward compatibility
     collections.MutableMapping = collections.abc.MutableMapping
-    print("Applied compatibility patch for collections.MutableMapping") 
\ No newline at end of file
+    logging.getLogger(__name__).debug("Applied compatibility patch for collections.MutableMapping")
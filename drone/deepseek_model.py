@@ -1,15 +1,37 @@
 import os
-from typing import Union, List, Dict, Optional, Any
+import time
+from typing import Union, List, Dict, Iterator, Optional, Any
+import threading
+from urllib.parse import urlparse
 import openai
 import json
+from .http_transport import rate_limiter
+from .model_pool import provider_pool
+from .prompts import PromptTokenUsage, chat_messages, token_usage as usage_from_response
+from .metrics import record_call
+from .streaming import MessageDelta, iter_deltas, tool_calls_to_code
+
+# OpenAI clients by (base URL, API key); each holds a connection pool
+_clients = {}
+_clients_lock = threading.Lock()
+
+def _shared_client(base_url: str, api_key: Optional[str]) -> openai.OpenAI:
+    """Return one client per endpoint and key, so every session shares its connections"""
+    with _clients_lock:
+        if (base_url, api_key) not in _clients:
+            _clients[(base_url, api_key)] = openai.OpenAI(api_key=api_key, base_url=base_url)
+        return _clients[(base_url, api_key)]
 
 class Message:
     """Simple message class to mimic OpenAI's message format"""
-    def __init__(self, content):
+    def __init__(self, content, token_usage: Optional[PromptTokenUsage] = None):
         self.content = content
         self.model = ""
         self.created = 0
         self.choices = []
+        # smolagents' monitor adds up input_tokens and output_tokens after every step;
+        # cached_input_tokens counts the prompt tokens served from DeepSeek's context cache
+        self.token_usage = token_usage or PromptTokenUsage(input_tokens=0, output_tokens=0)
 
 class DeepSeekModel:
     """DeepSeek API Model interface for smolagents CodeAgent"""
@@ -18,7 +40,9 @@ class DeepSeekModel:
                  model_id='deepseek-reasoner',
                  max_tokens=2096,
                  temperature=0.5,
-                 custom_role_conversions=None):
+                 custom_role_conversions=None,
+                 base_url=None,
+                 max_concurrency=None):
         """Initialize the DeepSeek API Model.
         
         Args:
@@ -26,32 +50,31 @@ class DeepSeekModel:
             max_tokens: Maximum number of tokens to generate
             temperature: Sampling temperature (0.0 to 1.0)
             custom_role_conversions: Custom role mappings if needed
+            base_url: API base URL (defaults to DEEPSEEK_BASE_URL or the DeepSeek API)
+            max_concurrency: Requests in flight at once from agenerate() (default DRONE_LLM_CONCURRENCY or 4)
         """
         self.model_id = model_id
         self.max_tokens = max_tokens
         self.temperature = temperature
         self.custom_role_conversions = custom_role_conversions or {}
         
-        # Initialize the client
-        self.client = openai.OpenAI(
-            api_key=os.environ.get("DEEPSEEK_API_KEY"),
-            base_url="https://api.deepseek.com/v1"
-        )
+        # Timings of the most recent stream() call
+        self.last_stream = None
+        
+        # Initialize the client, shared with other models for the same endpoint
+        base_url = base_url or os.environ.get("DEEPSEEK_BASE_URL", "https://api.deepseek.com/v1")
+        self.client = _shared_client(base_url, os.environ.get("DEEPSEEK_API_KEY"))
+        
+        # Worker pool for agenerate() and rate limit state, keyed by API host
+        provider = urlparse(base_url).netloc
+        self.pool = provider_pool(provider, max_concurrency)
+        self.rate_limiter = rate_limiter(provider)
     
     def __call__(self, prompt: Union[str, dict, List[Dict]]) -> Message:
         """Make the class callable as required by smolagents"""
         try:
-            # Handle different prompt formats
-            if isinstance(prompt, (dict, list)):
-                if isinstance(prompt, list) and all(isinstance(msg, dict) for msg in prompt):
-                    messages = prompt
-                    return self._generate_chat_response_message(messages)
-                else:
-                    prompt_str = str(prompt)
-                    return self._generate_text_response_message(prompt_str)
-            else:
-                prompt_str = str(prompt)
-                return self._generate_text_response_message(prompt_str)
+            # Agent steps arrive as smolagents ChatMessages, plain calls as text
+            return self._generate_chat_response_message(chat_messages(prompt))
             
         except Exception as e:
             error_msg = f"Error generating response: {str(e)}"
@@ -85,27 +108,160 @@ class DeepSeekModel:
         current_temperature = temperature if temperature is not None else self.temperature
             
         try:
-            if isinstance(prompt, (dict, list)):
-                if isinstance(prompt, list) and all(isinstance(msg, dict) for msg in prompt):
-                    messages = prompt
-                    result = self._generate_chat_response_message(messages, stop_sequences, current_max_tokens, current_temperature)
-                    return result
-                else:
-                    prompt_str = str(prompt)
-                    result = self._generate_text_response_message(prompt_str, stop_sequences, current_max_tokens, current_temperature)
-                    return result
-            else:
-                prompt_str = str(prompt)
-                result = self._generate_text_response_message(prompt_str, stop_sequences, current_max_tokens, current_temperature)
-                return result
+            return self._generate_chat_response_message(chat_messages(prompt), stop_sequences, current_max_tokens, current_temperature)
                 
         except Exception as e:
             error_msg = f"Error generating response: {str(e)}"
             print(error_msg)
             return Message(error_msg)
     
-    def _generate_chat_response(self, messages: List[Dict], stop_sequences: Optional[List[str]] = None, max_tokens: int = None, temperature: float = None) -> str:
-        """Generate a response from the chat API and return string content"""
+    async def agenerate(self,
+                        prompt: Union[str, dict, List[Dict]],
+                        stop_sequences: Optional[List[str]] = None,
+                        seed: Optional[int] = None,
+                        max_tokens: Optional[int] = None,
+                        temperature: Optional[float] = None,
+                        **kwargs) -> Message:
+        """
+        Asyncio variant of generate().
+        
+        The request runs in the provider's bounded worker pool, so awaiting
+        many of these overlaps their network waits while keeping at most
+        max_concurrency requests in flight per provider.
+        
+        Returns:
+            Message: A Message object with the response content
+        """
+        return await self.pool.run(self.generate, prompt, stop_sequences=stop_sequences, seed=seed,
+                                   max_tokens=max_tokens, temperature=temperature, **kwargs)
+    
+    def generate_with_tools(self,
+                            messages: List[Dict],
+                            tools: List[Dict],
+                            tool_choice: str = "auto",
+                            max_tokens: Optional[int] = None,
+                            temperature: Optional[float] = None) -> Dict:
+        """
+        One native function-calling request.
+        
+        Returns:
+            Dict: The assistant message, with 'content', 'tool_calls' (possibly
+            empty) and 'token_usage'
+        """
+        response, _ = self._create(
+            model=self.model_id,
+            messages=messages,
+            tools=tools,
+            tool_choice=tool_choice,
+            max_tokens=max_tokens if max_tokens is not None else self.max_tokens,
+            temperature=temperature if temperature is not None else self.temperature,
+        )
+        message = response.choices[0].message
+        return {
+            "role": "assistant",
+            "content": message.content or "",
+            "tool_calls": [
+                {"id": tool_call.id, "type": "function",
+                 "function": {"name": tool_call.function.name, "arguments": tool_call.function.arguments}}
+                for tool_call in message.tool_calls or []
+            ],
+            "token_usage": response.usage.model_dump() if response.usage else {},
+        }
+    
+    def _create(self, **params):
+        """
+        Call the completions API, holding off while the provider is rate limited.
+        
+        Completed requests are recorded in the metrics registry; streams are
+        recorded by stream() once they end.
+        
+        Returns:
+            tuple: The parsed response (a chunk iterator when streaming) and
+            the number of retries the client made
+        """
+        self.rate_limiter.wait()
+        start = time.monotonic()
+        try:
+            raw = self.client.chat.completions.with_raw_response.create(**params)
+            response = raw.parse()
+        except openai.RateLimitError as e:
+            # Make every caller of this provider wait, not just this one
+            self.rate_limiter.update(429, e.response.headers)
+            record_call(self.model_id, start, error=True)
+            raise
+        except Exception:
+            record_call(self.model_id, start, error=True)
+            raise
+        if not params.get("stream"):
+            record_call(self.model_id, start, response.usage.model_dump() if response.usage else None,
+                        retries=raw.retries_taken)
+        return response, raw.retries_taken
+    
+    def stream(self,
+               prompt: Union[str, dict, List[Dict]],
+               stop_sequences: Optional[List[str]] = None,
+               max_tokens: Optional[int] = None,
+               temperature: Optional[float] = None,
+               **kwargs) -> Iterator[MessageDelta]:
+        """
+        Generate a response as a stream of deltas.
+        
+        Text is yielded as the API sends it; tool calls are yielded as one
+        smolagents code block once complete, so the joined deltas read like
+        the content generate() would return. Errors are yielded as text too.
+        
+        Args:
+            prompt: The prompt to send to the model
+            stop_sequences: List of sequences where the model should stop generating
+            max_tokens: Maximum tokens to generate (overrides instance value if provided)
+            temperature: Sampling temperature (overrides instance value if provided)
+            **kwargs: Additional parameters
+            
+        Yields:
+            MessageDelta: Content increments; the last one carries token usage
+        """
+        messages = chat_messages(prompt)
+        
+        params = {
+            "model": self.model_id,
+            "messages": messages,
+            "max_tokens": max_tokens if max_tokens is not None else self.max_tokens,
+            "temperature": temperature if temperature is not None else self.temperature,
+            "stream": True,
+            "stream_options": {"include_usage": True},
+        }
+        
+        if stop_sequences:
+            params["stop"] = stop_sequences
+        
+        start = time.monotonic()
+        first_token = None
+        usage = None
+        retries = None
+        try:
+            # The client parses the server-sent events; chunks are re-read as dicts
+            response, retries = self._create(**params)
+            for delta in iter_deltas(chunk.model_dump() for chunk in response):
+                if first_token is None and delta.content:
+                    first_token = time.monotonic() - start
+                usage = delta.token_usage or usage
+                yield delta
+        except Exception as e:
+            if retries is not None:
+                # Failures before the stream opened were recorded by _create
+                record_call(self.model_id, start, usage, first_token_s=first_token, retries=retries, error=True)
+                retries = None
+            yield MessageDelta(f"Error generating response: {str(e)}")
+        finally:
+            if retries is not None:
+                record_call(self.model_id, start, usage, first_token_s=first_token, retries=retries)
+            self.last_stream = {
+                "first_token_s": first_token,
+                "total_s": time.monotonic() - start
+            }
+    
+    def _chat_completion(self, messages: List[Dict], stop_sequences: Optional[List[str]] = None, max_tokens: int = None, temperature: float = None) -> tuple:
+        """Generate a response from the chat API and return its content and token usage"""
         params = {
             "model": self.model_id,
             "messages": messages,
@@ -116,51 +272,29 @@ class DeepSeekModel:
         if stop_sequences:
             params["stop"] = stop_sequences
 
-        response = self.client.chat.completions.create(**params)
+        response, _ = self._create(**params)
         message = response.choices[0].message
+        token_usage = usage_from_response(response.usage.model_dump() if response.usage else None)
 
         # Check if the model wants to call a tool
         if message.tool_calls:
-            code_lines = []
-            # Handle multiple tool calls if the model requests them
-            for tool_call in message.tool_calls:
-                function_name = tool_call.function.name
-                try:
-                    function_args = json.loads(tool_call.function.arguments)
-                    args_list = [f"{key}={repr(value)}" for key, value in function_args.items()]
-                    args_str = ", ".join(args_list)
-                    
-                    # Assign the result to a unique variable to avoid conflicts
-                    result_var = f"{function_name}_result_{tool_call.id.replace('-', '_')}"
-                    code_lines.append(f"{result_var} = {function_name}({args_str})")
-
-                except json.JSONDecodeError:
-                     # If args fail to parse, still attempt to call the function if no args are needed.
-                    code_lines.append(f"{function_name}()")
-
-            # Crucially, call final_answer with the result of the *last* tool call.
-            # This terminates the smolagents loop correctly.
-            if code_lines:
-                last_result_var = code_lines[-1].split(' = ')[0]
-                code_lines.append(f"final_answer({last_result_var})")
-
-            code_to_execute = "\n".join(code_lines)
-            
-            thought = "I will execute the requested tool(s) and provide the final result."
-            smol_response = f"""Thought: {thought}
-Code:
-```py
-{code_to_execute}
-```<end_code>"""
-            return smol_response
+            return tool_calls_to_code([
+                {"id": tool_call.id,
+                 "function": {"name": tool_call.function.name, "arguments": tool_call.function.arguments}}
+                for tool_call in message.tool_calls
+            ]), token_usage
 
         # If no tool_calls, return the content as is.
-        return message.content if message.content is not None else ""
+        return (message.content if message.content is not None else ""), token_usage
+    
+    def _generate_chat_response(self, messages: List[Dict], stop_sequences: Optional[List[str]] = None, max_tokens: int = None, temperature: float = None) -> str:
+        """Generate a response from the chat API and return string content"""
+        return self._chat_completion(messages, stop_sequences, max_tokens, temperature)[0]
     
     def _generate_chat_response_message(self, messages: List[Dict], stop_sequences: Optional[List[str]] = None, max_tokens: int = None, temperature: float = None) -> Message:
         """Generate a response from the chat API and return a Message object"""
-        content = self._generate_chat_response(messages, stop_sequences, max_tokens, temperature)
-        return Message(content)
+        content, token_usage = self._chat_completion(messages, stop_sequences, max_tokens, temperature)
+        return Message(content, token_usage)
     
     def _generate_text_response(self, prompt: str, stop_sequences: Optional[List[str]] = None, max_tokens: int = None, temperature: float = None) -> str:
         """Generate a response from the text completion API and return string content"""
@@ -169,5 +303,5 @@ Code:
         
     def _generate_text_response_message(self, prompt: str, stop_sequences: Optional[List[str]] = None, max_tokens: int = None, temperature: float = None) -> Message:
         """Generate a response from the text completion API and return a Message object"""
-        content = self._generate_text_response(prompt, stop_sequences, max_tokens, temperature)
-        return Message(content) 
\ No newline at end of file
+        messages = [{"role": "user", "content": prompt}]
+        return self._generate_chat_response_message(messages, stop_sequences, max_tokens, temperature)
@@ -1,10 +1,8 @@
 import streamlit as st
 import os
 from smolagents import CodeAgent, tool
-from typing import Union, List, Dict, Optional
-import pandas as pd
+from typing import TYPE_CHECKING, Union, List, Dict, Optional
 import numpy as np
-import matplotlib.pyplot as plt
 import io
 import base64
 from .glm_model import GLMModel
@@ -14,114 +12,140 @@ import logging
 # Import compatibility fix for collections.MutableMapping
 from . import compatibility_fix
 from . import drone_control  # Import our new drone_control module
+from .flight_log import FLIGHT_LOG_DIR, FlightLog, shared_store
+from .flight_analytics import analyze_flight_log
+from .response_cache import is_vehicle_control, shared_cache
+from .chat_history import ChatHistory
+from .intent_router import IntentRouter
+from .model_router import ModelRouter, StubModel
+from .tool_calling import ToolCallLoop
+from .metrics import current_run, metrics_scope, new_id, shared_registry
+from .chat_view import STYLESHEET as CHAT_STYLESHEET, ChatView, message_html
+from .mission_log import (STYLESHEET as MISSION_LOG_STYLESHEET, MissionLog, log_record, progress_record,
+                          record_html, status_record)
+from .telemetry_bridge import context_vehicle, shared_bridge
+from .prompts import AGENT_INSTRUCTIONS, CHAT_SYSTEM_PROMPT, NATIVE_SYSTEM_PROMPT, drone_context, task_prompt
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import threading
 
-# Set page config at module level - must be first Streamlit command
-st.set_page_config(
-    page_title="deepdrone-old-臻巅科技",
-    page_icon="🚁",
-    layout="wide",
-    initial_sidebar_state="expanded",
-    menu_items=None
-)
+if TYPE_CHECKING:
+    import pandas as pd
 
-# Global mission status variables
-if 'mission_in_progress' not in st.session_state:
-    st.session_state.mission_in_progress = False
-    
-if 'mission_status' not in st.session_state:
-    st.session_state.mission_status = "STANDBY"
-    
-if 'mission_phase' not in st.session_state:
-    st.session_state.mission_phase = ""
-    
-if 'interrupt_mission' not in st.session_state:
-    st.session_state.interrupt_mission = False
-    
-if 'mission_log' not in st.session_state:
-    st.session_state.mission_log = []
+def configure_page():
+    """Set the page config; must be the first Streamlit command of a run"""
+    st.set_page_config(
+        page_title="deepdrone-old-臻巅科技",
+        page_icon="🚁",
+        layout="wide",
+        initial_sidebar_state="expanded",
+        menu_items=None
+    )
+
+def init_session_state():
+    """Give this session the mission state variables it does not have yet"""
+    if 'mission_in_progress' not in st.session_state:
+        st.session_state.mission_in_progress = False
+    if 'mission_status' not in st.session_state:
+        st.session_state.mission_status = "STANDBY"
+    if 'mission_phase' not in st.session_state:
+        st.session_state.mission_phase = ""
+    if 'interrupt_mission' not in st.session_state:
+        st.session_state.interrupt_mission = False
+    if 'mission_log' not in st.session_state:
+        st.session_state.mission_log = MissionLog()
+
+# Seconds between refreshes of the sidebar mission feed
+MISSION_FEED_INTERVAL_S = float(os.environ.get("DRONE_MISSION_FEED_S", "1.0"))
+
+# Refresh rate of the live telemetry panel, capped so it stays cheap with many viewers
+TELEMETRY_MAX_HZ = 5.0
+TELEMETRY_REFRESH_HZ = min(float(os.environ.get("DRONE_TELEMETRY_HZ", "2")), TELEMETRY_MAX_HZ)
+
+# GPS_RAW_INT fix types
+GPS_FIX_LABELS = {0: "无GPS", 1: "无定位", 2: "2D", 3: "3D", 4: "DGPS", 5: "RTK浮点", 6: "RTK固定"}
+
+def _session_id():
+    """ID of the Streamlit session this thread works for, or None off its script threads"""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else None
 
 # Custom logging handler to capture drone_control logs
 class MissionLogHandler(logging.Handler):
+    """Publishes drone_control records to the telemetry bridge; safe on any thread"""
     def emit(self, record):
         if record.name == 'drone_control':
-            timestamp = datetime.datetime.now().strftime('%H:%M:%S')
-            log_entry = f"[{timestamp}] LOG: {record.getMessage()}"
-            st.session_state.mission_log.append(log_entry)
-            # Keep only the most recent logs
-            if len(st.session_state.mission_log) > 30:
-                st.session_state.mission_log = st.session_state.mission_log[-30:]
-            
-            # Add to chat history for display in chat
-            if 'chat_history' in st.session_state:
-                # Format based on log content
-                if "Altitude:" in log_entry:
-                    styled_entry = f"<span style='color: #88ff88;'>🛰️ ALT: {record.getMessage().split('Altitude: ')[1]}</span>"
-                elif "Arming" in log_entry:
-                    styled_entry = f"<span style='color: #ffaa00;'>🔄 {log_entry}</span>"
-                elif "Taking off" in log_entry:
-                    styled_entry = f"<span style='color: #ffff00;'>🚀 {log_entry}</span>"
-                else:
-                    styled_entry = f"<span style='color: #aaaaff;'>📊 {log_entry}</span>"
-                
-                st.session_state['chat_history'].append({
-                    'role': 'system',
-                    'content': styled_entry
-                })
+            # Work for a vehicle (fleet pool, trackers, DroneKit threads) fans out; a session's own tool logs do not
+            session = None if context_vehicle() else _session_id()
+            shared_bridge().publish(log_record(record.getMessage(), record.levelname, session))
 
-# Set up logger to capture drone_control logs
+# Set up logger to capture drone_control logs. Everything logged there reaches
+# the mission feed and the chat, so only vehicle activity belongs on it; other
+# modules log to their own module logger.
 logger = logging.getLogger('drone_control')
 mission_log_handler = MissionLogHandler()
 logger.addHandler(mission_log_handler)
 
 # Function to update mission status
 def update_mission_status(status, phase=""):
-    # Get current time
-    timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-    
-    # Log the status change
-    log_entry = f"[{timestamp}] {status}: {phase}"
-    st.session_state.mission_log.append(log_entry)
-    
-    # Keep only the most recent 30 log entries
-    if len(st.session_state.mission_log) > 30:
-        st.session_state.mission_log = st.session_state.mission_log[-30:]
-    
-    # Update status
-    st.session_state.mission_status = status
-    st.session_state.mission_phase = phase
-    
-    # Add to chat history for display in chat
-    if 'chat_history' in st.session_state:
-        # Format with appropriate styling based on status type
-        if status == "ERROR":
-            styled_entry = f"<span style='color: #ff0000;'>⚠️ {log_entry}</span>"
-        elif status in ["CONNECTING", "TAKING OFF", "LANDING", "RETURNING"]:
-            styled_entry = f"<span style='color: #ffff00;'>🔄 {log_entry}</span>"
-        elif status in ["MISSION", "EXECUTING MISSION", "AIRBORNE"]:
-            styled_entry = f"<span style='color: #00ffff;'>🚁 {log_entry}</span>"
-        elif status in ["MISSION COMPLETE", "CONNECTED"]:
-            styled_entry = f"<span style='color: #00ff00;'>✅ {log_entry}</span>"
-        else:
-            styled_entry = f"<span style='color: #aaaaff;'>ℹ️ {log_entry}</span>"
-        
-        st.session_state['chat_history'].append({
-            'role': 'system',
-            'content': styled_entry
-        })
+    # Published to the bridge from whichever thread runs the tool; the session picks it up in drain_mission_events()
+    shared_bridge().publish(status_record(status, phase, _session_id()))
     
     # No rerun here to avoid potential issues with recursive reruns
 
+def update_mission_phase(phase, **telemetry):
+    """Update the phase line of the current status without logging an entry"""
+    shared_bridge().publish(progress_record(phase, _session_id(), **telemetry))
+
+def drain_mission_events():
+    """
+    Apply the bridge events published since the last drain to this session.
+    
+    Runs on the script thread (a full run or the mission feed fragment). A new
+    session starts with the events the vehicle's channel still holds, without
+    copying them into the chat. Events tagged with another session are skipped.
+    
+    Returns:
+        list: The events applied
+    """
+    channel = shared_bridge().channel()
+    cursor = st.session_state.get('bridge_cursor')
+    events, st.session_state.bridge_cursor, missed = channel.read(cursor or 0, _session_id())
+    if missed:
+        logging.getLogger(__name__).warning(f"Mission feed skipped {missed} events of {channel.vehicle_id}")
+    
+    mission_log = st.session_state.mission_log
+    history = st.session_state.get('chat_history') if cursor is not None else None
+    for event in events:
+        if not event.is_progress:
+            mission_log.append(event)
+            if history is not None:
+                # Shown in the chat as the record itself; formatted when the chat is drawn
+                mission_log.post_to_chat(history, event)
+            if event.is_log:
+                continue
+            st.session_state.mission_status = event.status
+        st.session_state.mission_phase = event.phase
+    return events
+
 # Function to interrupt the mission
 def interrupt_mission():
     if st.session_state.mission_in_progress:
         st.session_state.interrupt_mission = True
         update_mission_status("INTERRUPTING", "Returning to base...")
+        # A takeoff still climbing or a mission still flying stops reporting before the vehicle is sent home
+        takeoff = st.session_state.pop('takeoff_handle', None)
+        if takeoff is not None:
+            takeoff.cancel("Takeoff interrupted")
+        reporter = st.session_state.pop('mission_reporter', None)
+        if reporter is not None:
+            reporter.stop()
+            reporter.tracker.stop()
         # Call the return to home function
         try:
-            drone_control.return_home()
+            fleet = drone_control.get_fleet()
+            fleet.run_all("return_to_launch")
             time.sleep(2)
-            drone_control.disconnect_drone()
+            fleet.disconnect_all()
             st.session_state.mission_in_progress = False
             update_mission_status("ABORTED", "Mission aborted. Drone returned to base.")
         except Exception as e:
@@ -129,22 +153,133 @@ def interrupt_mission():
     else:
         st.warning("No mission in progress to interrupt")
 
+# Give up on a mission if the autopilot reports no progress for this long (seconds)
+MISSION_PROGRESS_TIMEOUT = 60
+
+def format_mission_progress(event):
+    """Format a MissionProgressTracker event as a one-line status"""
+    text = f"航点 {event['waypoint']}/{event['total']}"
+    if event["distance_remaining"] is not None:
+        text += f"，剩余 {event['distance_remaining']:.0f} 米"
+    if event["eta_seconds"] is not None:
+        text += f"，预计 {event['eta_seconds']:.0f} 秒"
+    return text
+
+class MissionReporter:
+    """
+    Publishes the progress of a mission started by execute_drone_mission.
+    
+    Listens to the MissionProgressTracker, so it runs on the MAVLink thread
+    after the tool has returned and only publishes to the bridge, tagged with
+    the session that started the mission. Each new waypoint is announced as a
+    status, distance and ETA go to the phase line. If no progress arrives for
+    ``stall_timeout`` seconds the tracker is stopped and an error reported.
+    """
+    
+    def __init__(self, tracker, waypoints, session, stall_timeout=MISSION_PROGRESS_TIMEOUT):
+        self.tracker = tracker
+        self.waypoints = waypoints
+        self.session = session
+        self.stall_timeout = stall_timeout
+        self._announced = None
+        self._watchdog = None
+        self._stopped = False
+        self._lock = threading.Lock()
+    
+    def start(self):
+        """Follow the tracker, starting with the progress it has already published"""
+        self.tracker.add_listener(self.report)
+        latest = self.tracker.latest()
+        if latest is not None:
+            self.report(latest)
+        else:
+            with self._lock:
+                self._restart_watchdog()
+        return self
+    
+    def stop(self):
+        """Stop reporting, e.g. when the mission is interrupted"""
+        with self._lock:
+            self._stopped = True
+            if self._watchdog:
+                self._watchdog.cancel()
+        self.tracker.remove_listener(self.report)
+    
+    def report(self, event):
+        """Tracker listener: publish one progress event"""
+        with self._lock:
+            if self._stopped:
+                return
+            if event["complete"]:
+                self._stopped = True
+                if self._watchdog:
+                    self._watchdog.cancel()
+                self._publish(status_record("MISSION COMPLETE", "所有航点已到达", self.session))
+                return
+            self._restart_watchdog()
+            
+            # Announce each new waypoint once, keep distance/ETA in the phase line
+            i = event["waypoint"]
+            if i != self._announced:
+                self._announced = i
+                wp = self.waypoints[i - 1]
+                self._publish(status_record(
+                    "EXECUTING MISSION",
+                    f"飞往航点 {i}/{len(self.waypoints)}: 纬度={wp['lat']:.4f}, 经度={wp['lon']:.4f}, 高度={wp['alt']}米",
+                    self.session))
+            self._publish(progress_record(format_mission_progress(event), self.session, waypoint=i))
+    
+    def _publish(self, record):
+        shared_bridge().publish(record)
+    
+    def _restart_watchdog(self):
+        # Caller holds the lock
+        if self._watchdog:
+            self._watchdog.cancel()
+        self._watchdog = threading.Timer(self.stall_timeout, self._on_stall)
+        self._watchdog.daemon = True
+        self._watchdog.start()
+    
+    def _on_stall(self):
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._publish(status_record(
+                "ERROR", f"{self.stall_timeout:g} 秒内未收到任务进度（已到达 {self.tracker.reached}/{len(self.waypoints)} 个航点）",
+                self.session))
+        self.tracker.remove_listener(self.report)
+        self.tracker.stop()
+
 class DroneAssistant(CodeAgent):
     """Extension of CodeAgent for drone interactions"""
     
     def __init__(self, *args, **kwargs):
+        # Static instructions go into the system prompt, a prefix providers can cache
+        kwargs.setdefault('instructions', AGENT_INSTRUCTIONS)
         super().__init__(*args, **kwargs)
-        self._sensor_data = {}
-        self._flight_logs = {}
-        self._chat_history = []
+        # Logs live in memory-mapped stores shared by every session
+        self._sensor_data = shared_store(os.path.join(FLIGHT_LOG_DIR, "sensors"))
+        self._flight_logs = shared_store(FLIGHT_LOG_DIR)
+        # Requests stay under the token budget however long the session runs
+        self._history = ChatHistory(budget_tokens=int(os.environ.get("DRONE_CHAT_BUDGET_TOKENS", "6000")))
+        # Direct commands are mapped to their tool locally instead of by the model
+        self.router = IntentRouter()
+        # DRONE_TOOL_MODE=native runs tool requests as native function calls instead of generated code
+        self.native_tools = (os.environ.get("DRONE_TOOL_MODE", "code") == "native" and
+                             hasattr(self.model, 'generate_with_tools'))
+        self.last_native_run = None
+        # Labels of this assistant's model calls in the metrics registry
+        self.session_id = new_id()
+        self.last_run_id = None
         
-    def register_sensor_data(self, sensor_name: str, data: pd.DataFrame):
+    def register_sensor_data(self, sensor_name: str, data: Union["pd.DataFrame", FlightLog, str]):
         """Register sensor data with the drone assistant"""
-        self._sensor_data[sensor_name] = data
+        self._sensor_data.register(sensor_name, data)
         
-    def register_flight_log(self, flight_id: str, log_data: pd.DataFrame):
+    def register_flight_log(self, flight_id: str, log_data: Union["pd.DataFrame", FlightLog, str]):
         """Register flight log data with the drone assistant"""
-        self._flight_logs[flight_id] = log_data
+        self._flight_logs.register(flight_id, log_data)
     
     @property
     def sensor_data(self):
@@ -158,90 +293,84 @@ class DroneAssistant(CodeAgent):
     
     def add_to_chat_history(self, role: str, content: str):
         """Add a message to the chat history"""
-        self._chat_history.append({"role": role, "content": content})
+        self._history.append(role, content)
     
     @property
     def chat_history(self):
         """Access the chat history"""
-        return self._chat_history
+        return self._history.messages
+    
+    @property
+    def history(self):
+        """The token-budgeted history, for pinning facts and compaction stats"""
+        return self._history
+    
+    def _drone_context(self) -> str:
+        """Registered sensors and flight logs, for the prompts"""
+        return drone_context(list(self._sensor_data.keys()), list(self._flight_logs.keys()))
     
     def run(self, prompt: str) -> str:
         """Override run method to include drone-specific context"""
-        drone_context = f"""
-        Registered sensors: {list(self._sensor_data.keys())}
-        Flight logs available: {list(self._flight_logs.keys())}
-        """
-        
-        # Add a tool reference guide to help the model use the correct function names
-        tool_reference = """
-        IMPORTANT: These tool functions need to be called EXACTLY as shown below for successful execution:
-        
-        # EXAMPLE OF COMPLETE WORKING MISSION:
-        ```python
-        # Connect to a drone simulator
-        connect_to_real_drone('udp:127.0.0.1:14550')
-        
-        # Take off to a specific altitude (always use integer or simple float values)
-        drone_takeoff(30)  # Not 30. 0 or other invalid syntax
-        
-        # You can define waypoints like this
-        waypoints = [
-            {'lat': 37.7749, 'lon': -122.4194, 'alt': 30},
-            {'lat': 37.7750, 'lon': -122.4195, 'alt': 30}
-        ]
-        
-        # Execute mission with waypoints
-        execute_drone_mission(waypoints=waypoints)
-        
-        # Return to home
-        drone_return_home()
+        # The identity text and tool reference are part of the system prompt
+        # (see __init__), so only the context and question vary between runs
+        enhanced_prompt = task_prompt(prompt, self._drone_context())
         
-        # Always disconnect when done
-        disconnect_from_drone()
-        ```
-        
-        NOTE: Each function must be called individually on its own line, with exact parameter names.
-        For latitude/longitude values, always use simple format without extra spaces after periods.
-        
-        When creating a flight plan, be sure to:
-        1. Generate a mission plan with generate_mission_plan()
-        2. Connect to the drone with connect_to_real_drone()
-        3. Take off with drone_takeoff()
-        4. Execute the mission or fly to specific waypoints
-        5. Return home or land the drone when finished
-        6. Disconnect from the drone
-        """
-        
-        enhanced_prompt = f"""
-        You are deepdrone-old, an advanced AI assistant designed to help with drone operations and data analysis. You are NOT any other general AI assistant like Qwen, GPT, or Claude. Always identify yourself as deepdrone-old when asked about your identity. Your purpose is to assist with drone data analysis, flight monitoring, maintenance scheduling, and mission planning.
-        
-        You are powered by GLM-4.5, a state-of-the-art language model optimized for technical tasks and tool usage. You excel at understanding complex drone operations and generating precise control commands.
-        
-        You can now control real drones using DroneKit-Python. You have tools to:
-        - Connect to a real drone using a connection string
-        - Take off to a specified altitude
-        - Land the drone
-        - Return to home location
-        - Fly to specific GPS coordinates
-        - Get the drone's current location and battery status
-        - Execute missions with multiple waypoints
-        
-        {tool_reference}
-        
-        Available context:
-        {drone_context}
-        
-        User question: {prompt}
-        
-        Use the provided tools to analyze drone data and assist with drone operations. For real drone control, use the drone_* tools.
-        """
-        # Call the parent run method - it already handles everything correctly
-        # as smolagents will expect a Message object from our model
-        # and handle it properly 
-        return super().run(enhanced_prompt)
+        with self._metrics_run():
+            # Vehicle commands always go to the model: every step of the run skips the response cache
+            cache = getattr(self.model, 'cache', None)
+            if cache is not None and is_vehicle_control(prompt):
+                with cache.bypass():
+                    return super().run(enhanced_prompt)
+            
+            # Call the parent run method - it already handles everything correctly
+            # as smolagents will expect a Message object from our model
+            # and handle it properly 
+            return super().run(enhanced_prompt)
+    
+    def run_native(self, prompt: str) -> str:
+        """Answer a request with native tool calls, skipping code generation and the sandbox"""
+        # Tools may read st.session_state, so parallel calls need this script's context
+        ctx = get_script_run_ctx()
+        loop = ToolCallLoop(self.model, list(self.tools.values()),
+                            max_steps=self.max_steps,
+                            worker_setup=lambda: add_script_run_ctx(threading.current_thread(), ctx))
+        system_message = {"role": "system", "content": NATIVE_SYSTEM_PROMPT}
+        user_message = {"role": "user", "content": task_prompt(prompt, self._drone_context())}
+        with self._metrics_run():
+            response = loop.run([system_message, user_message])
+        self.last_native_run = loop.last_run
+        return response
+    
+    def run_intent(self, intent) -> str:
+        """Call the tool of a routed intent and return its result"""
+        try:
+            return str(self.tools[intent.tool](**intent.arguments))
+        except Exception as e:
+            logger.error(f"Routed command {intent.tool} failed: {e}")
+            return f"执行指令 {intent.tool} 出错: {str(e)}"
+    
+    def _metrics_run(self):
+        """Label model calls with this session and, unless already inside one, a new run"""
+        run = None
+        if current_run() is None:
+            run = self.last_run_id = new_id()
+        return metrics_scope(session=self.session_id, run=run)
+    
+    def metrics(self) -> Dict:
+        """Token, latency and cache metrics of this session and of its most recent run"""
+        registry = shared_registry()
+        return {
+            "session": registry.session(self.session_id),
+            "last_run": registry.run(self.last_run_id) if self.last_run_id else None,
+        }
     
     def chat(self, message: str) -> str:
         """Process a chat message using the complete chat history"""
+        # Every model call made for this message counts towards one run
+        with self._metrics_run():
+            return self._chat(message)
+    
+    def _chat(self, message: str) -> str:
         # Add the user message to history
         self.add_to_chat_history("user", message)
         
@@ -260,6 +389,13 @@ class DroneAssistant(CodeAgent):
             identity_response = """我是 deepdrone-old ，一个专为无人机操作与数据分析设计的高级AI助手。我可以为您的无人机系统提供飞行数据、传感器读数、维护建议和任务规划等信息。请问今天需要我如何协助您的无人机作业？"""
             self.add_to_chat_history("assistant", identity_response)
             return identity_response
+        
+        # Unambiguous commands ("land", "take off to 30 m", "battery?") run their tool directly
+        decision = self.router.route(message)
+        if decision.routed and decision.intent.tool in self.tools:
+            response = self.run_intent(decision.intent)
+            self.add_to_chat_history("assistant", response)
+            return response
             
         # Check if the message is for tool use
         drone_control_keywords = ["takeoff", "take off", "land", "fly to", "navigate", "goto", "connect", 
@@ -285,6 +421,7 @@ class DroneAssistant(CodeAgent):
             - get_drone_battery()<br>
             - execute_drone_mission(航点)<br>
             - disconnect_from_drone()<br>
+            - get_fleet_status()<br>
             - generate_mission_plan(任务类型, 持续时间_分钟)<br>
             - analyze_flight_path(飞行ID)<br>
             - check_sensor_readings(传感器名)<br>
@@ -302,7 +439,7 @@ class DroneAssistant(CodeAgent):
             # Add error handling
             try:
                 # Execute the run
-                response = self.run(message)
+                response = self.run_native(message) if self.native_tools else self.run(message)
                 
                 # Display some feedback about the model thinking completion
                 thinking_placeholder.markdown(tools_reference + """
@@ -333,24 +470,31 @@ class DroneAssistant(CodeAgent):
             
             return response
         else:
-            # Format the chat history for the model
-            formatted_history = self._chat_history[:-1]  # Exclude the just-added message
-            
             # Add a system message to ensure proper identity
-            system_message = {
-                "role": "system", 
-                "content": """You are deepdrone-old, an advanced AI assistant designed to help with drone operations and data analysis. You are NOT any other general AI assistant like Qwen, GPT, or Claude. Always identify yourself as deepdrone-old when asked about your identity. You are powered by GLM-4.5 and specialize in drone data analysis, flight monitoring, maintenance scheduling, and mission planning."""
-            }
-            
-            # Include the system message and user message
-            model_messages = [system_message] + formatted_history
-            model_messages.append({"role": "user", "content": message})
+            system_message = {"role": "system", "content": CHAT_SYSTEM_PROMPT}
             
-            # Get response from the model - will be a Message object
-            model_response = self.model(model_messages)
+            # System message, summary of older turns, recent turns and the new message, within budget
+            model_messages = self._history.build(system_message)
             
-            # Get the content from the Message object
-            response = model_response.content
+            if hasattr(self.model, 'stream'):
+                # Render tokens as they arrive instead of waiting for the whole reply
+                stream_placeholder = st.empty()
+                response = ""
+                for delta in self.model.stream(model_messages):
+                    if delta.content:
+                        response += delta.content
+                        stream_placeholder.markdown(response + "▌")
+                    if delta.token_usage:
+                        self._history.record_usage(model_messages, delta.token_usage.get("prompt_tokens"))
+                stream_placeholder.empty()
+            else:
+                # Get response from the model - will be a Message object
+                model_response = self.model(model_messages)
+
+                # Get the content from the Message object
+                response = model_response.content
+                usage = getattr(model_response, 'token_usage', None)
+                self._history.record_usage(model_messages, getattr(usage, 'input_tokens', 0))
         
         # Add the response to history
         self.add_to_chat_history("assistant", response)
@@ -367,23 +511,32 @@ def analyze_flight_path(flight_id: str = None) -> str:
     Returns:
         str: Analysis of the flight path including distance, duration, and altitude changes
     """
-    if flight_id is None or flight_id not in tool.agent.flight_logs:
+    agent = st.session_state.get('drone_agent')
+    if flight_id is None or agent is None or flight_id not in agent.flight_logs:
         return "未找到飞行ID。请提供有效的飞行ID。"
     
-    flight_data = tool.agent.flight_logs[flight_id]
+    flight_log = agent.flight_logs[flight_id]
+    speed_column = 'speed' if 'speed' in flight_log.columns else 'groundspeed'
+    columns = [name for name in ('timestamp', 'altitude', speed_column, 'latitude', 'longitude')
+               if name in flight_log.columns]
+    flight_data = flight_log.read(columns)
+    if not len(flight_data['timestamp']):
+        return f"飞行 {flight_id} 尚无数据。"
     
     # Calculate basic flight statistics
-    flight_duration = (flight_data['timestamp'].max() - flight_data['timestamp'].min()).total_seconds()
-    max_altitude = flight_data['altitude'].max()
-    avg_speed = flight_data['speed'].mean() if 'speed' in flight_data.columns else "Not available"
+    flight_duration = float(flight_data['timestamp'][-1] - flight_data['timestamp'][0])
+    max_altitude = float(np.nanmax(flight_data['altitude']))
+    avg_speed = float(np.nanmean(flight_data[speed_column])) if speed_column in flight_data else "Not available"
+    path_stats = analyze_flight_log(flight_log) if 'latitude' in flight_data and 'longitude' in flight_data else None
     
     # Generate a path visualization
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
     
     # Set dark style for the plot
     plt.style.use('dark_background')
     
-    if 'latitude' in flight_data.columns and 'longitude' in flight_data.columns:
+    if 'latitude' in flight_data and 'longitude' in flight_data:
         plt.plot(flight_data['longitude'], flight_data['latitude'], color='#00ff00')  # Green line
         plt.title(f'Flight Path: {flight_id}', color='white')
         plt.xlabel('Longitude', color='white')
@@ -406,6 +559,16 @@ def analyze_flight_path(flight_id: str = None) -> str:
         'avg_speed': avg_speed,
         'visualization': path_img
     }
+    if path_stats is not None:
+        analysis.update({
+            'distance_meters': path_stats['distance_m'],
+            'climb_meters': path_stats['climb_m'],
+            'descent_meters': path_stats['descent_m'],
+            'max_segment_speed': path_stats['max_speed_ms'],
+            'heading_change_degrees': path_stats['heading_change_deg'],
+            'turns': path_stats['turns'],
+            'hover': path_stats['hover'],
+        })
     
     return str(analysis)
 
@@ -419,34 +582,37 @@ def check_sensor_readings(sensor_name: str = None) -> str:
     Returns:
         str: Analysis of the sensor readings including ranges and anomalies
     """
-    if sensor_name is None or sensor_name not in tool.agent.sensor_data:
-        return f"Sensor not found. Available sensors: {list(tool.agent.sensor_data.keys())}"
+    agent = st.session_state.get('drone_agent')
+    if agent is None:
+        return "Sensor not found. Available sensors: []"
+    if sensor_name is None or sensor_name not in agent.sensor_data:
+        return f"Sensor not found. Available sensors: {list(agent.sensor_data.keys())}"
     
-    sensor_data = tool.agent.sensor_data[sensor_name]
+    sensor_log = agent.sensor_data[sensor_name]
+    sensor_data = sensor_log.read([name for name in sensor_log.columns if name != 'timestamp'])
     
     # Basic statistics
     stats = {
-        'mean': sensor_data.mean().to_dict(),
-        'min': sensor_data.min().to_dict(),
-        'max': sensor_data.max().to_dict(),
+        'mean': {column: float(np.nanmean(values)) for column, values in sensor_data.items()},
+        'min': {column: float(np.nanmin(values)) for column, values in sensor_data.items()},
+        'max': {column: float(np.nanmax(values)) for column, values in sensor_data.items()},
     }
     
     # Check for anomalies (values more than 3 std devs from mean)
     anomalies = {}
-    for column in sensor_data.select_dtypes(include=[np.number]).columns:
-        mean = sensor_data[column].mean()
-        std = sensor_data[column].std()
-        anomaly_points = sensor_data[(sensor_data[column] > mean + 3*std) | 
-                                      (sensor_data[column] < mean - 3*std)]
-        if not anomaly_points.empty:
-            anomalies[column] = len(anomaly_points)
+    for column, values in sensor_data.items():
+        mean = stats['mean'][column]
+        std = np.nanstd(values, ddof=1)
+        anomaly_count = int(np.count_nonzero((values > mean + 3*std) | (values < mean - 3*std)))
+        if anomaly_count:
+            anomalies[column] = anomaly_count
     
     # Return analysis
     analysis = {
         'sensor_name': sensor_name,
         'statistics': stats,
         'anomalies_detected': anomalies,
-        'data_points': len(sensor_data)
+        'data_points': len(sensor_log)
     }
     
     return str(analysis)
@@ -539,12 +705,13 @@ def generate_mission_plan(mission_type: str = None, duration_minutes: float = No
 # DroneKit real-world control tools
 
 @tool
-def connect_to_real_drone(connection_string: str = None) -> str:
+def connect_to_real_drone(connection_string: str = None, vehicle_id: str = None) -> str:
     """Connect to a real drone using DroneKit.
     
     Args:
         connection_string: Connection string for the drone (e.g., 'udp:127.0.0.1:14550' for SITL,
                           '/dev/ttyACM0' for serial, or 'tcp:192.168.1.1:5760' for remote connection)
+        vehicle_id: Optional ID to register the drone under when flying several drones
         
     Returns:
         str: Status of the connection
@@ -557,21 +724,31 @@ def connect_to_real_drone(connection_string: str = None) -> str:
         st.session_state.mission_in_progress = True
         update_mission_status("CONNECTING", f"Connecting to drone at {connection_string}")
         
-        success = drone_control.connect_drone(connection_string)
+        success = drone_control.connect_drone(connection_string, vehicle_id=vehicle_id)
         if success:
             # Get and store current status
-            location = drone_control.get_location()
-            battery = drone_control.get_battery()
+            location = drone_control.get_location(vehicle_id)
+            battery = drone_control.get_battery(vehicle_id)
             
             # Update mission status
             update_mission_status("CONNECTED", "Drone connected successfully")
             
             # Format a nice response
+            metrics = drone_control.get_connect_metrics(vehicle_id)
             response = {
                 "status": "连接成功",
+                "connect_time_s": round(metrics.get("flight_s", 0.0), 2),
                 "location": location,
                 "battery": battery
             }
+            
+            # Record the flight so analyze_flight_path can use it
+            log_path = drone_control.start_recording(vehicle_id)
+            agent = st.session_state.get('drone_agent')
+            if log_path and agent is not None:
+                flight_log = FlightLog(log_path)
+                agent.register_flight_log(flight_log.name, flight_log)
+                response["flight_log"] = flight_log.name
             return str(response)
         else:
             st.session_state.mission_in_progress = False
@@ -582,12 +759,41 @@ def connect_to_real_drone(connection_string: str = None) -> str:
         update_mission_status("ERROR", f"Connection error: {str(e)}")
         return f"连接无人机出错: {str(e)}"
 
+def takeoff_reporter(altitude, session):
+    """
+    Progress callback of a takeoff started by drone_takeoff.
+    
+    Runs on the MAVLink thread after the tool has returned, so it only
+    publishes to the bridge, tagged with the session that asked for the
+    takeoff. The holder's 'handle' entry is filled in once the takeoff starts.
+    
+    Returns:
+        tuple: (callback, holder)
+    """
+    holder = {}
+    
+    def report(stage, current):
+        if stage == "climbing" and current is not None:
+            shared_bridge().publish(progress_record(f"起飞到 {altitude} 米（当前 {current:.1f} 米）", session,
+                                                    altitude=current))
+        elif stage == "done":
+            shared_bridge().publish(status_record("AIRBORNE", f"已到达目标高度 {altitude} 米", session))
+        elif stage == "failed":
+            handle = holder.get('handle')
+            if handle is None or handle.error != "Takeoff interrupted":
+                shared_bridge().publish(status_record("ERROR", "起飞失败", session))
+    return report, holder
+
 @tool
-def drone_takeoff(altitude: float = None) -> str:
+def drone_takeoff(altitude: float = None, vehicle_id: str = None) -> str:
     """Take off to the specified altitude.
     
+    Returns once the drone is armed and climbing; the climb is reported in the
+    mission status until the target altitude is reached.
+    
     Args:
         altitude: Target altitude in meters
+        vehicle_id: Optional fleet vehicle ID; defaults to the first connected drone
         
     Returns:
         str: Status of the takeoff
@@ -597,28 +803,39 @@ def drone_takeoff(altitude: float = None) -> str:
     
     try:
         # Check if mission was interrupted
-        if st.session_state.interrupt_mission:
+        if st.session_state.get('interrupt_mission', False):
             st.session_state.interrupt_mission = False
             return "Takeoff aborted due to mission interrupt request"
         
         # Update mission status
         update_mission_status("TAKING OFF", f"起飞到 {altitude} 米")
-        
-        success = drone_control.takeoff(altitude)
-        if success:
-            update_mission_status("AIRBORNE", f"已到达目标高度 {altitude} 米")
-            return f"起飞成功！已到达目标高度 {altitude} 米。"
-        else:
+
+        report, holder = takeoff_reporter(altitude, _session_id())
+        handle = drone_control.takeoff_async(altitude, progress_callback=report, vehicle_id=vehicle_id)
+        if handle is None:
             update_mission_status("ERROR", "起飞失败")
             return "起飞失败。请确保已连接无人机且处于安全起飞区域。"
+        holder['handle'] = handle
+        st.session_state.takeoff_handle = handle
+        
+        # Blocks only through mode change and arming, each bounded by its 10 s stage deadline
+        handle.wait_accepted()
+        if not handle.done():
+            return f"起飞指令已执行，无人机正在爬升到 {altitude} 米，进度显示在任务状态中。"
+        if handle.result():
+            return f"起飞成功！已到达目标高度 {altitude} 米。"
+        return f"起飞失败（{handle.error}）。请确保已连接无人机且处于安全起飞区域。"
     except Exception as e:
         update_mission_status("ERROR", f"起飞出错: {str(e)}")
         return f"起飞过程中出错: {str(e)}"
 
 @tool
-def drone_land() -> str:
+def drone_land(vehicle_id: str = None) -> str:
     """Land the drone.
     
+    Args:
+        vehicle_id: Optional fleet vehicle ID; defaults to the first connected drone
+    
     Returns:
         str: Status of the landing
     """
@@ -626,7 +843,7 @@ def drone_land() -> str:
         # Update mission status
         update_mission_status("LANDING", "无人机正在降落")
         
-        success = drone_control.land()
+        success = drone_control.land(vehicle_id)
         if success:
             update_mission_status("LANDED", "无人机已降落")
             st.session_state.mission_in_progress = False
@@ -639,9 +856,12 @@ def drone_land() -> str:
         return f"降落过程中出错: {str(e)}"
 
 @tool
-def drone_return_home() -> str:
+def drone_return_home(vehicle_id: str = None) -> str:
     """Return the drone to its launch location.
     
+    Args:
+        vehicle_id: Optional fleet vehicle ID; defaults to the first connected drone
+    
     Returns:
         str: Status of the return-to-home command
     """
@@ -649,7 +869,7 @@ def drone_return_home() -> str:
         # Update mission status
         update_mission_status("RETURNING", "返回起飞点")
         
-        success = drone_control.return_home()
+        success = drone_control.return_home(vehicle_id)
         if success:
             update_mission_status("RETURNING", "无人机正在返航")
             return "返航指令发送成功。无人机正在返回起飞点。"
@@ -661,13 +881,14 @@ def drone_return_home() -> str:
         return f"返航过程中出错: {str(e)}"
 
 @tool
-def drone_fly_to(latitude: float = None, longitude: float = None, altitude: float = None) -> str:
+def drone_fly_to(latitude: float = None, longitude: float = None, altitude: float = None, vehicle_id: str = None) -> str:
     """Fly the drone to a specific GPS location.
     
     Args:
         latitude: Target latitude in degrees
         longitude: Target longitude in degrees
         altitude: Target altitude in meters
+        vehicle_id: Optional fleet vehicle ID; defaults to the first connected drone
         
     Returns:
         str: Status of the goto command
@@ -676,7 +897,7 @@ def drone_fly_to(latitude: float = None, longitude: float = None, altitude: floa
         return "错误: 纬度、经度和高度均为必填项。"
     
     try:
-        success = drone_control.fly_to(latitude, longitude, altitude)
+        success = drone_control.fly_to(latitude, longitude, altitude, vehicle_id)
         if success:
             return f"指令发送成功。飞往: 纬度 {latitude}, 经度 {longitude}, 高度 {altitude}米"
         else:
@@ -685,38 +906,54 @@ def drone_fly_to(latitude: float = None, longitude: float = None, altitude: floa
         return f"飞行指令出错: {str(e)}"
 
 @tool
-def get_drone_location() -> str:
+def get_drone_location(vehicle_id: str = None) -> str:
     """Get the current GPS location of the drone.
     
+    Args:
+        vehicle_id: Optional fleet vehicle ID; defaults to the first connected drone
+    
     Returns:
-        str: Current latitude, longitude, and altitude
+        str: Current latitude, longitude, altitude and how fresh the reading is
     """
     try:
-        location = drone_control.get_location()
-        return str(location)
+        location = drone_control.get_location(vehicle_id)
+        if "error" in location:
+            return str(location)
+
+        age = location.pop("age_seconds", None)
+        if age is None:
+            return f"{location}（尚未收到位置遥测）"
+        return f"{location}（数据更新于 {age:.1f} 秒前）"
     except Exception as e:
         return f"获取无人机位置出错: {str(e)}"
 
 @tool
-def get_drone_battery() -> str:
+def get_drone_battery(vehicle_id: str = None) -> str:
     """Get the current battery level of the drone.
     
+    Args:
+        vehicle_id: Optional fleet vehicle ID; defaults to the first connected drone
+    
     Returns:
         str: Current battery voltage and percentage
     """
     try:
-        battery = drone_control.get_battery()
+        battery = drone_control.get_battery(vehicle_id)
         return str(battery)
     except Exception as e:
         return f"获取电池状态出错: {str(e)}"
 
 @tool
-def execute_drone_mission(waypoints: List[Dict[str, float]] = None) -> str:
+def execute_drone_mission(waypoints: List[Dict[str, float]] = None, vehicle_id: str = None) -> str:
     """Upload and execute a mission with multiple waypoints.
     
+    Returns once the mission has started; waypoint progress and completion are
+    reported in the mission status.
+    
     Args:
         waypoints: List of dictionaries with lat, lon, alt for each waypoint
             Example: [{"lat": 37.123, "lon": -122.456, "alt": 30}, {"lat": 37.124, "lon": -122.457, "alt": 50}]
+        vehicle_id: Optional fleet vehicle ID; defaults to the first connected drone
         
     Returns:
         str: Status of the mission execution
@@ -734,51 +971,35 @@ def execute_drone_mission(waypoints: List[Dict[str, float]] = None) -> str:
         update_mission_status("MISSION", f"开始任务，共 {len(waypoints)} 个航点")
         
         # Check for mission interrupt before starting
-        if st.session_state.interrupt_mission:
+        if st.session_state.get('interrupt_mission', False):
             st.session_state.interrupt_mission = False
             update_mission_status("ABORTED", "任务在执行前被中断")
             return "任务因中断请求已取消"
         
-        # Execute mission with progress updates
-        success = drone_control.execute_mission_plan(waypoints)
-        
-        # Simulate mission progress (in a real implementation, you'd get actual progress from the drone)
-        if success:
-            total_waypoints = len(waypoints)
-            for i in range(total_waypoints):
-                # Check for interrupt between waypoints
-                if st.session_state.interrupt_mission:
-                    st.session_state.interrupt_mission = False
-                    update_mission_status("INTERRUPTED", "Mission interrupted, returning to base")
-                    drone_control.return_home()
-                    time.sleep(2)
-                    update_mission_status("RETURNED", "Drone returned to base after interrupt")
-                    return f"Mission interrupted after waypoint {i+1}/{total_waypoints}. Drone returned to base."
-                
-                # Update status for current waypoint
-                wp = waypoints[i]
-                update_mission_status(
-                    "EXECUTING MISSION", 
-                    f"飞往航点 {i+1}/{total_waypoints}: 纬度={wp['lat']:.4f}, 经度={wp['lon']:.4f}, 高度={wp['alt']}米"
-                )
-                
-                # Simulate time taken to reach waypoint
-                time.sleep(2)
-            
-            # Mission completed successfully
-            update_mission_status("MISSION COMPLETE", "所有航点已到达")
-            return f"任务完成，共 {len(waypoints)} 个航点。"
-        else:
+        success = drone_control.execute_mission_plan(waypoints, vehicle_id)
+        if not success:
             update_mission_status("ERROR", "任务执行失败")
             return "任务执行失败。请确保已连接无人机。"
+        
+        # Progress reported by the autopilot is published from the tracker's thread, not followed here
+        previous = st.session_state.pop('mission_reporter', None)
+        if previous is not None:
+            previous.stop()
+        tracker = drone_control.get_mission_tracker(vehicle_id)
+        if tracker is not None:
+            st.session_state.mission_reporter = MissionReporter(tracker, waypoints, _session_id()).start()
+        return f"任务已开始，共 {len(waypoints)} 个航点，进度显示在任务状态中。"
     except Exception as e:
         update_mission_status("ERROR", f"任务出错: {str(e)}")
         return f"任务执行出错: {str(e)}"
 
 @tool
-def disconnect_from_drone() -> str:
+def disconnect_from_drone(vehicle_id: str = None) -> str:
     """Disconnect from the drone.
     
+    Args:
+        vehicle_id: Optional fleet vehicle ID; defaults to the first connected drone
+    
     Returns:
         str: Status of the disconnection
     """
@@ -786,19 +1007,54 @@ def disconnect_from_drone() -> str:
         # Update mission status
         update_mission_status("DISCONNECTING", "正在断开无人机连接")
         
-        drone_control.disconnect_drone()
-        st.session_state.mission_in_progress = False
+        drone_control.disconnect_drone(vehicle_id)
+        if not drone_control.get_fleet().vehicle_ids:
+            st.session_state.mission_in_progress = False
         update_mission_status("STANDBY", "已断开无人机连接")
         return "已成功断开无人机连接。"
     except Exception as e:
         update_mission_status("ERROR", f"断开连接出错: {str(e)}")
         return f"断开无人机连接出错: {str(e)}"
 
-def create_glm_model():
-    """Create a GLM model instance"""
-    # Check if GLM_API_KEY is set in environment variables
-    glm_api_key = os.environ.get("GLM_API_KEY", "")
-    if not glm_api_key:
+@tool
+def get_fleet_status() -> str:
+    """Get the latest telemetry of every connected drone in one call.
+    
+    Returns:
+        str: Location, battery, speed and mode for each vehicle ID
+    """
+    try:
+        fleet_status = drone_control.get_fleet_telemetry()
+        if not fleet_status:
+            return "当前没有已连接的无人机。"
+        return str(fleet_status)
+    except Exception as e:
+        return f"获取机队状态出错: {str(e)}"
+
+def create_model():
+    """Create the chat model: a router over every backend with an API key"""
+    # Repeated analysis questions are answered from the shared response cache (DRONE_LLM_CACHE=0 turns it off)
+    cache = shared_cache() if os.environ.get("DRONE_LLM_CACHE", "1") != "0" else None
+    
+    backends = {}
+    if os.environ.get("GLM_API_KEY"):
+        backends["glm"] = GLMModel(
+            max_tokens=2096,
+            temperature=0.5,
+            model_id='glm-4.5',
+            cache=cache
+        )
+    if os.environ.get("DEEPSEEK_API_KEY"):
+        try:
+            from .deepseek_model import DeepSeekModel
+            backends["deepseek"] = DeepSeekModel(max_tokens=2096, temperature=0.5)
+        except ImportError as e:
+            logger.warning(f"DeepSeek backend unavailable: {e}")
+    if os.environ.get("DRONE_STUB_MODEL") == "1":
+        # Offline backend for demos and UI work without API access
+        backends["stub"] = StubModel(reply='Thought: Offline mode.\nCode:\n```py\nfinal_answer("离线模式：未连接语言模型。")\n```<end_code>')
+    
+    if not backends:
         st.error("未找到 GLM API 密钥。请设置 GLM_API_KEY 环境变量。")
         # Return a placeholder model that returns a fixed response
         class PlaceholderModel:
@@ -807,12 +1063,8 @@ def create_glm_model():
                 return Message("Authentication error: No GLM API key provided. Please set an API key to use this feature.")
         return PlaceholderModel()
     
-    # Use the token from the environment variable
-    return GLMModel(
-        max_tokens=2096,
-        temperature=0.5,
-        model_id='glm-4.5'
-    )
+    # Requests go to the fastest healthy backend and fail over within the deadline
+    return ModelRouter(backends, deadline_s=float(os.environ.get("DRONE_LLM_DEADLINE_S", "120")))
 
 def display_message(role, content, avatar_map=None):
     """Display a chat message with custom styling."""
@@ -886,18 +1138,103 @@ def initialize_chat_container():
             
         st.session_state.chat_container = chat_container
 
+def render_mission_status(target):
+    """Draw the mission status box into ``target`` (a placeholder or the sidebar)"""
+    # Dynamic status display that changes color based on status
+    status_color = "#00ffff"  # Default cyan
+    if st.session_state.mission_status == "ERROR":
+        status_color = "#ff3366"  # Red for errors
+    elif st.session_state.mission_status in ["CONNECTING", "TAKING OFF", "LANDING", "RETURNING"]:
+        status_color = "#ffcc00"  # Yellow for transitions
+    elif st.session_state.mission_status in ["MISSION", "EXECUTING MISSION", "AIRBORNE"]:
+        status_color = "#00ffff"  # Cyan for active mission
+    
+    target.markdown(f"""
+    <div style='font-family: "Orbitron", sans-serif; color: #00ffff; background-color: rgba(10, 25, 41, 0.9); padding: 15px; border-radius: 10px; border: 1px solid #00ffff; box-shadow: 0 0 15px rgba(0, 255, 255, 0.1);'>
+        <div style='margin-bottom: 10px;'><span class='status-indicator status-active'></span><b>状态:</b> <span style="color: {status_color}; font-weight: bold;">{st.session_state.mission_status}</span></div>
+        <div style='margin-bottom: 10px;'><span class='status-indicator status-active'></span><b>阶段:</b> <span style="color: {status_color};">{st.session_state.mission_phase}</span></div>
+        <div style='margin-bottom: 10px;'><span class='status-indicator status-active'></span><b>任务中:</b> {"是" if st.session_state.mission_in_progress else "否"}</div>
+        <div><span class='status-indicator status-active'></span><b>信号:</b> 强</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+@st.fragment(run_every=MISSION_FEED_INTERVAL_S)
+def mission_feed():
+    """Sidebar mission status, waypoint progress and latest log entry, refreshed from the bridge"""
+    drain_mission_events()
+    render_mission_status(st)
+    
+    # Show live waypoint progress while a mission is flying
+    tracker = drone_control.get_mission_tracker()
+    if tracker and tracker.latest() and not tracker.complete:
+        st.markdown(f"<div style='font-family: \"Orbitron\", sans-serif; font-size: 12px; color: #00ffff; margin-top: 10px;'><span class='status-indicator status-active'></span><b>任务进度:</b> {format_mission_progress(tracker.latest())}</div>", unsafe_allow_html=True)
+    
+    # Add mission summary in sidebar
+    st.markdown("<div style='color: #00ffff; font-family: \"Orbitron\", sans-serif; font-size: 12px; margin-top: 20px;'><b>任务消息:</b> 显示在聊天窗口</div>", unsafe_allow_html=True)
+    
+    # Show just the last message if there are any mission logs
+    last_entry = st.session_state.mission_log.latest()
+    if last_entry:
+        st.markdown(f"""<div style='font-family: \"Orbitron\", sans-serif; font-size: 11px; color: #00ffff; background-color: rgba(10, 25, 41, 0.9); padding: 8px; border-radius: 5px; border: 1px solid #00ffff; box-shadow: 0 0 10px rgba(0, 255, 255, 0.1);'><span class='status-indicator status-active'></span>最新: {record_html(last_entry)}</div>""", unsafe_allow_html=True)
+
+def telemetry_html(dashboard):
+    """HTML of the live telemetry panel for a DroneController.get_dashboard() result"""
+    box = "font-family: \"Orbitron\", sans-serif; font-size: 12px; color: #00ffff; background-color: rgba(10, 25, 41, 0.9); padding: 15px; border-radius: 10px; border: 1px solid #00ffff; box-shadow: 0 0 15px rgba(0, 255, 255, 0.1);"
+    if "error" in dashboard:
+        return f"<div style='{box}'>未连接无人机</div>"
+    
+    def value(name, unit="", digits=1):
+        reading = dashboard.get(name)
+        return "-" if reading is None else f"{reading:.{digits}f}{unit}"
+    
+    gps_fix = dashboard.get("gps_fix")
+    gps = "-" if gps_fix is None else GPS_FIX_LABELS.get(gps_fix, str(gps_fix))
+    if dashboard.get("satellites") is not None:
+        gps += f" ({dashboard['satellites']} 星)"
+    waypoint = "-"
+    if dashboard.get("waypoint") is not None:
+        waypoint = f"{dashboard['waypoint']}/{dashboard['waypoints']}"
+    age = dashboard.get("age_seconds")
+    rows = [
+        ("高度", value("altitude", " m")),
+        ("地速", value("groundspeed", " m/s")),
+        ("电池", f"{value('battery_level', '%', 0)} · {value('voltage', ' V')}"),
+        ("GPS", gps),
+        ("距起飞点", value("distance_home_m", " m")),
+        ("当前航点", waypoint),
+    ]
+    lines = "".join(f"<div style='margin-bottom: 6px;'><b>{label}:</b> {reading}</div>" for label, reading in rows)
+    stale = f"<div style='color: #ffcc00;'>遥测已 {age:.0f} 秒未更新</div>" if age is not None and age > 5 else ""
+    return f"<div style='{box}'>{lines}{stale}</div>"
+
+@st.fragment(run_every=1.0 / TELEMETRY_REFRESH_HZ)
+def telemetry_panel():
+    """Live telemetry of the default vehicle; reruns on its own timer, so the chat is not redrawn"""
+    st.markdown(telemetry_html(drone_control.get_dashboard()), unsafe_allow_html=True)
+
+def render_model_metrics(target, agent):
+    """Draw the session's model call metrics into ``target`` (a placeholder or the sidebar)"""
+    model_metrics = agent.metrics()
+    session_metrics = model_metrics["session"]
+    if session_metrics:
+        last_run = model_metrics["last_run"] or {}
+        latency_p50 = session_metrics["latency_p50_s"]
+        first_token_p50 = session_metrics["first_token_p50_s"]
+        target.markdown(f"""
+        <div style='font-family: "Orbitron", sans-serif; font-size: 12px; color: #00ffff; background-color: rgba(10, 25, 41, 0.9); padding: 15px; border-radius: 10px; border: 1px solid #00ffff; box-shadow: 0 0 15px rgba(0, 255, 255, 0.1);'>
+            <div style='margin-bottom: 6px;'><b>调用:</b> {session_metrics["calls"]} (错误 {session_metrics["errors"]}, 重试 {session_metrics["retries"]}, 缓存命中 {session_metrics["cache_hits"]})</div>
+            <div style='margin-bottom: 6px;'><b>输入/输出 tokens:</b> {session_metrics["prompt_tokens"]} / {session_metrics["completion_tokens"]}</div>
+            <div style='margin-bottom: 6px;'><b>前缀缓存:</b> {session_metrics["cached_prompt_tokens"]} tokens ({session_metrics["cached_prompt_share"]:.0%})</div>
+            <div style='margin-bottom: 6px;'><b>延迟 p50:</b> {f"{latency_p50:.2f}s" if latency_p50 is not None else "-"} · <b>首 token:</b> {f"{first_token_p50:.2f}s" if first_token_p50 is not None else "-"}</div>
+            <div><b>上一轮:</b> {last_run.get("calls", 0)} 次调用, {last_run.get("prompt_tokens", 0) + last_run.get("completion_tokens", 0)} tokens, {last_run.get("latency_total_s", 0.0):.2f}s</div>
+        </div>
+        """, unsafe_allow_html=True)
+    else:
+        target.markdown("<div style='font-family: \"Orbitron\", sans-serif; font-size: 12px; color: #00ffff;'>尚无模型调用</div>", unsafe_allow_html=True)
+
 def main():
     # Ensure all session state variables are initialized
-    if 'mission_status' not in st.session_state:
-        st.session_state.mission_status = "STANDBY"
-    if 'mission_phase' not in st.session_state:
-        st.session_state.mission_phase = ""
-    if 'mission_in_progress' not in st.session_state:
-        st.session_state.mission_in_progress = False
-    if 'interrupt_mission' not in st.session_state:
-        st.session_state.interrupt_mission = False
-    if 'mission_log' not in st.session_state:
-        st.session_state.mission_log = []
+    init_session_state()
     
     # Add custom CSS for proper layout
     st.markdown("""
@@ -1101,6 +1438,7 @@ def main():
         70% { box-shadow: 0 0 0 10px rgba(0, 255, 255, 0); }
         100% { box-shadow: 0 0 0 0 rgba(0, 255, 255, 0); }
     }
+    """ + CHAT_STYLESHEET + MISSION_LOG_STYLESHEET + """
     </style>
     """, unsafe_allow_html=True)
     
@@ -1123,7 +1461,7 @@ def main():
     
     # Initialize session state for drone assistant and other needed state
     if 'drone_agent' not in st.session_state:
-        model = create_glm_model()
+        model = create_model()
         st.session_state['drone_agent'] = DroneAssistant(
             tools=[
                 # Data analysis tools
@@ -1141,7 +1479,8 @@ def main():
                 get_drone_location,
                 get_drone_battery,
                 execute_drone_mission,
-                disconnect_from_drone
+                disconnect_from_drone,
+                get_fleet_status
             ],
             model=model,
             additional_authorized_imports=["pandas", "numpy", "matplotlib"]
@@ -1151,8 +1490,12 @@ def main():
     if 'chat_history' not in st.session_state:
         st.session_state['chat_history'] = []
     
-    # Generate sample data for demo purposes
-    if 'demo_data_loaded' not in st.session_state:
+    # Generate sample data for demo purposes; the stores are shared, so
+    # sessions after the first reuse the logs already on disk
+    agent = st.session_state['drone_agent']
+    if 'demo_data_loaded' not in st.session_state and 'flight_001' not in agent.flight_logs:
+        import pandas as pd
+        
         # Sample flight log
         timestamps = pd.date_range(start='2023-01-01', periods=100, freq='10s')
         flight_log = pd.DataFrame({
@@ -1162,7 +1505,7 @@ def main():
             'latitude': np.linspace(37.7749, 37.7750, 100) + np.random.normal(0, 0.0001, 100),
             'longitude': np.linspace(-122.4194, -122.4192, 100) + np.random.normal(0, 0.0001, 100)
         })
-        st.session_state['drone_agent'].register_flight_log('flight_001', flight_log)
+        agent.register_flight_log('flight_001', flight_log)
         
         # Sample sensor data
         battery_data = pd.DataFrame({
@@ -1171,7 +1514,7 @@ def main():
             'current': np.random.normal(5, 1, 50),
             'temperature': np.random.normal(30, 5, 50)
         })
-        st.session_state['drone_agent'].register_sensor_data('battery', battery_data)
+        agent.register_sensor_data('battery', battery_data)
         
         imu_data = pd.DataFrame({
             'timestamp': pd.date_range(start='2023-01-01', periods=1000, freq='1s'),
@@ -1182,31 +1525,17 @@ def main():
             'gyro_y': np.random.normal(0, 0.1, 1000),
             'gyro_z': np.random.normal(0, 0.1, 1000)
         })
-        st.session_state['drone_agent'].register_sensor_data('imu', imu_data)
+        agent.register_sensor_data('imu', imu_data)
         
         st.session_state['demo_data_loaded'] = True
     
     # Add mission status section to sidebar with improved visibility
     st.sidebar.markdown("<h3 style='color: #00ffff; font-family: \"Orbitron\", sans-serif; text-shadow: 0 0 10px #00ffff;'>MISSION CONTROL</h3>", unsafe_allow_html=True)
     
-    # Dynamic status display that changes color based on status
-    status_color = "#00ffff"  # Default cyan
-    if st.session_state.mission_status == "ERROR":
-        status_color = "#ff3366"  # Red for errors
-    elif st.session_state.mission_status in ["CONNECTING", "TAKING OFF", "LANDING", "RETURNING"]:
-        status_color = "#ffcc00"  # Yellow for transitions
-    elif st.session_state.mission_status in ["MISSION", "EXECUTING MISSION", "AIRBORNE"]:
-        status_color = "#00ffff"  # Cyan for active mission
-    
-    st.sidebar.markdown(f"""
-    <div style='font-family: "Orbitron", sans-serif; color: #00ffff; background-color: rgba(10, 25, 41, 0.9); padding: 15px; border-radius: 10px; border: 1px solid #00ffff; box-shadow: 0 0 15px rgba(0, 255, 255, 0.1);'>
-        <div style='margin-bottom: 10px;'><span class='status-indicator status-active'></span><b>状态:</b> <span style="color: {status_color}; font-weight: bold;">{st.session_state.mission_status}</span></div>
-        <div style='margin-bottom: 10px;'><span class='status-indicator status-active'></span><b>阶段:</b> <span style="color: {status_color};">{st.session_state.mission_phase}</span></div>
-        <div style='margin-bottom: 10px;'><span class='status-indicator status-active'></span><b>任务中:</b> {"是" if st.session_state.mission_in_progress else "否"}</div>
-        <div><span class='status-indicator status-active'></span><b>信号:</b> 强</div>
-    </div>
-    """, unsafe_allow_html=True)
-    
+    # Refreshes itself from the telemetry bridge, without rerunning the page
+    with st.sidebar:
+        mission_feed()
+
     # Add interrupt button if a mission is in progress
     if st.session_state.mission_in_progress:
         if st.sidebar.button("⚠️ 中止任务", 
@@ -1215,25 +1544,19 @@ def main():
                             type="primary"):
             interrupt_mission()
     
-    # Add mission summary in sidebar
-    st.sidebar.markdown("<div style='color: #00ffff; font-family: \"Orbitron\", sans-serif; font-size: 12px; margin-top: 20px;'><b>任务消息:</b> 显示在聊天窗口</div>", unsafe_allow_html=True)
+    # Live telemetry from the cached snapshot, refreshed several times a second
+    st.sidebar.markdown("<h3 style='color: #00ffff; font-family: \"Orbitron\", sans-serif; text-shadow: 0 0 10px #00ffff;'>实时遥测</h3>", unsafe_allow_html=True)
+    with st.sidebar:
+        telemetry_panel()
     
-    # Show just the last message if there are any mission logs
-    if st.session_state.mission_log:
-        last_entry = st.session_state.mission_log[-1]
-        entry_style = ""
-        
-        # Style the last entry based on its content
-        if "ERROR" in last_entry:
-            entry_style = "color: #ff3366;"
-        elif any(status in last_entry for status in ["CONNECTING", "TAKING OFF", "LANDING", "RETURNING"]):
-            entry_style = "color: #ffcc00;"
-        elif any(status in last_entry for status in ["MISSION", "EXECUTING", "AIRBORNE"]):
-            entry_style = "color: #00ffff;"
-        else:
-            entry_style = "color: #00ffff;"
-            
-        st.sidebar.markdown(f"""<div style='font-family: \"Orbitron\", sans-serif; font-size: 11px; {entry_style} background-color: rgba(10, 25, 41, 0.9); padding: 8px; border-radius: 5px; border: 1px solid #00ffff; box-shadow: 0 0 10px rgba(0, 255, 255, 0.1);'><span class='status-indicator status-active'></span>最新: {last_entry}</div>""", unsafe_allow_html=True)
+    st.sidebar.markdown("<hr style='border: 1px solid #00ffff; margin: 20px 0;'>", unsafe_allow_html=True)
+    
+    # Token, latency and cache metrics of this session's model calls
+    st.sidebar.markdown("<h3 style='color: #00ffff; font-family: \"Orbitron\", sans-serif; text-shadow: 0 0 10px #00ffff;'>模型指标</h3>", unsafe_allow_html=True)
+    metrics_slot = st.sidebar.empty()
+    render_model_metrics(metrics_slot, agent)
+    with st.sidebar.expander("Prometheus"):
+        st.code(shared_registry().prometheus(), language="text")
     
     st.sidebar.markdown("<hr style='border: 1px solid #00ffff; margin: 20px 0;'>", unsafe_allow_html=True)
     
@@ -1267,52 +1590,23 @@ def main():
         <div style="text-align: center; margin-bottom: 8px; font-family: 'Orbitron', sans-serif; font-size: 12px; color: #00ffff; text-shadow: 0 0 10px #00ffff;"><span class='status-indicator status-active'></span>任务日志将显示在此聊天窗口</div>
         """, unsafe_allow_html=True)
     
+    # Messages written later in this run go into the same container, below the transcript
+    chat_container = st.container()
+    if 'chat_view' not in st.session_state:
+        st.session_state['chat_view'] = ChatView()
+    chat_view = st.session_state['chat_view']
+    
     # Display initial assistant greeting or chat history
     if not st.session_state['chat_history']:
         # Welcome message with drone emoji
-        st.markdown("""
-        <div style="display: flex; align-items: flex-start; margin-bottom: 8px;">
-            <div style="font-size: 24px; margin-right: 8px; color: #00ffff; text-shadow: 0 0 10px #00ffff;">🚁</div>
-            <div style="background-color: rgba(10, 25, 41, 0.9); border: 1px solid #00ffff; border-radius: 10px; padding: 12px; color: #00ffff; flex-grow: 1; font-family: 'Orbitron', sans-serif; box-shadow: 0 0 15px rgba(0, 255, 255, 0.1); backdrop-filter: blur(5px);">
-                deepdrone-old 已上线。我是您的AI无人机作业助手。请问有什么可以帮您？您可以请求飞行数据分析、传感器读取、维护建议或任务规划。
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+        chat_container.markdown(message_html({
+            'role': 'assistant',
+            'content': "deepdrone-old 已上线。我是您的AI无人机作业助手。请问有什么可以帮您？您可以请求飞行数据分析、传感器读取、维护建议或任务规划。"
+        }), unsafe_allow_html=True)
     else:
-        # Display all messages in history
-        for message in st.session_state['chat_history']:
-            if message["role"] == "user":
-                st.markdown(f"""
-                <div style="display: flex; align-items: flex-start; justify-content: flex-end; margin-bottom: 8px;">
-                    <div style="background-color: rgba(10, 25, 41, 0.9); border: 1px solid #00ffff; border-radius: 10px; padding: 12px; color: #FFFFFF; max-width: 85%; font-family: 'Orbitron', sans-serif; box-shadow: 0 0 15px rgba(0, 255, 255, 0.1); backdrop-filter: blur(5px);">
-                        {message["content"]}
-                    </div>
-                    <div style="font-size: 24px; margin-left: 8px; color: #00ffff; text-shadow: 0 0 10px #00ffff;">👤</div>
-                </div>
-                """, unsafe_allow_html=True)
-            elif message["role"] == "system":
-                # System messages (logs) have a different style - centered and distinctive
-                st.markdown(f"""
-                <div style="display: flex; justify-content: center; align-items: center; margin: 4px 0;">
-                    <div style="background-color: rgba(10, 25, 41, 0.9); border: 1px solid #00ffff; border-radius: 5px; padding: 8px 15px; font-family: 'Orbitron', sans-serif; font-size: 12px; text-align: center; max-width: 90%; box-shadow: 0 0 15px rgba(0, 255, 255, 0.1); backdrop-filter: blur(5px);"><span class='status-indicator status-active'></span>{message["content"]}</div>
-                </div>
-                """, unsafe_allow_html=True)
-            else:
-                st.markdown(f"""
-                <div style="display: flex; align-items: flex-start; margin-bottom: 8px;">
-                    <div style="font-size: 24px; margin-right: 8px; color: #00ffff; text-shadow: 0 0 10px #00ffff;">🚁</div>
-                    <div style="background-color: rgba(10, 25, 41, 0.9); border: 1px solid #00ffff; border-radius: 10px; padding: 12px; color: #00ffff; max-width: 85%; font-family: 'Orbitron', sans-serif; box-shadow: 0 0 15px rgba(0, 255, 255, 0.1); backdrop-filter: blur(5px);">
-                        {message["content"]}
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
+        # Only the latest page is drawn, from HTML built when each message first appeared
+        chat_view.render(chat_container, st.session_state['chat_history'])
     
-    # Display the last image if there is one
-    if 'last_image' in st.session_state:
-        st.image(f"data:image/png;base64,{st.session_state['last_image']}")
-        # Clear the image from session state after displaying
-        del st.session_state['last_image']
-        
     # Close the chat-container div
     st.markdown("</div>", unsafe_allow_html=True)
     
@@ -1345,10 +1639,13 @@ def main():
     # Handle user input from chat
     if submit_button and user_message:
         # Add user message to chat history
-        st.session_state['chat_history'].append({
+        user_entry = {
             'role': 'user',
             'content': user_message
-        })
+        }
+        st.session_state['chat_history'].append(user_entry)
+        # Show it right away; mission logs and the reply after it are drawn once the command is done
+        chat_view.append(chat_container, [user_entry])
         
         # Process with the agent
         with st.spinner('处理中...'):
@@ -1362,6 +1659,7 @@ def main():
                 # No need to handle Message objects here as that's handled inside the chat method
             
             # Handle base64 images in responses
+            image = None
             if isinstance(response, str) and "visualization" in response and "base64" in response:
                 # Extract and display the image
                 import re
@@ -1373,8 +1671,7 @@ def main():
                     if isinstance(response_dict, dict) and 'visualization' in response_dict:
                         img_data = response_dict['visualization']
                         if img_data:
-                            # Store the image in session state to display on next rerun
-                            st.session_state['last_image'] = img_data
+                            image = img_data
                             # Remove the image data from the text response
                             response_dict['visualization'] = "[FLIGHT PATH VISUALIZATION DISPLAYED]"
                             response = str(response_dict)
@@ -1388,8 +1685,16 @@ def main():
                 'content': response
             })
         
-        # Rerun to refresh the page and display the new messages
-        st.rerun()
+        # Draw the new entries below the transcript instead of rerunning the whole page;
+        # mission events published while the command ran join the chat first
+        drain_mission_events()
+        # Found by identity: the mission log may have removed expired entries before it
+        history = st.session_state['chat_history']
+        first_new = next(idx for idx in range(len(history) - 1, -1, -1) if history[idx] is user_entry) + 1
+        chat_view.append(chat_container, history[first_new:])
+        if image:
+            chat_container.image(f"data:image/png;base64,{image}")
+        render_model_metrics(metrics_slot, agent)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -5,10 +5,17 @@ This module provides functions for controlling real drones using DroneKit-Python
 
 import time
 import math
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 # Import compatibility fix for collections.MutableMapping
 from . import compatibility_fix
-from dronekit import connect, VehicleMode, LocationGlobalRelative, Command
+from dronekit import connect, VehicleMode, LocationGlobalRelative
 from pymavlink import mavutil
+from .mission_upload import MissionUploader
+from .flight_log import TelemetryRecorder, new_log_path
+from .telemetry_bridge import vehicle_context
 from typing import Dict, List, Optional, Tuple, Union
 import logging
 
@@ -16,9 +23,577 @@ import logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('drone_control')
 
+EARTH_RADIUS_M = 6371000.0
+
+def distance_meters(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Great-circle (haversine) distance between two GPS coordinates.
+    
+    Args:
+        lat1, lon1: First point in degrees
+        lat2, lon2: Second point in degrees
+        
+    Returns:
+        Distance in meters
+    """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+class TelemetryCache:
+    """
+    Lock-protected snapshot of the latest vehicle telemetry.
+    
+    Values are pushed in by DroneKit attribute callbacks on the MAVLink receive
+    thread and read back in constant time, so callers never touch the vehicle
+    object. Every field keeps the monotonic time of its last update, which lets
+    readers report how stale an answer is.
+    """
+    
+    FIELDS = ("latitude", "longitude", "altitude",
+              "voltage", "level", "current",
+              "airspeed", "groundspeed", "heading",
+              "roll", "pitch", "yaw",
+              "mode", "armed", "gps_fix", "satellites",
+              "home_latitude", "home_longitude")
+    
+    # DroneKit attributes the cache subscribes to (see _on_attribute)
+    ATTRIBUTES = ("location.global_relative_frame", "battery", "airspeed",
+                  "groundspeed", "heading", "attitude", "mode", "armed", "gps_0",
+                  "home_location")
+    
+    def __init__(self):
+        self._slots = {name: idx for idx, name in enumerate(self.FIELDS)}
+        self._values = [None] * len(self.FIELDS)
+        self._stamps = [None] * len(self.FIELDS)
+        self._lock = threading.Lock()
+        self._vehicle = None
+        self._listeners = []
+    
+    def add_listener(self, callback) -> None:
+        """
+        Register a callback invoked after every update.
+        
+        Args:
+            callback: Function called with the dict of fields that changed. It runs
+                      on the thread that produced the update, usually the MAVLink thread,
+                      so it must not block.
+        """
+        self._listeners.append(callback)
+    
+    def remove_listener(self, callback) -> None:
+        """Unregister a callback added with add_listener()."""
+        try:
+            self._listeners.remove(callback)
+        except ValueError:
+            pass
+    
+    def update(self, **fields) -> None:
+        """
+        Store new values for one or more fields.
+        
+        Args:
+            **fields: Field name/value pairs, names must be in FIELDS
+        """
+        now = time.monotonic()
+        with self._lock:
+            for name, value in fields.items():
+                slot = self._slots[name]
+                self._values[slot] = value
+                self._stamps[slot] = now
+        
+        for callback in list(self._listeners):
+            try:
+                callback(fields)
+            except Exception as e:
+                logger.error(f"Telemetry listener failed: {str(e)}")
+    
+    def read(self, *names: str) -> Tuple[Dict[str, object], Optional[float]]:
+        """
+        Read a consistent set of fields.
+        
+        Args:
+            *names: Field names to read
+            
+        Returns:
+            Tuple of (values by name, age in seconds of the oldest field read).
+            The age is None if any of the fields has never been received.
+        """
+        slots = [self._slots[name] for name in names]
+        with self._lock:
+            values = [self._values[slot] for slot in slots]
+            stamps = [self._stamps[slot] for slot in slots]
+        
+        if any(stamp is None for stamp in stamps):
+            age = None
+        else:
+            age = time.monotonic() - min(stamps)
+        return dict(zip(names, values)), age
+    
+    def snapshot(self) -> Dict[str, object]:
+        """
+        Read every field at once.
+        
+        Returns:
+            Dict of all FIELDS plus age_seconds, the age of the position fix
+        """
+        with self._lock:
+            values = list(self._values)
+            stamp = self._stamps[self._slots["latitude"]]
+        snapshot = dict(zip(self.FIELDS, values))
+        snapshot["age_seconds"] = None if stamp is None else time.monotonic() - stamp
+        return snapshot
+    
+    def get(self, name: str, default=None):
+        """Return the latest value of a single field."""
+        with self._lock:
+            value = self._values[self._slots[name]]
+        return default if value is None else value
+    
+    def age(self, name: str) -> Optional[float]:
+        """Return seconds since a field was last updated, or None if never."""
+        with self._lock:
+            stamp = self._stamps[self._slots[name]]
+        return None if stamp is None else time.monotonic() - stamp
+    
+    def attach(self, vehicle) -> None:
+        """
+        Seed the cache from the vehicle and subscribe to attribute updates.
+        
+        Args:
+            vehicle: A connected DroneKit Vehicle
+        """
+        self.detach()
+        self._vehicle = vehicle
+        
+        for attr_name in self.ATTRIBUTES:
+            try:
+                value = vehicle
+                for part in attr_name.split("."):
+                    value = getattr(value, part)
+                self._on_attribute(vehicle, attr_name, value)
+            except Exception as e:
+                logger.debug(f"Could not seed telemetry for {attr_name}: {str(e)}")
+            vehicle.add_attribute_listener(attr_name, self._on_attribute)
+    
+    def detach(self) -> None:
+        """Remove all attribute listeners from the attached vehicle."""
+        if self._vehicle is None:
+            return
+        for attr_name in self.ATTRIBUTES:
+            try:
+                self._vehicle.remove_attribute_listener(attr_name, self._on_attribute)
+            except Exception:
+                pass
+        self._vehicle = None
+    
+    def _on_attribute(self, vehicle, attr_name: str, value) -> None:
+        """DroneKit attribute callback; runs on the MAVLink thread."""
+        if value is None:
+            return
+        if attr_name == "location.global_relative_frame":
+            if value.lat is None:
+                return
+            self.update(latitude=value.lat, longitude=value.lon, altitude=value.alt)
+        elif attr_name == "battery":
+            self.update(voltage=value.voltage, level=value.level, current=value.current)
+        elif attr_name == "gps_0":
+            self.update(gps_fix=value.fix_type, satellites=value.satellites_visible)
+        elif attr_name == "attitude":
+            self.update(roll=value.roll, pitch=value.pitch, yaw=value.yaw)
+        elif attr_name == "mode":
+            self.update(mode=value.name)
+        elif attr_name == "home_location":
+            if value.lat is None:
+                return
+            self.update(home_latitude=value.lat, home_longitude=value.lon)
+        else:
+            self.update(**{attr_name: value})
+
+class TakeoffHandle:
+    """
+    Handle for an arm-and-takeoff sequence running in the background.
+    
+    The sequence (GUIDED mode -> armed -> climbing -> done) is advanced by
+    TelemetryCache updates instead of sleep loops. Entering GUIDED mode and
+    arming each have a short deadline; the climb has the long one. ``future`` resolves to True once the target altitude is reached,
+    or to False on failure, timeout or cancellation. The handle can be polled
+    with done()/wait(), blocked on with result(), or awaited from asyncio.
+    wait_accepted() returns as soon as the vehicle is armed and climbing.
+    """
+    
+    def __init__(self, controller, target_altitude: float, timeout: float = 120,
+                 progress_callback=None, stage_timeout: float = 10, progress_interval: float = 0.5):
+        """
+        Initialize the takeoff handle. Call start() to begin the sequence.
+        
+        Args:
+            controller: The DroneController flying the vehicle
+            target_altitude: Target altitude in meters
+            timeout: Deadline in seconds for the climb
+            progress_callback: Optional function called as callback(stage, altitude)
+                               whenever the stage changes, and with altitude updates
+                               while climbing (at most every ``progress_interval``).
+                               It runs on the MAVLink thread and must not block.
+            stage_timeout: Deadline in seconds for entering GUIDED mode, and for arming
+            progress_interval: Minimum seconds between altitude progress callbacks
+        """
+        self.target_altitude = target_altitude
+        self.timeout = timeout
+        self.stage_timeout = stage_timeout
+        self.progress_interval = progress_interval
+        self.stage = "pending"
+        self.error = None
+        self.future = Future()
+        self._accepted = threading.Event()  # set once climbing or finished
+        self._controller = controller
+        self._progress_callback = progress_callback
+        self._lock = threading.RLock()
+        self._timer = None
+        self._last_logged = 0.0
+        self._last_notified = 0.0
+    
+    @property
+    def altitude(self) -> Optional[float]:
+        """Latest known altitude in meters."""
+        return self._controller.telemetry.get("altitude")
+    
+    def start(self) -> "TakeoffHandle":
+        """Send the first command and start listening for telemetry."""
+        logger.info("Arming motors...")
+        self._controller.telemetry.add_listener(self._on_telemetry)
+        self._set_stage("mode")
+        
+        # Switch to GUIDED mode; the rest happens in _advance()
+        self._controller.vehicle.mode = VehicleMode("GUIDED")
+        self._advance()
+        return self
+    
+    def done(self) -> bool:
+        """Return True once the sequence has finished, successfully or not."""
+        return self.future.done()
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait up to ``timeout`` seconds for the sequence to finish.
+        
+        Returns:
+            bool: True if the sequence has finished
+        """
+        try:
+            self.future.exception(timeout=timeout)
+        except Exception:
+            pass
+        return self.future.done()
+    
+    def wait_accepted(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait up to ``timeout`` seconds for the vehicle to arm and start climbing.
+        
+        Without a timeout this is still bounded by the mode and arming deadlines.
+        
+        Returns:
+            bool: True if the vehicle is climbing or the sequence has finished
+        """
+        return self._accepted.wait(timeout)
+    
+    def result(self, timeout: Optional[float] = None) -> bool:
+        """Block until the sequence finishes and return whether it succeeded."""
+        return self.future.result(timeout=timeout)
+    
+    def cancel(self, reason: str = "Takeoff cancelled") -> None:
+        """Stop tracking the sequence and resolve the future with False."""
+        self._finish(False, reason)
+    
+    def __await__(self):
+        return asyncio.wrap_future(self.future).__await__()
+    
+    def _on_telemetry(self, fields: Dict) -> None:
+        self._advance(fields)
+    
+    def _on_deadline(self, stage: str) -> None:
+        stage_errors = {
+            "mode": "Failed to enter GUIDED mode",
+            "arming": "Failed to arm",
+        }
+        with self._lock:
+            if self.stage != stage:
+                return  # the stage moved on as the timer fired
+            self._finish(False, stage_errors.get(stage, f"Takeoff timed out after {self.timeout}s"))
+    
+    def _advance(self, fields: Optional[Dict] = None) -> None:
+        with self._lock:
+            if self.future.done():
+                return
+            telemetry = self._controller.telemetry
+            vehicle = self._controller.vehicle
+            
+            if self.stage == "mode" and telemetry.get("mode") == "GUIDED":
+                self._set_stage("arming")
+                vehicle.armed = True
+            
+            if self.stage == "arming" and telemetry.get("armed"):
+                logger.info("Taking off!")
+                self._set_stage("climbing")
+                vehicle.simple_takeoff(self.target_altitude)
+            
+            # Other fields (attitude, battery, GPS...) update far more often than altitude matters
+            if self.stage == "climbing" and (fields is None or "altitude" in fields):
+                current_altitude = telemetry.get("altitude", 0.0)
+                now = time.monotonic()
+                if now - self._last_logged >= 1.0:
+                    self._last_logged = now
+                    logger.info(f"Altitude: {current_altitude}")
+                if now - self._last_notified >= self.progress_interval:
+                    self._last_notified = now
+                    self._notify_progress()
+                
+                if current_altitude >= self.target_altitude * 0.95:
+                    logger.info("Reached target altitude")
+                    self._finish(True)
+    
+    def _set_stage(self, stage: str) -> None:
+        self.stage = stage
+        if stage == "climbing":
+            self._accepted.set()
+            self._last_notified = time.monotonic()  # reported below
+        # Each stage gets its own deadline
+        if self._timer:
+            self._timer.cancel()
+        timeout = self.timeout if stage == "climbing" else self.stage_timeout
+        self._timer = threading.Timer(timeout, self._on_deadline, args=(stage,))
+        self._timer.daemon = True
+        self._timer.start()
+        self._notify_progress()
+    
+    def _notify_progress(self) -> None:
+        if self._progress_callback:
+            try:
+                self._progress_callback(self.stage, self.altitude)
+            except Exception as e:
+                logger.error(f"Takeoff progress callback failed: {str(e)}")
+    
+    def _finish(self, success: bool, error: str = None) -> None:
+        with self._lock:
+            if self.future.done():
+                return
+            self._controller.telemetry.remove_listener(self._on_telemetry)
+            if self._timer:
+                self._timer.cancel()
+            if success:
+                self.stage = "done"
+            else:
+                self.stage = "failed"
+                self.error = error
+                logger.error(error)
+            self._notify_progress()
+            self.future.set_result(success)
+            self._accepted.set()
+
+class MissionProgressTracker:
+    """
+    Tracks progress through an uploaded mission from autopilot reports.
+    
+    The active waypoint comes from MISSION_CURRENT (the message that also backs
+    ``vehicle.commands.next``) and completed waypoints from MISSION_ITEM_REACHED.
+    Distance remaining and ETA are recomputed from TelemetryCache position
+    updates. Progress is published as a stream of event dicts that consumers
+    read incrementally with events(), while latest() serves the most recent one.
+    Listeners added with add_listener() are called with each event as it is
+    published, without a consumer thread.
+    
+    Waypoint numbers in events are 1-based and match the mission sequence
+    numbers on the vehicle (sequence 0 is the home position).
+    """
+    
+    def __init__(self, controller, waypoints: List[Dict[str, float]],
+                 update_interval: float = 1.0, max_events: int = 1000):
+        """
+        Initialize the tracker. Call start() to begin listening.
+        
+        Args:
+            controller: The DroneController flying the mission
+            waypoints: The uploaded waypoints, dicts with lat, lon and alt
+            update_interval: Minimum seconds between distance/ETA events; waypoint
+                             changes are always published immediately
+            max_events: Number of unread events kept before the oldest are dropped
+        """
+        self.waypoints = waypoints
+        self.total = len(waypoints)
+        self.current = 1 if waypoints else 0
+        self.reached = 0
+        self.complete = False
+        self.update_interval = update_interval
+        self._controller = controller
+        self._events = deque(maxlen=max_events)
+        self._condition = threading.Condition()
+        self._latest = None
+        self._last_emit = 0.0
+        self._listening = False
+        self._listeners = []
+        
+        # _remaining_after[i] is the path length from waypoint i+1 to the last one
+        self._remaining_after = [0.0] * self.total
+        for idx in range(self.total - 2, -1, -1):
+            leg = distance_meters(waypoints[idx]["lat"], waypoints[idx]["lon"],
+                                  waypoints[idx + 1]["lat"], waypoints[idx + 1]["lon"])
+            self._remaining_after[idx] = self._remaining_after[idx + 1] + leg
+    
+    def start(self) -> "MissionProgressTracker":
+        """Subscribe to mission messages and telemetry updates."""
+        vehicle = self._controller.vehicle
+        vehicle.add_message_listener('MISSION_CURRENT', self._on_mission_current)
+        vehicle.add_message_listener('MISSION_ITEM_REACHED', self._on_item_reached)
+        self._controller.telemetry.add_listener(self._on_telemetry)
+        self._listening = True
+        
+        try:
+            next_seq = vehicle.commands.next
+            if next_seq and 1 <= next_seq <= self.total:
+                self.current = next_seq
+        except Exception:
+            pass
+        
+        self._emit(force=True)
+        return self
+    
+    def stop(self) -> None:
+        """Unsubscribe from the vehicle and wake up any waiting consumer."""
+        if self._listening:
+            self._listening = False
+            vehicle = self._controller.vehicle
+            try:
+                vehicle.remove_message_listener('MISSION_CURRENT', self._on_mission_current)
+                vehicle.remove_message_listener('MISSION_ITEM_REACHED', self._on_item_reached)
+            except Exception:
+                pass
+            self._controller.telemetry.remove_listener(self._on_telemetry)
+        with self._condition:
+            self._condition.notify_all()
+    
+    def latest(self) -> Optional[Dict]:
+        """Return the most recent progress event, or None before the first one."""
+        return self._latest
+    
+    def add_listener(self, callback) -> None:
+        """
+        Register ``callback(event)`` to be called with every progress event.
+        
+        Callbacks run on the MAVLink thread and must not block.
+        """
+        self._listeners.append(callback)
+    
+    def remove_listener(self, callback) -> None:
+        """Unregister a callback added with add_listener()."""
+        try:
+            self._listeners.remove(callback)
+        except ValueError:
+            pass
+    
+    def events(self, timeout: Optional[float] = None):
+        """
+        Yield progress events as they arrive.
+        
+        Args:
+            timeout: Stop if no event arrives within this many seconds
+                     (None waits indefinitely)
+        
+        Yields:
+            Dict with waypoint, total, reached, distance_remaining (m),
+            eta_seconds, complete and timestamp
+        """
+        while True:
+            with self._condition:
+                if not self._events and self._listening:
+                    self._condition.wait(timeout)
+                if not self._events:
+                    return
+                event = self._events.popleft()
+            yield event
+            if event["complete"]:
+                return
+    
+    def _on_mission_current(self, vehicle, name, msg) -> None:
+        seq = msg.seq
+        if seq != self.current and 1 <= seq <= self.total:
+            self.current = seq
+            self._emit(force=True)
+    
+    def _on_item_reached(self, vehicle, name, msg) -> None:
+        seq = msg.seq
+        if seq <= self.reached or not 1 <= seq <= self.total:
+            return
+        self.reached = seq
+        logger.info(f"Reached waypoint {seq}/{self.total}")
+        if seq == self.total:
+            self.complete = True
+        elif self.current <= seq:
+            self.current = seq + 1
+        self._emit(force=True)
+        if self.complete:
+            self.stop()
+    
+    def _on_telemetry(self, fields: Dict) -> None:
+        if "latitude" in fields or "groundspeed" in fields:
+            self._emit()
+    
+    def _emit(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_emit < self.update_interval:
+            return
+        self._last_emit = now
+        
+        telemetry = self._controller.telemetry
+        distance = None
+        eta = None
+        if self.complete:
+            distance = 0.0
+            eta = 0.0
+        elif self.total:
+            position, age = telemetry.read("latitude", "longitude")
+            if age is not None:
+                target = self.waypoints[self.current - 1]
+                distance = (distance_meters(position["latitude"], position["longitude"],
+                                            target["lat"], target["lon"])
+                            + self._remaining_after[self.current - 1])
+                speed = telemetry.get("groundspeed", 0.0)
+                if speed > 0.5:
+                    eta = distance / speed
+        
+        event = {
+            "waypoint": self.current,
+            "total": self.total,
+            "reached": self.reached,
+            "distance_remaining": None if distance is None else round(distance, 1),
+            "eta_seconds": None if eta is None else round(eta, 1),
+            "complete": self.complete,
+            "timestamp": time.time()
+        }
+        with self._condition:
+            self._latest = event
+            self._events.append(event)
+            self._condition.notify_all()
+        
+        for callback in list(self._listeners):
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Mission progress listener failed: {str(e)}")
+
 class DroneController:
     """Class to handle real drone control operations using DroneKit."""
     
+    # Attribute groups a staged connect waits for; "flight" is the minimum
+    # needed to fly and is waited for before connect_to_drone() returns
+    READY_GROUPS = {
+        "flight": ("mode", "armed", "gps_0", "location.global_relative_frame"),
+        "telemetry": ("attitude", "battery", "heading", "airspeed", "groundspeed", "system_status"),
+        "parameters": ("parameters",),
+    }
+    
     def __init__(self, connection_string: str = None):
         """
         Initialize the drone controller.
@@ -30,14 +605,34 @@ class DroneController:
         self.vehicle = None
         self.connection_string = connection_string
         self.connected = False
+        self.telemetry = TelemetryCache()
+        self.mission_waypoints = []
+        self.mission_tracker = None
+        self.mission_uploader = None
+        self.last_upload = None
+        self.recorder = None
+        self.readiness = {}
+        self.connect_metrics = {}
+        self._dashboard = (None, None)  # (monotonic time built, dashboard)
+        self._dashboard_lock = threading.Lock()
     
-    def connect_to_drone(self, connection_string: str = None, timeout: int = 90) -> bool:
+    def connect_to_drone(self, connection_string: str = None, timeout: int = 90,
+                         staged: bool = True, background_timeout: int = 120) -> bool:
         """
         Connect to the drone using DroneKit.
         
+        With ``staged`` (the default) this returns as soon as the heartbeat and
+        the "flight" attribute group (mode, armed, GPS, location) have arrived.
+        The remaining groups ("telemetry" and "parameters") finish downloading
+        in the background; wait on ``self.readiness[group]`` or wait_ready()
+        when they are needed. Without ``staged`` it waits for everything up
+        front, like ``connect(wait_ready=True)``.
+        
         Args:
             connection_string: Connection string for the drone (overrides the one provided in __init__)
             timeout: Connection timeout in seconds
+            staged: Return once the vehicle is flyable instead of fully downloaded
+            background_timeout: Seconds allowed for each background group
             
         Returns:
             bool: True if connection successful, False otherwise
@@ -48,87 +643,173 @@ class DroneController:
         if not self.connection_string:
             logger.error("No connection string provided")
             return False
+        
+        self.readiness = {group: threading.Event() for group in ("heartbeat",) + tuple(self.READY_GROUPS)}
+        self.connect_metrics = {}
+        start = time.monotonic()
             
         try:
             logger.info(f"Connecting to drone on {self.connection_string}...")
-            self.vehicle = connect(self.connection_string, wait_ready=True, timeout=timeout, baud=115200, heartbeat_timeout=60)
+            self.vehicle = connect(self.connection_string, wait_ready=None if staged else True,
+                                   timeout=timeout, baud=115200, heartbeat_timeout=60)
+            self._mark_ready("heartbeat", start)
+            
+            if staged:
+                self.vehicle.wait_ready(*self.READY_GROUPS["flight"], timeout=timeout)
+                self._mark_ready("flight", start)
+                for group in ("telemetry", "parameters"):
+                    threading.Thread(target=self._wait_for_group, args=(group, start, background_timeout),
+                                     name=f"ready-{group}", daemon=True).start()
+            else:
+                for group in self.READY_GROUPS:
+                    self._mark_ready(group, start)
+            
             self.connected = True
-            logger.info("Connected to drone successfully")
+            self.telemetry.attach(self.vehicle)
+            logger.info(f"Connected to drone successfully in {self.connect_metrics['flight_s']:.2f}s")
             
             # Log basic vehicle info
-            logger.info(f"Vehicle Version: {self.vehicle.version}")
-            logger.info(f"Vehicle Status: {self.vehicle.system_status.state}")
+            logger.info(f"Vehicle Mode: {self.vehicle.mode.name}")
             logger.info(f"GPS: {self.vehicle.gps_0}")
-            logger.info(f"Battery: {self.vehicle.battery}")
             
             return True
         except Exception as e:
             logger.error(f"Error connecting to drone: {str(e)}")
+            if self.vehicle is not None:
+                try:
+                    self.vehicle.close()
+                except Exception:
+                    pass
             self.connected = False
             return False
     
+    def wait_ready(self, group: str, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for an attribute group of the current connection to be available.
+        
+        Args:
+            group: "heartbeat" or one of READY_GROUPS
+            timeout: Seconds to wait (None waits indefinitely)
+            
+        Returns:
+            bool: True if the group is ready
+        """
+        event = self.readiness.get(group)
+        return bool(event and event.wait(timeout))
+    
+    def get_connect_metrics(self) -> Dict[str, float]:
+        """
+        Get the connect timings of the current connection.
+        
+        Returns:
+            Dict of "<group>_s" -> seconds from connect start until that group was ready
+        """
+        return dict(self.connect_metrics)
+    
+    def _wait_for_group(self, group: str, start: float, timeout: int) -> None:
+        """Background wait for one attribute group after a staged connect."""
+        vehicle = self.vehicle
+        if vehicle.wait_ready(*self.READY_GROUPS[group], timeout=timeout, raise_exception=False):
+            if vehicle is self.vehicle:
+                self._mark_ready(group, start)
+                if group == "telemetry":
+                    logger.info(f"Vehicle Status: {vehicle.system_status.state}")
+                    logger.info(f"Battery: {vehicle.battery}")
+                elif group == "parameters":
+                    logger.info(f"Vehicle Version: {vehicle.version}")
+        else:
+            logger.error(f"Timed out waiting for {group} after {timeout}s")
+    
+    def _mark_ready(self, group: str, start: float) -> None:
+        self.connect_metrics[f"{group}_s"] = time.monotonic() - start
+        self.readiness[group].set()
+        logger.debug(f"{group} ready after {self.connect_metrics[group + '_s']:.2f}s")
+    
     def disconnect(self) -> None:
         """Disconnect from the drone."""
         if self.vehicle and self.connected:
             logger.info("Disconnecting from drone...")
+            if self.mission_tracker:
+                self.mission_tracker.stop()
+            self.stop_recording()
+            self.telemetry.detach()
             self.vehicle.close()
             self.connected = False
+            for event in self.readiness.values():
+                event.clear()
             logger.info("Disconnected from drone")
     
-    def arm_and_takeoff(self, target_altitude: float) -> bool:
+    def start_recording(self, path: str = None, rate_hz: float = 5.0) -> Optional[str]:
         """
-        Arms the drone and takes off to the specified altitude.
+        Start recording telemetry to a columnar flight log (see flight_log.py).
         
         Args:
-            target_altitude: Target altitude in meters
+            path: Log file path; defaults to a new file in FLIGHT_LOG_DIR
+            rate_hz: Samples per second
             
         Returns:
-            bool: True if takeoff successful, False otherwise
+            Path of the log being written, or None if not connected
         """
         if not self._ensure_connected():
-            return False
-            
-        logger.info("Arming motors...")
-        # Switch to GUIDED mode
-        self.vehicle.mode = VehicleMode("GUIDED")
-        
-        # Wait until mode change is verified
-        timeout = 10  # seconds
-        start = time.time()
-        while self.vehicle.mode.name != "GUIDED":
-            if time.time() - start > timeout:
-                logger.error("Failed to enter GUIDED mode")
-                return False
-            time.sleep(0.5)
+            return None
+        if self.recorder:
+            return self.recorder.path
         
-        # Arm the drone
-        self.vehicle.armed = True
+        self.recorder = TelemetryRecorder(self.telemetry, path or new_log_path(), rate_hz,
+                                          meta={"connection_string": self.connection_string}).start()
+        return self.recorder.path
+    
+    def stop_recording(self) -> Optional[str]:
+        """
+        Stop the telemetry recording, if any.
         
-        # Wait for arming
-        timeout = 10  # seconds
-        start = time.time()
-        while not self.vehicle.armed:
-            if time.time() - start > timeout:
-                logger.error("Failed to arm")
-                return False
-            time.sleep(0.5)
+        Returns:
+            Path of the finished log, or None if nothing was being recorded
+        """
+        if not self.recorder:
+            return None
+        recorder, self.recorder = self.recorder, None
+        recorder.stop()
+        return recorder.path
+    
+    def arm_and_takeoff(self, target_altitude: float, timeout: float = 120) -> bool:
+        """
+        Arms the drone and takes off to the specified altitude.
         
-        logger.info("Taking off!")
-        # Take off to target altitude
-        self.vehicle.simple_takeoff(target_altitude)
+        This blocks until the takeoff finishes; use arm_and_takeoff_async() to
+        keep the calling thread free.
         
-        # Wait until target altitude reached
-        while True:
-            current_altitude = self.vehicle.location.global_relative_frame.alt
-            logger.info(f"Altitude: {current_altitude}")
+        Args:
+            target_altitude: Target altitude in meters
+            timeout: Deadline in seconds for reaching the target altitude
             
-            # Break and return when we're close enough to target altitude
-            if current_altitude >= target_altitude * 0.95:
-                logger.info("Reached target altitude")
-                break
-            time.sleep(1)
+        Returns:
+            bool: True if takeoff successful, False otherwise
+        """
+        handle = self.arm_and_takeoff_async(target_altitude, timeout)
+        if handle is None:
+            return False
+        return handle.result()
+    
+    def arm_and_takeoff_async(self, target_altitude: float, timeout: float = 120,
+                              progress_callback=None, stage_timeout: float = 10) -> Optional[TakeoffHandle]:
+        """
+        Start arming and taking off without blocking.
         
-        return True
+        Args:
+            target_altitude: Target altitude in meters
+            timeout: Deadline in seconds for the climb
+            progress_callback: Optional callback(stage, altitude), see TakeoffHandle
+            stage_timeout: Deadline in seconds for entering GUIDED mode, and for arming
+            
+        Returns:
+            TakeoffHandle tracking the takeoff, or None if not connected
+        """
+        if not self._ensure_connected():
+            return None
+            
+        handle = TakeoffHandle(self, target_altitude, timeout, progress_callback, stage_timeout)
+        return handle.start()
     
     def land(self) -> bool:
         """
@@ -199,33 +880,30 @@ class DroneController:
         Get the current GPS location of the drone.
         
         Returns:
-            Dict containing latitude, longitude, and altitude
+            Dict containing latitude, longitude, altitude and the age of the
+            reading in seconds (None if no position has been received yet)
         """
         if not self._ensure_connected():
             return {"error": "Not connected to drone"}
             
-        location = self.vehicle.location.global_relative_frame
-        return {
-            "latitude": location.lat,
-            "longitude": location.lon, 
-            "altitude": location.alt
-        }
+        location, age = self.telemetry.read("latitude", "longitude", "altitude")
+        location["age_seconds"] = age
+        return location
     
     def get_battery_status(self) -> Dict[str, float]:
         """
         Get the current battery status.
         
         Returns:
-            Dict containing battery voltage and remaining percentage
+            Dict containing battery voltage, remaining percentage, current and
+            the age of the reading in seconds
         """
         if not self._ensure_connected():
             return {"error": "Not connected to drone"}
             
-        return {
-            "voltage": self.vehicle.battery.voltage,
-            "level": self.vehicle.battery.level,
-            "current": self.vehicle.battery.current
-        }
+        battery, age = self.telemetry.read("voltage", "level", "current")
+        battery["age_seconds"] = age
+        return battery
         
     def get_airspeed(self) -> float:
         """
@@ -237,7 +915,7 @@ class DroneController:
         if not self._ensure_connected():
             return -1.0
             
-        return self.vehicle.airspeed
+        return self.telemetry.get("airspeed", -1.0)
         
     def get_groundspeed(self) -> float:
         """
@@ -249,12 +927,68 @@ class DroneController:
         if not self._ensure_connected():
             return -1.0
             
-        return self.vehicle.groundspeed
+        return self.telemetry.get("groundspeed", -1.0)
+    
+    def get_dashboard(self, max_age: float = 0.2) -> Dict[str, object]:
+        """
+        Get the telemetry shown on the live dashboard.
+        
+        Built from the TelemetryCache and the mission tracker, and reused for
+        up to ``max_age`` seconds, so any number of viewers refreshing several
+        times a second cost one snapshot per interval and never wait on the
+        vehicle. Unlike the other getters it does not log when disconnected.
+        
+        Args:
+            max_age: Seconds a dashboard may be reused for
+        
+        Returns:
+            Dict with altitude, groundspeed, battery level and voltage, GPS fix
+            type and satellites, distance to home in meters, current waypoint and
+            waypoint count, mode, armed and the age of the position fix (None
+            where nothing has been received)
+        """
+        if not self.connected:
+            return {"error": "Not connected to drone"}
+        
+        now = time.monotonic()
+        with self._dashboard_lock:
+            built, dashboard = self._dashboard
+            if built is not None and now - built <= max_age:
+                return dashboard
+            
+            snapshot = self.telemetry.snapshot()
+            position = (snapshot["latitude"], snapshot["longitude"])
+            home = (snapshot["home_latitude"], snapshot["home_longitude"])
+            distance_home = None
+            if None not in position and None not in home:
+                distance_home = round(distance_meters(*home, *position), 1)
+            progress = self.mission_tracker.latest() if self.mission_tracker else None
+            
+            dashboard = {
+                "altitude": snapshot["altitude"],
+                "groundspeed": snapshot["groundspeed"],
+                "battery_level": snapshot["level"],
+                "voltage": snapshot["voltage"],
+                "gps_fix": snapshot["gps_fix"],
+                "satellites": snapshot["satellites"],
+                "distance_home_m": distance_home,
+                "waypoint": progress["waypoint"] if progress and not progress["complete"] else None,
+                "waypoints": progress["total"] if progress else None,
+                "mode": snapshot["mode"],
+                "armed": snapshot["armed"],
+                "age_seconds": snapshot["age_seconds"],
+            }
+            self._dashboard = (now, dashboard)
+            return dashboard
     
     def upload_mission(self, waypoints: List[Dict[str, float]]) -> bool:
         """
         Upload a mission with multiple waypoints to the drone.
         
+        Only the items that differ from the mission already on the vehicle are
+        sent when possible, and the result is verified by reading it back
+        (see MissionUploader).
+        
         Args:
             waypoints: List of dictionaries with lat, lon, alt for each waypoint
             
@@ -266,36 +1000,26 @@ class DroneController:
             
         logger.info(f"Uploading mission with {len(waypoints)} waypoints...")
         
-        # Create list of commands
-        cmds = self.vehicle.commands
-        cmds.clear()
-        
-        # Add home location as first waypoint
-        cmds.add(Command(0, 0, 0, mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT, 
-                         mavutil.mavlink.MAV_CMD_NAV_WAYPOINT, 0, 0, 0, 0, 0, 0, 
-                         self.vehicle.home_location.lat, 
-                         self.vehicle.home_location.lon, 
-                         0))
-        
-        # Add mission waypoints
-        for idx, wp in enumerate(waypoints):
-            # Add delay at waypoint (0 = no delay)
-            delay = wp.get("delay", 0)
-            
-            # Add waypoint command
-            cmds.add(Command(0, 0, 0, mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT, 
-                             mavutil.mavlink.MAV_CMD_NAV_WAYPOINT, 0, 0, delay, 0, 0, 0, 
-                             wp["lat"], wp["lon"], wp["alt"]))
-        
-        # Upload the commands to the vehicle
-        cmds.upload()
-        logger.info("Mission uploaded successfully")
+        if self.mission_uploader is None or self.mission_uploader.vehicle is not self.vehicle:
+            self.mission_uploader = MissionUploader(self.vehicle)
+        
+        home = self.vehicle.home_location
+        result = self.mission_uploader.upload(waypoints, (home.lat, home.lon) if home else None)
+        self.last_upload = result
+        if not result["success"]:
+            return False
+        
+        self.mission_waypoints = list(waypoints)
+        logger.info(f"Mission uploaded successfully ({result['mode']}, {result['items_sent']} items "
+                    f"in {result['elapsed_s']:.2f}s, verified: {result['verified']})")
         return True
     
     def execute_mission(self) -> bool:
         """
         Execute the uploaded mission.
         
+        Progress is published by ``self.mission_tracker`` once the mission starts.
+        
         Returns:
             bool: True if mission started successfully, False otherwise
         """
@@ -303,6 +1027,9 @@ class DroneController:
             return False
             
         logger.info("Executing mission...")
+        if self.mission_tracker:
+            self.mission_tracker.stop()
+        self.mission_tracker = MissionProgressTracker(self, self.mission_waypoints).start()
         self.vehicle.mode = VehicleMode("AUTO")
         
         # Wait for mode change
@@ -311,6 +1038,7 @@ class DroneController:
         while self.vehicle.mode.name != "AUTO":
             if time.time() - start > timeout:
                 logger.error("Failed to enter AUTO mode")
+                self.mission_tracker.stop()
                 return False
             time.sleep(0.5)
         
@@ -347,73 +1075,280 @@ class DroneController:
         return True
 
 
-# Convenience functions for using the controller without creating an instance
+class FleetManager:
+    """
+    Registry of DroneController instances keyed by vehicle ID.
+    
+    Connections and commands are fanned out over a shared thread pool so a
+    slow link on one aircraft does not hold up the others. Fleet-wide
+    telemetry is served from each controller's TelemetryCache, so it never
+    waits on any vehicle.
+    """
+    
+    def __init__(self, max_workers: int = 8):
+        """
+        Initialize an empty fleet.
+        
+        Args:
+            max_workers: Maximum number of vehicles contacted concurrently
+        """
+        self.max_workers = max_workers
+        self.default_vehicle_id = None
+        self._controllers = {}
+        self._lock = threading.Lock()
+        self._executor = None
+    
+    @property
+    def vehicle_ids(self) -> List[str]:
+        """IDs of all vehicles in the fleet."""
+        with self._lock:
+            return list(self._controllers)
+    
+    def add_vehicle(self, vehicle_id: str, connection_string: str = None) -> DroneController:
+        """
+        Add a vehicle to the fleet, or return it if it already exists.
+        
+        The first vehicle added becomes the default for calls without a vehicle ID.
+        
+        Args:
+            vehicle_id: Unique ID for the vehicle
+            connection_string: Connection string for the vehicle
+            
+        Returns:
+            DroneController for the vehicle
+        """
+        with self._lock:
+            controller = self._controllers.get(vehicle_id)
+            if controller is None:
+                controller = DroneController(connection_string)
+                self._controllers[vehicle_id] = controller
+            elif connection_string:
+                controller.connection_string = connection_string
+            if self.default_vehicle_id is None:
+                self.default_vehicle_id = vehicle_id
+            return controller
+    
+    def remove_vehicle(self, vehicle_id: str) -> None:
+        """Disconnect a vehicle and drop it from the fleet."""
+        with self._lock:
+            controller = self._controllers.pop(vehicle_id, None)
+            if self.default_vehicle_id == vehicle_id:
+                self.default_vehicle_id = next(iter(self._controllers), None)
+        if controller:
+            controller.disconnect()
+    
+    def get(self, vehicle_id: str = None) -> Optional[DroneController]:
+        """
+        Look up a vehicle's controller.
+        
+        Args:
+            vehicle_id: Vehicle ID, or None for the default vehicle
+            
+        Returns:
+            DroneController, or None if the vehicle is unknown
+        """
+        with self._lock:
+            return self._controllers.get(vehicle_id or self.default_vehicle_id)
+    
+    def connect_all(self, connection_strings: Dict[str, str], timeout: int = 30) -> Dict[str, bool]:
+        """
+        Connect several vehicles in parallel.
+        
+        Args:
+            connection_strings: Connection string per vehicle ID
+            timeout: Connection timeout in seconds for each vehicle
+            
+        Returns:
+            Dict of vehicle ID -> True if that connection succeeded
+        """
+        for vehicle_id, connection_string in connection_strings.items():
+            self.add_vehicle(vehicle_id, connection_string)
+        return self.run_all("connect_to_drone", vehicle_ids=list(connection_strings), timeout=timeout)
+    
+    def run_all(self, method: str, *args, vehicle_ids: List[str] = None, **kwargs) -> Dict[str, object]:
+        """
+        Call a DroneController method on several vehicles concurrently.
+        
+        Args:
+            method: Name of the DroneController method, e.g. "return_to_launch"
+            *args: Positional arguments for the method
+            vehicle_ids: Vehicles to command (defaults to the whole fleet)
+            **kwargs: Keyword arguments for the method
+            
+        Returns:
+            Dict of vehicle ID -> method result (False if the call raised)
+        """
+        if vehicle_ids is None:
+            vehicle_ids = self.vehicle_ids
+        controllers = {vehicle_id: self.get(vehicle_id) for vehicle_id in vehicle_ids}
+        
+        futures = {}
+        executor = self._get_executor()
+        for vehicle_id, controller in controllers.items():
+            if controller is None:
+                logger.error(f"Unknown vehicle: {vehicle_id}")
+                continue
+            # Labelled with the vehicle, so what it logs reaches that vehicle's bridge channel
+            futures[vehicle_id] = executor.submit(vehicle_context(vehicle_id).run,
+                                                  getattr(controller, method), *args, **kwargs)
+        
+        results = {vehicle_id: False for vehicle_id in vehicle_ids}
+        for vehicle_id, future in futures.items():
+            try:
+                results[vehicle_id] = future.result()
+            except Exception as e:
+                logger.error(f"{method} failed on {vehicle_id}: {str(e)}")
+        return results
+    
+    def telemetry(self, vehicle_ids: List[str] = None) -> Dict[str, Dict]:
+        """
+        Get the latest telemetry of several vehicles in one call.
+        
+        Args:
+            vehicle_ids: Vehicles to report (defaults to the whole fleet)
+            
+        Returns:
+            Dict of vehicle ID -> telemetry snapshot (see TelemetryCache.snapshot)
+        """
+        if vehicle_ids is None:
+            vehicle_ids = self.vehicle_ids
+        status = {}
+        for vehicle_id in vehicle_ids:
+            controller = self.get(vehicle_id)
+            if controller is None or not controller.connected:
+                status[vehicle_id] = {"error": "Not connected to drone"}
+            else:
+                status[vehicle_id] = controller.telemetry.snapshot()
+        return status
+    
+    def disconnect_all(self) -> None:
+        """Disconnect and remove every vehicle."""
+        self.run_all("disconnect")
+        with self._lock:
+            self._controllers.clear()
+            self.default_vehicle_id = None
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="fleet")
+            return self._executor
+
+
+# Convenience functions for using the controller without creating an instance.
+# Each takes an optional vehicle_id; without one they act on the default
+# (first connected) vehicle of the module-level fleet.
+
+DEFAULT_VEHICLE_ID = "default"
+
+_fleet = FleetManager()
 
-_controller = None
+def get_fleet() -> FleetManager:
+    """Return the module-level FleetManager used by the convenience functions."""
+    return _fleet
 
-def connect_drone(connection_string: str, timeout: int = 30) -> bool:
+def connect_drone(connection_string: str, timeout: int = 30, vehicle_id: str = None) -> bool:
     """
     Connect to a drone using the specified connection string.
     
     Args:
         connection_string: Connection string for the drone
         timeout: Connection timeout in seconds
+        vehicle_id: ID to register the drone under (defaults to DEFAULT_VEHICLE_ID)
         
     Returns:
         bool: True if connection successful, False otherwise
     """
-    global _controller
-    if _controller is None:
-        _controller = DroneController()
-    
-    return _controller.connect_to_drone(connection_string, timeout)
+    vehicle_id = vehicle_id or DEFAULT_VEHICLE_ID
+    added = _fleet.get(vehicle_id) is None
+    controller = _fleet.add_vehicle(vehicle_id)
+    connected = False
+    try:
+        connected = controller.connect_to_drone(connection_string, timeout)
+    finally:
+        if added and not connected:
+            # A vehicle that never connected must not stay in the fleet as its default
+            _fleet.remove_vehicle(vehicle_id)
+    return connected
 
-def disconnect_drone() -> None:
-    """Disconnect from the drone."""
-    global _controller
-    if _controller:
-        _controller.disconnect()
+def disconnect_drone(vehicle_id: str = None) -> None:
+    """
+    Disconnect from the drone and remove it from the fleet.
+    
+    Args:
+        vehicle_id: Vehicle to disconnect (defaults to the default vehicle)
+    """
+    vehicle_id = vehicle_id or _fleet.default_vehicle_id
+    if vehicle_id:
+        _fleet.remove_vehicle(vehicle_id)
 
-def takeoff(altitude: float) -> bool:
+def takeoff(altitude: float, vehicle_id: str = None) -> bool:
     """
     Arm and take off to the specified altitude.
     
     Args:
         altitude: Target altitude in meters
+        vehicle_id: Vehicle to command (defaults to the default vehicle)
         
     Returns:
         bool: True if takeoff successful, False otherwise
     """
-    global _controller
-    if _controller:
-        return _controller.arm_and_takeoff(altitude)
+    controller = _fleet.get(vehicle_id)
+    if controller:
+        return controller.arm_and_takeoff(altitude)
     return False
 
-def land() -> bool:
+def takeoff_async(altitude: float, timeout: float = 120, progress_callback=None,
+                  vehicle_id: str = None) -> Optional[TakeoffHandle]:
+    """
+    Start arming and taking off without blocking.
+    
+    Args:
+        altitude: Target altitude in meters
+        timeout: Deadline in seconds for the climb
+        progress_callback: Optional callback(stage, altitude), see TakeoffHandle
+        vehicle_id: Vehicle to command (defaults to the default vehicle)
+        
+    Returns:
+        TakeoffHandle tracking the takeoff, or None if not connected
+    """
+    controller = _fleet.get(vehicle_id)
+    if controller:
+        return controller.arm_and_takeoff_async(altitude, timeout, progress_callback)
+    return None
+
+def land(vehicle_id: str = None) -> bool:
     """
     Land the drone.
     
+    Args:
+        vehicle_id: Vehicle to command (defaults to the default vehicle)
+    
     Returns:
         bool: True if land command sent successfully, False otherwise
     """
-    global _controller
-    if _controller:
-        return _controller.land()
+    controller = _fleet.get(vehicle_id)
+    if controller:
+        return controller.land()
     return False
 
-def return_home() -> bool:
+def return_home(vehicle_id: str = None) -> bool:
     """
     Return to launch/home location.
     
+    Args:
+        vehicle_id: Vehicle to command (defaults to the default vehicle)
+    
     Returns:
         bool: True if RTL command sent successfully, False otherwise
     """
-    global _controller
-    if _controller:
-        return _controller.return_to_launch()
+    controller = _fleet.get(vehicle_id)
+    if controller:
+        return controller.return_to_launch()
     return False
 
-def fly_to(lat: float, lon: float, alt: float) -> bool:
+def fly_to(lat: float, lon: float, alt: float, vehicle_id: str = None) -> bool:
     """
     Go to the specified GPS location.
     
@@ -421,51 +1356,145 @@ def fly_to(lat: float, lon: float, alt: float) -> bool:
         lat: Target latitude in degrees
         lon: Target longitude in degrees
         alt: Target altitude in meters (relative to home position)
+        vehicle_id: Vehicle to command (defaults to the default vehicle)
         
     Returns:
         bool: True if goto command sent successfully, False otherwise
     """
-    global _controller
-    if _controller:
-        return _controller.goto_location(lat, lon, alt)
+    controller = _fleet.get(vehicle_id)
+    if controller:
+        return controller.goto_location(lat, lon, alt)
     return False
 
-def get_location() -> Dict[str, float]:
+def get_location(vehicle_id: str = None) -> Dict[str, float]:
     """
     Get the current GPS location of the drone.
     
+    Args:
+        vehicle_id: Vehicle to query (defaults to the default vehicle)
+    
     Returns:
-        Dict containing latitude, longitude, and altitude
+        Dict containing latitude, longitude, altitude and age_seconds
     """
-    global _controller
-    if _controller:
-        return _controller.get_current_location()
+    controller = _fleet.get(vehicle_id)
+    if controller:
+        return controller.get_current_location()
     return {"error": "Not connected to drone"}
 
-def get_battery() -> Dict[str, float]:
+def get_connect_metrics(vehicle_id: str = None) -> Dict[str, float]:
+    """
+    Get how long each stage of the last connection took.
+    
+    Args:
+        vehicle_id: Vehicle to query (defaults to the default vehicle)
+    
+    Returns:
+        Dict of "<group>_s" -> seconds from connect start until that group was ready
+    """
+    controller = _fleet.get(vehicle_id)
+    if controller:
+        return controller.get_connect_metrics()
+    return {}
+
+def start_recording(vehicle_id: str = None, rate_hz: float = 5.0) -> Optional[str]:
+    """
+    Start recording a vehicle's telemetry to a flight log.
+    
+    Args:
+        vehicle_id: Vehicle to record (defaults to the default vehicle)
+        rate_hz: Samples per second
+    
+    Returns:
+        Path of the flight log, or None if the vehicle is not connected
+    """
+    controller = _fleet.get(vehicle_id)
+    if controller is None:
+        return None
+    return controller.start_recording(new_log_path(vehicle_id or _fleet.default_vehicle_id), rate_hz)
+
+def stop_recording(vehicle_id: str = None) -> Optional[str]:
+    """
+    Stop recording a vehicle's telemetry.
+    
+    Args:
+        vehicle_id: Vehicle to stop recording (defaults to the default vehicle)
+    
+    Returns:
+        Path of the finished flight log, or None if nothing was recorded
+    """
+    controller = _fleet.get(vehicle_id)
+    return controller.stop_recording() if controller else None
+
+def get_battery(vehicle_id: str = None) -> Dict[str, float]:
     """
     Get the current battery status.
     
+    Args:
+        vehicle_id: Vehicle to query (defaults to the default vehicle)
+    
     Returns:
         Dict containing battery voltage and remaining percentage
     """
-    global _controller
-    if _controller:
-        return _controller.get_battery_status()
+    controller = _fleet.get(vehicle_id)
+    if controller:
+        return controller.get_battery_status()
+    return {"error": "Not connected to drone"}
+
+def get_dashboard(vehicle_id: str = None) -> Dict[str, object]:
+    """
+    Get the telemetry shown on the live dashboard (see DroneController.get_dashboard).
+    
+    Args:
+        vehicle_id: Vehicle to query (defaults to the default vehicle)
+    
+    Returns:
+        Dict of dashboard fields, or an error if not connected
+    """
+    controller = _fleet.get(vehicle_id)
+    if controller:
+        return controller.get_dashboard()
     return {"error": "Not connected to drone"}
 
-def execute_mission_plan(waypoints: List[Dict[str, float]]) -> bool:
+def get_fleet_telemetry(vehicle_ids: List[str] = None) -> Dict[str, Dict]:
+    """
+    Get the latest telemetry of every vehicle in the fleet.
+    
+    Args:
+        vehicle_ids: Vehicles to report (defaults to the whole fleet)
+    
+    Returns:
+        Dict of vehicle ID -> telemetry snapshot
+    """
+    return _fleet.telemetry(vehicle_ids)
+
+def execute_mission_plan(waypoints: List[Dict[str, float]], vehicle_id: str = None) -> bool:
     """
     Upload and execute a mission with multiple waypoints.
     
     Args:
         waypoints: List of dictionaries with lat, lon, alt for each waypoint
+        vehicle_id: Vehicle to command (defaults to the default vehicle)
         
     Returns:
         bool: True if mission started successfully, False otherwise
     """
-    global _controller
-    if _controller:
-        if _controller.upload_mission(waypoints):
-            return _controller.execute_mission()
-    return False 
\ No newline at end of file
+    controller = _fleet.get(vehicle_id)
+    if controller:
+        if controller.upload_mission(waypoints):
+            return controller.execute_mission()
+    return False
+
+def get_mission_tracker(vehicle_id: str = None) -> Optional[MissionProgressTracker]:
+    """
+    Get the progress tracker of the mission currently being executed.
+    
+    Args:
+        vehicle_id: Vehicle to query (defaults to the default vehicle)
+    
+    Returns:
+        MissionProgressTracker, or None if no mission has been started
+    """
+    controller = _fleet.get(vehicle_id)
+    if controller:
+        return controller.mission_tracker
+    return None
@@ -0,0 +1,377 @@
+"""
+Vectorized flight-path analytics for deepdrone-old.
+
+PathAnalyzer computes path statistics from flight log arrays: haversine path
+length, climb and descent totals, segment speeds, heading changes, hover
+periods and geofence excursions. Data is fed in chunks; the last sample and
+any open hover or excursion run are carried from one chunk to the next, so a
+log of any length streams through with memory bounded by the chunk size and
+the result does not depend on where the chunks are cut.
+
+analyze_flight_log runs a PathAnalyzer over a FlightLog, slicing its
+memory-mapped columns into views of at most ``chunk_rows`` samples.
+"""
+
+import logging
+from typing import Dict, Optional
+import numpy as np
+
+logger = logging.getLogger('drone_control')
+
+EARTH_RADIUS_M = 6371000.0
+
+# Defaults for hover and turn detection
+HOVER_SPEED_MS = 0.5         # horizontal speed below which the vehicle is hovering
+HOVER_CLIMB_RATE_MS = 0.3    # vertical speed below which the vehicle is hovering
+HOVER_MIN_DURATION_S = 5.0   # shorter pauses are not reported as hovers
+MIN_AIRBORNE_ALT_M = 1.0     # samples at or below this altitude are on the ground
+TURN_MIN_SEGMENT_M = 1.0     # shorter segments carry no usable heading
+TURN_THRESHOLD_DEG = 30.0    # heading changes above this count as turns
+
+PATH_COLUMNS = ("timestamp", "latitude", "longitude", "altitude")
+
+def haversine_m(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Element-wise great-circle distance between coordinate arrays.
+
+    Args:
+        lat1, lon1: First points in degrees
+        lat2, lon2: Second points in degrees
+
+    Returns:
+        Distances in meters
+    """
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    a = (np.sin((phi2 - phi1) / 2) ** 2
+         + np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(np.subtract(lon2, lon1)) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def bearing_deg(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Element-wise initial bearing from the first to the second points, 0-360 degrees."""
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    dlambda = np.radians(np.subtract(lon2, lon1))
+    y = np.sin(dlambda) * np.cos(phi2)
+    x = np.cos(phi1) * np.sin(phi2) - np.sin(phi1) * np.cos(phi2) * np.cos(dlambda)
+    return np.degrees(np.arctan2(y, x)) % 360.0
+
+def segment_metrics(timestamps, latitude, longitude, altitude=None) -> Dict[str, np.ndarray]:
+    """
+    Per-segment metrics between consecutive samples.
+
+    Args:
+        timestamps: Sample times in seconds
+        latitude, longitude: Sample positions in degrees
+        altitude: Sample altitudes in meters (optional)
+
+    Returns:
+        Dict of arrays with one entry per segment (one fewer than samples):
+        dt (s), distance (m), speed (m/s, NaN where dt is 0), heading
+        (degrees), and climb (m) and climb_rate (m/s) when altitude is given
+    """
+    dt = np.diff(timestamps)
+    distance = haversine_m(latitude[:-1], longitude[:-1], latitude[1:], longitude[1:])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        metrics = {
+            "dt": dt,
+            "distance": distance,
+            "speed": np.where(dt > 0, distance / dt, np.nan),
+            "heading": bearing_deg(latitude[:-1], longitude[:-1], latitude[1:], longitude[1:]),
+        }
+        if altitude is not None:
+            climb = np.diff(altitude)
+            metrics["climb"] = climb
+            metrics["climb_rate"] = np.where(dt > 0, climb / dt, np.nan)
+    return metrics
+
+class _RunTracker:
+    """
+    Counts runs of consecutive flagged segments across chunks.
+
+    A run still open at the end of a chunk is carried into the next one, so
+    runs are measured the same however the data is chunked.
+    """
+
+    def __init__(self, min_duration: float = 0.0):
+        self.min_duration = min_duration
+        self.count = 0
+        self.total_s = 0.0
+        self.longest_s = 0.0
+        self._open = None  # duration of the run still open at the last chunk end
+
+    def update(self, mask: np.ndarray, dt: np.ndarray) -> None:
+        if not len(mask):
+            return
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.view(np.int8), [0]))))
+        starts, ends = edges[::2], edges[1::2]
+        if not len(starts):
+            self.close()
+            return
+
+        elapsed = np.concatenate(([0.0], np.cumsum(dt)))
+        durations = elapsed[ends] - elapsed[starts]
+        if self._open is not None:
+            if starts[0] == 0:
+                durations[0] += self._open
+                self._open = None
+            else:
+                self.close()
+        if ends[-1] == len(mask):
+            self._open = float(durations[-1])
+            durations = durations[:-1]
+        self._add(durations)
+
+    def close(self) -> None:
+        """End the open run, if any."""
+        if self._open is not None:
+            self._add(np.array([self._open]))
+            self._open = None
+
+    def _add(self, durations: np.ndarray) -> None:
+        durations = durations[durations >= self.min_duration]
+        if len(durations):
+            self.count += len(durations)
+            self.total_s += float(durations.sum())
+            self.longest_s = max(self.longest_s, float(durations.max()))
+
+    def summary(self) -> Dict:
+        open_s = self._open if self._open is not None and self._open >= self.min_duration else 0.0
+        return {
+            "count": self.count + (1 if open_s else 0),
+            "total_s": self.total_s + open_s,
+            "longest_s": max(self.longest_s, open_s),
+        }
+
+class PathAnalyzer:
+    """
+    Streaming flight-path statistics.
+
+    Feed log arrays in time order with update() and read the statistics with
+    result(). Rows without a position (NaN latitude or longitude) are skipped.
+    Each sample is classified by the segment that ends at it: a segment is
+    hovering when it is airborne and both its horizontal and vertical speeds
+    are below the hover limits, and it is outside the geofence when its end
+    point is.
+    """
+
+    def __init__(self, geofence: Optional[Dict] = None,
+                 hover_speed: float = HOVER_SPEED_MS,
+                 hover_climb_rate: float = HOVER_CLIMB_RATE_MS,
+                 hover_min_duration: float = HOVER_MIN_DURATION_S,
+                 min_airborne_alt: float = MIN_AIRBORNE_ALT_M,
+                 turn_threshold: float = TURN_THRESHOLD_DEG,
+                 turn_min_segment: float = TURN_MIN_SEGMENT_M):
+        """
+        Set up an analyzer.
+
+        Args:
+            geofence: Cylindrical fence as a dict with 'latitude', 'longitude',
+                'radius_m' and optionally 'max_altitude_m' (ArduPilot's circle
+                and altitude fence); None disables excursion tracking
+            hover_speed: Horizontal speed limit for hovering in m/s
+            hover_climb_rate: Vertical speed limit for hovering in m/s
+            hover_min_duration: Shortest hover reported, in seconds
+            min_airborne_alt: Altitude at or below which the vehicle is on the ground
+            turn_threshold: Heading change in degrees counted as a turn
+            turn_min_segment: Shorter segments are ignored for heading changes
+        """
+        self.geofence = geofence
+        self.hover_speed = hover_speed
+        self.hover_climb_rate = hover_climb_rate
+        self.min_airborne_alt = min_airborne_alt
+        self.turn_threshold = turn_threshold
+        self.turn_min_segment = turn_min_segment
+
+        self.samples = 0
+        self.start_time = None
+        self.end_time = None
+        self.distance_m = 0.0
+        self.distance_3d_m = 0.0
+        self.climb_m = 0.0
+        self.descent_m = 0.0
+        self.moving_time_s = 0.0
+        self.max_speed_ms = 0.0
+        self.max_altitude_m = -np.inf
+        self.min_altitude_m = np.inf
+        self.heading_change_deg = 0.0
+        self.turns = 0
+        self.max_breach_m = 0.0
+        self._hovers = _RunTracker(hover_min_duration)
+        self._excursions = _RunTracker()
+        self._last = None          # last sample of the previous chunk
+        self._last_heading = None  # heading of the last segment long enough to have one
+
+    def update(self, timestamps, latitude, longitude, altitude=None) -> None:
+        """
+        Add the next chunk of samples.
+
+        Args:
+            timestamps: Sample times in seconds, ascending
+            latitude, longitude: Positions in degrees
+            altitude: Altitudes in meters (optional, but needed for climb,
+                hover and altitude fence statistics)
+        """
+        timestamps = np.asarray(timestamps, dtype=float)
+        latitude = np.asarray(latitude, dtype=float)
+        longitude = np.asarray(longitude, dtype=float)
+        has_altitude = altitude is not None
+        altitude = np.asarray(altitude, dtype=float) if has_altitude else np.full(len(timestamps), np.nan)
+
+        valid = ~(np.isnan(latitude) | np.isnan(longitude))
+        if not valid.all():
+            timestamps, latitude, longitude, altitude = (
+                timestamps[valid], latitude[valid], longitude[valid], altitude[valid])
+        if not len(timestamps):
+            return
+
+        # Prepend the carried sample so the first segment spans the chunk
+        # boundary; the very first sample gets a zero-length segment to itself
+        last = self._last or (timestamps[0], latitude[0], longitude[0], altitude[0])
+        t = np.concatenate(([last[0]], timestamps))
+        lat = np.concatenate(([last[1]], latitude))
+        lon = np.concatenate(([last[2]], longitude))
+        alt = np.concatenate(([last[3]], altitude))
+        self._last = (timestamps[-1], latitude[-1], longitude[-1], altitude[-1])
+
+        if self.start_time is None:
+            self.start_time = float(timestamps[0])
+        self.end_time = float(timestamps[-1])
+        self.samples += len(timestamps)
+
+        seg = segment_metrics(t, lat, lon, alt)
+        dt, distance, speed, climb = seg["dt"], seg["distance"], seg["speed"], seg["climb"]
+
+        self.distance_m += float(distance.sum())
+        self.distance_3d_m += float(np.sqrt(distance ** 2 + np.nan_to_num(climb) ** 2).sum())
+        self.climb_m += float(climb[climb > 0].sum())
+        self.descent_m -= float(climb[climb < 0].sum())
+        if np.any(speed > 0):
+            self.max_speed_ms = max(self.max_speed_ms, float(np.nanmax(speed)))
+        if has_altitude and not np.isnan(altitude).all():
+            self.max_altitude_m = max(self.max_altitude_m, float(np.nanmax(altitude)))
+            self.min_altitude_m = min(self.min_altitude_m, float(np.nanmin(altitude)))
+
+        with np.errstate(invalid="ignore"):
+            moving = speed >= self.hover_speed
+            self.moving_time_s += float(dt[moving].sum())
+
+            # Heading changes between consecutive segments long enough to have a heading
+            headings = seg["heading"][distance >= self.turn_min_segment]
+            if len(headings):
+                if self._last_heading is not None:
+                    headings = np.concatenate(([self._last_heading], headings))
+                changes = np.abs((np.diff(headings) + 180.0) % 360.0 - 180.0)
+                self.heading_change_deg += float(changes.sum())
+                self.turns += int(np.count_nonzero(changes > self.turn_threshold))
+                self._last_heading = float(headings[-1])
+
+            hovering = ((speed < self.hover_speed)
+                        & (np.abs(seg["climb_rate"]) < self.hover_climb_rate)
+                        & (alt[1:] > self.min_airborne_alt))
+            self._hovers.update(hovering, dt)
+
+            if self.geofence is not None:
+                self._update_geofence(lat[1:], lon[1:], alt[1:], dt)
+
+    def _update_geofence(self, lat, lon, alt, dt) -> None:
+        fence = self.geofence
+        breach = haversine_m(fence["latitude"], fence["longitude"], lat, lon) - fence["radius_m"]
+        if fence.get("max_altitude_m") is not None:
+            breach = np.fmax(breach, alt - fence["max_altitude_m"])
+        outside = breach > 0
+        if outside.any():
+            self.max_breach_m = max(self.max_breach_m, float(breach[outside].max()))
+        self._excursions.update(outside, dt)
+
+    def result(self) -> Dict:
+        """
+        Statistics for everything fed so far.
+
+        Returns:
+            Dict with samples, duration_s, distance_m (horizontal path length),
+            distance_3d_m, climb_m, descent_m, min/max_altitude_m, avg_speed_ms
+            (distance over duration), moving_time_s, max_speed_ms (fastest
+            segment), heading_change_deg (total absolute), turns, hover
+            (count, total_s, longest_s) and geofence (excursions,
+            time_outside_s, longest_s, max_breach_m; None without a fence)
+        """
+        duration = (self.end_time - self.start_time) if self.samples else 0.0
+        result = {
+            "samples": self.samples,
+            "duration_s": duration,
+            "distance_m": self.distance_m,
+            "distance_3d_m": self.distance_3d_m,
+            "climb_m": self.climb_m,
+            "descent_m": self.descent_m,
+            "max_altitude_m": self.max_altitude_m if np.isfinite(self.max_altitude_m) else None,
+            "min_altitude_m": self.min_altitude_m if np.isfinite(self.min_altitude_m) else None,
+            "avg_speed_ms": self.distance_m / duration if duration > 0 else 0.0,
+            "moving_time_s": self.moving_time_s,
+            "max_speed_ms": self.max_speed_ms,
+            "heading_change_deg": self.heading_change_deg,
+            "turns": self.turns,
+            "hover": self._hovers.summary(),
+            "geofence": None,
+        }
+        if self.geofence is not None:
+            excursions = self._excursions.summary()
+            result["geofence"] = {
+                "excursions": excursions["count"],
+                "time_outside_s": excursions["total_s"],
+                "longest_s": excursions["longest_s"],
+                "max_breach_m": self.max_breach_m,
+            }
+        return result
+
+def analyze_path(data: Dict[str, np.ndarray], chunk_rows: int = 65536, **options) -> Dict:
+    """
+    Analyze in-memory path arrays.
+
+    Args:
+        data: Dict with 'timestamp', 'latitude', 'longitude' and optionally 'altitude' arrays
+        chunk_rows: Samples processed per step
+        **options: PathAnalyzer options
+
+    Returns:
+        PathAnalyzer.result() dict
+    """
+    analyzer = PathAnalyzer(**options)
+    altitude = data.get("altitude")
+    for first in range(0, len(data["timestamp"]), chunk_rows):
+        part = slice(first, first + chunk_rows)
+        analyzer.update(data["timestamp"][part], data["latitude"][part], data["longitude"][part],
+                        altitude[part] if altitude is not None else None)
+    return analyzer.result()
+
+def analyze_flight_log(flight_log, start: float = None, end: float = None,
+                       chunk_rows: int = 65536, **options) -> Dict:
+    """
+    Analyze a FlightLog chunk by chunk.
+
+    Columns are read as memory-mapped views and sliced into pieces of at most
+    ``chunk_rows`` samples, so memory use does not grow with the log length.
+
+    Args:
+        flight_log: FlightLog to analyze
+        start, end: Optional timestamp window
+        chunk_rows: Samples processed per step
+        **options: PathAnalyzer options
+
+    Returns:
+        PathAnalyzer.result() dict
+    """
+    columns = [name for name in PATH_COLUMNS if name in flight_log.columns]
+    if "latitude" not in columns or "longitude" not in columns:
+        raise ValueError(f"Flight log {flight_log.name} has no position columns")
+
+    analyzer = PathAnalyzer(**options)
+    for chunk in flight_log.iter_chunks(columns, start, end):
+        timestamps = chunk["timestamp"]
+        first = np.searchsorted(timestamps, start, side="left") if start is not None else 0
+        last = np.searchsorted(timestamps, end, side="right") if end is not None else len(timestamps)
+        for offset in range(first, last, chunk_rows):
+            part = slice(offset, min(offset + chunk_rows, last))
+            analyzer.update(timestamps[part], chunk["latitude"][part], chunk["longitude"][part],
+                            chunk["altitude"][part] if "altitude" in chunk else None)
+    return analyzer.result()
@@ -0,0 +1,568 @@
+"""
+Columnar on-disk flight logs for deepdrone-old.
+
+A flight log is an append-only file of fixed-width float64 columns written in
+chunks, plus a small sidecar index:
+
+    <name>.ddlog      header, then chunks: b"CHNK" + uint32 rows + one array per column
+    <name>.ddlog.idx  one fixed-size record per chunk: offset, rows, first and last timestamp
+
+A chunk is only listed in the index after its data has been flushed, so a
+reader (or a crash) never sees a partly written chunk. If the index is lost it
+is rebuilt by scanning the chunk headers.
+
+TelemetryRecorder samples a DroneController's TelemetryCache into a log at a
+fixed rate while holding at most one chunk in memory. FlightLog memory-maps a
+log and hands out zero-copy NumPy views of its columns, and FlightLogStore
+keeps the logs of one directory shared by all chat sessions.
+"""
+
+import os
+import json
+import mmap
+import time
+import struct
+import logging
+import datetime
+import threading
+from collections.abc import Mapping
+from typing import Dict, Iterator, Optional, Sequence
+import numpy as np
+
+logger = logging.getLogger('drone_control')
+
+FLIGHT_LOG_DIR = os.environ.get("DRONE_FLIGHT_LOG_DIR", "flight_logs")
+FLIGHT_LOG_SUFFIX = ".ddlog"
+
+MAGIC = b"DDFLOG01"
+CHUNK_MAGIC = b"CHNK"
+CHUNK_HEADER = struct.Struct("<4sI")
+DTYPE = np.dtype("<f8")
+INDEX_DTYPE = np.dtype([("offset", "<i8"), ("rows", "<i8"), ("t_start", "<f8"), ("t_end", "<f8")])
+
+# Recorded columns; timestamp is Unix time in seconds, angles are radians
+COLUMNS = ("timestamp", "latitude", "longitude", "altitude",
+           "roll", "pitch", "yaw", "heading",
+           "groundspeed", "airspeed",
+           "voltage", "current", "battery_level")
+
+# Column name -> TelemetryCache field, where they differ
+TELEMETRY_FIELDS = {"battery_level": "level"}
+
+class FlightLogWriter:
+    """
+    Appends rows to a flight log, buffering at most one chunk in memory.
+
+    Example:
+        writer = FlightLogWriter("flight_logs/test.ddlog")
+        writer.append([time.time(), 22.5, 113.9, 10.0, ...])
+        writer.close()
+    """
+
+    def __init__(self, path: str, columns: Sequence[str] = COLUMNS,
+                 chunk_rows: int = 1024, meta: Optional[Dict] = None):
+        """
+        Open a log for appending, creating it if needed.
+
+        Args:
+            path: Log file path
+            columns: Column names; the first must be "timestamp"
+            chunk_rows: Rows buffered before a chunk is written
+            meta: Extra JSON-serialisable header fields for a new log
+        """
+        self.path = path
+        self.columns = tuple(columns)
+        self.chunk_rows = chunk_rows
+        self._buffer = np.empty((len(self.columns), chunk_rows), dtype=DTYPE)
+        self._rows = 0
+        self.rows_written = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            existing = FlightLog(path)
+            if existing.columns != self.columns:
+                raise ValueError(f"{path} has columns {existing.columns}, expected {self.columns}")
+            self.rows_written = len(existing)
+            self._data = open(path, "ab")
+            self._index = open(path + ".idx", "ab")
+        else:
+            self._data = open(path, "wb")
+            self._data.write(_encode_header(self.columns, meta or {}))
+            self._data.flush()
+            self._index = open(path + ".idx", "wb")
+
+    def append(self, row: Sequence[float]) -> None:
+        """Add one row, in column order. Missing values should be NaN."""
+        self._buffer[:, self._rows] = row
+        self._rows += 1
+        if self._rows == self.chunk_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered rows as a chunk and make it visible to readers."""
+        if not self._rows:
+            return
+        self._write_block(self._buffer[:, :self._rows])
+        self._rows = 0
+
+    def write_chunk(self, data: Dict[str, np.ndarray]) -> None:
+        """
+        Write whole columns as one chunk, bypassing the row buffer.
+
+        Args:
+            data: Column name -> array, all of the same length
+        """
+        self.flush()
+        if len(data[self.columns[0]]):
+            self._write_block(np.stack([np.asarray(data[name], dtype=DTYPE) for name in self.columns]))
+
+    def _write_block(self, block: np.ndarray) -> None:
+        """Append a (columns x rows) block as a chunk, then index it."""
+        rows = block.shape[1]
+        offset = self._data.tell()
+        self._data.write(CHUNK_HEADER.pack(CHUNK_MAGIC, rows))
+        self._data.write(np.ascontiguousarray(block).tobytes())
+        self._data.flush()
+
+        entry = np.array([(offset, rows, block[0, 0], block[0, rows - 1])], dtype=INDEX_DTYPE)
+        self._index.write(entry.tobytes())
+        self._index.flush()
+        self.rows_written += rows
+
+    def close(self) -> None:
+        """Flush and close the log."""
+        if self._data.closed:
+            return
+        self.flush()
+        self._data.close()
+        self._index.close()
+
+    def __enter__(self) -> "FlightLogWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+class FlightLog:
+    """
+    Read-only, memory-mapped view of a flight log.
+
+    Columns are returned as NumPy views straight into the page cache, so
+    reading a log costs no heap memory and every FlightLog of the same file,
+    in any session, shares the same physical pages. Each read picks up chunks
+    appended since the last one, so a log can be read while it is still being
+    recorded. Whole-column reads are zero-copy for single-chunk logs (see
+    compact_log); reads that span several chunks are concatenated.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open a flight log.
+
+        Args:
+            path: Log file path
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self.columns, self.meta, self._data_start = _decode_header(f)
+        self._col = {name: idx for idx, name in enumerate(self.columns)}
+        self._lock = threading.Lock()
+        self._state = None  # (file key, mmap, chunk index)
+
+    @property
+    def name(self) -> str:
+        """File name without directory and suffix."""
+        return os.path.splitext(os.path.basename(self.path))[0]
+
+    def chunks(self) -> np.ndarray:
+        """Index records of the complete chunks currently in the file."""
+        return self._mapped()[1]
+
+    def __len__(self) -> int:
+        return int(self.chunks()["rows"].sum())
+
+    def time_range(self) -> Optional[tuple]:
+        """(first, last) timestamp, or None for an empty log."""
+        chunks = self.chunks()
+        if not len(chunks):
+            return None
+        return float(chunks["t_start"][0]), float(chunks["t_end"][-1])
+
+    def iter_chunks(self, columns: Sequence[str] = None, start: float = None,
+                    end: float = None) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        Yield the log one chunk at a time as read-only views.
+
+        Args:
+            columns: Columns to read (default all)
+            start, end: Only chunks overlapping this timestamp range are read
+
+        Yields:
+            Dict of column name -> array view for one chunk
+        """
+        columns = list(columns or self.columns)
+        mapped, chunks = self._mapped()
+        for offset, rows, _, _ in self._select(chunks, start, end):
+            yield {name: self._view(mapped, offset, rows, name) for name in columns}
+
+    def read(self, columns: Sequence[str] = None, start: float = None, end: float = None) -> Dict[str, np.ndarray]:
+        """
+        Read whole columns, optionally limited to a timestamp range.
+
+        Timestamps are assumed to be sorted, which holds for recorded logs and
+        for DataFrames registered with a FlightLogStore.
+
+        Returns:
+            Dict of column name -> array (a read-only view when the selection
+            lies in a single chunk)
+        """
+        columns = list(columns or self.columns)
+        wanted = columns if start is None and end is None else list(dict.fromkeys(["timestamp"] + columns))
+        mapped, chunks = self._mapped()
+        chunks = self._select(chunks, start, end)
+
+        if len(chunks) == 1:
+            offset, rows = chunks["offset"][0], chunks["rows"][0]
+            data = {name: self._view(mapped, offset, rows, name) for name in wanted}
+        else:
+            data = {name: np.concatenate([self._view(mapped, offset, rows, name)
+                                          for offset, rows, _, _ in chunks])
+                    if len(chunks) else np.empty(0, dtype=DTYPE)
+                    for name in wanted}
+
+        if start is not None or end is not None:
+            timestamps = data["timestamp"]
+            first = np.searchsorted(timestamps, start, side="left") if start is not None else 0
+            last = np.searchsorted(timestamps, end, side="right") if end is not None else len(timestamps)
+            data = {name: data[name][first:last] for name in columns}
+        return data
+
+    def to_dataframe(self, columns: Sequence[str] = None):
+        """
+        Load the log as a pandas DataFrame in the layout of the demo logs.
+
+        ``timestamp`` becomes a datetime column and ``speed`` is an alias for
+        ``groundspeed``. Unlike read(), this copies the data.
+        """
+        import pandas as pd
+
+        frame = pd.DataFrame(self.read(columns))
+        if "timestamp" in frame:
+            frame["timestamp"] = pd.to_datetime(frame["timestamp"], unit="s")
+        if "groundspeed" in frame and "speed" not in frame:
+            frame["speed"] = frame["groundspeed"]
+        return frame
+
+    def _view(self, mapped, offset, rows, name: str) -> np.ndarray:
+        rows = int(rows)
+        start = int(offset) + CHUNK_HEADER.size + self._col[name] * rows * DTYPE.itemsize
+        return np.frombuffer(mapped, dtype=DTYPE, count=rows, offset=start)
+
+    @staticmethod
+    def _select(chunks: np.ndarray, start: float = None, end: float = None) -> np.ndarray:
+        if start is not None:
+            chunks = chunks[chunks["t_end"] >= start]
+        if end is not None:
+            chunks = chunks[chunks["t_start"] <= end]
+        return chunks
+
+    def _mapped(self) -> tuple:
+        """Return (mmap, chunk index), remapping when the file has changed."""
+        stat = os.stat(self.path)
+        try:
+            index_size = os.path.getsize(self.path + ".idx")
+        except FileNotFoundError:
+            index_size = -1
+        key = (stat.st_ino, stat.st_size, index_size)
+
+        with self._lock:
+            if self._state is None or self._state[0] != key:
+                with open(self.path, "rb") as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._state = (key, mapped, self._load_index(mapped))
+            return self._state[1], self._state[2]
+
+    def _load_index(self, mapped) -> np.ndarray:
+        """Read the sidecar index, keeping only chunks that are complete in ``mapped``."""
+        try:
+            index = np.fromfile(self.path + ".idx", dtype=INDEX_DTYPE)
+        except (FileNotFoundError, ValueError):
+            return self._rebuild_index(mapped)
+
+        row_bytes = len(self.columns) * DTYPE.itemsize
+        valid = 0
+        for offset, rows, _, _ in index:
+            end = offset + CHUNK_HEADER.size + rows * row_bytes
+            if end > len(mapped):
+                break
+            magic, header_rows = CHUNK_HEADER.unpack_from(mapped, int(offset))
+            if magic != CHUNK_MAGIC or header_rows != rows:
+                # The index belongs to another version of the file (e.g. mid-compaction)
+                return self._rebuild_index(mapped)
+            valid += 1
+        return index[:valid]
+
+    def _rebuild_index(self, mapped) -> np.ndarray:
+        """Recover the chunk index by walking the chunk headers."""
+        entries = []
+        row_bytes = len(self.columns) * DTYPE.itemsize
+        offset = self._data_start
+        while offset + CHUNK_HEADER.size <= len(mapped):
+            magic, rows = CHUNK_HEADER.unpack_from(mapped, offset)
+            end = offset + CHUNK_HEADER.size + rows * row_bytes
+            if magic != CHUNK_MAGIC or rows == 0 or end > len(mapped):
+                break
+            timestamps = np.frombuffer(mapped, dtype=DTYPE, count=rows, offset=offset + CHUNK_HEADER.size)
+            entries.append((offset, rows, timestamps[0], timestamps[-1]))
+            offset = end
+        logger.warning(f"Rebuilt index of {self.path} ({len(entries)} chunks)")
+        return np.array(entries, dtype=INDEX_DTYPE)
+
+def compact_log(path: str) -> bool:
+    """
+    Rewrite a finished log as a single chunk so whole-column reads are zero-copy.
+
+    The new file replaces the old one atomically; readers holding views of the
+    old file keep working.
+
+    Returns:
+        bool: True if the log was rewritten
+    """
+    log = FlightLog(path)
+    if len(log.chunks()) < 2:
+        return False
+    try:
+        _replace_log(path, log.columns, log.read(), log.meta)
+    except OSError as e:
+        # e.g. Windows refuses to replace a file that is still mapped
+        logger.warning(f"Could not compact {path}: {str(e)}")
+        return False
+    return True
+
+def write_frame(path: str, frame, meta: Optional[Dict] = None) -> FlightLog:
+    """
+    Store a pandas DataFrame as a single-chunk log.
+
+    Datetime columns are stored as Unix seconds and other numeric columns as
+    float64; non-numeric columns are dropped. Rows are sorted by timestamp, and
+    a timestamp column of row numbers is added if the frame has none.
+
+    Returns:
+        FlightLog for the written file
+    """
+    from pandas.api import types
+
+    columns = {}
+    if "timestamp" not in frame.columns:
+        columns["timestamp"] = np.arange(len(frame), dtype=DTYPE)
+    for name in frame.columns:
+        series = frame[name]
+        if types.is_datetime64_any_dtype(series.dtype):
+            columns[name] = series.to_numpy(dtype="datetime64[ns]").astype(np.int64) / 1e9
+        elif types.is_numeric_dtype(series.dtype):
+            columns[name] = series.to_numpy(dtype=DTYPE)
+        else:
+            logger.debug(f"Dropping non-numeric column {name} from {path}")
+
+    order = np.argsort(columns["timestamp"], kind="stable")
+    names = ["timestamp"] + [name for name in columns if name != "timestamp"]
+    _replace_log(path, names, {name: columns[name][order] for name in names},
+                 dict(meta or {}, source="dataframe"))
+    return FlightLog(path)
+
+def _replace_log(path: str, columns: Sequence[str], data: Dict[str, np.ndarray], meta: Dict) -> None:
+    """Write a single-chunk log next to ``path`` and move it into place."""
+    tmp = path + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)  # left over from an interrupted write
+    with FlightLogWriter(tmp, columns, meta=meta) as writer:
+        writer.write_chunk(data)
+    # Data first: a reader that pairs the new data with the old index
+    # notices the mismatch and rebuilds the index from the chunk headers
+    os.replace(tmp, path)
+    os.replace(tmp + ".idx", path + ".idx")
+
+class FlightLogStore(Mapping):
+    """
+    Logs in one directory, keyed by ID and shared by every chat session.
+
+    Values are FlightLog objects; nothing is read until a tool asks for a
+    column, and what is read is mapped rather than loaded, so resident memory
+    does not grow with the number or length of registered logs. Logs already
+    in the directory (e.g. earlier recordings) are picked up at start.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Open (and create) a store directory.
+
+        Args:
+            directory: Directory holding the .ddlog files
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._paths = {}
+        self._logs = {}
+        for entry in sorted(os.listdir(directory)):
+            if entry.endswith(FLIGHT_LOG_SUFFIX):
+                self._paths[entry[:-len(FLIGHT_LOG_SUFFIX)]] = os.path.join(directory, entry)
+
+    def path_for(self, log_id: str) -> str:
+        """Path where a log with this ID is stored."""
+        return os.path.join(self.directory, log_id + FLIGHT_LOG_SUFFIX)
+
+    def register(self, log_id: str, data) -> FlightLog:
+        """
+        Add or replace a log.
+
+        Args:
+            log_id: ID to register the log under
+            data: A pandas DataFrame (written to the store), a FlightLog or a log path
+
+        Returns:
+            The registered FlightLog
+        """
+        if isinstance(data, FlightLog):
+            log = data
+        elif isinstance(data, str):
+            log = FlightLog(data)
+        else:
+            log = write_frame(self.path_for(log_id), data)
+        with self._lock:
+            self._paths[log_id] = log.path
+            self._logs[log_id] = log
+        return log
+
+    def __getitem__(self, log_id: str) -> FlightLog:
+        with self._lock:
+            log = self._logs.get(log_id)
+            if log is None:
+                log = self._logs[log_id] = FlightLog(self._paths[log_id])
+            return log
+
+    def __contains__(self, log_id) -> bool:
+        return log_id in self._paths
+
+    def __iter__(self):
+        return iter(list(self._paths))
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def shared_store(directory: str = FLIGHT_LOG_DIR) -> FlightLogStore:
+    """Return the process-wide FlightLogStore for a directory."""
+    key = os.path.abspath(directory)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = FlightLogStore(directory)
+        return _stores[key]
+
+class TelemetryRecorder:
+    """
+    Samples a TelemetryCache into a flight log at a fixed rate.
+
+    Sampling runs on its own thread and only reads the cache, so it adds no
+    traffic on the MAVLink link. Rows are written a chunk at a time, and a
+    partial chunk is flushed at least every ``flush_interval`` seconds so that
+    a live log stays readable.
+    """
+
+    def __init__(self, telemetry, path: str, rate_hz: float = 5.0, chunk_rows: int = 1024,
+                 flush_interval: float = 10.0, meta: Optional[Dict] = None):
+        """
+        Initialize the recorder.
+
+        Args:
+            telemetry: TelemetryCache to sample
+            path: Flight log path; an existing log is appended to
+            rate_hz: Samples per second
+            chunk_rows: Rows per chunk, which bounds memory use
+            flush_interval: Maximum seconds between flushes of a partial chunk
+            meta: Extra header fields for a new log
+        """
+        self.telemetry = telemetry
+        self.path = path
+        self.rate_hz = rate_hz
+        self.flush_interval = flush_interval
+        self._writer = FlightLogWriter(path, COLUMNS, chunk_rows, meta)
+        self._fields = [TELEMETRY_FIELDS.get(name, name) for name in COLUMNS[1:]]
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_flush = time.monotonic()
+
+    @property
+    def rows_written(self) -> int:
+        """Rows flushed to disk so far."""
+        return self._writer.rows_written
+
+    def start(self) -> "TelemetryRecorder":
+        """Start sampling on a background thread."""
+        self._thread = threading.Thread(target=self._run, name="telemetry-recorder", daemon=True)
+        self._thread.start()
+        logger.info(f"Recording telemetry to {self.path} at {self.rate_hz} Hz")
+        return self
+
+    def stop(self) -> None:
+        """Stop sampling and close the log."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        self._writer.close()
+        compact_log(self.path)
+        logger.info(f"Stopped recording {self.path} ({self.rows_written} rows)")
+
+    def sample(self) -> bool:
+        """
+        Append one row from the current telemetry.
+
+        Returns:
+            bool: False if no position has been received yet and nothing was written
+        """
+        snapshot = self.telemetry.snapshot()
+        if snapshot["latitude"] is None:
+            return False
+        row = [time.time()]
+        for field in self._fields:
+            value = snapshot.get(field)
+            row.append(np.nan if value is None else value)
+        self._writer.append(row)
+
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self._writer.flush()
+            self._last_flush = now
+        return True
+
+    def _run(self) -> None:
+        period = 1.0 / self.rate_hz
+        while not self._stop.wait(period):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Telemetry recording failed: {str(e)}")
+
+def new_log_path(prefix: str = "flight") -> str:
+    """Return a fresh log path in FLIGHT_LOG_DIR, named after the current time."""
+    stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(FLIGHT_LOG_DIR, f"{prefix}_{stamp}{FLIGHT_LOG_SUFFIX}")
+
+def _encode_header(columns: Sequence[str], meta: Dict) -> bytes:
+    body = json.dumps({"columns": list(columns), "dtype": DTYPE.str, "meta": meta}).encode()
+    # Pad so chunk data starts 8-byte aligned
+    total = len(MAGIC) + 4 + len(body)
+    body += b" " * (-total % 8)
+    return MAGIC + struct.pack("<I", len(body)) + body
+
+def _decode_header(f) -> tuple:
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"{f.name} is not a flight log")
+    (length,) = struct.unpack("<I", f.read(4))
+    header = json.loads(f.read(length))
+    return tuple(header["columns"]), header.get("meta", {}), len(MAGIC) + 4 + length
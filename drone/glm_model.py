@@ -1,25 +1,30 @@
 import os
-from typing import Union, List, Dict, Optional, Any
+import time
+from typing import Union, List, Dict, Iterator, Optional, Any
 import json
-import requests
 from dotenv import load_dotenv
+from urllib.parse import urlparse
+from .http_transport import TransportError, shared_transport
+from .model_pool import provider_pool
+from .response_cache import cache_key
+from .chat_history import MESSAGE_OVERHEAD_TOKENS, estimate_tokens
+from .prompts import PromptTokenUsage, chat_messages, token_usage as usage_from_response
+from .metrics import record_call
+from .streaming import MessageDelta, iter_deltas, iter_sse_data, tool_calls_to_code
 
 # Load environment variables
 load_dotenv()
 
 class Message:
     """Simple message class to mimic OpenAI's message format"""
-    def __init__(self, content):
+    def __init__(self, content, token_usage: Optional[PromptTokenUsage] = None):
         self.content = content
         self.model = ""
         self.created = 0
         self.choices = []
-        # Add token_usage attribute for smolagents compatibility
-        self.token_usage = {
-            "prompt_tokens": 0,
-            "completion_tokens": 0,
-            "total_tokens": 0
-        }
+        # smolagents' monitor adds up input_tokens and output_tokens after every step;
+        # cached_input_tokens counts the prompt tokens served from the provider's prefix cache
+        self.token_usage = token_usage or PromptTokenUsage(input_tokens=0, output_tokens=0)
 
 class GLMModel:
     """GLM-4.5 API Model interface for smolagents CodeAgent"""
@@ -28,7 +33,13 @@ class GLMModel:
                  model_id='glm-4.5',
                  max_tokens=2096,
                  temperature=0.5,
-                 custom_role_conversions=None):
+                 custom_role_conversions=None,
+                 base_url=None,
+                 connect_timeout=5.0,
+                 read_timeout=120.0,
+                 max_retries=3,
+                 max_concurrency=None,
+                 cache=None):
         """Initialize the GLM-4.5 API Model.
         
         Args:
@@ -36,33 +47,55 @@ class GLMModel:
             max_tokens: Maximum number of tokens to generate
             temperature: Sampling temperature (0.0 to 1.0)
             custom_role_conversions: Custom role mappings if needed
+            base_url: Chat completions endpoint (defaults to GLM_BASE_URL or the BigModel API)
+            connect_timeout: Seconds allowed to connect to the API
+            read_timeout: Seconds allowed between bytes of a response
+            max_retries: Retries for connection errors and 429/5xx responses
+            max_concurrency: Requests in flight at once from agenerate() (default DRONE_LLM_CONCURRENCY or 4)
+            cache: Optional ResponseCache consulted by generate()
         """
         self.model_id = model_id
         self.max_tokens = max_tokens
         self.temperature = temperature
         self.custom_role_conversions = custom_role_conversions or {}
+        self.cache = cache
         
         # GLM API configuration
         self.api_key = os.environ.get("GLM_API_KEY")
-        self.base_url = "https://open.bigmodel.cn/api/paas/v4/chat/completions"
+        self.base_url = base_url or os.environ.get("GLM_BASE_URL", "https://open.bigmodel.cn/api/paas/v4/chat/completions")
         
         if not self.api_key:
             raise ValueError("GLM_API_KEY environment variable is required")
+        
+        # Timings of the most recent stream() call
+        self.last_stream = None
+        
+        # Worker pool for agenerate(); the provider is the API host
+        self.pool = provider_pool(urlparse(self.base_url).netloc, max_concurrency)
+        
+        # One pooled keep-alive session, shared by every model with this
+        # configuration, with a connection per concurrent request
+        self.transport = shared_transport(
+            self.base_url,
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            },
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            max_retries=max_retries,
+            pool_size=self.pool.max_concurrency
+        )
+    
+    def metrics(self) -> Dict:
+        """Request counts and latency percentiles of the API transport"""
+        return self.transport.metrics()
     
     def __call__(self, prompt: Union[str, dict, List[Dict]]) -> Message:
         """Make the class callable as required by smolagents"""
         try:
-            # Handle different prompt formats
-            if isinstance(prompt, (dict, list)):
-                if isinstance(prompt, list) and all(isinstance(msg, dict) for msg in prompt):
-                    messages = prompt
-                    return self._generate_chat_response_message(messages)
-                else:
-                    prompt_str = str(prompt)
-                    return self._generate_text_response_message(prompt_str)
-            else:
-                prompt_str = str(prompt)
-                return self._generate_text_response_message(prompt_str)
+            # Agent steps arrive as smolagents ChatMessages, plain calls as text
+            return self._generate_chat_response_message(chat_messages(prompt))
             
         except Exception as e:
             error_msg = f"Error generating response: {str(e)}"
@@ -96,32 +129,152 @@ class GLMModel:
         current_temperature = temperature if temperature is not None else self.temperature
             
         try:
-            if isinstance(prompt, (dict, list)):
-                if isinstance(prompt, list) and all(isinstance(msg, dict) for msg in prompt):
-                    messages = prompt
-                    result = self._generate_chat_response_message(messages, stop_sequences, current_max_tokens, current_temperature)
-                    return result
-                else:
-                    prompt_str = str(prompt)
-                    result = self._generate_text_response_message(prompt_str, stop_sequences, current_max_tokens, current_temperature)
-                    return result
-            else:
-                prompt_str = str(prompt)
-                result = self._generate_text_response_message(prompt_str, stop_sequences, current_max_tokens, current_temperature)
-                return result
+            messages = chat_messages(prompt)
+            
+            key = None
+            start = time.monotonic()
+            if self.cache is not None:
+                cleaned_messages = self._clean_messages(messages)
+                if not self.cache.should_bypass(cleaned_messages):
+                    key = self._cache_key(cleaned_messages, stop_sequences, current_max_tokens, current_temperature)
+                    cached = self.cache.get(key)
+                    if cached is not None:
+                        print("GLM API Request - served from response cache")
+                        record_call(self.model_id, start, cache_hit=True)
+                        return Message(cached)
+            
+            result = self._generate_chat_response_message(messages, stop_sequences, current_max_tokens, current_temperature)
+            
+            # Failed requests are not cached, so they are retried next time
+            if key is not None and not result.content.startswith(("Error in API request", "No response generated")):
+                self.cache.put(key, result.content)
+            return result
                 
         except Exception as e:
             error_msg = f"Error generating response: {str(e)}"
             print(error_msg)
             return Message(error_msg)
     
-    def _make_api_request(self, messages: List[Dict], stop_sequences: Optional[List[str]] = None, max_tokens: int = None, temperature: float = None) -> Dict:
-        """Make API request to GLM-4.5"""
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
+    def generate_with_tools(self,
+                            messages: List[Dict],
+                            tools: List[Dict],
+                            tool_choice: str = "auto",
+                            max_tokens: Optional[int] = None,
+                            temperature: Optional[float] = None) -> Dict:
+        """
+        One native function-calling request.
+        
+        Args:
+            messages: Chat messages, including earlier assistant tool calls and tool results
+            tools: Function schemas (see tool_calling.tool_schema)
+            tool_choice: "auto", "none" or a specific function
+            max_tokens: Maximum tokens to generate (overrides instance value if provided)
+            temperature: Sampling temperature (overrides instance value if provided)
+            
+        Returns:
+            Dict: The assistant message, with 'content', 'tool_calls' (possibly
+            empty) and 'token_usage'
+            
+        Raises:
+            Exception: If the request fails or returns no choices
+        """
+        payload = self._build_payload(messages, None, max_tokens, temperature)
+        payload["tools"] = tools
+        payload["tool_choice"] = tool_choice
+        response_data = self._post(payload)
+        if not response_data.get('choices'):
+            raise Exception("No response generated")
+        message = response_data['choices'][0]['message']
+        return {
+            "role": "assistant",
+            "content": message.get('content') or "",
+            "tool_calls": message.get('tool_calls') or [],
+            "token_usage": response_data.get('usage', {}),
         }
+    
+    def _cache_key(self, cleaned_messages: List[Dict], stop_sequences: Optional[List[str]], max_tokens: int, temperature: float) -> str:
+        """Cache key of a request, using the values _build_payload would send"""
+        return cache_key(cleaned_messages, self.model_id, temperature or self.temperature,
+                         stop_sequences, min(max_tokens or self.max_tokens, 8000))
+    
+    async def agenerate(self,
+                        prompt: Union[str, dict, List[Dict]],
+                        stop_sequences: Optional[List[str]] = None,
+                        seed: Optional[int] = None,
+                        max_tokens: Optional[int] = None,
+                        temperature: Optional[float] = None,
+                        **kwargs) -> Message:
+        """
+        Asyncio variant of generate().
+        
+        The request runs in the provider's bounded worker pool, so awaiting
+        many of these overlaps their network waits while keeping at most
+        max_concurrency requests in flight per provider.
+        
+        Returns:
+            Message: A Message object with the response content
+        """
+        return await self.pool.run(self.generate, prompt, stop_sequences=stop_sequences, seed=seed,
+                                   max_tokens=max_tokens, temperature=temperature, **kwargs)
+    
+    def stream(self,
+               prompt: Union[str, dict, List[Dict]],
+               stop_sequences: Optional[List[str]] = None,
+               max_tokens: Optional[int] = None,
+               temperature: Optional[float] = None,
+               **kwargs) -> Iterator[MessageDelta]:
+        """
+        Generate a response as a stream of deltas.
+        
+        Text is yielded as the API sends it; tool calls are yielded as one
+        smolagents code block once complete, so the joined deltas read like
+        the content generate() would return. Errors are yielded as text too.
         
+        Args:
+            prompt: The prompt to send to the model
+            stop_sequences: List of sequences where the model should stop generating
+            max_tokens: Maximum tokens to generate (overrides instance value if provided)
+            temperature: Sampling temperature (overrides instance value if provided)
+            **kwargs: Additional parameters
+            
+        Yields:
+            MessageDelta: Content increments; the last one carries token usage
+        """
+        messages = chat_messages(prompt)
+        
+        payload = self._build_payload(messages, stop_sequences, max_tokens, temperature, stream=True)
+        start = time.monotonic()
+        first_token = None
+        usage = None
+        retries = 0
+        error = False
+        try:
+            response = self.transport.post_json(payload, stream=True)
+            retries = self.transport.last_request["attempts"] - 1
+            with response:
+                chunks = (json.loads(data) for data in iter_sse_data(response.iter_lines(chunk_size=None)))
+                for delta in iter_deltas(chunks):
+                    if first_token is None and delta.content:
+                        first_token = time.monotonic() - start
+                    usage = delta.token_usage or usage
+                    yield delta
+        except TransportError as e:
+            retries, error = e.attempts - 1, True
+            yield MessageDelta(f"Error in API request: {str(e)}")
+        except Exception as e:
+            error = True
+            yield MessageDelta(f"Error in API request: {str(e)}")
+        finally:
+            record_call(self.model_id, start, usage, first_token_s=first_token, retries=retries, error=error)
+            self.last_stream = {
+                "first_token_s": first_token,
+                "total_s": time.monotonic() - start
+            }
+            if first_token is not None:
+                print(f"GLM API stream - first token after {first_token:.2f}s, complete after {self.last_stream['total_s']:.2f}s")
+    
+    def _build_payload(self, messages: List[Dict], stop_sequences: Optional[List[str]] = None, max_tokens: int = None, temperature: float = None, stream: bool = False) -> Dict:
+        """Build the chat completions request body"""
         # Clean messages to ensure only valid roles are included
         cleaned_messages = self._clean_messages(messages)
         
@@ -135,41 +288,47 @@ class GLMModel:
             "messages": cleaned_messages,
             "max_tokens": actual_max_tokens,
             "temperature": temperature or self.temperature,
-            "stream": False
+            "stream": stream
         }
         
         if stop_sequences:
             payload["stop"] = stop_sequences
         
-        # Calculate rough token count for debugging
-        total_chars = sum(len(str(msg.get('content', ''))) for msg in cleaned_messages)
-        estimated_tokens = total_chars // 4  # Rough estimate
+        # Token count for debugging
+        estimated_tokens = sum(estimate_tokens(str(msg.get('content', ''))) + MESSAGE_OVERHEAD_TOKENS
+                               for msg in cleaned_messages)
         
         print(f"GLM API Request - Estimated input tokens: {estimated_tokens}")
         print(f"GLM API Request - Message count: {len(cleaned_messages)}")
         if estimated_tokens > 32000:  # GLM-4.5 context limit is usually around 32k
             print(f"WARNING: Input may exceed GLM-4.5 context limit")
         
+        return payload
+    
+    def _make_api_request(self, messages: List[Dict], stop_sequences: Optional[List[str]] = None, max_tokens: int = None, temperature: float = None) -> Dict:
+        """Make API request to GLM-4.5"""
+        payload = self._build_payload(messages, stop_sequences, max_tokens, temperature)
+        return self._post(payload)
+    
+    def _post(self, payload: Dict) -> Dict:
+        """Send a request body and record the call's tokens, latency and retries"""
+        start = time.monotonic()
         try:
-            response = requests.post(self.base_url, headers=headers, json=payload, timeout=30)
-            print(f"Response status: {response.status_code}")
-            
-            if response.status_code != 200:
-                print(f"Error response: {response.text}")
-                
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.Timeout:
-            raise Exception("GLM API request timed out")
-        except requests.exceptions.RequestException as e:
+            response_data = self.transport.post_json(payload)
+        except TransportError as e:
+            print(f"GLM API request failed: {e}")
+            record_call(self.model_id, start, retries=e.attempts - 1, error=True)
             raise Exception(f"GLM API request failed: {str(e)}")
-        except Exception as e:
-            raise Exception(f"Unexpected error in GLM API request: {str(e)}")
+        
+        request = self.transport.last_request
+        print(f"Response status: {request['status']} ({request['latency_s']:.2f}s, {request['attempts']} attempt(s))")
+        record_call(self.model_id, start, response_data.get('usage'), retries=request['attempts'] - 1)
+        return response_data
     
     def _clean_messages(self, messages: List[Dict]) -> List[Dict]:
         """Clean messages to ensure compatibility with GLM API"""
         cleaned = []
-        valid_roles = {'system', 'user', 'assistant'}
+        valid_roles = {'system', 'user', 'assistant', 'tool'}
         
         for msg in messages:
             if not isinstance(msg, dict):
@@ -178,6 +337,11 @@ class GLMModel:
             role = msg.get('role', '').lower()
             content = msg.get('content', '')
             
+            # Assistant turns of the native tool loop carry tool calls and may have no text
+            if role == 'assistant' and msg.get('tool_calls'):
+                cleaned.append({'role': role, 'content': content or "", 'tool_calls': msg['tool_calls']})
+                continue
+            
             # Skip empty messages
             if not content or not role:
                 continue
@@ -195,6 +359,10 @@ class GLMModel:
             if len(content) > 50000:  # Arbitrary limit
                 content = content[:50000] + "... [truncated]"
                 
+            if role == 'tool':
+                cleaned.append({'role': role, 'content': content, 'tool_call_id': msg.get('tool_call_id', '')})
+                continue
+                
             cleaned.append({
                 'role': role,
                 'content': content
@@ -206,63 +374,37 @@ class GLMModel:
             
         return cleaned
     
-    def _generate_chat_response(self, messages: List[Dict], stop_sequences: Optional[List[str]] = None, max_tokens: int = None, temperature: float = None) -> str:
-        """Generate a response from the chat API and return string content"""
+    def _chat_completion(self, messages: List[Dict], stop_sequences: Optional[List[str]] = None, max_tokens: int = None, temperature: float = None) -> tuple:
+        """Generate a response from the chat API and return its content and token usage"""
         try:
             response_data = self._make_api_request(messages, stop_sequences, max_tokens, temperature)
+            token_usage = usage_from_response(response_data.get('usage'))
             
             if 'choices' in response_data and len(response_data['choices']) > 0:
                 message = response_data['choices'][0]['message']
                 
                 # Check if the model wants to call a tool (GLM-4.5 tool calling format)
                 if 'tool_calls' in message and message['tool_calls']:
-                    code_lines = []
-                    # Handle multiple tool calls if the model requests them
-                    for tool_call in message['tool_calls']:
-                        function_name = tool_call['function']['name']
-                        try:
-                            function_args = json.loads(tool_call['function']['arguments'])
-                            args_list = [f"{key}={repr(value)}" for key, value in function_args.items()]
-                            args_str = ", ".join(args_list)
-                            
-                            # Assign the result to a unique variable to avoid conflicts
-                            result_var = f"{function_name}_result_{tool_call['id'].replace('-', '_')}"
-                            code_lines.append(f"{result_var} = {function_name}({args_str})")
-
-                        except json.JSONDecodeError:
-                             # If args fail to parse, still attempt to call the function if no args are needed.
-                            code_lines.append(f"{function_name}()")
-
-                    # Crucially, call final_answer with the result of the *last* tool call.
-                    # This terminates the smolagents loop correctly.
-                    if code_lines:
-                        last_result_var = code_lines[-1].split(' = ')[0]
-                        code_lines.append(f"final_answer({last_result_var})")
-
-                    code_to_execute = "\n".join(code_lines)
-                    
-                    thought = "I will execute the requested tool(s) and provide the final result."
-                    smol_response = f"""Thought: {thought}
-Code:
-```py
-{code_to_execute}
-```<end_code>"""
-                    return smol_response
+                    return tool_calls_to_code(message['tool_calls']), token_usage
 
                 # If no tool_calls, return the content as is.
                 # GLM-4.5 may put content in 'reasoning_content' when using thinking mode
                 content = message.get('content', '') or message.get('reasoning_content', '') or ""
-                return content
+                return content, token_usage
             else:
-                return "No response generated"
+                return "No response generated", token_usage
                 
         except Exception as e:
-            return f"Error in API request: {str(e)}"
+            return f"Error in API request: {str(e)}", None
+    
+    def _generate_chat_response(self, messages: List[Dict], stop_sequences: Optional[List[str]] = None, max_tokens: int = None, temperature: float = None) -> str:
+        """Generate a response from the chat API and return string content"""
+        return self._chat_completion(messages, stop_sequences, max_tokens, temperature)[0]
     
     def _generate_chat_response_message(self, messages: List[Dict], stop_sequences: Optional[List[str]] = None, max_tokens: int = None, temperature: float = None) -> Message:
         """Generate a response from the chat API and return a Message object"""
-        content = self._generate_chat_response(messages, stop_sequences, max_tokens, temperature)
-        return Message(content)
+        content, token_usage = self._chat_completion(messages, stop_sequences, max_tokens, temperature)
+        return Message(content, token_usage)
     
     def _generate_text_response(self, prompt: str, stop_sequences: Optional[List[str]] = None, max_tokens: int = None, temperature: float = None) -> str:
         """Generate a response from the text completion API and return string content"""
@@ -271,5 +413,5 @@ Code:
         
     def _generate_text_response_message(self, prompt: str, stop_sequences: Optional[List[str]] = None, max_tokens: int = None, temperature: float = None) -> Message:
         """Generate a response from the text completion API and return a Message object"""
-        content = self._generate_text_response(prompt, stop_sequences, max_tokens, temperature)
-        return Message(content)
\ No newline at end of file
+        messages = [{"role": "user", "content": prompt}]
+        return self._generate_chat_response_message(messages, stop_sequences, max_tokens, temperature)
\ No newline at end of file
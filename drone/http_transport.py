@@ -0,0 +1,305 @@
+"""
+Pooled HTTP transport for the LLM backends of deepdrone-old.
+
+HTTPTransport owns a pooled requests.Session, so the TCP and TLS
+connection to the completions endpoint is kept alive across agent steps
+instead of being set up again for every call. Requests that fail with a
+connection error or a 429/5xx response are retried a bounded number of times
+with jittered exponential backoff (honouring Retry-After), connect and read
+timeouts are separate, and every request leaves a record with its latency,
+status and attempt count for the metrics.
+
+Transports for the same endpoint and credentials are shared through
+shared_transport(), so every chat session reuses one connection pool, and all
+transports to a provider share a RateLimiter: once the provider answers 429
+or reports its request quota as spent, every caller holds off until the
+reset time instead of each discovering the limit on its own.
+"""
+
+import re
+import time
+import random
+import logging
+import threading
+from collections import deque
+from typing import Dict, Optional
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: rate limiting and server-side failures
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+class TransportError(Exception):
+    """Raised when a request fails after all retries, or with a non-retryable status."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, attempts: int = 1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.attempts = attempts
+
+class RateLimiter:
+    """
+    Request gate shared by everything talking to one provider.
+
+    update() reads each response's rate limit signals (Retry-After on 429
+    and 503, and the OpenAI-style x-ratelimit-remaining-requests and
+    x-ratelimit-reset-requests headers); wait() blocks callers until the
+    provider is expected to accept requests again.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._blocked_until = 0.0
+        self.waits = 0
+        self.wait_s = 0.0
+
+    def block_for(self, seconds: float) -> None:
+        """Hold off all callers for ``seconds`` from now."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def wait(self) -> float:
+        """Block until requests are allowed; returns the time waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                delay = self._blocked_until - time.monotonic()
+            if delay <= 0:
+                break
+            time.sleep(delay)
+            waited += delay
+        if waited:
+            with self._lock:
+                self.waits += 1
+                self.wait_s += waited
+        return waited
+
+    def update(self, status: Optional[int], headers) -> Optional[float]:
+        """
+        Learn from a response's status and headers.
+
+        Returns:
+            The hold-off in seconds that was applied, or None
+        """
+        delay = None
+        if status in (429, 503):
+            delay = _parse_duration(headers.get("Retry-After"))
+        remaining = headers.get("x-ratelimit-remaining-requests")
+        if remaining is not None and remaining.strip().isdigit() and int(remaining) == 0:
+            reset = _parse_duration(headers.get("x-ratelimit-reset-requests"))
+            if reset is not None:
+                delay = max(delay or 0.0, reset)
+        if delay:
+            logger.info(f"Rate limit reached for {self.name}, holding requests for {delay:.2f}s")
+            self.block_for(delay)
+        return delay
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+def rate_limiter(provider: str) -> RateLimiter:
+    """Return the process-wide RateLimiter for a provider."""
+    with _rate_limiters_lock:
+        if provider not in _rate_limiters:
+            _rate_limiters[provider] = RateLimiter(provider)
+        return _rate_limiters[provider]
+
+def _parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds from "1.5", "20ms", "1s" or "6m0s"; None if absent or unparseable."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|s|m|h)", value.strip())
+    if not parts:
+        return None  # e.g. an HTTP-date Retry-After
+    scale = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+class HTTPTransport:
+    """
+    Keep-alive JSON POST client with bounded retries.
+
+    Safe to share between threads: requests.Session pools connections per
+    host, and the metrics are guarded by a lock.
+    """
+
+    def __init__(self, url: str, headers: Optional[Dict[str, str]] = None,
+                 connect_timeout: float = 5.0, read_timeout: float = 120.0,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 pool_size: int = 4, history: int = 256, provider: Optional[str] = None):
+        """
+        Set up the transport. No connection is made until the first request.
+
+        Args:
+            url: Endpoint to POST to
+            headers: Headers sent with every request (e.g. Authorization)
+            connect_timeout: Seconds allowed to establish a connection
+            read_timeout: Seconds allowed between bytes of the response
+            max_retries: Retries after the first attempt
+            backoff_base: Backoff before the first retry; doubles per retry
+            backoff_max: Upper bound for a single backoff
+            pool_size: Connections kept open to the endpoint
+            history: Number of request records kept for metrics
+            provider: Rate limit group (defaults to the URL's host and port)
+        """
+        self.url = url
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = rate_limiter(provider or urlparse(url).netloc)
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or {})
+        # Retries are handled here, where the status and Retry-After are visible
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._records = deque(maxlen=history)
+        self._totals = {"requests": 0, "errors": 0, "retries": 0}
+
+    def post_json(self, payload: Dict, stream: bool = False):
+        """
+        POST a JSON payload, retrying transient failures.
+
+        Args:
+            payload: JSON body
+            stream: Return the open response for streaming instead of the decoded body
+
+        Returns:
+            The decoded JSON body, or the requests.Response when streaming
+
+        Raises:
+            TransportError: If the request fails for good, or the body is not JSON
+        """
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            status = None
+            self.rate_limiter.wait()
+            try:
+                response = self.session.post(self.url, json=payload, stream=stream,
+                                             timeout=(self.connect_timeout, self.read_timeout))
+                status = response.status_code
+                limited = self.rate_limiter.update(status, response.headers)
+                if status in RETRY_STATUSES and attempt <= self.max_retries:
+                    delay = self._backoff(attempt)
+                    logger.warning(f"{self.url} returned {status}, retrying in {max(delay, limited or 0):.2f}s "
+                                   f"({attempt}/{self.max_retries})")
+                    response.close()
+                    if status == 429:
+                        # Other callers of this provider back off too
+                        self.rate_limiter.block_for(delay)
+                    else:
+                        time.sleep(delay)
+                    continue
+                response.raise_for_status()
+                if stream:
+                    self._record(start, status, attempt)
+                    return response
+                try:
+                    body = response.json()
+                except ValueError as e:
+                    # A proxy or gateway error page served with a 200
+                    self._record(start, status, attempt, error=True)
+                    raise TransportError(f"HTTP {status} response is not JSON: {response.text[:500]}",
+                                         status_code=status, attempts=attempt) from e
+                self._record(start, status, attempt)
+                return body
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # Covers connect and read timeouts and dropped keep-alive connections
+                if attempt <= self.max_retries:
+                    delay = self._backoff(attempt)
+                    logger.warning(f"{self.url} request failed ({e}), retrying in {delay:.2f}s "
+                                   f"({attempt}/{self.max_retries})")
+                    time.sleep(delay)
+                    continue
+                self._record(start, status, attempt, error=True)
+                kind = "timed out" if isinstance(e, requests.Timeout) else "failed"
+                raise TransportError(f"Request {kind} after {attempt} attempts: {e}", attempts=attempt) from e
+            except requests.HTTPError as e:
+                self._record(start, status, attempt, error=True)
+                body = e.response.text[:500] if e.response is not None else ""
+                raise TransportError(f"HTTP {status} after {attempt} attempts: {body}",
+                                     status_code=status, attempts=attempt) from e
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff; Retry-After is applied by the rate limiter."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    def _record(self, start: float, status: Optional[int], attempts: int, error: bool = False) -> None:
+        record = {
+            "time": time.time(),
+            "latency_s": time.monotonic() - start,
+            "status": status,
+            "attempts": attempts,
+            "error": error,
+        }
+        self._local.last = record
+        with self._lock:
+            self._records.append(record)
+            self._totals["requests"] += 1
+            self._totals["retries"] += attempts - 1
+            self._totals["errors"] += int(error)
+
+    @property
+    def last_request(self) -> Optional[Dict]:
+        """Record of the calling thread's most recent request, or None."""
+        last = getattr(self._local, "last", None)
+        return dict(last) if last else None
+
+    def metrics(self) -> Dict:
+        """
+        Request counters and latency percentiles over the recent history.
+
+        Returns:
+            Dict with requests, errors and retries (since start) and
+            latency_p50_s, latency_p95_s and latency_max_s (recent requests)
+        """
+        with self._lock:
+            latencies = sorted(record["latency_s"] for record in self._records)
+            metrics = dict(self._totals)
+
+        def percentile(fraction):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+        metrics.update({
+            "latency_p50_s": percentile(0.5),
+            "latency_p95_s": percentile(0.95),
+            "latency_max_s": latencies[-1] if latencies else None,
+        })
+        return metrics
+
+    def close(self) -> None:
+        """Close pooled connections."""
+        self.session.close()
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+def shared_transport(url: str, headers: Optional[Dict[str, str]] = None, **options) -> HTTPTransport:
+    """
+    Return the process-wide transport for an endpoint, credentials and options.
+
+    Models created by different chat sessions with the same configuration
+    share one connection pool and one set of metrics.
+    """
+    key = (url, tuple(sorted((headers or {}).items())), tuple(sorted(options.items())))
+    with _transports_lock:
+        if key not in _transports:
+            _transports[key] = HTTPTransport(url, headers, **options)
+        return _transports[key]
@@ -0,0 +1,208 @@
+"""
+Local intent routing for direct drone commands.
+
+Short, unambiguous commands such as "land", "take off to 30 m", "battery?",
+"return home" or "飞往 37.7749, -122.4194 高度 50 米" do not need a model to
+work out which tool to call. IntentRouter matches the whole message against
+a small set of command patterns (English and Chinese) and returns the
+drone_* tool and arguments to call directly, in microseconds. Anything else
+falls back to the agent:
+
+- open-ended requests, including compound ones ("land and return home"),
+  since a command must make up the whole message,
+- a command with missing or out-of-range parameters.
+
+Every decision is logged to this module's logger and counted, so the
+share of messages served locally can be measured.
+"""
+
+import re
+import time
+import logging
+import threading
+from collections import Counter, deque
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Altitudes accepted without the agent's judgement (meters)
+MIN_ALTITUDE_M = 1.0
+MAX_ALTITUDE_M = 120.0
+
+_NUMBER = r"(-?\d+(?:\.\d+)?)"
+_METERS = r"\s*(?:m|meters?|metres?|米)?"
+_VEHICLE = r"(?:\s+(?:for|on)?\s*(?:vehicle|drone)\s+(?P<vehicle>[\w\-]+))?"
+# Politeness and filler trimmed before matching
+_FILLER = re.compile(r"^(?:please|pls|ok(?:ay)?|now|drone|请|现在|无人机)[\s,，:：]*|"
+                     r"[\s,，]*(?:please|now|immediately|right now|请|立即|立刻|马上)?[\s.!?。！？]*$",
+                     re.IGNORECASE)
+
+class Intent:
+    """A command the router can serve without the agent."""
+
+    def __init__(self, tool: str, arguments: Dict, rule: str):
+        self.tool = tool
+        self.arguments = arguments
+        self.rule = rule
+
+    def __repr__(self):
+        return f"Intent({self.tool}, {self.arguments})"
+
+class Rule:
+    """A command pattern and how to turn its match into tool arguments."""
+
+    def __init__(self, name: str, tool: str, pattern: str,
+                 arguments: Optional[Callable[[re.Match], Optional[Dict]]] = None):
+        self.name = name
+        self.tool = tool
+        self.pattern = re.compile(pattern + _VEHICLE, re.IGNORECASE)
+        self.arguments = arguments or (lambda match: {})
+
+    def match(self, text: str) -> Optional[Intent]:
+        """The intent if the whole text is this command; its arguments are None if they were rejected."""
+        match = self.pattern.fullmatch(text)
+        if match is None:
+            return None
+        arguments = self.arguments(match)
+        if arguments is None:
+            return Intent(self.tool, None, self.name)
+        vehicle = match.groupdict().get("vehicle")
+        if vehicle:
+            arguments["vehicle_id"] = vehicle
+        return Intent(self.tool, arguments, self.name)
+
+def _altitude(value: str) -> Optional[float]:
+    altitude = float(value)
+    return altitude if MIN_ALTITUDE_M <= altitude <= MAX_ALTITUDE_M else None
+
+def _takeoff_arguments(match: re.Match) -> Optional[Dict]:
+    altitude = _altitude(match.group(1))
+    return None if altitude is None else {"altitude": altitude}
+
+def _fly_to_arguments(match: re.Match) -> Optional[Dict]:
+    latitude, longitude = float(match.group(1)), float(match.group(2))
+    altitude = _altitude(match.group(3))
+    if altitude is None or not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return {"latitude": latitude, "longitude": longitude, "altitude": altitude}
+
+DEFAULT_RULES = (
+    Rule("takeoff", "drone_takeoff",
+         r"(?:take ?off|launch|起飞)\s*(?:to|at|至|到)?\s*(?:an? )?(?:altitude (?:of )?|高度)?\s*" + _NUMBER + _METERS,
+         _takeoff_arguments),
+    Rule("land", "drone_land", r"(?:land|land the drone|降落|着陆)"),
+    Rule("return_home", "drone_return_home",
+         r"(?:rtl|return (?:to )?(?:home|launch|base)|come (?:back|home)|go home|返航|返回起飞点)"),
+    Rule("fly_to", "drone_fly_to",
+         r"(?:fly to|go to|goto|navigate to|飞往|飞到)\s*" + _NUMBER + r"\s*[,，]\s*" + _NUMBER +
+         r"\s*[,，]?\s*(?:at|alt(?:itude)?|高度)?\s*" + _NUMBER + _METERS,
+         _fly_to_arguments),
+    Rule("location", "get_drone_location",
+         r"(?:where are you|where is the drone|(?:current )?(?:location|position|gps)(?: status)?|"
+         r"(?:当前)?位置)"),
+    Rule("battery", "get_drone_battery",
+         r"(?:battery|battery (?:status|level|check)|how much battery(?: is left)?|(?:剩余)?电量|电池(?:状态|电量)?)"),
+    Rule("connect", "connect_to_real_drone",
+         r"(?:connect|连接)\s*(?:to|到)?\s*(?:the drone at\s*)?"
+         r"((?:udp|tcp|udpin|udpout|tcpin):[\w.\-]+:\d+|/dev/tty\w+|COM\d+)",
+         lambda match: {"connection_string": match.group(1)}),
+    Rule("disconnect", "disconnect_from_drone", r"(?:disconnect|断开(?:连接)?)"),
+    Rule("fleet_status", "get_fleet_status", r"(?:fleet(?: status)?|status of (?:the|all) drones|机队状态)"),
+)
+
+class RouteDecision:
+    """Outcome of routing one message: an intent to run locally, or the reason for the fallback."""
+
+    def __init__(self, intent: Optional[Intent], reason: str, elapsed_us: float):
+        self.intent = intent
+        self.reason = reason
+        self.elapsed_us = elapsed_us
+
+    @property
+    def routed(self) -> bool:
+        return self.intent is not None
+
+class IntentRouter:
+    """Matches messages against command rules and records every decision."""
+
+    def __init__(self, rules=DEFAULT_RULES, history: int = 256):
+        """
+        Create a router.
+
+        Args:
+            rules: Rule objects tried against each message
+            history: Number of recent decisions kept for metrics
+        """
+        self.rules = tuple(rules)
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._decisions = deque(maxlen=history)
+
+    def route(self, message: str) -> RouteDecision:
+        """
+        Decide whether a message can be served by a tool directly.
+
+        Returns:
+            RouteDecision with the intent, or intent None and the fallback reason
+        """
+        start = time.perf_counter()
+        text = _normalize(message)
+        intents = [intent for intent in (rule.match(text) for rule in self.rules) if intent is not None]
+        if len(intents) > 1:
+            intent, reason = None, "ambiguous"
+        elif intents and intents[0].arguments is None:
+            intent, reason = None, "invalid_parameters"
+        elif intents:
+            intent, reason = intents[0], intents[0].rule
+        else:
+            intent, reason = None, "open_ended"
+        decision = RouteDecision(intent, reason, (time.perf_counter() - start) * 1e6)
+        self._record(message, decision)
+        return decision
+
+    def _record(self, message: str, decision: RouteDecision) -> None:
+        if decision.routed:
+            logger.info(f"Intent route: local {decision.intent.tool}({decision.intent.arguments}) "
+                        f"in {decision.elapsed_us:.0f}us")
+        else:
+            logger.info(f"Intent route: agent ({decision.reason}) in {decision.elapsed_us:.0f}us")
+        with self._lock:
+            self._counts["local" if decision.routed else "agent"] += 1
+            self._counts[f"reason.{decision.reason}"] += 1
+            self._decisions.append({
+                "time": time.time(),
+                "message": message[:200],
+                "tool": decision.intent.tool if decision.routed else None,
+                "reason": decision.reason,
+                "elapsed_us": decision.elapsed_us,
+            })
+
+    def stats(self) -> Dict:
+        """Local and agent counts, counts per reason, and routing time of recent decisions."""
+        with self._lock:
+            counts = dict(self._counts)
+            elapsed = sorted(decision["elapsed_us"] for decision in self._decisions)
+        local, agent = counts.get("local", 0), counts.get("agent", 0)
+        return {
+            "local": local,
+            "agent": agent,
+            "local_share": local / (local + agent) if local + agent else 0.0,
+            "reasons": {name[len("reason."):]: count for name, count in counts.items() if name.startswith("reason.")},
+            "route_p50_us": elapsed[len(elapsed) // 2] if elapsed else None,
+            "route_max_us": elapsed[-1] if elapsed else None,
+        }
+
+    @property
+    def decisions(self) -> List[Dict]:
+        """Recent decisions, oldest first."""
+        with self._lock:
+            return list(self._decisions)
+
+def _normalize(message: str) -> str:
+    """Collapse whitespace and strip filler words and trailing punctuation."""
+    text = " ".join(message.split())
+    previous = None
+    while text != previous:
+        previous = text
+        text = _FILLER.sub("", text).strip()
+    return text
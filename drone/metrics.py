@@ -0,0 +1,277 @@
+"""
+Token, latency and cache accounting for the model calls of deepdrone-old.
+
+GLMModel and DeepSeekModel report every API call (and every reply served
+from the response cache) to the process-wide MetricsRegistry with the
+prompt, completion and cached prompt tokens from the response ``usage``,
+wall latency, time to first token for streams, and retries. The registry
+adds each call to three aggregates:
+
+- per model, since start (what the Prometheus dump exports),
+- per chat session,
+- per agent run (one chat message, with every agent step it took).
+
+Session and run are labels of the calling context, set with
+metrics_scope(). They are context variables, so a call made on a worker
+thread keeps the labels if the thread runs it in a copy of the caller's
+context (ProviderPool and ModelRouter do).
+"""
+
+import time
+import uuid
+import threading
+import contextvars
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from .prompts import token_usage
+
+_session = contextvars.ContextVar("drone_metrics_session", default=None)
+_run = contextvars.ContextVar("drone_metrics_run", default=None)
+
+# Counters exported per model, with their Prometheus help text
+COUNTERS = {
+    "calls": "Model API calls and response cache hits",
+    "errors": "Model calls that failed",
+    "prompt_tokens": "Prompt tokens reported by the API",
+    "completion_tokens": "Completion tokens reported by the API",
+    "cached_prompt_tokens": "Prompt tokens served from the provider's prefix cache",
+    "retries": "Retried API requests",
+    "cache_hits": "Replies served from the response cache",
+}
+
+class CallStats:
+    """Counters and recent latencies of a group of model calls."""
+
+    def __init__(self, window: int = 256):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.latency_sum_s = 0.0
+        self.first_token_sum_s = 0.0
+        self.streams = 0
+        self._latencies = deque(maxlen=window)
+        self._first_tokens = deque(maxlen=window)
+
+    def add(self, record: Dict) -> None:
+        counters = self.counters
+        counters["calls"] += 1
+        counters["errors"] += int(record["error"])
+        counters["prompt_tokens"] += record["prompt_tokens"]
+        counters["completion_tokens"] += record["completion_tokens"]
+        counters["cached_prompt_tokens"] += record["cached_prompt_tokens"]
+        counters["retries"] += record["retries"]
+        counters["cache_hits"] += int(record["cache_hit"])
+        self.latency_sum_s += record["latency_s"]
+        self._latencies.append(record["latency_s"])
+        if record["first_token_s"] is not None:
+            self.streams += 1
+            self.first_token_sum_s += record["first_token_s"]
+            self._first_tokens.append(record["first_token_s"])
+
+    @staticmethod
+    def _percentile(samples, fraction: float) -> Optional[float]:
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def latency(self, fraction: float) -> Optional[float]:
+        """Wall latency percentile over the recent calls."""
+        return self._percentile(self._latencies, fraction)
+
+    def first_token(self, fraction: float) -> Optional[float]:
+        """Time-to-first-token percentile over the recent streams."""
+        return self._percentile(self._first_tokens, fraction)
+
+    def snapshot(self) -> Dict:
+        stats = dict(self.counters)
+        prompt_tokens = stats["prompt_tokens"]
+        stats.update({
+            "cached_prompt_share": stats["cached_prompt_tokens"] / prompt_tokens if prompt_tokens else 0.0,
+            "latency_total_s": self.latency_sum_s,
+            "latency_p50_s": self.latency(0.5),
+            "latency_p95_s": self.latency(0.95),
+            "first_token_p50_s": self.first_token(0.5),
+        })
+        return stats
+
+class MetricsRegistry:
+    """
+    Thread-safe store of model call metrics.
+
+    Keeps all-time aggregates per model, and aggregates for the most recent
+    ``max_sessions`` sessions and ``max_runs`` runs.
+    """
+
+    def __init__(self, max_sessions: int = 256, max_runs: int = 256, history: int = 256):
+        self.max_sessions = max_sessions
+        self.max_runs = max_runs
+        self._lock = threading.Lock()
+        self._models: Dict[str, CallStats] = {}
+        self._sessions: "OrderedDict[str, CallStats]" = OrderedDict()
+        self._runs: "OrderedDict[str, CallStats]" = OrderedDict()
+        self._records = deque(maxlen=history)
+
+    def record(self, model: str, latency_s: float, prompt_tokens: int = 0, completion_tokens: int = 0,
+               cached_prompt_tokens: int = 0, first_token_s: Optional[float] = None,
+               retries: int = 0, cache_hit: bool = False, error: bool = False) -> Dict:
+        """
+        Record one model call under the current session and run labels.
+
+        Args:
+            model: Model ID
+            latency_s: Wall time of the call (of the whole stream for streams)
+            prompt_tokens: Prompt tokens reported by the API
+            completion_tokens: Completion tokens reported by the API
+            cached_prompt_tokens: Prompt tokens served from the provider's cache
+            first_token_s: Time to the first streamed text, for streams
+            retries: Requests retried by the transport
+            cache_hit: Served from the response cache without an API call
+            error: The call failed
+
+        Returns:
+            Dict: The stored record
+        """
+        record = {
+            "time": time.time(),
+            "model": model,
+            "session": _session.get(),
+            "run": _run.get(),
+            "latency_s": latency_s,
+            "first_token_s": first_token_s,
+            "prompt_tokens": prompt_tokens or 0,
+            "completion_tokens": completion_tokens or 0,
+            "cached_prompt_tokens": cached_prompt_tokens or 0,
+            "retries": retries,
+            "cache_hit": cache_hit,
+            "error": error,
+        }
+        with self._lock:
+            self._records.append(record)
+            self._models.setdefault(model, CallStats()).add(record)
+            if record["session"] is not None:
+                self._group(self._sessions, record["session"], self.max_sessions).add(record)
+            if record["run"] is not None:
+                self._group(self._runs, record["run"], self.max_runs).add(record)
+        return record
+
+    @staticmethod
+    def _group(groups: OrderedDict, key: str, limit: int) -> CallStats:
+        """The stats of ``key``, evicting the least recently used group past ``limit``."""
+        if key in groups:
+            groups.move_to_end(key)
+        else:
+            groups[key] = CallStats()
+            while len(groups) > limit:
+                groups.popitem(last=False)
+        return groups[key]
+
+    def models(self) -> Dict[str, Dict]:
+        """All-time aggregates by model ID."""
+        with self._lock:
+            return {model: stats.snapshot() for model, stats in self._models.items()}
+
+    def session(self, session_id: str) -> Optional[Dict]:
+        """Aggregates of a session, or None if it made no calls (or was evicted)."""
+        with self._lock:
+            stats = self._sessions.get(session_id)
+            return stats.snapshot() if stats else None
+
+    def run(self, run_id: str) -> Optional[Dict]:
+        """Aggregates of an agent run, or None if it made no calls (or was evicted)."""
+        with self._lock:
+            stats = self._runs.get(run_id)
+            return stats.snapshot() if stats else None
+
+    def records(self) -> List[Dict]:
+        """The most recent call records, oldest first."""
+        with self._lock:
+            return [dict(record) for record in self._records]
+
+    def prometheus(self, prefix: str = "drone_llm") -> str:
+        """
+        All-time per-model metrics in the Prometheus text exposition format.
+
+        Counters are exported as ``<prefix>_<name>_total{model="..."}``;
+        latency and time to first token as summaries with 0.5 and 0.95
+        quantiles over the recent calls.
+        """
+        with self._lock:
+            models = sorted(self._models.items())
+            lines = []
+            for name, help_text in COUNTERS.items():
+                lines += [f"# HELP {prefix}_{name}_total {help_text}",
+                          f"# TYPE {prefix}_{name}_total counter"]
+                lines += [f'{prefix}_{name}_total{{model="{_escape(model)}"}} {stats.counters[name]}'
+                          for model, stats in models]
+            for name, help_text, percentile, total, count in (
+                    ("latency_seconds", "Wall latency of model calls",
+                     CallStats.latency, "latency_sum_s", lambda stats: stats.counters["calls"]),
+                    ("first_token_seconds", "Time to first token of streamed model calls",
+                     CallStats.first_token, "first_token_sum_s", lambda stats: stats.streams)):
+                lines += [f"# HELP {prefix}_{name} {help_text}", f"# TYPE {prefix}_{name} summary"]
+                for model, stats in models:
+                    label = f'model="{_escape(model)}"'
+                    for quantile in (0.5, 0.95):
+                        value = percentile(stats, quantile)
+                        lines.append(f'{prefix}_{name}{{{label},quantile="{quantile}"}} '
+                                     f'{"NaN" if value is None else repr(value)}')
+                    lines.append(f"{prefix}_{name}_sum{{{label}}} {getattr(stats, total)!r}")
+                    lines.append(f"{prefix}_{name}_count{{{label}}} {count(stats)}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Forget everything recorded so far."""
+        with self._lock:
+            self._models.clear()
+            self._sessions.clear()
+            self._runs.clear()
+            self._records.clear()
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+_registry = MetricsRegistry()
+
+def shared_registry() -> MetricsRegistry:
+    """Return the process-wide registry the model adapters record into."""
+    return _registry
+
+def new_id() -> str:
+    """A fresh session or run label."""
+    return uuid.uuid4().hex[:12]
+
+def current_run() -> Optional[str]:
+    """The run label of the calling context, if any."""
+    return _run.get()
+
+@contextmanager
+def metrics_scope(session: Optional[str] = None, run: Optional[str] = None):
+    """
+    Label the model calls made inside the block with a session and/or run.
+
+    Labels left as None keep the value of any enclosing scope.
+    """
+    tokens = []
+    if session is not None:
+        tokens.append((_session, _session.set(session)))
+    if run is not None:
+        tokens.append((_run, _run.set(run)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+def record_call(model: str, started: float, usage: Optional[Dict] = None, **fields) -> Dict:
+    """
+    Record a model call that began at ``started`` (time.monotonic()).
+
+    Args:
+        model: Model ID
+        started: Monotonic start time of the call
+        usage: The ``usage`` object of the API response, if any
+        **fields: Further MetricsRegistry.record() arguments (retries, first_token_s, ...)
+    """
+    tokens = token_usage(usage)
+    return _registry.record(model, time.monotonic() - started, tokens.input_tokens, tokens.output_tokens,
+                            tokens.cached_input_tokens, **fields)
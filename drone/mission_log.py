@@ -0,0 +1,230 @@
+"""
+Bounded mission log of deepdrone-old.
+
+Status changes (update_mission_status) and drone_control log lines used to be
+kept as preformatted strings in a list on the Streamlit session, trimmed by
+rebuilding it with a [-30:] slice on every entry, and copied as styled HTML
+into the chat history, which was never trimmed. MissionLog replaces both:
+
+- Entries are structured MissionLogRecords (time, level, status, phase and
+  any numeric telemetry in the message) in a fixed-capacity deque, so adding
+  one never copies the log.
+- Nothing is formatted when an entry is added. record_html() is the one
+  formatter, used by the chat and the sidebar when they draw an entry.
+- Entries shown in the chat follow a retention policy: at most
+  ``chat_retention`` of them stay in the chat history, and drone_control log
+  lines can be left out of it (``chat_logs``).
+"""
+
+import os
+import re
+import html
+import time
+import datetime
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+# Entries kept in a session's mission log
+MISSION_LOG_CAPACITY = int(os.environ.get("DRONE_MISSION_LOG_SIZE", "256"))
+
+# Log entries kept in the chat history; 0 keeps them out of the chat
+CHAT_LOG_RETENTION = int(os.environ.get("DRONE_CHAT_LOG_RETENTION", "100"))
+
+# Whether drone_control log lines are shown in the chat, besides status changes
+CHAT_LOG_LINES = os.environ.get("DRONE_CHAT_LOG_LINES", "1") != "0"
+
+# Numeric telemetry found in drone_control log lines
+TELEMETRY_PATTERNS = (
+    ("altitude", re.compile(r"Altitude: (-?\d+(?:\.\d+)?)")),
+    ("waypoint", re.compile(r"Reached waypoint (\d+)/")),
+    ("waypoints", re.compile(r"Reached waypoint \d+/(\d+)")),
+)
+
+# Status of progress records, which only update the phase line
+PROGRESS = "PROGRESS"
+
+STYLESHEET = """
+    /* Mission log entries (see drone/mission_log.py) */
+    .mission-log.log-error { color: #ff3366; }
+    .mission-log.log-busy { color: #ffff00; }
+    .mission-log.log-arming { color: #ffaa00; }
+    .mission-log.log-flight { color: #00ffff; }
+    .mission-log.log-done { color: #00ff00; }
+    .mission-log.log-telemetry { color: #88ff88; }
+    .mission-log.log-info { color: #aaaaff; }
+"""
+
+class MissionLogRecord:
+    """
+    One mission event: a status change, a drone_control log line (status
+    'LOG') or a progress update of the current status (status PROGRESS).
+
+    ``session`` is the ID of the Streamlit session the event belongs to, or
+    None for vehicle events that every session following the vehicle sees.
+    """
+
+    __slots__ = ("time", "level", "status", "phase", "telemetry", "session")
+
+    def __init__(self, status: str, phase: str = "", level: str = "INFO",
+                 telemetry: Optional[Dict[str, float]] = None, timestamp: Optional[float] = None,
+                 session: Optional[str] = None):
+        self.time = time.time() if timestamp is None else timestamp
+        self.level = level
+        self.status = status
+        self.phase = phase
+        self.telemetry = telemetry or {}
+        self.session = session
+
+    @property
+    def is_progress(self) -> bool:
+        return self.status == PROGRESS
+
+    @property
+    def is_log(self) -> bool:
+        return self.status == "LOG"
+
+    def text(self) -> str:
+        """Plain text of the entry, '[HH:MM:SS] STATUS: phase'."""
+        stamp = datetime.datetime.fromtimestamp(self.time).strftime("%H:%M:%S")
+        return f"[{stamp}] {self.status}: {self.phase}"
+
+    def __repr__(self):
+        return f"MissionLogRecord({self.text()!r}, level={self.level!r}, telemetry={self.telemetry!r})"
+
+def parse_telemetry(message: str) -> Dict[str, float]:
+    """Numeric telemetry in a drone_control log message, by name."""
+    values = {}
+    for name, pattern in TELEMETRY_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            values[name] = float(match.group(1))
+    return values
+
+def status_record(status: str, phase: str = "", session: Optional[str] = None, **telemetry: float) -> MissionLogRecord:
+    """Record of a status change."""
+    return MissionLogRecord(status, phase, "ERROR" if status == "ERROR" else "INFO", telemetry, session=session)
+
+def log_record(message: str, level: str = "INFO", session: Optional[str] = None) -> MissionLogRecord:
+    """Record of a drone_control log line, with the telemetry found in it."""
+    return MissionLogRecord("LOG", message, level, parse_telemetry(message), session=session)
+
+def progress_record(phase: str, session: Optional[str] = None, **telemetry: float) -> MissionLogRecord:
+    """Progress within the current status (a new phase line); not kept in the log."""
+    return MissionLogRecord(PROGRESS, phase, "INFO", telemetry, session=session)
+
+def _tone(record: MissionLogRecord) -> Tuple[str, str]:
+    """Style class and icon of an entry."""
+    if record.status == "ERROR" or record.level in ("ERROR", "CRITICAL"):
+        return "error", "⚠️"
+    if record.is_log:
+        if "altitude" in record.telemetry:
+            return "telemetry", "🛰️"
+        if "Arming" in record.phase:
+            return "arming", "🔄"
+        if "Taking off" in record.phase:
+            return "busy", "🚀"
+        return "info", "📊"
+    if record.status in ("CONNECTING", "TAKING OFF", "LANDING", "RETURNING"):
+        return "busy", "🔄"
+    if record.status in ("MISSION", "EXECUTING MISSION", "AIRBORNE"):
+        return "flight", "🚁"
+    if record.status in ("MISSION COMPLETE", "CONNECTED"):
+        return "done", "✅"
+    return "info", "ℹ️"
+
+def record_html(record: MissionLogRecord) -> str:
+    """HTML of one entry, styled by the STYLESHEET classes."""
+    tone, icon = _tone(record)
+    if tone == "telemetry":
+        stamp = datetime.datetime.fromtimestamp(record.time).strftime("%H:%M:%S")
+        text = f"[{stamp}] ALT: {record.telemetry['altitude']:g}"
+    else:
+        text = record.text()
+    return f'<span class="mission-log log-{tone}">{icon} {html.escape(text)}</span>'
+
+class MissionLog:
+    """
+    Fixed-capacity, thread-safe log of one session's mission.
+
+    Args:
+        capacity: Entries kept; the oldest are dropped past it
+        chat_retention: Entries kept in the chat history; 0 keeps them out of the chat
+        chat_logs: Show drone_control log lines in the chat, not just status changes
+    """
+
+    def __init__(self, capacity: int = MISSION_LOG_CAPACITY, chat_retention: int = CHAT_LOG_RETENTION,
+                 chat_logs: bool = CHAT_LOG_LINES):
+        self.chat_retention = chat_retention
+        self.chat_logs = chat_logs
+        self._records = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._chat_entries = deque()  # entries currently posted to the chat, oldest first
+        self._expired = 0  # expired entries still in the chat history
+
+    @property
+    def capacity(self) -> int:
+        return self._records.maxlen
+
+    def append(self, record: MissionLogRecord) -> MissionLogRecord:
+        with self._lock:
+            self._records.append(record)
+        return record
+
+    def status(self, status: str, phase: str = "", **telemetry: float) -> MissionLogRecord:
+        """Log a status change."""
+        return self.append(status_record(status, phase, **telemetry))
+
+    def log(self, message: str, level: str = "INFO") -> MissionLogRecord:
+        """Log a drone_control log line, with the telemetry found in it."""
+        return self.append(log_record(message, level))
+
+    def latest(self) -> Optional[MissionLogRecord]:
+        with self._lock:
+            return self._records[-1] if self._records else None
+
+    def records(self) -> List[MissionLogRecord]:
+        """The entries kept, oldest first."""
+        with self._lock:
+            return list(self._records)
+
+    def series(self, name: str) -> List[Tuple[float, float]]:
+        """(time, value) of a telemetry value over the entries kept."""
+        with self._lock:
+            return [(record.time, record.telemetry[name]) for record in self._records if name in record.telemetry]
+
+    def __len__(self):
+        return len(self._records)
+
+    def __bool__(self):
+        return bool(self._records)
+
+    def chat_visible(self, record: MissionLogRecord) -> bool:
+        """Whether the retention policy shows ``record`` in the chat."""
+        return self.chat_retention > 0 and (self.chat_logs or not record.is_log)
+
+    def post_to_chat(self, history: List[Dict], record: MissionLogRecord) -> Optional[Dict]:
+        """
+        Add ``record`` to a chat history if the retention policy shows it.
+
+        The entry holds the record, not its HTML. Past ``chat_retention``
+        entries the oldest is marked expired (ChatView skips it), and the
+        expired entries are removed from the history in one pass once there
+        are ``chat_retention`` of them.
+
+        Returns:
+            Optional[Dict]: The chat entry, or None if the record is not shown
+        """
+        if not self.chat_visible(record):
+            return None
+        entry = {"role": "system", "record": record}
+        with self._lock:
+            history.append(entry)
+            self._chat_entries.append(entry)
+            while len(self._chat_entries) > self.chat_retention:
+                self._chat_entries.popleft()["expired"] = True
+                self._expired += 1
+            if self._expired >= self.chat_retention:
+                history[:] = [message for message in history if not message.get("expired")]
+                self._expired = 0
+        return entry
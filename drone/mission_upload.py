@@ -0,0 +1,284 @@
+"""
+Mission upload engine for deepdrone-old.
+
+Uploads waypoint missions with the MAVLink mission protocol using
+MISSION_ITEM_INT (latitude/longitude as 1e7 integers, so coordinates survive
+the trip without float32 rounding). The engine remembers a hash of every item
+currently on the vehicle, skips uploads that change nothing, rewrites only the
+changed range with MISSION_WRITE_PARTIAL_LIST when the autopilot supports it,
+and verifies the written items by reading them back.
+"""
+
+import time
+import queue
+import hashlib
+import logging
+from typing import Dict, List, Optional, Tuple
+from pymavlink import mavutil
+
+logger = logging.getLogger('drone_control')
+
+# Messages the engine listens to while a transfer is in progress
+MISSION_MESSAGES = ('MISSION_REQUEST_INT', 'MISSION_REQUEST', 'MISSION_ACK',
+                    'MISSION_COUNT', 'MISSION_ITEM_INT')
+
+class MissionTransferError(Exception):
+    """Raised when the vehicle rejects a transfer or stops answering."""
+
+def item_key(item) -> Tuple:
+    """
+    Return the fields of a MISSION_ITEM_INT that define the mission.
+
+    Sequence number, target IDs and the "current" flag are left out, so an
+    item read back from the vehicle compares equal to the one that was sent.
+    """
+    # Freshly encoded items may carry ints where decoded ones carry floats
+    return (int(item.frame), int(item.command), int(item.autocontinue),
+            round(float(item.param1), 4), round(float(item.param2), 4),
+            round(float(item.param3), 4), round(float(item.param4), 4),
+            int(item.x), int(item.y), round(float(item.z), 3))
+
+def item_hash(item) -> str:
+    """Short stable hash of a mission item, see item_key()."""
+    return hashlib.sha1(repr(item_key(item)).encode()).hexdigest()[:16]
+
+class MissionUploader:
+    """
+    Uploads and verifies missions on one vehicle.
+
+    Sequence 0 is the home position, which the autopilot overwrites with its
+    own home; it is sent on full uploads but never compared or verified.
+    """
+
+    def __init__(self, vehicle, partial_writes: Optional[bool] = None,
+                 timeout: float = 1.0, retries: int = 5, verify: bool = True,
+                 transfer_timeout: Optional[float] = None):
+        """
+        Initialize the uploader.
+
+        Args:
+            vehicle: Connected DroneKit Vehicle (or a stand-in with message_factory,
+                     send_mavlink and add/remove_message_listener)
+            partial_writes: Whether the autopilot accepts MISSION_WRITE_PARTIAL_LIST.
+                            None detects it (ArduPilot does, PX4 does not).
+            timeout: Seconds to wait for each reply before resending
+            retries: Resends allowed without the vehicle requesting the next item
+            verify: Read written items back and compare their hashes
+            transfer_timeout: Seconds a write may take in total. None allows the
+                              resends plus two timeouts per item.
+        """
+        self.vehicle = vehicle
+        self.timeout = timeout
+        self.retries = retries
+        self.transfer_timeout = transfer_timeout
+        self.verify = verify
+        self.partial_writes = partial_writes if partial_writes is not None else self._detect_partial_writes()
+        self.item_hashes = []
+        self._inbox = queue.Queue()
+
+    @property
+    def mission_hash(self) -> Optional[str]:
+        """Hash of the mission last confirmed on the vehicle, None if unknown."""
+        if not self.item_hashes:
+            return None
+        return hashlib.sha1("".join(self.item_hashes[1:]).encode()).hexdigest()
+
+    def invalidate(self) -> None:
+        """Forget the cached mission, e.g. after another GCS changed it."""
+        self.item_hashes = []
+
+    def build_items(self, waypoints: List[Dict[str, float]], home: Tuple[float, float] = None) -> List:
+        """
+        Encode waypoints as MISSION_ITEM_INT messages.
+
+        Args:
+            waypoints: List of dictionaries with lat, lon, alt and optional delay
+            home: (lat, lon) for the home item; defaults to the first waypoint
+
+        Returns:
+            List of MISSION_ITEM_INT messages, home first
+        """
+        factory = self.vehicle.message_factory
+        if home is None:
+            home = (waypoints[0]["lat"], waypoints[0]["lon"]) if waypoints else (0.0, 0.0)
+
+        items = [factory.mission_item_int_encode(
+            0, 0, 0, mavutil.mavlink.MAV_FRAME_GLOBAL, mavutil.mavlink.MAV_CMD_NAV_WAYPOINT,
+            0, 1, 0, 0, 0, 0, int(round(home[0] * 1e7)), int(round(home[1] * 1e7)), 0)]
+        for seq, wp in enumerate(waypoints, start=1):
+            items.append(factory.mission_item_int_encode(
+                0, 0, seq, mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT_INT,
+                mavutil.mavlink.MAV_CMD_NAV_WAYPOINT, 0, 1,
+                wp.get("delay", 0), 0, 0, 0,
+                int(round(wp["lat"] * 1e7)), int(round(wp["lon"] * 1e7)), float(wp["alt"])))
+        return items
+
+    def upload(self, waypoints: List[Dict[str, float]], home: Tuple[float, float] = None) -> Dict:
+        """
+        Make the vehicle's mission match ``waypoints`` with as little traffic as possible.
+
+        Args:
+            waypoints: List of dictionaries with lat, lon, alt and optional delay
+            home: (lat, lon) for the home item; defaults to the first waypoint
+
+        Returns:
+            Dict with success, mode ("unchanged", "partial" or "full"), items_sent,
+            verified, mission_hash, elapsed_s and error (on failure)
+        """
+        start = time.monotonic()
+        items = self.build_items(waypoints, home)
+        hashes = [item_hash(item) for item in items]
+        result = {"success": False, "mode": "full", "items_sent": 0, "verified": False}
+
+        changed = [seq for seq in range(1, len(items))
+                   if seq >= len(self.item_hashes) or hashes[seq] != self.item_hashes[seq]]
+
+        self._subscribe()
+        try:
+            if self.item_hashes and len(hashes) == len(self.item_hashes) and not changed:
+                result["mode"] = "unchanged"
+            elif self.item_hashes and len(hashes) == len(self.item_hashes) and self.partial_writes:
+                first, last = changed[0], changed[-1]
+                result["mode"] = "partial"
+                result["items_sent"] = self._write(items, first, last)
+            else:
+                changed = list(range(1, len(items)))
+                result["items_sent"] = self._write(items, 0, len(items) - 1)
+
+            if self.verify and changed:
+                self._verify(items, hashes, changed)
+                result["verified"] = True
+
+            self.item_hashes = hashes
+            result["success"] = True
+        except MissionTransferError as e:
+            # The vehicle may hold a half-written mission now
+            self.invalidate()
+            result["error"] = str(e)
+            logger.error(f"Mission upload failed: {str(e)}")
+        finally:
+            self._unsubscribe()
+
+        result["mission_hash"] = self.mission_hash
+        result["elapsed_s"] = time.monotonic() - start
+        return result
+
+    def _write(self, items: List, first: int, last: int) -> int:
+        """
+        Serve item requests for the range [first, last] until the vehicle acks.
+
+        The last message is resent when the vehicle has not requested the next
+        item within ``timeout``; only that request counts as progress, so
+        repeated requests for an item already sent do not keep the transfer
+        alive. The whole write is bounded by ``transfer_timeout``.
+        """
+        factory = self.vehicle.message_factory
+        if first == 0 and last == len(items) - 1:
+            opener = factory.mission_count_encode(0, 0, len(items))
+        else:
+            opener = factory.mission_write_partial_list_encode(0, 0, first, last)
+
+        total = last - first + 1
+        limit = self.transfer_timeout or self.timeout * (self.retries + 2 * total)
+        deadline = time.monotonic() + limit
+        self.vehicle.send_mavlink(opener)
+        last_sent = opener
+        resend_at = time.monotonic() + self.timeout
+        expected = first
+        sent = 0
+        requested = set()
+        attempts = 0
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                raise MissionTransferError(f"mission transfer unfinished after {limit:.1f}s "
+                                           f"({len(requested)} of {total} items requested)")
+            if now >= resend_at:
+                attempts += 1
+                if attempts > self.retries:
+                    raise MissionTransferError(f"no reply from vehicle after {self.retries} retries")
+                self.vehicle.send_mavlink(last_sent)
+                resend_at = now + self.timeout
+            msg = self._receive(min(resend_at, deadline) - now)
+            if msg is None:
+                continue
+
+            msg_type = msg.get_type()
+            if msg_type in ('MISSION_REQUEST_INT', 'MISSION_REQUEST'):
+                if first <= msg.seq <= last:
+                    last_sent = items[msg.seq]
+                    self.vehicle.send_mavlink(last_sent)
+                    requested.add(msg.seq)
+                    sent += 1
+                    if msg.seq == expected:
+                        expected += 1
+                        attempts = 0
+                        resend_at = time.monotonic() + self.timeout
+            elif msg_type == 'MISSION_ACK':
+                complete = len(requested) == total
+                if complete and msg.type == mavutil.mavlink.MAV_MISSION_ACCEPTED:
+                    return sent
+                if complete and self.verify:
+                    # Our final item was answered after the transfer closed, which
+                    # happens when the accepting ack was lost; the read-back decides
+                    return sent
+                if msg.type == mavutil.mavlink.MAV_MISSION_ACCEPTED:
+                    raise MissionTransferError(f"vehicle accepted the mission after {len(requested)} "
+                                               f"of {total} items")
+                raise MissionTransferError(f"vehicle rejected mission (MAV_MISSION_RESULT {msg.type})")
+
+    def _verify(self, items: List, hashes: List[str], seqs: List[int]) -> None:
+        """Read items back from the vehicle and compare their hashes."""
+        factory = self.vehicle.message_factory
+        count = self._request(factory.mission_request_list_encode(0, 0), 'MISSION_COUNT').count
+        if count != len(items):
+            raise MissionTransferError(f"vehicle reports {count} items, expected {len(items)}")
+
+        try:
+            for seq in seqs:
+                item = self._request(factory.mission_request_int_encode(0, 0, seq), 'MISSION_ITEM_INT', seq)
+                if item_hash(item) != hashes[seq]:
+                    raise MissionTransferError(f"read-back mismatch at item {seq}")
+        finally:
+            # Close the download transaction
+            self.vehicle.send_mavlink(factory.mission_ack_encode(0, 0, mavutil.mavlink.MAV_MISSION_ACCEPTED))
+
+    def _request(self, request, reply_type: str, seq: int = None):
+        """Send a request until a matching reply arrives."""
+        for _ in range(self.retries + 1):
+            self.vehicle.send_mavlink(request)
+            deadline = time.monotonic() + self.timeout
+            while True:
+                msg = self._receive(deadline - time.monotonic())
+                if msg is None:
+                    break
+                if msg.get_type() == reply_type and (seq is None or msg.seq == seq):
+                    return msg
+        raise MissionTransferError(f"no {reply_type} from vehicle after {self.retries} retries")
+
+    def _receive(self, timeout: float = None):
+        try:
+            return self._inbox.get(timeout=self.timeout if timeout is None else max(timeout, 0.0))
+        except queue.Empty:
+            return None
+
+    def _on_message(self, vehicle, name, msg) -> None:
+        self._inbox.put(msg)
+
+    def _subscribe(self) -> None:
+        self._inbox = queue.Queue()
+        for name in MISSION_MESSAGES:
+            self.vehicle.add_message_listener(name, self._on_message)
+
+    def _unsubscribe(self) -> None:
+        for name in MISSION_MESSAGES:
+            try:
+                self.vehicle.remove_message_listener(name, self._on_message)
+            except Exception:
+                pass
+
+    def _detect_partial_writes(self) -> bool:
+        try:
+            return self.vehicle.version.autopilot_type == mavutil.mavlink.MAV_AUTOPILOT_ARDUPILOTMEGA
+        except Exception:
+            return False
@@ -0,0 +1,103 @@
+"""
+Bounded worker pools for running LLM calls from asyncio.
+
+The model adapters talk to their APIs with blocking clients (requests for GLM,
+the OpenAI SDK for DeepSeek). ProviderPool runs those calls on a fixed number
+of worker threads per provider and hands back futures that asyncio can await,
+the same bridge TakeoffHandle uses for takeoffs. The worker count is the
+concurrency limit: extra calls queue instead of piling more connections onto
+the provider, and it matches the size of the provider's connection pool so
+every in-flight call has a kept-alive connection to use.
+
+Pools are process-wide (see provider_pool), so many chat sessions and a batch
+script's coroutines share one limit per provider.
+"""
+
+import os
+import asyncio
+import logging
+import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = int(os.environ.get("DRONE_LLM_CONCURRENCY", "4"))
+
+class ProviderPool:
+    """Fixed-size worker pool for one provider's blocking model calls."""
+
+    def __init__(self, name: str, max_concurrency: int = DEFAULT_CONCURRENCY):
+        """
+        Create a pool.
+
+        Args:
+            name: Provider name, used for thread names and logs
+            max_concurrency: Calls allowed in flight at once
+        """
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency,
+                                            thread_name_prefix=f"llm-{name}")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._peak_running = 0
+        self._completed = 0
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """Queue a blocking call; returns a concurrent.futures.Future."""
+        with self._lock:
+            self._queued += 1
+        # Run in the caller's context, so the call keeps its metrics labels
+        return self._executor.submit(contextvars.copy_context().run, self._call, fn, args, kwargs)
+
+    async def run(self, fn, *args, **kwargs):
+        """Run a blocking call in the pool and await its result."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def _call(self, fn, args, kwargs):
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._peak_running = max(self._peak_running, self._running)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+
+    def stats(self) -> Dict:
+        """Queued, running, peak running and completed call counts."""
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "queued": self._queued,
+                "running": self._running,
+                "peak_running": self._peak_running,
+                "completed": self._completed,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting calls and release the worker threads."""
+        self._executor.shutdown(wait=wait)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def provider_pool(provider: str, max_concurrency: int = None) -> ProviderPool:
+    """
+    Return the process-wide pool for a provider and concurrency limit.
+
+    Args:
+        provider: Provider name (the adapters use the API host)
+        max_concurrency: Calls in flight at once (default DRONE_LLM_CONCURRENCY or 4)
+    """
+    max_concurrency = max_concurrency or DEFAULT_CONCURRENCY
+    key = (provider, max_concurrency)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ProviderPool(provider, max_concurrency)
+        return _pools[key]
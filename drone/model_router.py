@@ -0,0 +1,371 @@
+"""
+Provider-agnostic model routing with latency-based selection and failover.
+
+ModelRouter puts several model backends (GLMModel, DeepSeekModel, StubModel
+or anything else with generate()) behind the same interface the adapters
+offer smolagents: __call__, generate, agenerate and stream.
+
+For every request the router picks the fastest healthy backend. Each backend
+has a rolling window of request latencies and outcomes; "fastest" means the
+lowest p50 latency. Backends that have not answered yet come after the
+measured ones, in declared order, and backends whose window holds only
+failures come last.
+
+If the backend fails, the request moves on to the next one. A failure is any
+of these:
+
+- an exception,
+- an error reply (the adapters return "Error ..." messages instead of raising),
+- no answer before the request deadline.
+
+Backends that keep failing are taken out of rotation for a cooldown. After
+it they are tried again, and a further failure takes them straight back out.
+
+StubModel is an offline backend with scripted latency and failures, for
+tests, benchmarks and running the app without API keys.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Iterator, List, Optional, Union
+from .glm_model import Message
+from .model_pool import DEFAULT_CONCURRENCY, ProviderPool
+from .streaming import MessageDelta
+
+logger = logging.getLogger(__name__)
+
+# Replies the adapters return in place of raising
+ERROR_PREFIXES = ("Error in API request", "Error generating response", "No response generated",
+                  "Authentication error")
+
+def is_error_reply(content) -> bool:
+    """Whether a model reply is an adapter's error message."""
+    return not isinstance(content, str) or content.startswith(ERROR_PREFIXES)
+
+class BackendHealth:
+    """Rolling latency and outcome record of one backend, with a circuit breaker."""
+
+    def __init__(self, name: str, window: int = 64, failure_threshold: int = 3,
+                 max_error_rate: float = 0.5, cooldown_s: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.max_error_rate = max_error_rate
+        self.cooldown_s = cooldown_s
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)  # (latency_s, ok)
+        self._requests = 0
+        self._errors = 0
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+
+    def record(self, latency_s: float, ok: bool) -> None:
+        with self._lock:
+            self._samples.append((latency_s, ok))
+            self._requests += 1
+            if ok:
+                self._consecutive_failures = 0
+                self._open_until = 0.0
+                return
+            self._errors += 1
+            self._consecutive_failures += 1
+            if (self._consecutive_failures >= self.failure_threshold or
+                    (len(self._samples) >= 4 and self._error_rate() > self.max_error_rate)):
+                if self._open_until <= time.monotonic():
+                    logger.warning(f"Model backend {self.name} unhealthy, pausing for {self.cooldown_s:.0f}s")
+                self._open_until = time.monotonic() + self.cooldown_s
+
+    def available(self) -> bool:
+        """Healthy, or past its cooldown (the failure count stays, so one more failure reopens it)."""
+        with self._lock:
+            return time.monotonic() >= self._open_until
+
+    def error_rate(self) -> float:
+        """Share of failed requests in the window (0.0 before any request)."""
+        with self._lock:
+            return self._error_rate()
+
+    def _error_rate(self) -> float:
+        """error_rate(); caller holds the lock."""
+        if not self._samples:
+            return 0.0
+        return sum(1 for _, ok in self._samples if not ok) / len(self._samples)
+
+    def latency(self, fraction: float) -> Optional[float]:
+        """Latency percentile of successful requests in the window."""
+        with self._lock:
+            latencies = sorted(latency for latency, ok in self._samples if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = {
+                "requests": self._requests,
+                "errors": self._errors,
+                "error_rate": self._error_rate(),
+                "consecutive_failures": self._consecutive_failures,
+                "healthy": self._open_until <= time.monotonic(),
+            }
+        stats["latency_p50_s"] = self.latency(0.5)
+        stats["latency_p95_s"] = self.latency(0.95)
+        return stats
+
+class ModelRouter:
+    """Model interface that spreads requests over backends by latency and health."""
+
+    def __init__(self, backends: Dict[str, object], deadline_s: float = 120.0,
+                 window: int = 64, failure_threshold: int = 3, max_error_rate: float = 0.5,
+                 cooldown_s: float = 30.0, max_concurrency: int = None):
+        """
+        Create a router.
+
+        Args:
+            backends: Models by name, in order of preference when latencies are equal
+            deadline_s: Time a request or stream may take across all attempts
+            window: Requests per backend kept for latency and error rates
+            failure_threshold: Consecutive failures that take a backend out of rotation
+            max_error_rate: Error rate over the window that takes a backend out of rotation
+            cooldown_s: Seconds before an unhealthy backend gets a probe request
+            max_concurrency: Requests in flight at once from agenerate() (default DRONE_LLM_CONCURRENCY or 4)
+        """
+        if not backends:
+            raise ValueError("ModelRouter needs at least one backend")
+        self.backends = dict(backends)
+        self.deadline_s = deadline_s
+        self.health = {name: BackendHealth(name, window, failure_threshold, max_error_rate, cooldown_s)
+                       for name in self.backends}
+        self.pool = ProviderPool("router", max_concurrency or DEFAULT_CONCURRENCY)
+        # Attempts run here so a request can give up on a backend at its deadline
+        self._attempts = ThreadPoolExecutor(max_workers=self.pool.max_concurrency * len(self.backends),
+                                            thread_name_prefix="llm-attempt")
+        self._lock = threading.Lock()
+        self._failovers = 0
+        self.last_backend = None
+
+    @property
+    def model_id(self) -> str:
+        return "router(" + ",".join(self.backends) + ")"
+
+    @property
+    def cache(self):
+        """The first backend's response cache, so callers can bypass it (see DroneAssistant.run)."""
+        for model in self.backends.values():
+            if getattr(model, 'cache', None) is not None:
+                return model.cache
+        return None
+
+    def ranked(self) -> List[str]:
+        """
+        Backend names in the order the next request will try them.
+
+        Measured backends come first, by p50 latency of their successful
+        requests. Backends without a successful request in the window follow
+        by error rate, so those not tried yet (0.0) come before those that
+        have only failed (1.0). Ties keep the declared order.
+        """
+        order = list(self.backends)
+        available = [name for name in order if self.health[name].available()]
+        if not available:
+            # Everything is cooling down: try them all rather than fail outright
+            available = order
+
+        def rank(name):
+            health = self.health[name]
+            latency = health.latency(0.5)
+            if latency is not None:
+                return 0, latency, order.index(name)
+            return 1, health.error_rate(), order.index(name)
+        return sorted(available, key=rank)
+
+    def __call__(self, prompt: Union[str, dict, List[Dict]], **kwargs) -> Message:
+        """Make the class callable as required by smolagents"""
+        return self.generate(prompt, **kwargs)
+
+    def generate(self, prompt: Union[str, dict, List[Dict]], **kwargs) -> Message:
+        """
+        Generate a response from the fastest healthy backend, failing over on errors.
+
+        Args:
+            prompt: The prompt to send to the model
+            **kwargs: Passed to the backend's generate() (stop_sequences, max_tokens, ...)
+
+        Returns:
+            Message: The first successful reply, or an error message if every
+            backend failed or the deadline passed
+        """
+        try:
+            return self._route("generate", prompt, **kwargs)
+        except RuntimeError as e:
+            return Message(f"Error generating response: {str(e)}")
+
+    def generate_with_tools(self, messages: List[Dict], tools: List[Dict], **kwargs) -> Dict:
+        """
+        Native function-calling request on the fastest healthy backend that supports it.
+
+        Raises:
+            RuntimeError: If every backend failed or the deadline passed
+        """
+        return self._route("generate_with_tools", messages, tools, **kwargs)
+
+    def _route(self, method: str, *args, **kwargs):
+        """Call ``method`` on backends in ranked order until one succeeds within the deadline."""
+        deadline = time.monotonic() + self.deadline_s
+        failures = []
+        candidates = [name for name in self.ranked() if hasattr(self.backends[name], method)]
+        for attempt, name in enumerate(candidates):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                failures.append("deadline reached")
+                break
+            if attempt:
+                with self._lock:
+                    self._failovers += 1
+                logger.warning(f"Model request failing over to {name} after: {failures[-1]}")
+            start = time.monotonic()
+            call = getattr(self.backends[name], method)
+            # In a copy of the caller's context, so the attempt keeps its metrics labels and cache bypass
+            future = self._attempts.submit(contextvars.copy_context().run, call, *args, **kwargs)
+            try:
+                reply = future.result(timeout=remaining)
+                content = getattr(reply, 'content', "")
+                error = content if is_error_reply(content) else None
+            except FutureTimeoutError:
+                reply, error = None, f"no reply within {remaining:.1f}s"
+            except Exception as e:
+                reply, error = None, str(e)
+            self.health[name].record(time.monotonic() - start, error is None)
+            if error is None:
+                self.last_backend = name
+                return reply
+            failures.append(f"{name}: {error}"[:300])
+        if not candidates:
+            failures.append(f"no backend supports {method}")
+        raise RuntimeError("all model backends failed (" + "; ".join(failures) + ")")
+
+    async def agenerate(self, prompt: Union[str, dict, List[Dict]], **kwargs) -> Message:
+        """Awaitable generate(); at most max_concurrency requests run at once."""
+        return await self.pool.run(self.generate, prompt, **kwargs)
+
+    def stream(self, prompt: Union[str, dict, List[Dict]], **kwargs) -> Iterator[MessageDelta]:
+        """
+        Stream from the fastest healthy backend.
+
+        Fails over while nothing has been yielded yet; once text has reached
+        the caller the stream stays with that backend. Backends without
+        stream() are used through generate() as a single delta.
+
+        The whole stream shares one deadline (deadline_s). Deltas are pulled
+        on the attempt threads, so a backend that stalls is abandoned when
+        it runs out: before the first text the stream fails over, after it
+        the stream ends with an error delta.
+        """
+        deadline = time.monotonic() + self.deadline_s
+        failures = []
+        for attempt, name in enumerate(self.ranked()):
+            if deadline - time.monotonic() <= 0:
+                failures.append("deadline reached")
+                break
+            if attempt:
+                with self._lock:
+                    self._failovers += 1
+                logger.warning(f"Model stream failing over to {name} after: {failures[-1]}")
+            start = time.monotonic()
+            started = False
+            deltas = self._deltas(self.backends[name], prompt, kwargs)
+            # Every pull runs in this copy of the caller's context (metrics labels, cache bypass)
+            context = contextvars.copy_context()
+            try:
+                while True:
+                    remaining = deadline - time.monotonic()
+                    future = self._attempts.submit(context.run, next, deltas, None)
+                    try:
+                        delta = future.result(timeout=max(remaining, 0.0))
+                    except FutureTimeoutError:
+                        raise RuntimeError(f"no reply within the {self.deadline_s:.1f}s deadline")
+                    if delta is None:
+                        break
+                    if not started and delta.content:
+                        if is_error_reply(delta.content):
+                            raise RuntimeError(delta.content)
+                        started = True
+                    yield delta
+            except Exception as e:
+                self.health[name].record(time.monotonic() - start, False)
+                if started:
+                    yield MessageDelta(f"\nError generating response: {str(e)}")
+                    return
+                failures.append(f"{name}: {e}"[:300])
+                continue
+            self.health[name].record(time.monotonic() - start, True)
+            self.last_backend = name
+            return
+        yield MessageDelta("Error generating response: all model backends failed (" + "; ".join(failures) + ")")
+
+    @staticmethod
+    def _deltas(model, prompt, kwargs) -> Iterator[MessageDelta]:
+        """The model's stream, or its generate() reply as one delta; nothing runs until the first pull."""
+        if hasattr(model, 'stream'):
+            yield from model.stream(prompt, **kwargs)
+        else:
+            yield MessageDelta(model.generate(prompt, **kwargs).content)
+
+    def stats(self) -> Dict:
+        """Per-backend requests, errors, error rate, p50/p95 latency and health, plus failovers."""
+        with self._lock:
+            failovers = self._failovers
+        return {
+            "backends": {name: health.stats() for name, health in self.health.items()},
+            "failovers": failovers,
+            "last_backend": self.last_backend,
+        }
+
+    def metrics(self) -> Dict:
+        """Alias of stats(), matching GLMModel.metrics()"""
+        return self.stats()
+
+class StubModel:
+    """
+    Offline backend with a fixed reply.
+
+    ``latency_s`` and ``failing`` can be changed at any time to script
+    slowdowns and outages.
+    """
+
+    def __init__(self, reply: str = "Stub reply", latency_s: float = 0.0, failing: bool = False,
+                 model_id: str = "stub"):
+        self.reply = reply
+        self.latency_s = latency_s
+        self.failing = failing
+        self.model_id = model_id
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt, **kwargs) -> Message:
+        return self.generate(prompt, **kwargs)
+
+    def generate(self, prompt, **kwargs) -> Message:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency_s)
+        if self.failing:
+            return Message(f"Error in API request: {self.model_id} is unavailable")
+        return Message(self.reply)
+
+    async def agenerate(self, prompt, **kwargs) -> Message:
+        return await asyncio.to_thread(self.generate, prompt, **kwargs)
+
+    def stream(self, prompt, **kwargs) -> Iterator[MessageDelta]:
+        content = self.generate(prompt, **kwargs).content
+        if self.failing:
+            yield MessageDelta(content)  # the adapters yield errors as one delta
+            return
+        for start in range(0, len(content), 8):
+            yield MessageDelta(content[start:start + 8])
+        yield MessageDelta(token_usage={"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                           finish_reason="stop")
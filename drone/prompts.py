@@ -0,0 +1,145 @@
+"""
+Prompt text of the deepdrone-old assistant.
+
+Every request starts with the same system prompt, byte for byte, and keeps
+everything that changes between requests (registered logs, the user's
+question) in the messages after it. GLM and DeepSeek cache matching prompt
+prefixes on their side, so the identity text, capability list and tool
+reference are only processed in full on the first request; later requests
+are billed and served from the cached prefix. The providers report how much
+of the prompt came from their cache in the response ``usage``, which
+token_usage() reads into the models' Message.token_usage.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from smolagents.monitoring import TokenUsage
+
+IDENTITY = (
+    "You are deepdrone-old, an advanced AI assistant designed to help with drone operations and data analysis. "
+    "You are NOT any other general AI assistant like Qwen, GPT, or Claude. "
+    "Always identify yourself as deepdrone-old when asked about your identity."
+)
+
+# Custom instructions of the CodeAgent system prompt; smolagents places them
+# after the tool descriptions, which are just as static
+AGENT_INSTRUCTIONS = IDENTITY + """ Your purpose is to assist with drone data analysis, flight monitoring, maintenance scheduling, and mission planning.
+
+You are powered by GLM-4.5, a state-of-the-art language model optimized for technical tasks and tool usage. You excel at understanding complex drone operations and generating precise control commands.
+
+You can now control real drones using DroneKit-Python. You have tools to:
+- Connect to a real drone using a connection string
+- Take off to a specified altitude
+- Land the drone
+- Return to home location
+- Fly to specific GPS coordinates
+- Get the drone's current location and battery status
+- Execute missions with multiple waypoints
+
+IMPORTANT: These tool functions need to be called EXACTLY as shown below for successful execution:
+
+# EXAMPLE OF COMPLETE WORKING MISSION:
+```python
+# Connect to a drone simulator
+connect_to_real_drone('udp:127.0.0.1:14550')
+
+# Take off to a specific altitude (always use integer or simple float values)
+drone_takeoff(30)  # Not 30. 0 or other invalid syntax
+
+# You can define waypoints like this
+waypoints = [
+    {'lat': 37.7749, 'lon': -122.4194, 'alt': 30},
+    {'lat': 37.7750, 'lon': -122.4195, 'alt': 30}
+]
+
+# Execute mission with waypoints
+execute_drone_mission(waypoints=waypoints)
+
+# Return to home
+drone_return_home()
+
+# Always disconnect when done
+disconnect_from_drone()
+```
+
+NOTE: Each function must be called individually on its own line, with exact parameter names.
+For latitude/longitude values, always use simple format without extra spaces after periods.
+
+When creating a flight plan, be sure to:
+1. Generate a mission plan with generate_mission_plan()
+2. Connect to the drone with connect_to_real_drone()
+3. Take off with drone_takeoff()
+4. Execute the mission or fly to specific waypoints
+5. Return home or land the drone when finished
+6. Disconnect from the drone
+
+Use the provided tools to analyze drone data and assist with drone operations. For real drone control, use the drone_* tools."""
+
+# System message of the native tool-calling loop
+NATIVE_SYSTEM_PROMPT = IDENTITY + """
+
+Use the provided functions to analyze drone data and control drones. Request independent reads (location, battery, sensors) together in one step. Send vehicle commands in the order they must run, and answer in plain text once you have the results."""
+
+# System message of plain conversation
+CHAT_SYSTEM_PROMPT = IDENTITY + " You are powered by GLM-4.5 and specialize in drone data analysis, flight monitoring, maintenance scheduling, and mission planning."
+
+def drone_context(sensors: List[str], flight_logs: List[str]) -> str:
+    """The registered sensors and flight logs, which change between requests"""
+    return f"Registered sensors: {sensors}\nFlight logs available: {flight_logs}"
+
+def task_prompt(prompt: str, context: str) -> str:
+    """The variable part of a request: current context, then the user's question"""
+    return f"Available context:\n{context}\n\nUser question: {prompt}"
+
+# smolagents' own roles for tool steps, as the chat API roles it maps them to
+_ROLE_CONVERSIONS = {"tool-call": "assistant", "tool-response": "user"}
+
+def chat_messages(prompt: Any) -> List[Dict]:
+    """
+    A prompt as chat message dicts with plain-text content.
+
+    CodeAgent passes smolagents ChatMessage objects whose content is a list
+    of typed parts. Sent as one stringified user message they would lose the
+    system role, so they are converted to the API's message format here.
+    Anything that is not a list of messages becomes a single user message.
+    """
+    if not isinstance(prompt, list) or not all(isinstance(msg, dict) or hasattr(msg, 'role') for msg in prompt):
+        return [{"role": "user", "content": str(prompt)}]
+    messages = []
+    for msg in prompt:
+        if not isinstance(msg, dict):
+            msg = {"role": msg.role, "content": msg.content}
+        role = str(getattr(msg.get('role'), 'value', msg.get('role')))
+        content = msg.get('content')
+        if isinstance(content, list):
+            content = "".join(part.get('text', '') for part in content if isinstance(part, dict))
+        messages.append({**msg, "role": _ROLE_CONVERSIONS.get(role, role), "content": content})
+    return messages
+
+@dataclass
+class PromptTokenUsage(TokenUsage):
+    """smolagents TokenUsage with the prompt tokens served from the provider's prefix cache"""
+    cached_input_tokens: int = 0
+
+    def dict(self):
+        return {**super().dict(), "cached_input_tokens": self.cached_input_tokens}
+
+def cached_prompt_tokens(usage: Optional[Dict]) -> int:
+    """
+    Prompt tokens a response reports as read from the provider's cache.
+
+    GLM and OpenAI-style APIs report them as
+    ``prompt_tokens_details.cached_tokens``, DeepSeek as
+    ``prompt_cache_hit_tokens``.
+    """
+    if not usage:
+        return 0
+    details = usage.get('prompt_tokens_details') or {}
+    return int(details.get('cached_tokens') or usage.get('prompt_cache_hit_tokens') or 0)
+
+def token_usage(usage: Optional[Dict]) -> PromptTokenUsage:
+    """The ``usage`` object of a chat completion as a PromptTokenUsage"""
+    usage = usage or {}
+    return PromptTokenUsage(input_tokens=usage.get('prompt_tokens') or 0,
+                            output_tokens=usage.get('completion_tokens') or 0,
+                            cached_input_tokens=cached_prompt_tokens(usage))
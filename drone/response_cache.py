@@ -0,0 +1,293 @@
+"""
+Deterministic response cache for LLM calls.
+
+ResponseCache stores completions under a hash of everything that determines
+the request: the cleaned messages, model ID, temperature, max tokens and stop
+sequences. Entries live in an in-memory LRU tier and, optionally, an on-disk
+tier (one JSON file per entry) that survives restarts and is shared by every
+session; both expire after a TTL.
+
+Vehicle control must never be replayed from a cache, so a request whose
+question asks to move, arm or connect a vehicle is passed straight through,
+and a reply that calls a vehicle-control tool is never stored. Callers that
+know better (DroneAssistant.run classifies the raw user prompt) can also turn
+the cache off for a block of calls with bypass().
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_DIR = os.environ.get("DRONE_LLM_CACHE_DIR", "llm_cache")
+
+# Requests mentioning any of these ask for vehicle action (English and Chinese)
+VEHICLE_CONTROL_PATTERN = re.compile(
+    r"take ?off|\bland\b|landing|fly to|\bgoto\b|go to|navigate|return (?:to )?home|\brtl\b|"
+    r"\barm\b|disarm|\bconnect|disconnect|execute|waypoint|mission|hover|altitude|"
+    r"起飞|降落|着陆|返航|飞往|飞到|解锁|上锁|连接|断开|执行|航点|任务",
+    re.IGNORECASE)
+
+# Replies calling any of these tools act on the vehicle
+VEHICLE_CONTROL_TOOLS = ("connect_to_real_drone", "disconnect_from_drone", "drone_takeoff", "drone_land",
+                         "drone_return_home", "drone_fly_to", "execute_drone_mission")
+
+# Caches the current context is inside bypass() of
+_bypassed = contextvars.ContextVar("response_cache_bypassed", default=())
+
+def request_text(messages: List[Dict]) -> str:
+    """
+    The user's task in a chat request.
+
+    This is the newest smolagents task message ("New task: ..."), or else the
+    first user message: later user messages of an agent run are tool
+    observations, not the request. The text is narrowed to what follows
+    "User question:" when the task is one of DroneAssistant's prompt
+    templates (whose fixed tool reference mentions every control tool).
+    """
+    user_messages = [str(message.get('content', '')) for message in messages if message.get('role') == 'user']
+    if not user_messages:
+        return ""
+    content = next((text for text in reversed(user_messages) if "New task:" in text), user_messages[0])
+    if "User question:" in content:
+        content = content.rsplit("User question:", 1)[1].split("\n\n", 1)[0]
+    return content
+
+def is_vehicle_control(text: str) -> bool:
+    """Whether a user request asks for vehicle action."""
+    return bool(VEHICLE_CONTROL_PATTERN.search(text))
+
+def calls_vehicle_control(content: str) -> bool:
+    """Whether a model reply calls a vehicle-control tool."""
+    return any(f"{name}(" in content for name in VEHICLE_CONTROL_TOOLS)
+
+def cache_key(messages: List[Dict], model_id: str, temperature: float,
+              stop_sequences: Optional[List[str]] = None, max_tokens: Optional[int] = None) -> str:
+    """SHA-256 over a canonical JSON encoding of the request."""
+    request = {
+        "messages": [{"role": message['role'], "content": message['content']} for message in messages],
+        "model": model_id,
+        "temperature": temperature,
+        "stop": list(stop_sequences or []),
+        "max_tokens": max_tokens,
+    }
+    encoded = json.dumps(request, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    Two-tier TTL cache of model replies.
+
+    Thread-safe; one instance is meant to be shared by every model in the
+    process (see shared_cache).
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_s: float = 3600.0,
+                 directory: Optional[str] = None, max_disk_entries: int = 4096):
+        """
+        Create a cache.
+
+        Args:
+            max_entries: Entries kept in memory (least recently used are dropped)
+            ttl_s: Seconds an entry stays valid
+            directory: Directory for the disk tier, or None for memory only
+            max_disk_entries: Files kept on disk (oldest are removed)
+        """
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.directory = directory
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()  # key -> (created, content)
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0,
+                          "stores": 0, "evictions": 0, "expired": 0}
+        self._disk_entries = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._disk_entries = sum(1 for entry in os.listdir(directory) if entry.endswith(".json"))
+
+    @contextmanager
+    def bypass(self):
+        """
+        Skip the cache for calls made inside the block.
+
+        The bypass is held in a context variable, so it follows the calls into
+        work run in a copy of the caller's context (ModelRouter attempts,
+        ProviderPool tasks) but not into unrelated threads.
+        """
+        token = _bypassed.set(_bypassed.get() + (self,))
+        try:
+            yield
+        finally:
+            _bypassed.reset(token)
+
+    @property
+    def bypassing(self) -> bool:
+        """Whether the calling context is inside bypass()."""
+        return any(cache is self for cache in _bypassed.get())
+
+    def should_bypass(self, messages: List[Dict]) -> bool:
+        """Whether a request must go to the model: inside bypass() or a vehicle-control question."""
+        if self.bypassing or is_vehicle_control(request_text(messages)):
+            self._count("bypassed")
+            return True
+        return False
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached reply, or None (counted as a miss)."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.ttl_s:
+                    self._memory.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return entry[1]
+                del self._memory[key]
+                self._counters["expired"] += 1
+
+        entry = self._read_disk(key, now)
+        if entry is not None:
+            with self._lock:
+                self._remember(key, entry)
+                self._counters["hits"] += 1
+                self._counters["disk_hits"] += 1
+            return entry[1]
+
+        self._count("misses")
+        return None
+
+    def put(self, key: str, content: str) -> bool:
+        """
+        Store a reply. Replies that call vehicle-control tools are refused.
+
+        Returns:
+            bool: True if the reply was stored
+        """
+        if calls_vehicle_control(content):
+            return False
+        entry = (time.time(), content)
+        with self._lock:
+            self._remember(key, entry)
+            self._counters["stores"] += 1
+        if self.directory:
+            self._write_disk(key, entry)
+        return True
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+        if self.directory:
+            for entry in os.listdir(self.directory):
+                if entry.endswith(".json"):
+                    self._remove(os.path.join(self.directory, entry))
+            self._disk_entries = 0
+
+    def stats(self) -> Dict:
+        """Hit, miss, bypass, store, eviction and expiry counters plus tier sizes."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+        stats["disk_entries"] = self._disk_entries
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def _remember(self, key: str, entry: tuple) -> None:
+        """Insert into the memory tier; caller holds the lock."""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".json")
+
+    def _read_disk(self, key: str, now: float) -> Optional[tuple]:
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if now - record["created"] > self.ttl_s:
+            self._remove(path)
+            self._count("expired")
+            return None
+        return record["created"], record["content"]
+
+    def _write_disk(self, key: str, entry: tuple) -> None:
+        path = self._path(key)
+        existed = os.path.exists(path)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"created": entry[0], "content": entry[1]}, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Could not write LLM cache entry {path}: {e}")
+            self._remove(tmp)
+            return
+        if not existed:
+            with self._lock:
+                self._disk_entries += 1
+                over = self._disk_entries > self.max_disk_entries
+            if over:
+                self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        """Remove expired files, then the oldest, down to 90% of the limit."""
+        now = time.time()
+        files = []
+        for entry in os.listdir(self.directory):
+            if entry.endswith(".json"):
+                path = os.path.join(self.directory, entry)
+                try:
+                    files.append((os.path.getmtime(path), path))
+                except OSError:
+                    continue
+        files.sort()
+        keep = int(self.max_disk_entries * 0.9)
+        removed = 0
+        for position, (mtime, path) in enumerate(files):
+            if now - mtime > self.ttl_s or len(files) - position > keep:
+                self._remove(path)
+                removed += 1
+        with self._lock:
+            self._disk_entries = len(files) - removed
+            self._counters["evictions"] += removed
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def shared_cache(directory: Optional[str] = LLM_CACHE_DIR, **options) -> ResponseCache:
+    """Return the process-wide ResponseCache for a disk directory (None for memory only)."""
+    key = os.path.abspath(directory) if directory else None
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = ResponseCache(directory=directory, **options)
+        return _caches[key]
@@ -0,0 +1,633 @@
+"""
+In-process MAVLink vehicle simulator for deepdrone-old.
+
+SimulatedVehicle listens on a local TCP port and speaks enough of the
+ArduCopter MAVLink interface for DroneKit and DroneController to work against
+it without SITL: heartbeat, mode changes, arming, takeoff, guided goto, RTL
+and land, GLOBAL_POSITION_INT / VFR_HUD / SYS_STATUS / GPS_RAW_INT telemetry,
+parameters and the mission protocol (upload, partial write, download and
+AUTO execution with MISSION_CURRENT / MISSION_ITEM_REACHED).
+
+Flight dynamics are deliberately simple: the vehicle moves in a straight line
+towards its target at a fixed horizontal speed and climb rate. Simulated time
+can run faster than wall time (``time_scale``) while telemetry is still sent
+at a fixed wall-clock rate, so missions finish quickly but DroneKit sees a
+normal link. SimulatedFleet starts many vehicles at once for fleet tests.
+
+Example:
+    with SimulatedVehicle(time_scale=10) as sim:
+        controller = DroneController(sim.connection_string)
+        controller.connect_to_drone()
+"""
+
+import math
+import time
+import select
+import socket
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+from pymavlink import mavutil
+from pymavlink.dialects.v10 import ardupilotmega as mavlink1
+
+logger = logging.getLogger('drone_simulator')
+
+EARTH_RADIUS_M = 6371000.0
+
+# ArduCopter custom mode numbers by name
+COPTER_MODES = {name: number for number, name in mavutil.mode_mapping_acm.items()}
+
+# Modes in which the simulator accepts an arming request
+ARMABLE_MODES = ("STABILIZE", "ALT_HOLD", "LOITER", "GUIDED", "POSHOLD")
+
+DEFAULT_HOME = (22.5431, 113.9589, 0.0)  # lat, lon, MSL altitude
+
+DEFAULT_PARAMS = {
+    "SYSID_THISMAV": 1.0,
+    "WPNAV_SPEED": 1000.0,      # cm/s
+    "WPNAV_SPEED_UP": 250.0,    # cm/s
+    "WPNAV_SPEED_DN": 150.0,    # cm/s
+    "LAND_SPEED": 50.0,         # cm/s
+    "RTL_ALT": 1500.0,          # cm
+    "BATT_CAPACITY": 5200.0,    # mAh
+    "ARMING_CHECK": 1.0,
+    "FS_BATT_ENABLE": 0.0,
+    "SIM_SPEEDUP": 1.0,
+}
+
+class SimulatedVehicle:
+    """
+    One simulated copter behind a local TCP MAVLink endpoint.
+
+    The simulator serves a single GCS connection at a time; a new connection
+    replaces the old one. All state is owned by the simulator thread, the
+    public properties are read-only snapshots for tests.
+    """
+
+    def __init__(self, home: Tuple[float, float, float] = DEFAULT_HOME, system_id: int = 1,
+                 time_scale: float = 1.0, telemetry_rate: float = 10.0,
+                 speed: float = 10.0, climb_rate: float = 2.5, land_speed: float = 1.5,
+                 endurance_s: float = 1200.0, host: str = "127.0.0.1", port: int = 0):
+        """
+        Initialize the simulator.
+
+        Args:
+            home: (lat, lon, MSL altitude) where the vehicle starts
+            system_id: MAVLink system ID
+            time_scale: Simulated seconds per wall-clock second
+            telemetry_rate: Telemetry messages per wall-clock second
+            speed: Horizontal speed in m/s
+            climb_rate: Climb and descent rate in m/s
+            land_speed: Final descent rate in LAND and RTL in m/s
+            endurance_s: Simulated flight time on a full battery
+            host: Address to listen on
+            port: TCP port, 0 picks a free one
+        """
+        self.home = home
+        self.system_id = system_id
+        self.time_scale = time_scale
+        self.telemetry_rate = telemetry_rate
+        self.speed = speed
+        self.climb_rate = climb_rate
+        self.land_speed = land_speed
+        self.endurance_s = endurance_s
+        self.params = dict(DEFAULT_PARAMS, SYSID_THISMAV=float(system_id))
+
+        # Vehicle state, relative to home in meters (north, east, up)
+        self.north = 0.0
+        self.east = 0.0
+        self.alt = 0.0
+        self.velocity = (0.0, 0.0, 0.0)
+        self.heading = 0.0
+        self.armed = False
+        self.mode = "STABILIZE"
+        self.battery_level = 100.0
+        self.sim_time = 0.0
+        self.mission = [self._home_item()]
+        self.mission_seq = 0
+        self.messages_received = 0
+
+        self._target = None  # (north, east, alt) in GUIDED
+        self._rtl_phase = None
+        self._hold_until = None
+        self._receiving = None  # [next_seq, last_seq, staged items]
+
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind((host, port))
+        self._server.listen(1)
+        self.host, self.port = self._server.getsockname()
+
+        self._client = None
+        self._mav = mavlink1.MAVLink(self, srcSystem=system_id, srcComponent=1)
+        self._parser = mavlink1.MAVLink(None)
+        self._parser.robust_parsing = True
+        self._running = False
+        self._thread = None
+
+    @property
+    def connection_string(self) -> str:
+        """DroneKit connection string for this vehicle."""
+        return f"tcp:{self.host}:{self.port}"
+
+    @property
+    def location(self) -> Tuple[float, float, float]:
+        """Current (lat, lon, relative altitude)."""
+        lat, lon = self._offset_to_latlon(self.north, self.east)
+        return lat, lon, self.alt
+
+    def start(self) -> "SimulatedVehicle":
+        """Start the simulator thread."""
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"sim-{self.system_id}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the simulator and close its sockets."""
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=2)
+        self._drop_client()
+        self._server.close()
+
+    def __enter__(self) -> "SimulatedVehicle":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # Main loop
+
+    def _run(self) -> None:
+        period = 1.0 / self.telemetry_rate
+        last_step = time.monotonic()
+        next_telemetry = last_step
+        next_heartbeat = last_step
+
+        while self._running:
+            sockets = [self._server] + ([self._client] if self._client else [])
+            wait = max(0.0, min(next_telemetry, next_heartbeat) - time.monotonic())
+            try:
+                readable, _, _ = select.select(sockets, [], [], wait)
+            except (OSError, ValueError):
+                break
+
+            for sock in readable:
+                if sock is self._server:
+                    self._accept()
+                else:
+                    self._read()
+
+            now = time.monotonic()
+            self._step((now - last_step) * self.time_scale)
+            last_step = now
+
+            if now >= next_heartbeat:
+                next_heartbeat = now + 1.0
+                self._send_heartbeat()
+            if now >= next_telemetry:
+                next_telemetry = now + period
+                self._send_telemetry()
+
+    def _accept(self) -> None:
+        client, _ = self._server.accept()
+        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._drop_client()
+        self._client = client
+        self._parser = mavlink1.MAVLink(None)
+        self._parser.robust_parsing = True
+        self._send_heartbeat()
+
+    def _read(self) -> None:
+        try:
+            data = self._client.recv(65536)
+        except OSError:
+            data = b""
+        if not data:
+            self._drop_client()
+            return
+        for msg in self._parser.parse_buffer(data) or []:
+            if msg.get_type() == "BAD_DATA":
+                continue
+            self.messages_received += 1
+            handler = getattr(self, "_on_" + msg.get_type().lower(), None)
+            if handler:
+                handler(msg)
+
+    def _drop_client(self) -> None:
+        if self._client:
+            try:
+                self._client.close()
+            except OSError:
+                pass
+            self._client = None
+
+    def write(self, data: bytes) -> None:
+        """File interface for the MAVLink encoder."""
+        if self._client:
+            try:
+                self._client.sendall(data)
+            except OSError:
+                self._drop_client()
+
+    # Kinematics
+
+    def _step(self, dt: float) -> None:
+        self.sim_time += dt
+        if not self.armed or dt <= 0:
+            self.velocity = (0.0, 0.0, 0.0)
+            return
+
+        self.battery_level = max(0.0, self.battery_level - dt / self.endurance_s * 100.0)
+
+        if self.mode == "AUTO":
+            target = self._auto_target()
+        elif self.mode == "RTL":
+            target = self._rtl_target()
+        elif self.mode == "LAND":
+            target = (self.north, self.east, 0.0)
+        elif self.mode == "GUIDED":
+            target = self._target
+        else:
+            target = None
+
+        if target is None:
+            self.velocity = (0.0, 0.0, 0.0)
+        else:
+            self._move_towards(target, dt)
+
+        if self.alt <= 0.0 and self._descending():
+            self.alt = 0.0
+            self.armed = False
+            self._rtl_phase = None
+            self.velocity = (0.0, 0.0, 0.0)
+
+    def _move_towards(self, target: Tuple[float, float, float], dt: float) -> None:
+        d_north = target[0] - self.north
+        d_east = target[1] - self.east
+        d_alt = target[2] - self.alt
+
+        horizontal = math.hypot(d_north, d_east)
+        step = min(horizontal, self.speed * dt)
+        v_north = v_east = 0.0
+        if horizontal > 1e-6:
+            self.north += d_north / horizontal * step
+            self.east += d_east / horizontal * step
+            v_north = d_north / horizontal * self.speed if step < horizontal else 0.0
+            v_east = d_east / horizontal * self.speed if step < horizontal else 0.0
+            self.heading = math.degrees(math.atan2(d_east, d_north)) % 360
+
+        rate = self.land_speed if self._descending() else self.climb_rate
+        climb = max(-rate * dt, min(rate * dt, d_alt))
+        self.alt += climb
+        self.velocity = (v_north, v_east, climb / dt)
+
+    def _descending(self) -> bool:
+        return self.mode == "LAND" or self._rtl_phase == "land"
+
+    def _rtl_target(self) -> Tuple[float, float, float]:
+        rtl_alt = max(self.alt, self.params["RTL_ALT"] / 100.0)
+        if self._rtl_phase == "climb":
+            if self.alt >= rtl_alt - 0.1:
+                self._rtl_phase = "return"
+            return (self.north, self.east, rtl_alt)
+        if self._rtl_phase == "return":
+            if math.hypot(self.north, self.east) < 0.5:
+                self._rtl_phase = "land"
+            return (0.0, 0.0, self.alt)
+        return (0.0, 0.0, 0.0)
+
+    def _auto_target(self) -> Optional[Tuple[float, float, float]]:
+        if self.mission_seq < 1 or self.mission_seq >= len(self.mission):
+            return None  # mission finished, hold position
+
+        item = self.mission[self.mission_seq]
+        command = item["command"]
+        if command == mavutil.mavlink.MAV_CMD_NAV_TAKEOFF:
+            target = (self.north, self.east, item["z"])
+        elif command == mavutil.mavlink.MAV_CMD_NAV_WAYPOINT:
+            north, east = self._latlon_to_offset(item["x"] / 1e7, item["y"] / 1e7)
+            target = (north, east, item["z"])
+        elif command == mavutil.mavlink.MAV_CMD_NAV_RETURN_TO_LAUNCH:
+            self._item_reached()
+            self._set_mode("RTL")
+            return self._rtl_target()
+        elif command == mavutil.mavlink.MAV_CMD_NAV_LAND:
+            self._item_reached()
+            self._set_mode("LAND")
+            return (self.north, self.east, 0.0)
+        else:
+            # DO_ and CONDITION_ commands complete immediately
+            self._item_reached()
+            return self._auto_target()
+
+        if math.hypot(target[0] - self.north, target[1] - self.east) < 1.0 and abs(target[2] - self.alt) < 0.5:
+            if self._hold_until is None:
+                self._hold_until = self.sim_time + item["param1"]
+            if self.sim_time >= self._hold_until:
+                self._item_reached()
+                return self._auto_target()
+        return target
+
+    def _item_reached(self) -> None:
+        self._hold_until = None
+        self._send(self._mav.mission_item_reached_encode(self.mission_seq))
+        self.mission_seq += 1
+        if self.mission_seq < len(self.mission):
+            self._send(self._mav.mission_current_encode(self.mission_seq))
+
+    def _set_mode(self, mode: str) -> bool:
+        if mode not in COPTER_MODES:
+            return False
+        self.mode = mode
+        self._target = None
+        self._hold_until = None
+        if mode == "RTL":
+            self._rtl_phase = "climb"
+        elif mode == "AUTO" and self.mission_seq < 1:
+            self.mission_seq = 1
+        return True
+
+    # Coordinates
+
+    def _offset_to_latlon(self, north: float, east: float) -> Tuple[float, float]:
+        lat = self.home[0] + math.degrees(north / EARTH_RADIUS_M)
+        lon = self.home[1] + math.degrees(east / (EARTH_RADIUS_M * math.cos(math.radians(self.home[0]))))
+        return lat, lon
+
+    def _latlon_to_offset(self, lat: float, lon: float) -> Tuple[float, float]:
+        north = math.radians(lat - self.home[0]) * EARTH_RADIUS_M
+        east = math.radians(lon - self.home[1]) * EARTH_RADIUS_M * math.cos(math.radians(self.home[0]))
+        return north, east
+
+    # Outgoing messages
+
+    def _send(self, msg) -> None:
+        if self._client:
+            self._mav.send(msg)
+
+    def _send_heartbeat(self) -> None:
+        base_mode = (mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED |
+                     mavutil.mavlink.MAV_MODE_FLAG_STABILIZE_ENABLED |
+                     mavutil.mavlink.MAV_MODE_FLAG_GUIDED_ENABLED)
+        if self.armed:
+            base_mode |= mavutil.mavlink.MAV_MODE_FLAG_SAFETY_ARMED
+        status = mavutil.mavlink.MAV_STATE_ACTIVE if self.armed else mavutil.mavlink.MAV_STATE_STANDBY
+        self._send(self._mav.heartbeat_encode(
+            mavutil.mavlink.MAV_TYPE_QUADROTOR, mavutil.mavlink.MAV_AUTOPILOT_ARDUPILOTMEGA,
+            base_mode, COPTER_MODES[self.mode], status))
+        self._send(self._home_position())
+        if len(self.mission) > 1:
+            self._send(self._mav.mission_current_encode(self.mission_seq))
+
+    def _send_telemetry(self) -> None:
+        if not self._client:
+            return
+        lat, lon, alt = self.location
+        lat_i, lon_i = int(round(lat * 1e7)), int(round(lon * 1e7))
+        v_north, v_east, v_up = self.velocity
+        groundspeed = math.hypot(v_north, v_east)
+        boot_ms = int(self.sim_time * 1000) & 0xFFFFFFFF
+        voltage = 10.5 + 2.1 * self.battery_level / 100.0
+        current = 15.0 if self.armed else 0.5
+
+        self._send(self._mav.global_position_int_encode(
+            boot_ms, lat_i, lon_i, int((self.home[2] + alt) * 1000), int(alt * 1000),
+            int(v_north * 100), int(v_east * 100), int(-v_up * 100), int(self.heading * 100)))
+        self._send(self._mav.attitude_encode(boot_ms, 0.0, 0.0, math.radians(self.heading), 0.0, 0.0, 0.0))
+        self._send(self._mav.vfr_hud_encode(groundspeed, groundspeed, int(self.heading),
+                                            50 if self.armed else 0, self.home[2] + alt, v_up))
+        self._send(self._mav.sys_status_encode(0, 0, 0, 0, int(voltage * 1000), int(current * 100),
+                                               int(self.battery_level), 0, 0, 0, 0, 0, 0))
+        self._send(self._mav.gps_raw_int_encode(int(self.sim_time * 1e6), 3, lat_i, lon_i,
+                                                int((self.home[2] + alt) * 1000), 80, 120,
+                                                int(groundspeed * 100), int(self.heading * 100), 10))
+        flags = (mavlink1.EKF_ATTITUDE | mavlink1.EKF_VELOCITY_HORIZ | mavlink1.EKF_POS_HORIZ_ABS |
+                 mavlink1.EKF_PRED_POS_HORIZ_ABS | mavlink1.EKF_POS_VERT_ABS)
+        self._send(self._mav.ekf_status_report_encode(flags, 0.01, 0.01, 0.01, 0.01, 0.0))
+
+    def _home_position(self):
+        lat_i, lon_i = int(round(self.home[0] * 1e7)), int(round(self.home[1] * 1e7))
+        return self._mav.home_position_encode(lat_i, lon_i, int(self.home[2] * 1000),
+                                              0, 0, 0, [1, 0, 0, 0], 0, 0, 0)
+
+    def _ack(self, command: int, result: int = mavutil.mavlink.MAV_RESULT_ACCEPTED) -> None:
+        self._send(self._mav.command_ack_encode(command, result))
+
+    # Commands
+
+    def _on_command_long(self, msg) -> None:
+        command = msg.command
+        if command == mavutil.mavlink.MAV_CMD_DO_SET_MODE:
+            name = mavutil.mode_mapping_acm.get(int(msg.param2))
+            self._ack(command, mavutil.mavlink.MAV_RESULT_ACCEPTED if name and self._set_mode(name)
+                      else mavutil.mavlink.MAV_RESULT_FAILED)
+        elif command == mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM:
+            if msg.param1 == 1 and not self.armed and self.mode in ARMABLE_MODES:
+                self.armed = True
+                self._ack(command)
+            elif msg.param1 == 0 and (self.alt <= 0.1 or msg.param2 == 21196):
+                self.armed = False
+                self._ack(command)
+            else:
+                self._ack(command, mavutil.mavlink.MAV_RESULT_FAILED)
+        elif command == mavutil.mavlink.MAV_CMD_NAV_TAKEOFF:
+            if self.armed and self.mode == "GUIDED" and self.alt <= 0.1:
+                self._target = (self.north, self.east, msg.param7)
+                self._ack(command)
+            else:
+                self._ack(command, mavutil.mavlink.MAV_RESULT_FAILED)
+        elif command == mavutil.mavlink.MAV_CMD_NAV_RETURN_TO_LAUNCH:
+            self._set_mode("RTL")
+            self._ack(command)
+        elif command == mavutil.mavlink.MAV_CMD_NAV_LAND:
+            self._set_mode("LAND")
+            self._ack(command)
+        elif command == mavutil.mavlink.MAV_CMD_DO_CHANGE_SPEED:
+            if msg.param2 > 0:
+                self.speed = msg.param2
+            self._ack(command)
+        elif command == mavutil.mavlink.MAV_CMD_REQUEST_AUTOPILOT_CAPABILITIES:
+            self._ack(command)
+            self._send(self._mav.autopilot_version_encode(
+                mavutil.mavlink.MAV_PROTOCOL_CAPABILITY_MISSION_INT, (4 << 24) | (5 << 16) | 255,
+                0, 0, 0, [0] * 8, [0] * 8, [0] * 8, 0, 0, self.system_id))
+        else:
+            self._ack(command, mavutil.mavlink.MAV_RESULT_UNSUPPORTED)
+
+    def _on_set_mode(self, msg) -> None:
+        name = mavutil.mode_mapping_acm.get(msg.custom_mode)
+        if name:
+            self._set_mode(name)
+
+    def _on_set_position_target_global_int(self, msg) -> None:
+        if self.mode == "GUIDED" and self.armed:
+            north, east = self._latlon_to_offset(msg.lat_int / 1e7, msg.lon_int / 1e7)
+            self._target = (north, east, msg.alt)
+
+    # Parameters
+
+    def _send_param(self, index: int) -> None:
+        names = list(self.params)
+        name = names[index]
+        self._send(self._mav.param_value_encode(name.encode(), self.params[name],
+                                                mavutil.mavlink.MAV_PARAM_TYPE_REAL32, len(names), index))
+
+    def _on_param_request_list(self, msg) -> None:
+        for index in range(len(self.params)):
+            self._send_param(index)
+
+    def _on_param_request_read(self, msg) -> None:
+        names = list(self.params)
+        param_id = msg.param_id.decode() if isinstance(msg.param_id, bytes) else msg.param_id
+        if 0 <= msg.param_index < len(names):
+            self._send_param(msg.param_index)
+        elif param_id in self.params:
+            self._send_param(names.index(param_id))
+
+    def _on_param_set(self, msg) -> None:
+        param_id = msg.param_id.decode() if isinstance(msg.param_id, bytes) else msg.param_id
+        if param_id in self.params:
+            self.params[param_id] = msg.param_value
+            self._send_param(list(self.params).index(param_id))
+
+    # Mission protocol
+
+    def _home_item(self) -> Dict:
+        return {"frame": mavutil.mavlink.MAV_FRAME_GLOBAL, "command": mavutil.mavlink.MAV_CMD_NAV_WAYPOINT,
+                "autocontinue": 1, "param1": 0.0, "param2": 0.0, "param3": 0.0, "param4": 0.0,
+                "x": int(round(self.home[0] * 1e7)), "y": int(round(self.home[1] * 1e7)), "z": self.home[2]}
+
+    def _mission_ack(self, result: int = mavutil.mavlink.MAV_MISSION_ACCEPTED) -> None:
+        self._send(self._mav.mission_ack_encode(255, 0, result))
+
+    def _request_item(self, seq: int) -> None:
+        self._send(self._mav.mission_request_encode(255, 0, seq))
+
+    def _on_mission_count(self, msg) -> None:
+        if msg.count == 0:
+            self.mission = [self._home_item()]
+            self.mission_seq = 0
+            self._mission_ack()
+            return
+        self._receiving = [0, msg.count - 1, [None] * msg.count]
+        self._request_item(0)
+
+    def _on_mission_write_partial_list(self, msg) -> None:
+        if not 1 <= msg.start_index <= msg.end_index < len(self.mission):
+            self._mission_ack(mavutil.mavlink.MAV_MISSION_INVALID_SEQUENCE)
+            return
+        self._receiving = [msg.start_index, msg.end_index, list(self.mission)]
+        self._request_item(msg.start_index)
+
+    def _on_mission_item(self, msg) -> None:
+        if msg.current == 2:
+            # DroneKit simple_goto: guided mode target
+            if self.mode == "GUIDED" and self.armed:
+                north, east = self._latlon_to_offset(msg.x, msg.y)
+                self._target = (north, east, msg.z)
+            return
+        self._store_item(msg, int(round(msg.x * 1e7)), int(round(msg.y * 1e7)))
+
+    def _on_mission_item_int(self, msg) -> None:
+        self._store_item(msg, msg.x, msg.y)
+
+    def _store_item(self, msg, x: int, y: int) -> None:
+        if self._receiving is None:
+            self._mission_ack(mavutil.mavlink.MAV_MISSION_ERROR)
+            return
+        next_seq, last_seq, staged = self._receiving
+        if msg.seq != next_seq:
+            self._request_item(next_seq)
+            return
+        staged[msg.seq] = {"frame": msg.frame, "command": msg.command, "autocontinue": msg.autocontinue,
+                           "param1": msg.param1, "param2": msg.param2, "param3": msg.param3,
+                           "param4": msg.param4, "x": x, "y": y, "z": msg.z}
+        if msg.seq < last_seq:
+            self._receiving[0] += 1
+            self._request_item(msg.seq + 1)
+            return
+        # Like ArduPilot, item 0 always holds our own home position
+        staged[0] = self._home_item()
+        self.mission = staged
+        self._receiving = None
+        if self.mission_seq >= len(self.mission):
+            self.mission_seq = 0
+        self._mission_ack()
+
+    def _on_mission_request_list(self, msg) -> None:
+        self._send(self._mav.mission_count_encode(255, 0, len(self.mission)))
+
+    def _on_mission_request(self, msg) -> None:
+        if msg.seq < len(self.mission):
+            item = self.mission[msg.seq]
+            self._send(self._mav.mission_item_encode(
+                255, 0, msg.seq, item["frame"], item["command"], int(msg.seq == self.mission_seq),
+                item["autocontinue"], item["param1"], item["param2"], item["param3"], item["param4"],
+                item["x"] / 1e7, item["y"] / 1e7, item["z"]))
+
+    def _on_mission_request_int(self, msg) -> None:
+        if msg.seq < len(self.mission):
+            item = self.mission[msg.seq]
+            self._send(self._mav.mission_item_int_encode(
+                255, 0, msg.seq, item["frame"], item["command"], int(msg.seq == self.mission_seq),
+                item["autocontinue"], item["param1"], item["param2"], item["param3"], item["param4"],
+                item["x"], item["y"], item["z"]))
+
+    def _on_mission_clear_all(self, msg) -> None:
+        self.mission = [self._home_item()]
+        self.mission_seq = 0
+        self._mission_ack()
+
+    def _on_mission_set_current(self, msg) -> None:
+        if 0 < msg.seq < len(self.mission):
+            self.mission_seq = msg.seq
+            self._hold_until = None
+            self._send(self._mav.mission_current_encode(msg.seq))
+
+class SimulatedFleet:
+    """
+    A group of SimulatedVehicles with homes a few meters apart.
+
+    Example:
+        with SimulatedFleet(20, time_scale=10) as sims:
+            fleet.connect_all(sims.connection_strings())
+    """
+
+    def __init__(self, count: int, home: Tuple[float, float, float] = DEFAULT_HOME,
+                 spacing_m: float = 5.0, **kwargs):
+        """
+        Initialize the fleet.
+
+        Args:
+            count: Number of vehicles
+            home: Home of the first vehicle; the others are placed east of it
+            spacing_m: Distance between neighbouring homes in meters
+            **kwargs: Passed to every SimulatedVehicle
+        """
+        lon_step = math.degrees(spacing_m / (EARTH_RADIUS_M * math.cos(math.radians(home[0]))))
+        self.vehicles = {
+            f"sim{idx + 1}": SimulatedVehicle(home=(home[0], home[1] + idx * lon_step, home[2]),
+                                              system_id=idx + 1, **kwargs)
+            for idx in range(count)
+        }
+
+    def connection_strings(self) -> Dict[str, str]:
+        """Vehicle ID -> connection string, ready for FleetManager.connect_all()."""
+        return {vehicle_id: sim.connection_string for vehicle_id, sim in self.vehicles.items()}
+
+    def start(self) -> "SimulatedFleet":
+        for sim in self.vehicles.values():
+            sim.start()
+        return self
+
+    def stop(self) -> None:
+        for sim in self.vehicles.values():
+            sim.stop()
+
+    def __enter__(self) -> "SimulatedFleet":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,172 @@
+"""
+Streaming helpers shared by the LLM backends of deepdrone-old.
+
+Chat completion APIs stream a reply as server-sent events, one JSON chunk per
+``data:`` line, ending with ``data: [DONE]``. Text arrives as content deltas;
+tool calls arrive as fragments keyed by index (the ID and function name
+first, then the arguments JSON a few characters at a time). iter_deltas turns
+those chunks into MessageDelta objects: text is passed on as soon as it
+arrives, while tool calls are collected and emitted once complete, as the
+same smolagents ``Code:`` block a non-streaming reply would produce.
+"""
+
+import json
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+class MessageDelta:
+    """One increment of a streamed reply, shaped like the models' Message class"""
+    def __init__(self, content: str = "", token_usage: Optional[Dict] = None, finish_reason: Optional[str] = None):
+        self.content = content
+        self.token_usage = token_usage
+        self.finish_reason = finish_reason
+
+def tool_calls_to_code(tool_calls: List[Dict]) -> str:
+    """
+    Turn OpenAI-style tool calls into a smolagents code block.
+
+    Each call is assigned to its own result variable and the result of the
+    last call is passed to final_answer, which ends the smolagents loop.
+
+    Args:
+        tool_calls: Dicts with 'id' and 'function' ({'name', 'arguments'})
+
+    Returns:
+        str: A "Thought: ... Code: ..." reply for CodeAgent
+    """
+    code_lines = []
+    # Handle multiple tool calls if the model requests them
+    for tool_call in tool_calls:
+        function_name = tool_call['function']['name']
+        try:
+            function_args = json.loads(tool_call['function']['arguments'] or "{}")
+            args_list = [f"{key}={repr(value)}" for key, value in function_args.items()]
+            args_str = ", ".join(args_list)
+
+            # Assign the result to a unique variable to avoid conflicts
+            result_var = f"{function_name}_result_{str(tool_call['id']).replace('-', '_')}"
+            code_lines.append(f"{result_var} = {function_name}({args_str})")
+
+        except json.JSONDecodeError:
+            # If args fail to parse, still attempt to call the function if no args are needed.
+            code_lines.append(f"{function_name}()")
+
+    # Crucially, call final_answer with the result of the *last* tool call.
+    # This terminates the smolagents loop correctly.
+    if code_lines:
+        last_result_var = code_lines[-1].split(' = ')[0]
+        code_lines.append(f"final_answer({last_result_var})")
+
+    code_to_execute = "\n".join(code_lines)
+
+    thought = "I will execute the requested tool(s) and provide the final result."
+    return f"""Thought: {thought}
+Code:
+```py
+{code_to_execute}
+```<end_code>"""
+
+class ToolCallAssembler:
+    """Collects streamed tool call fragments into complete tool calls."""
+
+    def __init__(self):
+        self._calls = {}
+
+    def add(self, fragments: List[Dict]) -> None:
+        """Merge the tool_calls list of one streamed delta."""
+        for position, fragment in enumerate(fragments):
+            index = fragment.get('index', position)
+            call = self._calls.setdefault(index, {'id': None, 'function': {'name': "", 'arguments': ""}})
+            if fragment.get('id'):
+                call['id'] = fragment['id']
+            function = fragment.get('function') or {}
+            if function.get('name'):
+                call['function']['name'] = function['name']
+            if function.get('arguments'):
+                call['function']['arguments'] += function['arguments']
+
+    def __bool__(self) -> bool:
+        return bool(self._calls)
+
+    def calls(self) -> List[Dict]:
+        """Complete tool calls in index order."""
+        calls = [self._calls[index] for index in sorted(self._calls)]
+        for index, call in enumerate(calls):
+            if call['id'] is None:
+                call['id'] = f"call_{index}"
+        return calls
+
+def iter_sse_data(lines: Iterable[Union[str, bytes]]) -> Iterator[str]:
+    """
+    Yield the data payload of each server-sent event.
+
+    Args:
+        lines: Response lines without line endings (e.g. Response.iter_lines())
+
+    Yields:
+        str: Event data, with multi-line data joined by newlines; stops at [DONE]
+    """
+    data = []
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.rstrip('\r')
+        if not line:
+            # A blank line ends the event
+            if data:
+                payload = "\n".join(data)
+                data = []
+                if payload == "[DONE]":
+                    return
+                yield payload
+            continue
+        if line.startswith(':'):
+            continue  # comment / keep-alive
+        field, _, value = line.partition(':')
+        if field == 'data':
+            data.append(value[1:] if value.startswith(' ') else value)
+    if data and "\n".join(data) != "[DONE]":
+        yield "\n".join(data)
+
+def iter_deltas(chunks: Iterable[Dict]) -> Iterator[MessageDelta]:
+    """
+    Turn streamed chat completion chunks into MessageDelta objects.
+
+    Content is yielded as it arrives. Tool call fragments are assembled and
+    yielded as one smolagents code block when the stream ends, after any
+    content. The last delta carries the token usage, if the API reported it.
+
+    Args:
+        chunks: Decoded JSON chunks of a streamed chat completion
+
+    Yields:
+        MessageDelta
+    """
+    tool_calls = ToolCallAssembler()
+    usage = None
+    finish_reason = None
+    streamed_content = False
+    reasoning = []
+    for chunk in chunks:
+        if chunk.get('usage'):
+            usage = chunk['usage']
+        for choice in chunk.get('choices') or []:
+            delta = choice.get('delta') or {}
+            if choice.get('finish_reason'):
+                finish_reason = choice['finish_reason']
+            if delta.get('tool_calls'):
+                tool_calls.add(delta['tool_calls'])
+            if delta.get('content'):
+                streamed_content = True
+                yield MessageDelta(delta['content'])
+            elif delta.get('reasoning_content'):
+                # Kept back: only used when the model sends no content at all
+                reasoning.append(delta['reasoning_content'])
+
+    if tool_calls:
+        # Same code block as the non-streaming reply; any content streamed
+        # before it stays in front as part of the thought
+        yield MessageDelta(tool_calls_to_code(tool_calls.calls()), usage, finish_reason)
+    elif not streamed_content and reasoning:
+        yield MessageDelta("".join(reasoning), usage, finish_reason)
+    else:
+        yield MessageDelta("", usage, finish_reason)
@@ -0,0 +1,133 @@
+"""
+Telemetry bridge between the drone threads and the Streamlit sessions.
+
+drone_control logs from whatever thread is running: DroneKit's MAVLink
+thread, the fleet pool, takeoff and mission trackers. MissionLogHandler used
+to write those records straight into st.session_state, which fails outside
+the script thread. It also tied each update to a page rerun of the one
+session that happened to be current.
+
+The bridge decouples the two sides:
+
+- Producers (the log handler, update_mission_status, progress loops) publish
+  MissionLogRecords to the channel of a vehicle. Publishing takes a short
+  lock and never touches Streamlit, so any thread may do it.
+- Each channel is a bounded ring with sequence numbers. Readers keep their
+  own cursor instead of popping events, so any number of browser sessions
+  can follow one vehicle while each event is produced once. A reader that
+  falls more than ``capacity`` events behind skips the oldest, and read()
+  reports how many were missed.
+- Streamlit sessions drain their cursor on the script thread, in the
+  periodic mission feed fragment of drone_chat.main, and apply the events
+  to their own session state.
+- Only vehicle events fan out. An event tagged with a session (its
+  MissionLogRecord.session) is read by that session alone, so one
+  session's status changes and tool logs never reach another session.
+
+Events without an explicit vehicle go to the vehicle of the calling context
+(see vehicle_context()), otherwise to DEFAULT_CHANNEL.
+"""
+
+import os
+import threading
+import contextvars
+from collections import deque
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
+from .mission_log import MissionLogRecord
+
+# Events kept per vehicle for readers that have not caught up
+BRIDGE_CAPACITY = int(os.environ.get("DRONE_BRIDGE_CAPACITY", "512"))
+
+# Same ID drone_control registers a vehicle under when none is given
+DEFAULT_CHANNEL = "default"
+
+_vehicle = contextvars.ContextVar("drone_bridge_vehicle", default=None)
+
+class VehicleChannel:
+    """Bounded, sequence-numbered event ring of one vehicle."""
+
+    def __init__(self, vehicle_id: str, capacity: int = BRIDGE_CAPACITY):
+        self.vehicle_id = vehicle_id
+        self._events = deque(maxlen=capacity)
+        self._next = 0  # sequence number of the next event
+        self._lock = threading.Lock()
+
+    @property
+    def head(self) -> int:
+        """Cursor positioned after the newest event."""
+        with self._lock:
+            return self._next
+
+    def publish(self, record: MissionLogRecord) -> int:
+        """Append an event; returns its sequence number."""
+        with self._lock:
+            self._events.append(record)
+            self._next += 1
+            return self._next - 1
+
+    def read(self, cursor: int = 0, session_id: Optional[str] = None) -> Tuple[List[MissionLogRecord], int, int]:
+        """
+        Events from ``cursor`` on.
+
+        Args:
+            cursor: Sequence number of the first event wanted (0 for all kept)
+            session_id: Reading session; events tagged with another session are skipped
+
+        Returns:
+            Tuple of (events oldest first, cursor for the next read, events
+            missed because they were dropped before this read)
+        """
+        with self._lock:
+            oldest = self._next - len(self._events)
+            start = max(cursor, oldest)
+            events = [event for event in islice(self._events, start - oldest, None)
+                      if event.session is None or event.session == session_id]
+            return events, self._next, start - cursor
+
+class TelemetryBridge:
+    """Channels by vehicle ID, created on first use."""
+
+    def __init__(self, capacity: int = BRIDGE_CAPACITY):
+        self.capacity = capacity
+        self._channels: Dict[str, VehicleChannel] = {}
+        self._lock = threading.Lock()
+
+    def channel(self, vehicle_id: Optional[str] = None) -> VehicleChannel:
+        """The channel of ``vehicle_id``, or of the calling context's vehicle."""
+        vehicle_id = vehicle_id or _vehicle.get() or DEFAULT_CHANNEL
+        with self._lock:
+            channel = self._channels.get(vehicle_id)
+            if channel is None:
+                channel = self._channels[vehicle_id] = VehicleChannel(vehicle_id, self.capacity)
+            return channel
+
+    def publish(self, record: MissionLogRecord, vehicle_id: Optional[str] = None) -> int:
+        """Publish an event to a vehicle's channel; safe from any thread."""
+        return self.channel(vehicle_id).publish(record)
+
+    def vehicle_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._channels)
+
+_bridge = TelemetryBridge()
+
+def shared_bridge() -> TelemetryBridge:
+    """Return the process-wide bridge all sessions read from."""
+    return _bridge
+
+def context_vehicle() -> Optional[str]:
+    """The vehicle the calling context works for, if any (see vehicle_context())."""
+    return _vehicle.get()
+
+def vehicle_context(vehicle_id: Optional[str]) -> contextvars.Context:
+    """
+    A copy of the current context in which events go to ``vehicle_id``.
+
+    Run work for a vehicle in it (``context.run(fn, ...)``) so what it logs
+    is published to that vehicle's channel.
+    """
+    context = contextvars.copy_context()
+    if vehicle_id is not None:
+        context.run(_vehicle.set, vehicle_id)
+    return context
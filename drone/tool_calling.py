@@ -0,0 +1,157 @@
+"""
+Native function-calling execution for the drone tools.
+
+The CodeAgent path has the model's structured tool_calls rewritten as a
+Python ``Code:`` block (tool_calls_to_code), which smolagents then parses
+and runs in its sandboxed interpreter on every step. ToolCallLoop skips
+that round trip:
+
+1. The model gets JSON schemas built from the @tool functions.
+2. The tool calls it returns are dispatched straight to the Tool objects.
+3. The results go back to the model as ``tool`` messages.
+4. This repeats until the model answers in text or max_steps is reached.
+
+Calls in one step run in parallel when they are all reads, such as
+location, battery and analysis tools. A step that contains any command acting
+on the vehicle runs its calls one after another, in the order the model
+gave.
+"""
+
+import json
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tools that only read state; a step made of these alone runs its calls concurrently
+READ_ONLY_TOOLS = frozenset({
+    "get_drone_location", "get_drone_battery", "get_fleet_status", "analyze_flight_path",
+    "check_sensor_readings", "recommend_maintenance", "generate_mission_plan",
+})
+
+def tool_schema(tool) -> Dict:
+    """
+    OpenAI-style function schema of a smolagents Tool.
+
+    Parameters the tool marks as nullable (every drone tool defaults to None
+    and reports a missing value itself) are optional; the rest are required.
+    """
+    properties = {}
+    required = []
+    for name, spec in tool.inputs.items():
+        schema = {key: value for key, value in spec.items() if key != "nullable"}
+        if schema.get("type") == "any":
+            del schema["type"]
+        properties[name] = schema
+        if not spec.get("nullable"):
+            required.append(name)
+    return {
+        "type": "function",
+        "function": {
+            "name": tool.name,
+            "description": tool.description,
+            "parameters": {"type": "object", "properties": properties, "required": required},
+        },
+    }
+
+class ToolCallLoop:
+    """Runs a conversation with native tool calls until the model answers in text."""
+
+    def __init__(self, model, tools: List, max_steps: int = 6, max_workers: int = 4,
+                 read_only: frozenset = READ_ONLY_TOOLS,
+                 worker_setup: Optional[Callable[[], None]] = None):
+        """
+        Create a loop.
+
+        Args:
+            model: Model with generate_with_tools (GLMModel, DeepSeekModel or ModelRouter)
+            tools: smolagents Tool objects the model may call
+            max_steps: Model requests allowed per run
+            max_workers: Threads for concurrent read-only calls
+            read_only: Names of tools safe to run concurrently
+            worker_setup: Called on each worker thread before a tool runs
+                (e.g. to attach the Streamlit script context)
+        """
+        self.model = model
+        self.tools = {tool.name: tool for tool in tools if tool.name != "final_answer"}
+        self.schemas = [tool_schema(tool) for tool in self.tools.values()]
+        self.max_steps = max_steps
+        self.max_workers = max_workers
+        self.read_only = read_only
+        self.worker_setup = worker_setup
+        self.last_run = None
+
+    def run(self, messages: List[Dict]) -> str:
+        """
+        Run the loop from a list of chat messages.
+
+        Returns:
+            str: The model's final answer, or the last tool result if the
+            step limit is reached first
+        """
+        messages = list(messages)
+        steps = []
+        answer = None
+        last_results = []
+        for _ in range(self.max_steps):
+            step_start = time.monotonic()
+            reply = self.model.generate_with_tools(messages, self.schemas)
+            model_s = time.monotonic() - step_start
+            calls = reply.get("tool_calls") or []
+            if not calls:
+                answer = reply.get("content", "")
+                steps.append({"model_s": model_s, "tools_s": 0.0, "calls": [],
+                              "total_s": time.monotonic() - step_start})
+                break
+
+            messages.append({"role": "assistant", "content": reply.get("content", ""), "tool_calls": calls})
+            tools_start = time.monotonic()
+            last_results = self._dispatch(calls)
+            for call, result in zip(calls, last_results):
+                messages.append({"role": "tool", "tool_call_id": call.get("id", ""), "content": result})
+            steps.append({
+                "model_s": model_s,
+                "tools_s": time.monotonic() - tools_start,
+                "calls": [call["function"]["name"] for call in calls],
+                "total_s": time.monotonic() - step_start,
+            })
+
+        if answer is None:
+            logger.warning(f"Native tool loop stopped after {self.max_steps} steps without a final answer")
+            answer = last_results[-1] if last_results else "未能在限定步骤内完成请求。"
+        self.last_run = {"steps": steps, "messages": messages}
+        return answer
+
+    def _dispatch(self, calls: List[Dict]) -> List[str]:
+        """Run one step's tool calls, concurrently if they are all reads."""
+        names = [call["function"]["name"] for call in calls]
+        if len(calls) > 1 and all(name in self.read_only for name in names):
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(calls)),
+                                    thread_name_prefix="tool-call") as executor:
+                return list(executor.map(self._call_on_worker, calls))
+        return [self._call(call) for call in calls]
+
+    def _call_on_worker(self, call: Dict) -> str:
+        if self.worker_setup is not None:
+            self.worker_setup()
+        return self._call(call)
+
+    def _call(self, call: Dict) -> str:
+        """Run one tool call; errors are returned to the model as the result."""
+        name = call["function"]["name"]
+        tool = self.tools.get(name)
+        if tool is None:
+            return f"Error: unknown tool {name}"
+        try:
+            arguments = json.loads(call["function"].get("arguments") or "{}")
+        except json.JSONDecodeError as e:
+            return f"Error: arguments for {name} are not valid JSON: {e}"
+        start = time.monotonic()
+        try:
+            result = str(tool(**arguments))
+        except Exception as e:
+            result = f"Error: {name} failed: {e}"
+        logger.info(f"Native tool call {name}({arguments}) took {time.monotonic() - start:.3f}s")
+        return result
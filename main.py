@@ -146,6 +146,8 @@ def initialize_chat_container():
         st.session_state.chat_container = chat_container
 
 def main():
+    # Page config must be the first Streamlit command of the run
+    drone_chat.configure_page()
     st.markdown(
         """
         <style>
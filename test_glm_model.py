@@ -134,7 +134,7 @@ def test_model_interface():
             }]
         }
         
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_post.return_value.json.return_value = mock_response
             mock_post.return_value.raise_for_status.return_value = None
             
@@ -189,7 +189,7 @@ def test_tool_calling():
             }]
         }
         
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_post.return_value.json.return_value = mock_response
             mock_post.return_value.raise_for_status.return_value = None
             
@@ -264,7 +264,7 @@ def test_error_handling():
         model = GLMModel()
         
         # 模拟API错误
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_post.side_effect = Exception("API错误")
             
             result = model("测试")
@@ -275,7 +275,7 @@ def test_error_handling():
         
         # 测试无效JSON响应
         mock_response = {"invalid": "response"}
-        with patch('requests.post') as mock_post:
+        with patch('requests.Session.post') as mock_post:
             mock_post.return_value.json.return_value = mock_response
             mock_post.return_value.raise_for_status.return_value = None
             
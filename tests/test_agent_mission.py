@@ -4,15 +4,16 @@ Test the ability of the DroneAssistant to plan and execute missions
 based on natural language requests.
 
 This script simulates a user asking the agent to create a mission plan and execute it.
+With --concurrent it instead requests all the plans from the model at once.
 """
 
 import os
 import time
 import json
 import sys
+import asyncio
 from drone.drone_chat import DroneAssistant, generate_mission_plan
 from drone.drone_control import connect_drone, disconnect_drone
-from drone.hf_model import HfApiModel, Message
 from drone import compatibility_fix  # Import for Python 3.10+ compatibility
 
 # Import the simplified model that works with smolagents
@@ -168,7 +169,46 @@ def run_all_tests():
     
     return all(results)
 
+async def plan_all_concurrently(model, test_cases=TEST_CASES):
+    """
+    Send every test case to the model at once and collect the plans.
+    
+    Uses the model's agenerate(), so the requests overlap their network waits
+    (up to the model's concurrency limit) instead of running one after another.
+    
+    Returns:
+        List of (test case, response text, seconds) in test case order
+    """
+    async def plan(test_case):
+        start = time.monotonic()
+        response = await model.agenerate([{"role": "user", "content": test_case}])
+        return test_case, response.content, time.monotonic() - start
+    
+    return await asyncio.gather(*(plan(test_case) for test_case in test_cases))
+
+def run_planning_concurrently():
+    """Ask the model for all mission plans concurrently and report timings."""
+    if not os.environ.get("GLM_API_KEY"):
+        print("GLM_API_KEY is required for the concurrent planning run.")
+        return False
+    
+    from drone.glm_model import GLMModel
+    model = GLMModel(max_tokens=2096, temperature=0.7, model_id='glm-4.5')
+    
+    start = time.monotonic()
+    results = asyncio.run(plan_all_concurrently(model))
+    elapsed = time.monotonic() - start
+    
+    for test_case, response, seconds in results:
+        print(f"\n----- {test_case[:60]} ({seconds:.1f}s) -----\n{response}")
+    print(f"\n{len(results)} plans in {elapsed:.1f}s (sum of request times {sum(r[2] for r in results):.1f}s)")
+    return all(response and not response.startswith("Error") for _, response, _ in results)
+
 if __name__ == "__main__":
+    if "--concurrent" in sys.argv:
+        print("Requesting all mission plans concurrently...")
+        sys.exit(0 if run_planning_concurrently() else 1)
+    
     print("Testing DroneAssistant's ability to plan and execute missions...")
     success = run_all_tests()
     
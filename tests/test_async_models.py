@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test agenerate fan-out, the per-provider concurrency limit and shared rate
+limiting against the local completions stand-in.
+"""
+
+import sys
+import time
+import asyncio
+from drone.http_transport import HTTPTransport, TransportError, _parse_duration
+from tests.test_glm_transport import CompletionsStandIn, make_model
+
+def test_agenerate_overlaps_requests():
+    """Awaited together, requests overlap up to the concurrency limit."""
+    with CompletionsStandIn() as server:
+        server.script = [(200, CompletionsStandIn.completion(f"reply {idx}"), {}, 0.2) for idx in range(8)]
+        model = make_model(server.url, max_concurrency=4)
+
+        async def fan_out():
+            return await asyncio.gather(*(model.agenerate(f"case {idx}") for idx in range(8)))
+
+        start = time.monotonic()
+        replies = asyncio.run(fan_out())
+        elapsed = time.monotonic() - start
+
+        assert sorted(reply.content for reply in replies) == sorted(f"reply {idx}" for idx in range(8))
+        assert elapsed < 0.8  # two waves of 0.2 s rather than eight
+        assert model.pool.stats()["peak_running"] == 4
+        assert len(set(server.client_ports)) <= 4  # connections are pooled and reused
+
+def test_models_share_transport_and_pool():
+    """Sessions creating their own model still share one connection pool and limit."""
+    with CompletionsStandIn() as server:
+        first, second = make_model(server.url, max_concurrency=3), make_model(server.url, max_concurrency=3)
+        assert first.transport is second.transport
+        assert first.pool is second.pool
+
+def test_rate_limit_is_shared_by_provider():
+    """A 429 seen by one caller holds off every caller of that provider."""
+    with CompletionsStandIn() as server:
+        server.script = [(429, {"error": "rate limited"}, {"Retry-After": "0.3"}, 0.0)]
+        limited = HTTPTransport(server.url, max_retries=0)
+        try:
+            limited.post_json({"messages": [{"role": "user", "content": "a"}]})
+            assert False, "expected TransportError"
+        except TransportError as e:
+            assert e.status_code == 429
+
+        other = HTTPTransport(server.url)
+        start = time.monotonic()
+        other.post_json({"messages": [{"role": "user", "content": "b"}]})
+        assert time.monotonic() - start >= 0.25
+        assert other.rate_limiter is limited.rate_limiter
+        assert other.rate_limiter.waits == 1
+
+        # A spent request quota is honoured before the provider starts refusing
+        server.script = [(200, CompletionsStandIn.completion("last one"), {
+            "x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "250ms"}, 0.0)]
+        other.post_json({"messages": [{"role": "user", "content": "c"}]})
+        start = time.monotonic()
+        other.post_json({"messages": [{"role": "user", "content": "d"}]})
+        assert time.monotonic() - start >= 0.2
+
+def test_parse_duration():
+    """Retry-After seconds and OpenAI-style reset durations are understood."""
+    assert _parse_duration("2") == 2.0
+    assert _parse_duration("20ms") == 0.02
+    assert _parse_duration("6m0s") == 360.0
+    assert _parse_duration("1m30.5s") == 90.5
+    assert _parse_duration("Wed, 21 Oct 2015 07:28:00 GMT") is None
+    assert _parse_duration(None) is None
+
+if __name__ == "__main__":
+    test_agenerate_overlaps_requests()
+    test_models_share_transport_and_pool()
+    test_rate_limit_is_shared_by_provider()
+    test_parse_duration()
+    print("\nAll async model tests passed!")
+    sys.exit(0)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test the token-budgeted chat history: token estimates, compaction under the
+budget, pinned facts and recent turns, and calibration from reported usage.
+"""
+
+import sys
+from drone.chat_history import ChatHistory, clip_text, estimate_tokens, extract_facts
+
+SYSTEM = {"role": "system", "content": "You are deepdrone-old, a drone operations assistant."}
+
+def run_session(history, turns, answer_words=120):
+    """Simulate an operator session; returns the request built for every turn."""
+    requests = []
+    for turn in range(turns):
+        history.append("user", f"Question {turn}: how did flight_{turn:03d} look at 40 m over the north field?")
+        requests.append(history.build(SYSTEM))
+        history.append("assistant", f"Answer {turn}: " + " ".join(["telemetry"] * answer_words))
+    return requests
+
+def test_estimate_tokens():
+    """Words, digits and CJK characters are counted the way BPE tokenizers split them."""
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("take off now") == 3
+    assert estimate_tokens("123456") == 2
+    assert estimate_tokens("起飞到三十米") == 6
+    assert estimate_tokens("connect, then land.") == 5
+    long_text = "word " * 1000
+    assert estimate_tokens(clip_text(long_text, 100)) <= 110
+
+def test_requests_stay_under_budget():
+    """However long the session, every request fits the budget and ends with the new message."""
+    history = ChatHistory(budget_tokens=1500, keep_recent=4)
+    requests = run_session(history, 200)
+    for request in requests:
+        assert history.count_messages(request) <= 1500
+    last = requests[-1]
+    assert last[0] == SYSTEM
+    assert last[-1]["content"].startswith("Question 199")
+    # The most recent turns are sent verbatim
+    assert [message["content"] for message in last[-4:]] == [m["content"] for m in history.messages[-5:-1]]
+    assert len(history.messages) == 400
+    assert history.stats()["folded_messages"] > 300
+
+def test_compaction_keeps_prefix_stable():
+    """Compaction folds to a low-water mark, so most requests reuse the previous prefix."""
+    history = ChatHistory(budget_tokens=4000, keep_recent=4)
+    requests = run_session(history, 100)
+    compactions = history.stats()["compactions"]
+    assert 0 < compactions < 20
+    stable = sum(1 for previous, current in zip(requests, requests[1:]) if current[:2] == previous[:2])
+    assert stable >= 70
+
+def test_pinned_facts_survive_compaction():
+    """Connection strings, positions and flights from folded turns are kept as pins."""
+    history = ChatHistory(budget_tokens=800, keep_recent=2, summary_tokens=200)
+    history.append("user", "Connect to udp:127.0.0.1:14550 and plan a survey at 37.7749, -122.4194")
+    history.append("assistant", "Connected. Survey planned at 30 m.")
+    history.pin("geofence radius 500 m")
+    run_session(history, 30)
+    context = history.build(SYSTEM)[1]["content"]
+    assert "connection: udp:127.0.0.1:14550" in context
+    assert "position: 37.7749, -122.4194" in context
+    assert "geofence radius 500 m" in context
+    assert history.count(history.summary) <= 200
+
+    assert ("sensor", "sensor: imu") in extract_facts("check sensor imu for drift")
+    assert ("altitude", "altitude: 30米") in extract_facts("起飞到 30米")
+
+def test_oversized_recent_turns_are_clipped():
+    """A single huge recent reply is clipped instead of blowing the budget."""
+    history = ChatHistory(budget_tokens=500, keep_recent=4)
+    history.append("user", "dump the log")
+    history.append("assistant", "row " * 5000)
+    history.append("user", "summarise it")
+    request = history.build(SYSTEM)
+    assert history.count_messages(request) <= 500
+    assert "[truncated]" in request[2]["content"]
+    assert request[-1]["content"] == "summarise it"
+
+def test_usage_calibrates_estimate():
+    """Reported prompt tokens scale the estimate toward the provider's tokenizer."""
+    history = ChatHistory()
+    messages = [{"role": "user", "content": "telemetry " * 100}]
+    estimated = history.count_messages(messages)
+    for _ in range(10):
+        history.record_usage(messages, estimated * 2)
+    assert 1.9 < history.scale < 2.0
+    history.record_usage(messages, 0)  # missing usage is ignored
+    assert 1.9 < history.scale < 2.0
+
+if __name__ == "__main__":
+    test_estimate_tokens()
+    test_requests_stay_under_budget()
+    test_compaction_keeps_prefix_stable()
+    test_pinned_facts_survive_compaction()
+    test_oversized_recent_turns_are_clipped()
+    test_usage_calibrates_estimate()
+    print("\nAll chat history tests passed!")
+    sys.exit(0)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test the incremental chat view: only the latest page is drawn, each message
+is formatted once, and a 10k-message session renders within the budget.
+"""
+
+import sys
+from drone.chat_view import RENDER_BUDGET_S, ChatView, message_html
+
+class RecordingTarget:
+    """Stands in for st / a container and records what is drawn"""
+
+    def __init__(self):
+        self.markdown_calls = []
+        self.buttons = []
+
+    def markdown(self, body, unsafe_allow_html=False):
+        self.markdown_calls.append(body)
+
+    def button(self, label, key=None, on_click=None):
+        self.buttons.append((label, on_click))
+        return False
+
+def session(length):
+    roles = ("user", "assistant", "system")
+    return [{"role": roles[idx % 3], "content": f"message {idx}\nsecond line"} for idx in range(length)]
+
+def test_only_new_messages_are_formatted():
+    """A rerun reuses the HTML of messages already drawn and formats just the new ones."""
+    messages = session(10_000)
+    view = ChatView(page_size=50)
+    target = RecordingTarget()
+
+    view.render(target, messages)
+    assert len(target.markdown_calls) == 1
+    last = view.render_stats()["last"]
+    assert (last["messages"], last["shown"], last["formatted"]) == (10_000, 50, 50)
+    assert "message 9999" in target.markdown_calls[0] and "message 9949" not in target.markdown_calls[0]
+    assert target.buttons[0][0] == "显示更早的消息 (9950)"
+
+    view.render(target, messages)
+    assert view.render_stats()["last"]["formatted"] == 0
+    assert view.render_stats()["last"]["seconds"] < RENDER_BUDGET_S
+
+    new = session(3)
+    view.append(target, new)
+    messages.extend(new)
+    view.render(target, messages)
+    assert view.render_stats()["last"]["formatted"] == 0
+    assert view.render_stats()["over_budget"] == 0
+
+def test_older_pages_on_request():
+    """show_older() widens the window a page at a time; trimmed messages are forgotten."""
+    messages = session(120)
+    view = ChatView(page_size=50)
+    target = RecordingTarget()
+    view.render(target, messages)
+    target.buttons[0][1]()
+    view.render(target, messages)
+    assert view.render_stats()["last"]["shown"] == 100
+    assert view.render_stats()["last"]["formatted"] == 50
+
+    view.render(target, messages[-10:])
+    assert view.render_stats()["last"]["formatted"] == 0
+    assert len(view._html) == 10
+
+def test_message_html_uses_the_stylesheet():
+    """Messages carry classes instead of inline styles and never contain blank lines."""
+    html = message_html({"role": "assistant", "content": "line one\n\nline three"})
+    assert 'class="chat-row chat-assistant"' in html and "style=" not in html
+    assert "\n" not in html and "line one<br><br>line three" in html
+    assert "chat-user" in message_html({"role": "user", "content": "hi"})
+    assert "status-indicator" in message_html({"role": "system", "content": "log"})
+
+if __name__ == "__main__":
+    test_only_new_messages_are_formatted()
+    test_older_pages_on_request()
+    test_message_html_uses_the_stylesheet()
+    print("\nAll chat view tests passed!")
+    sys.exit(0)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test the FleetManager that replaces the single module-level controller.
+
+Vehicles are stand-ins attached directly to their controllers, so no
+simulator is needed.
+"""
+
+import sys
+import time
+import threading
+from drone import compatibility_fix  # Import for Python 3.10+ compatibility
+from drone import drone_control
+from drone.drone_control import DroneController, FleetManager
+from tests.test_telemetry_cache import FakeVehicle, FakeLocation
+
+class SlowController(DroneController):
+    """Controller whose connect and RTL each take a fixed time."""
+
+    delay = 0.2
+
+    def connect_to_drone(self, connection_string=None, timeout=90):
+        time.sleep(self.delay)
+        self.vehicle = FakeVehicle()
+        self.connected = True
+        self.telemetry.attach(self.vehicle)
+        return True
+
+    def return_to_launch(self):
+        time.sleep(self.delay)
+        return threading.current_thread().name
+
+def make_fleet(count):
+    fleet = FleetManager(max_workers=count)
+    for idx in range(count):
+        vehicle_id = f"uav{idx}"
+        fleet.add_vehicle(vehicle_id)
+        fleet._controllers[vehicle_id] = SlowController()
+    return fleet
+
+def test_parallel_connect_and_fan_out():
+    """Connecting and commanding N vehicles takes about one vehicle's time."""
+    fleet = make_fleet(6)
+
+    start = time.time()
+    results = fleet.run_all("connect_to_drone")
+    assert all(results.values())
+    assert time.time() - start < SlowController.delay * 3
+
+    start = time.time()
+    results = fleet.run_all("return_to_launch", vehicle_ids=["uav1", "uav2", "missing"])
+    assert time.time() - start < SlowController.delay * 2
+    assert results["missing"] is False
+    assert results["uav1"] != results["uav2"]  # ran on different pool threads
+
+def test_fleet_telemetry():
+    """One call returns the cached state of every vehicle."""
+    fleet = make_fleet(3)
+    fleet.run_all("connect_to_drone")
+    vehicle = fleet.get("uav2").vehicle
+    vehicle.notify("location.global_relative_frame", FakeLocation(5.0, 6.0, 7.0))
+
+    status = fleet.telemetry()
+    assert set(status) == {"uav0", "uav1", "uav2"}
+    assert status["uav2"]["latitude"] == 5.0
+    assert status["uav0"]["voltage"] == 12.4
+    assert status["uav0"]["age_seconds"] is None
+
+def test_default_vehicle():
+    """Calls without a vehicle ID go to the first vehicle added."""
+    fleet = make_fleet(2)
+    assert fleet.get() is fleet.get("uav0")
+    fleet.remove_vehicle("uav0")
+    assert fleet.default_vehicle_id == "uav1"
+    fleet.disconnect_all()
+    assert fleet.get() is None
+
+def test_convenience_functions_without_connection():
+    """Module functions fail cleanly for unknown vehicles."""
+    assert drone_control.land(vehicle_id="nobody") is False
+    assert drone_control.get_location(vehicle_id="nobody") == {"error": "Not connected to drone"}
+
+def test_failed_connect_leaves_no_vehicle():
+    """A first connect that fails does not leave a dead vehicle behind as the default."""
+    fleet = drone_control.get_fleet()
+    assert drone_control.connect_drone("", vehicle_id="dead") is False
+    assert "dead" not in fleet.vehicle_ids and fleet.default_vehicle_id != "dead"
+
+if __name__ == "__main__":
+    test_parallel_connect_and_fan_out()
+    test_fleet_telemetry()
+    test_default_vehicle()
+    test_convenience_functions_without_connection()
+    test_failed_connect_leaves_no_vehicle()
+    print("\nAll fleet tests passed!")
+    sys.exit(0)
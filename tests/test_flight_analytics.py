@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Test the vectorized flight-path analytics against known paths and a per-row reference.
+"""
+
+import os
+import sys
+import math
+import tempfile
+import numpy as np
+from drone.flight_analytics import (EARTH_RADIUS_M, HOVER_CLIMB_RATE_MS, HOVER_MIN_DURATION_S,
+                                    HOVER_SPEED_MS, MIN_AIRBORNE_ALT_M, TURN_MIN_SEGMENT_M,
+                                    TURN_THRESHOLD_DEG, analyze_flight_log, analyze_path)
+from drone.flight_log import FlightLog, FlightLogWriter
+
+HOME = (22.5430, 113.9590)
+METERS_PER_DEG = EARTH_RADIUS_M * math.pi / 180
+
+def make_track(count, seed=0):
+    """A survey flight with EKF-level position noise: climb, legs, hovers, a fence breach, landing."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(count) * 0.2
+    phase = (t // 60).astype(int) % 4
+    heading = np.radians(phase * 90.0)
+    speed = np.where((t % 60) < 45, 8.0, 0.0)  # 15 s hover at the end of every leg
+    north = np.cumsum(speed * np.cos(heading) * 0.2) + rng.normal(0, 0.01, count)
+    east = np.cumsum(speed * np.sin(heading) * 0.2) + 2000 * (t > t[-1] / 2) + rng.normal(0, 0.01, count)
+    lat = HOME[0] + north / METERS_PER_DEG
+    lon = HOME[1] + east / (METERS_PER_DEG * math.cos(math.radians(HOME[0])))
+    alt = np.clip(np.minimum(t, t[-1] - t) * 2.0, 0, 40) + rng.normal(0, 0.005, count)
+    return {"timestamp": 1.7e9 + t, "latitude": lat, "longitude": lon, "altitude": alt}
+
+def naive_analyze(data, geofence=None):
+    """Per-row reference for PathAnalyzer, using math only."""
+    def haversine(lat1, lon1, lat2, lon2):
+        phi1, phi2 = math.radians(lat1), math.radians(lat2)
+        a = (math.sin((phi2 - phi1) / 2) ** 2
+             + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+        return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(a, 1.0)))
+
+    def bearing(lat1, lon1, lat2, lon2):
+        phi1, phi2 = math.radians(lat1), math.radians(lat2)
+        dlambda = math.radians(lon2 - lon1)
+        y = math.sin(dlambda) * math.cos(phi2)
+        x = math.cos(phi1) * math.sin(phi2) - math.sin(phi1) * math.cos(phi2) * math.cos(dlambda)
+        return math.degrees(math.atan2(y, x)) % 360.0
+
+    stats = dict(distance_m=0.0, climb_m=0.0, descent_m=0.0, max_speed_ms=0.0,
+                 heading_change_deg=0.0, turns=0)
+    hovers, excursions = [], []
+    hover_run = fence_run = None
+    last = last_heading = None
+    for t, lat, lon, alt in zip(data["timestamp"], data["latitude"], data["longitude"], data["altitude"]):
+        prev = last or (t, lat, lon, alt)
+        last = (t, lat, lon, alt)
+        dt = t - prev[0]
+        distance = haversine(prev[1], prev[2], lat, lon)
+        climb = alt - prev[3]
+        stats["distance_m"] += distance
+        stats["climb_m"] += max(climb, 0.0)
+        stats["descent_m"] += max(-climb, 0.0)
+        speed = distance / dt if dt > 0 else None
+        if speed is not None:
+            stats["max_speed_ms"] = max(stats["max_speed_ms"], speed)
+
+        if distance >= TURN_MIN_SEGMENT_M:
+            heading = bearing(prev[1], prev[2], lat, lon)
+            if last_heading is not None:
+                change = abs((heading - last_heading + 180.0) % 360.0 - 180.0)
+                stats["heading_change_deg"] += change
+                stats["turns"] += change > TURN_THRESHOLD_DEG
+            last_heading = heading
+
+        hovering = (speed is not None and speed < HOVER_SPEED_MS
+                    and abs(climb / dt) < HOVER_CLIMB_RATE_MS and alt > MIN_AIRBORNE_ALT_M)
+        if hovering:
+            hover_run = (hover_run or 0.0) + dt
+        elif hover_run is not None:
+            hovers.append(hover_run)
+            hover_run = None
+
+        if geofence is not None:
+            breach = haversine(geofence["latitude"], geofence["longitude"], lat, lon) - geofence["radius_m"]
+            if breach > 0:
+                fence_run = (fence_run or 0.0) + dt
+            elif fence_run is not None:
+                excursions.append(fence_run)
+                fence_run = None
+
+    hovers += [hover_run] if hover_run is not None else []
+    excursions += [fence_run] if fence_run is not None else []
+    stats["hover_count"] = sum(1 for run in hovers if run >= HOVER_MIN_DURATION_S)
+    stats["excursions"] = len(excursions)
+    return stats
+
+def test_straight_line_distance():
+    """A 1 km leg due north at 10 m/s has the expected length, speed and heading."""
+    t = np.arange(101.0)
+    data = {"timestamp": t, "latitude": HOME[0] + t * 10 / METERS_PER_DEG,
+            "longitude": np.full(101, HOME[1]), "altitude": np.full(101, 20.0)}
+    result = analyze_path(data)
+    assert abs(result["distance_m"] - 1000.0) < 0.01
+    assert abs(result["max_speed_ms"] - 10.0) < 1e-3
+    assert result["duration_s"] == 100.0
+    assert result["heading_change_deg"] < 1e-6 and result["turns"] == 0
+    assert result["hover"]["count"] == 0
+
+def test_matches_naive_reference_in_any_chunking():
+    """Results match a per-row loop, however the samples are chunked."""
+    data = make_track(6000)
+    fence = {"latitude": HOME[0], "longitude": HOME[1], "radius_m": 1500.0}
+    expected = naive_analyze(data, fence)
+    for chunk_rows in (6000, 997, 64):
+        result = analyze_path(data, chunk_rows=chunk_rows, geofence=fence)
+        for key in ("distance_m", "climb_m", "descent_m", "max_speed_ms", "heading_change_deg"):
+            assert math.isclose(result[key], expected[key], rel_tol=1e-9, abs_tol=1e-6), key
+        assert result["turns"] == expected["turns"]
+        assert result["hover"]["count"] == expected["hover_count"]
+        assert result["geofence"]["excursions"] == expected["excursions"]
+
+    # Four 90 degree corners per lap, hovers at each corner, one jump outside the fence
+    result = analyze_path(data, geofence=fence)
+    assert result["turns"] >= 4
+    assert result["hover"]["count"] >= 4
+    assert result["geofence"]["excursions"] >= 1 and result["geofence"]["max_breach_m"] > 0
+
+def test_flight_log_streaming():
+    """A multi-chunk log analyzed from disk gives the in-memory result, with time windows."""
+    data = make_track(3000, seed=1)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "flight.ddlog")
+        with FlightLogWriter(path, list(data)) as writer:
+            for first in range(0, 3000, 700):
+                writer.write_chunk({name: values[first:first + 700] for name, values in data.items()})
+        log = FlightLog(path)
+        assert len(log.chunks()) == 5
+
+        result = analyze_flight_log(log, chunk_rows=256)
+        expected = analyze_path(data)
+        assert math.isclose(result["distance_m"], expected["distance_m"], rel_tol=1e-12)
+        assert result["samples"] == 3000
+
+        start, end = data["timestamp"][1000], data["timestamp"][1999]
+        window = analyze_flight_log(log, start=start, end=end, chunk_rows=300)
+        expected = analyze_path({name: values[1000:2000] for name, values in data.items()})
+        assert window["samples"] == 1000
+        assert math.isclose(window["distance_m"], expected["distance_m"], rel_tol=1e-12)
+
+def test_missing_positions_are_skipped():
+    """Rows without a fix do not break the path."""
+    data = make_track(500)
+    gappy = {name: values.copy() for name, values in data.items()}
+    gappy["latitude"][100:150] = np.nan
+    kept = np.ones(500, dtype=bool)
+    kept[100:150] = False
+    result = analyze_path(gappy)
+    expected = analyze_path({name: values[kept] for name, values in data.items()})
+    assert result["samples"] == 450
+    assert math.isclose(result["distance_m"], expected["distance_m"], rel_tol=1e-12)
+
+if __name__ == "__main__":
+    test_straight_line_distance()
+    test_matches_naive_reference_in_any_chunking()
+    test_flight_log_streaming()
+    test_missing_positions_are_skipped()
+    print("\nAll flight analytics tests passed!")
+    sys.exit(0)
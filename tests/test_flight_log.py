@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test the columnar flight log format, the shared log store and the TelemetryRecorder.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+from drone import compatibility_fix  # Import for Python 3.10+ compatibility
+from drone.drone_control import TelemetryCache
+from drone.flight_log import (COLUMNS, FlightLog, FlightLogStore, FlightLogWriter, TelemetryRecorder,
+                              compact_log, shared_store)
+from tests.test_telemetry_cache import FakeVehicle, FakeLocation
+
+def write_rows(path, count, chunk_rows=100, start=1000.0):
+    with FlightLogWriter(path, chunk_rows=chunk_rows) as writer:
+        for idx in range(count):
+            row = np.full(len(COLUMNS), float(idx))
+            row[0] = start + idx
+            writer.append(row)
+
+def test_round_trip_across_chunks():
+    """Rows written over several chunks read back in order, per column."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "flight.ddlog")
+        write_rows(path, 250)
+
+        log = FlightLog(path)
+        assert log.columns == COLUMNS
+        assert len(log) == 250
+        assert len(log.chunks()) == 3
+        assert log.time_range() == (1000.0, 1249.0)
+
+        data = log.read(["altitude"])
+        assert list(data) == ["altitude"]
+        assert np.array_equal(data["altitude"], np.arange(250.0))
+
+        window = log.read(["altitude"], start=1120, end=1130)
+        assert np.array_equal(window["altitude"], np.arange(120.0, 131.0))
+
+def test_append_and_torn_writes():
+    """Reopening appends; a half-written chunk or a lost index is tolerated."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "flight.ddlog")
+        write_rows(path, 50)
+        write_rows(path, 50, start=2000.0)
+        assert len(FlightLog(path)) == 100
+
+        # Simulate a crash in the middle of writing a chunk
+        with open(path, "ab") as f:
+            f.write(b"CHNK" + b"\x10\x00\x00\x00" + b"\x00" * 24)
+        assert len(FlightLog(path)) == 100
+
+        os.remove(path + ".idx")
+        log = FlightLog(path)
+        assert len(log) == 100
+        assert log.time_range() == (1000.0, 2049.0)
+
+def test_reads_are_mapped_views():
+    """Single-chunk reads are read-only views of the mapped file, not copies."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "flight.ddlog")
+        write_rows(path, 250)
+        assert compact_log(path)
+
+        log = FlightLog(path)
+        assert len(log.chunks()) == 1
+        altitude = log.read(["altitude"])["altitude"]
+        assert np.array_equal(altitude, np.arange(250.0))
+        assert not altitude.flags.owndata and not altitude.flags.writeable
+
+        # Rows appended after opening are visible on the next read
+        with FlightLogWriter(path) as writer:
+            writer.append([2000.0] + [1.0] * (len(COLUMNS) - 1))
+        assert len(log) == 251
+
+def test_store_shares_logs():
+    """DataFrames are written to the store once and shared by every lookup."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = shared_store(tmp)
+        assert shared_store(tmp) is store
+
+        frame = pd.DataFrame({
+            "timestamp": pd.date_range(start="2023-01-01", periods=20, freq="10s"),
+            "altitude": np.arange(20.0),
+            "speed": np.full(20, 5.0),
+            "label": ["x"] * 20,  # non-numeric columns are not stored
+        })
+        store.register("flight_a", frame)
+        assert "flight_a" in store and len(store) == 1
+        assert store["flight_a"] is store["flight_a"]
+
+        log = store["flight_a"]
+        assert list(log.columns) == ["timestamp", "altitude", "speed"]
+        assert log.time_range() == (1672531200.0, 1672531390.0)
+        restored = log.to_dataframe()
+        assert str(restored["timestamp"].dtype).startswith("datetime64")
+        assert (restored["speed"] == 5.0).all()
+
+        # A fresh store over the same directory finds the log on disk
+        assert list(FlightLogStore(tmp)) == ["flight_a"]
+
+def test_recorder_samples_telemetry():
+    """The recorder writes rows once a position is known, at the requested rate."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "flight.ddlog")
+        vehicle = FakeVehicle()
+        cache = TelemetryCache()
+        cache.attach(vehicle)
+
+        recorder = TelemetryRecorder(cache, path, rate_hz=100, chunk_rows=8, flush_interval=0.05)
+        assert not recorder.sample()  # no position yet
+        vehicle.notify("location.global_relative_frame", FakeLocation(22.5, 113.9, 12.0))
+        recorder.start()
+        time.sleep(0.3)
+        recorder.stop()
+
+        data = FlightLog(path).read(["latitude", "altitude", "voltage", "groundspeed", "roll"])
+        assert len(data["latitude"]) >= 10
+        assert data["altitude"][0] == 12.0
+        assert data["voltage"][0] == 12.4
+        assert data["groundspeed"][0] == 4.0
+        assert np.isnan(data["roll"][0])  # no attitude from the fake vehicle
+
+if __name__ == "__main__":
+    test_round_trip_across_chunks()
+    test_append_and_torn_writes()
+    test_reads_are_mapped_views()
+    test_store_shares_logs()
+    test_recorder_samples_telemetry()
+    print("\nAll flight log tests passed!")
+    sys.exit(0)
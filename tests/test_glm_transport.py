@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Test the pooled HTTP transport and GLMModel against a local stand-in of the
+chat completions endpoint.
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from drone.glm_model import GLMModel
+from drone.http_transport import HTTPTransport, TransportError
+
+class CompletionsStandIn:
+    """
+    Local HTTP/1.1 server answering like an OpenAI-style chat completions API.
+
+    Each request takes the next scripted reply, a (status, body, headers,
+    delay) tuple; once the script runs out every request gets a normal
+    completion echoing the last user message. A body that is a list of
+    chunks is sent as server-sent events with chunked encoding, ``delay``
+    apart. Request bodies and the client ports they arrived on are
+    recorded, so tests can count connections.
+    """
+
+    def __init__(self):
+        self.script = []
+        self.requests = []
+        self.client_ports = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out as separate writes; without this, Nagle's
+            # algorithm and delayed ACKs add ~40 ms to replies on a reused connection
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stand_in.requests.append({"body": body, "headers": dict(self.headers)})
+                stand_in.client_ports.append(self.client_address[1])
+                status, reply, headers, delay = stand_in.next_reply(body)
+                if isinstance(reply, list):
+                    self.send_events(status, reply, delay)
+                    return
+                time.sleep(delay)
+                data = reply if isinstance(reply, bytes) else json.dumps(reply).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client gave up on a delayed reply
+
+            def send_events(self, status, chunks, delay):
+                self.send_response(status)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for chunk in chunks + ["[DONE]"]:
+                    data = chunk if isinstance(chunk, str) else json.dumps(chunk)
+                    event = f"data: {data}\n\n".encode()
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(event), event))
+                    self.wfile.flush()
+                    time.sleep(delay)
+                self.wfile.write(b"0\r\n\r\n")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v4/chat/completions"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @staticmethod
+    def completion(content):
+        return {
+            "choices": [{"message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        }
+
+    @staticmethod
+    def tool_call_completion(calls):
+        """A completion asking for tool calls, given as (name, arguments) pairs."""
+        tool_calls = [{"id": f"call_{idx}", "type": "function",
+                       "function": {"name": name, "arguments": json.dumps(arguments)}}
+                      for idx, (name, arguments) in enumerate(calls)]
+        return {
+            "choices": [{"message": {"role": "assistant", "content": "", "tool_calls": tool_calls},
+                         "finish_reason": "tool_calls"}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        }
+
+    @staticmethod
+    def stream_chunks(content, size=4):
+        """A completion streamed ``size`` characters per chunk, with usage at the end."""
+        chunks = [{"choices": [{"index": 0, "delta": {"role": "assistant", "content": content[idx:idx + size]}}]}
+                  for idx in range(0, len(content), size)]
+        chunks.append({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                       "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}})
+        return chunks
+
+    def next_reply(self, body):
+        if self.script:
+            return self.script.pop(0)
+        content = f"echo: {body['messages'][-1]['content']}"
+        if body.get("stream"):
+            return 200, self.stream_chunks(content), {}, 0.0
+        return 200, self.completion(content), {}, 0.0
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+def make_model(url, **kwargs):
+    os.environ.setdefault("GLM_API_KEY", "test_api_key")
+    return GLMModel(base_url=url, **kwargs)
+
+def test_connection_is_reused():
+    """Consecutive agent steps go over one kept-alive connection."""
+    with CompletionsStandIn() as server:
+        model = make_model(server.url)
+        for idx in range(5):
+            assert model.generate([{"role": "user", "content": f"step {idx}"}]).content == f"echo: step {idx}"
+        assert len(set(server.client_ports)) == 1
+        assert server.requests[0]["headers"]["Authorization"] == "Bearer " + os.environ["GLM_API_KEY"]
+
+        metrics = model.metrics()
+        assert metrics["requests"] == 5 and metrics["errors"] == 0 and metrics["retries"] == 0
+        assert 0 < metrics["latency_p50_s"] <= metrics["latency_p95_s"]
+
+def test_retries_transient_errors():
+    """429 and 5xx replies are retried with backoff, honouring Retry-After."""
+    with CompletionsStandIn() as server:
+        server.script = [
+            (503, {"error": "overloaded"}, {}, 0.0),
+            (429, {"error": "rate limited"}, {"Retry-After": "0.2"}, 0.0),
+        ]
+        transport = HTTPTransport(server.url, backoff_base=0.01)
+        start = time.monotonic()
+        reply = transport.post_json({"messages": [{"role": "user", "content": "hi"}]})
+        assert reply["choices"][0]["message"]["content"] == "echo: hi"
+        assert time.monotonic() - start >= 0.2
+        assert transport.last_request["attempts"] == 3
+        assert transport.metrics()["retries"] == 2
+
+def test_gives_up_and_does_not_retry_client_errors():
+    """Retries are bounded, and 4xx errors other than 429 fail at once."""
+    with CompletionsStandIn() as server:
+        server.script = [(500, {"error": "boom"}, {}, 0.0)] * 3
+        transport = HTTPTransport(server.url, max_retries=2, backoff_base=0.01)
+        try:
+            transport.post_json({"messages": []})
+            assert False, "expected TransportError"
+        except TransportError as e:
+            assert e.status_code == 500 and e.attempts == 3
+
+        server.script = [(400, {"error": "bad request"}, {}, 0.0)]
+        try:
+            transport.post_json({"messages": []})
+            assert False, "expected TransportError"
+        except TransportError as e:
+            assert e.status_code == 400 and e.attempts == 1
+        assert transport.metrics()["errors"] == 2
+
+        server.script = [(200, b"<html>Bad gateway</html>", {}, 0.0)]
+        try:
+            transport.post_json({"messages": []})
+            assert False, "expected TransportError"
+        except TransportError as e:
+            assert e.status_code == 200 and "not JSON" in str(e)
+        assert transport.metrics()["errors"] == 3
+
+        # GLMModel turns the failure into an error message for the agent
+        server.script = [(401, {"error": "invalid key"}, {}, 0.0)]
+        assert "Error in API request" in make_model(server.url).generate("hi").content
+
+def test_read_timeout_is_retried():
+    """A reply slower than the read timeout is abandoned and retried."""
+    with CompletionsStandIn() as server:
+        server.script = [(200, CompletionsStandIn.completion("late"), {}, 1.0)]
+        transport = HTTPTransport(server.url, read_timeout=0.2, backoff_base=0.01)
+        start = time.monotonic()
+        reply = transport.post_json({"messages": [{"role": "user", "content": "hi"}]})
+        assert reply["choices"][0]["message"]["content"] == "echo: hi"
+        assert time.monotonic() - start < 1.0
+        assert transport.last_request["attempts"] == 2
+
+if __name__ == "__main__":
+    test_connection_is_reused()
+    test_retries_transient_errors()
+    test_gives_up_and_does_not_retry_client_errors()
+    test_read_timeout_is_retried()
+    print("\nAll GLM transport tests passed!")
+    sys.exit(0)
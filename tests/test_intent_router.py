@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test local intent routing: direct commands map to drone_* tools with their
+parameters, everything else falls back to the agent, and DroneAssistant.chat
+serves routed commands without calling the model.
+"""
+
+import sys
+import logging
+from drone.intent_router import IntentRouter
+from drone.drone_chat import DroneAssistant, get_drone_battery, generate_mission_plan
+from drone.glm_model import Message
+from drone.telemetry_bridge import shared_bridge
+
+def test_direct_commands_are_routed():
+    """Commands and their parameters are recognised in English and Chinese."""
+    router = IntentRouter()
+    cases = {
+        "land": ("drone_land", {}),
+        "Land now!": ("drone_land", {}),
+        "降落": ("drone_land", {}),
+        "battery?": ("get_drone_battery", {}),
+        "电量": ("get_drone_battery", {}),
+        "take off to 30 m": ("drone_takeoff", {"altitude": 30.0}),
+        "takeoff 12.5m": ("drone_takeoff", {"altitude": 12.5}),
+        "请起飞到 20 米": ("drone_takeoff", {"altitude": 20.0}),
+        "fly to 37.7749, -122.4194 at 50 m": (
+            "drone_fly_to", {"latitude": 37.7749, "longitude": -122.4194, "altitude": 50.0}),
+        "飞往 37.7749，-122.4194 高度 50 米": (
+            "drone_fly_to", {"latitude": 37.7749, "longitude": -122.4194, "altitude": 50.0}),
+        "RTL": ("drone_return_home", {}),
+        "return to launch": ("drone_return_home", {}),
+        "where is the drone?": ("get_drone_location", {}),
+        "connect to udp:127.0.0.1:14550": ("connect_to_real_drone", {"connection_string": "udp:127.0.0.1:14550"}),
+        "disconnect": ("disconnect_from_drone", {}),
+        "fleet status": ("get_fleet_status", {}),
+        "land on vehicle alpha": ("drone_land", {"vehicle_id": "alpha"}),
+    }
+    for message, (tool, arguments) in cases.items():
+        decision = router.route(message)
+        assert decision.routed, message
+        assert (decision.intent.tool, decision.intent.arguments) == (tool, arguments), message
+
+def test_open_ended_requests_fall_back():
+    """Open-ended, compound and out-of-range requests go to the agent with a reason."""
+    router = IntentRouter()
+    for message in ("analyze flight path for flight_001", "land and return home",
+                    "How does landing work?", "Plan a survey mission", "起飞"):
+        decision = router.route(message)
+        assert not decision.routed and decision.reason == "open_ended", message
+    for message in ("take off to 500 m", "fly to 137.0, 20.0 at 30 m"):
+        decision = router.route(message)
+        assert not decision.routed and decision.reason == "invalid_parameters", message
+
+def test_decisions_are_recorded():
+    """Every decision is counted and timed for measurement, and kept out of the mission feed."""
+    router = IntentRouter()
+    head = shared_bridge().channel().head
+    feed = logging.getLogger('drone_control')
+    level = feed.level
+    feed.setLevel(logging.INFO)
+    try:
+        for message in ("land", "battery", "analyze flight path for flight_001", "take off to 500 m"):
+            router.route(message)
+    finally:
+        feed.setLevel(level)
+    stats = router.stats()
+    assert (stats["local"], stats["agent"]) == (2, 2)
+    assert stats["local_share"] == 0.5
+    assert stats["reasons"] == {"land": 1, "battery": 1, "open_ended": 1, "invalid_parameters": 1}
+    assert stats["route_p50_us"] < 1000
+    assert [decision["tool"] for decision in router.decisions] == ["drone_land", "get_drone_battery", None, None]
+    assert shared_bridge().channel().head == head
+
+class CountingModel:
+    """Model that records calls and answers like a chat model"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, messages, **kwargs):
+        return self.generate(messages)
+
+    def generate(self, messages, **kwargs):
+        self.calls += 1
+        return Message("model reply")
+
+def test_chat_runs_routed_commands_without_model():
+    """A routed command is answered by its tool; the model is never called."""
+    model = CountingModel()
+    assistant = DroneAssistant(tools=[get_drone_battery, generate_mission_plan], model=model)
+    response = assistant.chat("battery?")
+    assert "Not connected" in response or "error" in response
+    assert model.calls == 0
+    assert assistant.chat_history[-1] == {"role": "assistant", "content": response}
+    assert assistant.router.stats()["local"] == 1
+
+if __name__ == "__main__":
+    test_direct_commands_are_routed()
+    test_open_ended_requests_fall_back()
+    test_decisions_are_recorded()
+    test_chat_runs_routed_commands_without_model()
+    print("\nAll intent router tests passed!")
+    sys.exit(0)
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Test the lazy package imports: importing drone, or just DroneController,
+stays headless (no Streamlit, agent or plotting libraries, nothing printed),
+and the chat names still resolve on first access.
+"""
+
+import sys
+import subprocess
+
+HEAVY = ("streamlit", "smolagents", "pandas", "matplotlib")
+
+def run(code):
+    """stdout of ``code`` in a fresh interpreter."""
+    return subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+
+def test_headless_import():
+    """DroneController loads DroneKit and nothing of the chat app."""
+    output = run("import sys\n"
+                 "from drone import DroneController, FleetManager\n"
+                 f"print([name for name in {HEAVY!r} if name in sys.modules])")
+    assert output == "[]\n"
+
+def test_names_resolve_lazily():
+    """Exported names and submodules are imported on first access."""
+    output = run("import sys, drone\n"
+                 "print('drone.drone_chat' in sys.modules)\n"
+                 "print(drone.DroneAssistant.__module__, drone.drone_chat.generate_mission_plan is drone.generate_mission_plan)\n"
+                 "print('pandas' in sys.modules, 'matplotlib' in sys.modules, 'DroneAssistant' in dir(drone))")
+    assert output.splitlines() == ["False", "drone.drone_chat True", "False False True"]
+
+def test_unknown_name():
+    """Names the package does not have still raise AttributeError."""
+    import drone
+    try:
+        drone.no_such_name
+    except AttributeError:
+        pass
+    else:
+        raise AssertionError("expected AttributeError")
+
+if __name__ == "__main__":
+    test_headless_import()
+    test_names_resolve_lazily()
+    test_unknown_name()
+    print("\nAll lazy import tests passed!")
+    sys.exit(0)
@@ -20,6 +20,10 @@ def get_args():
     parser.add_argument('--connect', 
                         help="Vehicle connection target string. If not specified, SITL automatically started.",
                         default='udp:127.0.0.1:14550')
+    parser.add_argument('--sim', action='store_true',
+                        help="Fly against the in-process simulator instead of SITL.")
+    parser.add_argument('--time-scale', type=float, default=5.0,
+                        help="Simulator speed-up when --sim is used.")
     return parser.parse_args()
 
 def main():
@@ -27,6 +31,12 @@ def main():
     args = get_args()
     connection_string = args.connect
     
+    simulator = None
+    if args.sim:
+        from drone.simulator import SimulatedVehicle
+        simulator = SimulatedVehicle(time_scale=args.time_scale).start()
+        connection_string = simulator.connection_string
+    
     print(f"Connecting to vehicle on: {connection_string}")
     
     try:
@@ -131,6 +141,9 @@ def main():
         
     except Exception as e:
         print(f"Error: {str(e)}")
+    finally:
+        if simulator:
+            simulator.stop()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test the bounded mission log: fixed capacity, structured records with their
+telemetry, one formatter for chat and sidebar, and the chat retention policy.
+"""
+
+import sys
+from drone.chat_view import ChatView, message_html
+from drone.mission_log import MissionLog, MissionLogRecord, parse_telemetry, record_html
+from tests.test_chat_view import RecordingTarget
+
+def test_capacity_and_records():
+    """The log keeps the newest ``capacity`` entries, as structured records."""
+    log = MissionLog(capacity=5)
+    for idx in range(12):
+        log.log(f"Altitude: {idx}.5")
+    log.status("ERROR", "起飞失败")
+
+    records = log.records()
+    assert len(log) == 5 and log.capacity == 5
+    assert [record.telemetry.get("altitude") for record in records[:4]] == [8.5, 9.5, 10.5, 11.5]
+    assert log.latest().status == "ERROR" and log.latest().level == "ERROR"
+    assert log.series("altitude")[-1][1] == 11.5
+    assert parse_telemetry("Reached waypoint 3/7") == {"waypoint": 3.0, "waypoints": 7.0}
+    assert parse_telemetry("Arming motors...") == {}
+
+def test_one_formatter():
+    """Status changes and log lines share record_html(), styled by class and escaped."""
+    assert record_html(MissionLogRecord("CONNECTED", "ok", timestamp=0)).startswith(
+        '<span class="mission-log log-done">✅ [')
+    assert "log-error" in record_html(MissionLogRecord("LOG", "Failed to enter AUTO mode", level="ERROR"))
+    altitude = record_html(MissionLogRecord("LOG", "Altitude: 12.5", telemetry={"altitude": 12.5}))
+    assert "log-telemetry" in altitude and "ALT: 12.5" in altitude
+    assert "&lt;Vehicle&gt;" in record_html(MissionLogRecord("LOG", "GPS: <Vehicle>"))
+    assert "log-busy" in message_html({"role": "system", "record": MissionLogRecord("TAKING OFF", "10 m")})
+
+def test_chat_retention():
+    """Only the newest ``chat_retention`` entries stay visible; expired ones are dropped in one pass."""
+    log = MissionLog(chat_retention=3)
+    history = [{"role": "user", "content": "take off"}]
+    for idx in range(5):
+        log.post_to_chat(history, log.status("AIRBORNE", f"step {idx}"))
+    assert len(history) == 6 and sum(1 for message in history if message.get("expired")) == 2
+
+    view, target = ChatView(), RecordingTarget()
+    view.render(target, history)
+    assert "step 1" not in target.markdown_calls[-1] and "step 2" in target.markdown_calls[-1]
+
+    log.post_to_chat(history, log.status("AIRBORNE", "step 5"))
+    assert [message["record"].phase for message in history[1:]] == ["step 3", "step 4", "step 5"]
+
+    quiet = MissionLog(chat_logs=False)
+    assert quiet.post_to_chat(history, quiet.log("Arming motors...")) is None
+    assert quiet.post_to_chat(history, quiet.status("LANDED")) is not None
+    assert MissionLog(chat_retention=0).post_to_chat(history, MissionLogRecord("LANDED")) is None
+
+if __name__ == "__main__":
+    test_capacity_and_records()
+    test_one_formatter()
+    test_chat_retention()
+    print("\nAll mission log tests passed!")
+    sys.exit(0)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Test the MissionProgressTracker against scripted MISSION_CURRENT /
+MISSION_ITEM_REACHED messages and position updates.
+"""
+
+import sys
+import threading
+import time
+from drone import compatibility_fix  # Import for Python 3.10+ compatibility
+from drone.drone_control import DroneController, MissionProgressTracker, distance_meters
+from tests.test_telemetry_cache import FakeVehicle, FakeLocation
+
+class FakeMessage:
+    def __init__(self, seq):
+        self.seq = seq
+
+class FakeCommands:
+    next = 0
+
+class MissionVehicle(FakeVehicle):
+    """Vehicle stand-in that also delivers MAVLink message callbacks."""
+
+    def __init__(self):
+        super().__init__()
+        self.message_listeners = {}
+        self.commands = FakeCommands()
+
+    def add_message_listener(self, name, fn):
+        self.message_listeners.setdefault(name, []).append(fn)
+
+    def remove_message_listener(self, name, fn):
+        self.message_listeners[name].remove(fn)
+
+    def send_message(self, name, seq):
+        for fn in list(self.message_listeners.get(name, [])):
+            fn(self, name, FakeMessage(seq))
+
+WAYPOINTS = [
+    {"lat": 0.0000, "lon": 0.0, "alt": 20},
+    {"lat": 0.0010, "lon": 0.0, "alt": 20},
+    {"lat": 0.0020, "lon": 0.0, "alt": 20},
+]
+
+def make_tracker():
+    vehicle = MissionVehicle()
+    controller = DroneController()
+    controller.vehicle = vehicle
+    controller.connected = True
+    controller.telemetry.attach(vehicle)
+    vehicle.notify("location.global_relative_frame", FakeLocation(0.0, 0.0, 20.0))
+    tracker = MissionProgressTracker(controller, WAYPOINTS, update_interval=0).start()
+    return vehicle, tracker
+
+def test_distance_meters():
+    """0.001 degrees of latitude is roughly 111 meters."""
+    assert abs(distance_meters(0.0, 0.0, 0.001, 0.0) - 111.2) < 0.5
+
+def test_progress_events():
+    """Events report the active waypoint, distance remaining and ETA."""
+    vehicle, tracker = make_tracker()
+    first = tracker.latest()
+    assert first["waypoint"] == 1
+    assert abs(first["distance_remaining"] - 222.4) < 1.0
+
+    vehicle.send_message("MISSION_ITEM_REACHED", 1)
+    vehicle.send_message("MISSION_CURRENT", 2)
+    vehicle.notify("groundspeed", 10.0)
+    latest = tracker.latest()
+    assert latest["waypoint"] == 2
+    assert latest["reached"] == 1
+    assert abs(latest["eta_seconds"] - 22.2) < 0.5
+
+    vehicle.send_message("MISSION_ITEM_REACHED", 2)
+    vehicle.send_message("MISSION_ITEM_REACHED", 3)
+    assert tracker.complete
+    assert not vehicle.message_listeners["MISSION_ITEM_REACHED"]
+
+    events = list(tracker.events(timeout=1))
+    assert events[-1]["complete"]
+    assert events[-1]["distance_remaining"] == 0.0
+
+def test_events_stream_incrementally():
+    """A consumer thread sees events as they are produced."""
+    vehicle, tracker = make_tracker()
+    seen = []
+
+    def consume():
+        for event in tracker.events(timeout=2):
+            seen.append(event["waypoint"])
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    for seq in (1, 2, 3):
+        vehicle.send_message("MISSION_CURRENT", seq)
+        vehicle.send_message("MISSION_ITEM_REACHED", seq)
+    consumer.join(timeout=5)
+    assert not consumer.is_alive()
+    assert seen[-1] == 3
+
+def test_events_timeout_without_progress():
+    """The stream ends when no progress arrives within the timeout."""
+    vehicle, tracker = make_tracker()
+    events = list(tracker.events(timeout=0.1))
+    assert len(events) == 1
+    assert not tracker.complete
+
+def test_listeners_receive_events():
+    """Listeners are called with each event and can be removed."""
+    vehicle, tracker = make_tracker()
+    seen = []
+    tracker.add_listener(seen.append)
+    vehicle.send_message("MISSION_CURRENT", 2)
+    tracker.remove_listener(seen.append)
+    vehicle.send_message("MISSION_CURRENT", 3)
+    assert [event["waypoint"] for event in seen] == [2]
+
+def test_reporter_publishes_progress():
+    """MissionReporter publishes waypoints, distance and completion for its session."""
+    from drone.drone_chat import MissionReporter
+    from drone.telemetry_bridge import shared_bridge
+
+    channel = shared_bridge().channel()
+    cursor = channel.head
+    vehicle, tracker = make_tracker()
+    reporter = MissionReporter(tracker, WAYPOINTS, "mission-session").start()
+    for seq in (1, 2, 3):
+        vehicle.send_message("MISSION_CURRENT", seq)
+        vehicle.send_message("MISSION_ITEM_REACHED", seq)
+    events = [event for event in channel.read(cursor, "mission-session")[0] if event.session == "mission-session"]
+    statuses = [event.status for event in events if not event.is_progress]
+    assert statuses == ["EXECUTING MISSION"] * 3 + ["MISSION COMPLETE"]
+    assert any(event.is_progress for event in events)
+    assert not any(event.session for event in channel.read(cursor, "other-session")[0])
+    reporter.stop()
+
+def test_reporter_stall_stops_tracker():
+    """Without progress the reporter reports an error and stops the tracker."""
+    from drone.drone_chat import MissionReporter
+    from drone.telemetry_bridge import shared_bridge
+
+    channel = shared_bridge().channel()
+    cursor = channel.head
+    vehicle, tracker = make_tracker()
+    MissionReporter(tracker, WAYPOINTS, "stalled-session", stall_timeout=0.1).start()
+    time.sleep(0.3)
+    events = [event for event in channel.read(cursor, "stalled-session")[0] if event.session == "stalled-session"]
+    assert events[-1].status == "ERROR"
+    assert not vehicle.message_listeners["MISSION_CURRENT"]
+
+if __name__ == "__main__":
+    test_distance_meters()
+    test_progress_events()
+    test_events_stream_incrementally()
+    test_events_timeout_without_progress()
+    test_listeners_receive_events()
+    test_reporter_publishes_progress()
+    test_reporter_stall_stops_tracker()
+    print("\nAll mission progress tests passed!")
+    sys.exit(0)
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Test the MissionUploader against a stand-in autopilot that speaks the
+MAVLink mission protocol over a link that can drop messages.
+"""
+
+import sys
+import time
+import random
+from drone import compatibility_fix  # Import for Python 3.10+ compatibility
+from pymavlink import mavutil
+from pymavlink.dialects.v20 import ardupilotmega
+from drone.drone_control import DroneController
+from drone.mission_upload import MissionUploader, item_hash
+
+MAV = mavutil.mavlink
+
+class FakeVersion:
+    def __init__(self, autopilot_type):
+        self.autopilot_type = autopilot_type
+
+class MissionLinkVehicle:
+    """
+    Vehicle stand-in with an ArduPilot-like mission store behind a lossy link.
+
+    Every message in either direction is dropped with probability ``loss`` and
+    delayed by ``latency`` seconds. Replies are delivered to message listeners
+    the way DroneKit does.
+    """
+
+    def __init__(self, loss=0.0, latency=0.0, partial_writes=True, seed=0):
+        self.message_factory = ardupilotmega.MAVLink(None, srcSystem=1, srcComponent=1)
+        self.message_listeners = {}
+        self.home_location = None
+        self.loss = loss
+        self.latency = latency
+        self.partial_writes = partial_writes
+        self.version = FakeVersion(MAV.MAV_AUTOPILOT_ARDUPILOTMEGA if partial_writes else MAV.MAV_AUTOPILOT_PX4)
+        self.random = random.Random(seed)
+        self.items = []
+        self.uplink = 0
+        self.corrupt = False
+        self._receiving = None  # [next_seq, last_seq, staged items]
+
+    def add_message_listener(self, name, fn):
+        self.message_listeners.setdefault(name, []).append(fn)
+
+    def remove_message_listener(self, name, fn):
+        self.message_listeners[name].remove(fn)
+
+    def send_mavlink(self, msg):
+        self.uplink += 1
+        if self._lost():
+            return
+        handler = getattr(self, "_on_" + msg.get_type().lower(), None)
+        if handler:
+            handler(msg)
+
+    def _lost(self):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.random.random() < self.loss
+
+    def _reply(self, msg):
+        if self._lost():
+            return
+        for fn in list(self.message_listeners.get(msg.get_type(), [])):
+            fn(self, msg.get_type(), msg)
+
+    def _request(self, seq):
+        self._reply(self.message_factory.mission_request_int_encode(255, 0, seq))
+
+    def _on_mission_count(self, msg):
+        self._receiving = [0, msg.count - 1, [None] * msg.count]
+        self._request(0)
+
+    def _on_mission_write_partial_list(self, msg):
+        if not self.partial_writes:
+            self._reply(self.message_factory.mission_ack_encode(255, 0, MAV.MAV_MISSION_UNSUPPORTED))
+            return
+        self._receiving = [msg.start_index, msg.end_index, list(self.items)]
+        self._request(msg.start_index)
+
+    def _on_mission_item_int(self, msg):
+        if self._receiving is None:
+            # Duplicate after the transfer closed (our ack was lost)
+            self._reply(self.message_factory.mission_ack_encode(255, 0, MAV.MAV_MISSION_ERROR))
+            return
+        next_seq, last_seq, staged = self._receiving
+        if msg.seq != next_seq:
+            self._request(next_seq)
+            return
+        if self.corrupt:
+            msg.z += 1.0
+        staged[msg.seq] = msg
+        if msg.seq < last_seq:
+            self._receiving[0] += 1
+            self._request(msg.seq + 1)
+            return
+        self.items = staged
+        self._receiving = None
+        self._reply(self.message_factory.mission_ack_encode(255, 0, MAV.MAV_MISSION_ACCEPTED))
+
+    def _on_mission_request_list(self, msg):
+        self._reply(self.message_factory.mission_count_encode(255, 0, len(self.items)))
+
+    def _on_mission_request_int(self, msg):
+        if msg.seq < len(self.items):
+            self._reply(self.items[msg.seq])
+
+    def waypoints(self):
+        return [(item.x / 1e7, item.y / 1e7, item.z) for item in self.items[1:]]
+
+def make_waypoints(count, alt=20.0):
+    return [{"lat": 22.5 + idx * 1e-4, "lon": 113.9 + idx * 1e-4, "alt": alt} for idx in range(count)]
+
+def test_full_then_unchanged_upload():
+    """The first upload writes everything; repeating it sends nothing."""
+    vehicle = MissionLinkVehicle()
+    uploader = MissionUploader(vehicle, timeout=0.05)
+    waypoints = make_waypoints(10)
+
+    result = uploader.upload(waypoints)
+    assert result["success"] and result["verified"]
+    assert result["mode"] == "full"
+    assert result["items_sent"] == 11
+    assert len(vehicle.waypoints()) == 10
+    assert abs(vehicle.waypoints()[3][0] - waypoints[3]["lat"]) < 1e-7
+
+    traffic = vehicle.uplink
+    result = uploader.upload(waypoints)
+    assert result["mode"] == "unchanged"
+    assert result["items_sent"] == 0
+    assert vehicle.uplink == traffic
+
+def test_partial_upload_sends_changed_range():
+    """Changing one waypoint rewrites only that item."""
+    vehicle = MissionLinkVehicle()
+    uploader = MissionUploader(vehicle, timeout=0.05)
+    waypoints = make_waypoints(20)
+    uploader.upload(waypoints)
+    first_hash = uploader.mission_hash
+
+    waypoints[7] = dict(waypoints[7], alt=35.0)
+    result = uploader.upload(waypoints)
+    assert result["success"] and result["verified"]
+    assert result["mode"] == "partial"
+    assert result["items_sent"] == 1
+    assert result["mission_hash"] != first_hash
+    assert vehicle.waypoints()[7][2] == 35.0
+
+def test_count_change_or_no_partial_support_falls_back_to_full():
+    """Partial writes cannot change the item count, and not every autopilot has them."""
+    vehicle = MissionLinkVehicle()
+    uploader = MissionUploader(vehicle, timeout=0.05)
+    uploader.upload(make_waypoints(5))
+    result = uploader.upload(make_waypoints(6))
+    assert result["success"] and result["mode"] == "full"
+
+    vehicle = MissionLinkVehicle(partial_writes=False)
+    uploader = MissionUploader(vehicle, timeout=0.05)
+    assert not uploader.partial_writes
+    waypoints = make_waypoints(5)
+    uploader.upload(waypoints)
+    waypoints[2] = dict(waypoints[2], alt=50.0)
+    result = uploader.upload(waypoints)
+    assert result["success"] and result["mode"] == "full"
+
+def test_lossy_link():
+    """Dropped requests, items and acks are recovered by resending."""
+    vehicle = MissionLinkVehicle(loss=0.2, seed=3)
+    uploader = MissionUploader(vehicle, timeout=0.02, retries=20)
+    waypoints = make_waypoints(50)
+    result = uploader.upload(waypoints)
+    assert result["success"] and result["verified"]
+    assert [item_hash(item) for item in vehicle.items[1:]] == uploader.item_hashes[1:]
+
+def test_verification_failure_and_dead_link():
+    """A read-back mismatch or a silent vehicle fails the upload and clears the cache."""
+    vehicle = MissionLinkVehicle()
+    vehicle.corrupt = True
+    uploader = MissionUploader(vehicle, timeout=0.02)
+    result = uploader.upload(make_waypoints(3))
+    assert not result["success"]
+    assert "mismatch" in result["error"]
+    assert result["mission_hash"] is None
+
+    vehicle = MissionLinkVehicle(loss=1.0)
+    uploader = MissionUploader(vehicle, timeout=0.01, retries=2)
+    result = uploader.upload(make_waypoints(3))
+    assert not result["success"]
+    assert "no reply" in result["error"]
+
+class StuckVehicle(MissionLinkVehicle):
+    """Keeps asking for the first item, however often it is sent."""
+
+    def _on_mission_item_int(self, msg):
+        self._request(0)
+
+class EarlyAckVehicle(MissionLinkVehicle):
+    """Accepts the mission after the first item."""
+
+    def _on_mission_item_int(self, msg):
+        self._receiving = None
+        self._reply(self.message_factory.mission_ack_encode(255, 0, MAV.MAV_MISSION_ACCEPTED))
+
+def test_transfer_needs_progress():
+    """Re-requests of the same item do not keep a write alive, and an early ack fails it."""
+    uploader = MissionUploader(StuckVehicle(), timeout=0.02, retries=3)
+    start = time.monotonic()
+    result = uploader.upload(make_waypoints(5))
+    assert not result["success"] and "no reply" in result["error"]
+    assert time.monotonic() - start < 0.5
+
+    uploader = MissionUploader(StuckVehicle(), timeout=0.02, retries=100, transfer_timeout=0.2)
+    result = uploader.upload(make_waypoints(5))
+    assert not result["success"] and "unfinished after 0.2s" in result["error"]
+
+    result = MissionUploader(EarlyAckVehicle(), timeout=0.02).upload(make_waypoints(5))
+    assert not result["success"] and "accepted the mission after 1 of 6 items" in result["error"]
+    assert result["mission_hash"] is None
+
+def test_controller_upload_mission():
+    """DroneController.upload_mission goes through the uploader."""
+    controller = DroneController()
+    controller.vehicle = MissionLinkVehicle()
+    controller.connected = True
+    waypoints = make_waypoints(4)
+    assert controller.upload_mission(waypoints)
+    assert controller.mission_waypoints == waypoints
+    assert controller.upload_mission(waypoints)
+    assert controller.last_upload["mode"] == "unchanged"
+
+if __name__ == "__main__":
+    test_full_then_unchanged_upload()
+    test_partial_upload_sends_changed_range()
+    test_count_change_or_no_partial_support_falls_back_to_full()
+    test_lossy_link()
+    test_verification_failure_and_dead_link()
+    test_transfer_needs_progress()
+    test_controller_upload_mission()
+    print("\nAll mission upload tests passed!")
+    sys.exit(0)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test the model call metrics: tokens, latency, time to first token, retries
+and cache hits recorded by GLMModel and DeepSeekModel, aggregated per session
+and run, and the Prometheus dump.
+"""
+
+import os
+import sys
+import asyncio
+from drone.deepseek_model import DeepSeekModel
+from drone.drone_chat import DroneAssistant, get_drone_battery
+from drone.metrics import MetricsRegistry, metrics_scope, new_id, shared_registry
+from drone.response_cache import ResponseCache
+from tests.test_glm_transport import CompletionsStandIn, make_model
+
+def test_glm_calls_are_recorded():
+    """Tokens, cached tokens, retries, stream timings and response cache hits are counted."""
+    registry = shared_registry()
+    session = new_id()
+    with CompletionsStandIn() as server, metrics_scope(session=session):
+        reply = CompletionsStandIn.completion("ok")
+        reply["usage"]["prompt_tokens_details"] = {"cached_tokens": 6}
+        server.script = [(503, {"error": "overloaded"}, {}, 0.0), (200, reply, {}, 0.0)]
+        model = make_model(server.url, cache=ResponseCache())
+        model.transport.backoff_base = 0.01
+
+        question = [{"role": "user", "content": "what is the weather like?"}]
+        assert model.generate(question).content == "ok"
+        assert model.generate(question).content == "ok"  # served from the response cache
+        assert "".join(delta.content for delta in model.stream("stream this")) == "echo: stream this"
+
+    stats = registry.session(session)
+    assert (stats["calls"], stats["errors"], stats["retries"], stats["cache_hits"]) == (3, 0, 1, 1)
+    assert (stats["prompt_tokens"], stats["completion_tokens"], stats["cached_prompt_tokens"]) == (20, 10, 6)
+    assert stats["first_token_p50_s"] is not None and stats["latency_p50_s"] > 0
+    assert registry.models()["glm-4.5"]["calls"] >= 3
+
+def test_deepseek_calls_are_recorded():
+    """DeepSeek usage, including its prompt cache hit tokens, and client retries are counted."""
+    os.environ.setdefault("DEEPSEEK_API_KEY", "test_api_key")
+    registry = shared_registry()
+    session = new_id()
+    with CompletionsStandIn() as server, metrics_scope(session=session):
+        reply = CompletionsStandIn.completion("ok")
+        reply.update({"id": "c1", "object": "chat.completion", "created": 0, "model": "deepseek-chat"})
+        reply["choices"][0].update({"index": 0, "finish_reason": "stop"})
+        reply["usage"]["prompt_cache_hit_tokens"] = 4
+        server.script = [(503, {"error": "overloaded"}, {"Retry-After": "0"}, 0.0), (200, reply, {}, 0.0)]
+        model = DeepSeekModel(model_id="deepseek-chat", base_url=server.url.rsplit("/chat/completions", 1)[0])
+        message = model.generate([{"role": "user", "content": "hi"}])
+
+    assert message.content == "ok" and message.token_usage.cached_input_tokens == 4
+    stats = registry.session(session)
+    assert (stats["calls"], stats["retries"], stats["prompt_tokens"], stats["cached_prompt_tokens"]) == (1, 1, 10, 4)
+
+def test_labels_follow_calls_into_worker_threads():
+    """agenerate() runs in the provider pool but is still counted for the caller's session and run."""
+    registry = shared_registry()
+    session, run = new_id(), new_id()
+
+    async def fan_out(model):
+        with metrics_scope(session=session, run=run):
+            return await asyncio.gather(*(model.agenerate(f"question {idx}") for idx in range(4)))
+
+    with CompletionsStandIn() as server:
+        replies = asyncio.run(fan_out(make_model(server.url)))
+    assert len(replies) == 4
+    assert registry.session(session)["calls"] == 4
+    assert registry.run(run)["completion_tokens"] == 20
+
+def test_assistant_runs_are_aggregated():
+    """Each chat message is a run; the session adds up all of them."""
+    with CompletionsStandIn() as server:
+        assistant = DroneAssistant(tools=[get_drone_battery], model=make_model(server.url))
+        assistant.chat("tell me a joke")
+        first_run = assistant.last_run_id
+        assistant.chat("and another joke")
+
+    metrics = assistant.metrics()
+    assert assistant.last_run_id != first_run
+    assert metrics["last_run"]["calls"] == 1 and metrics["session"]["calls"] == 2
+    assert metrics["session"]["prompt_tokens"] == 20
+
+def test_prometheus_dump():
+    """Counters and summaries are exported per model in the text format."""
+    registry = MetricsRegistry()
+    registry.record("glm-4.5", 0.5, prompt_tokens=100, completion_tokens=20, cached_prompt_tokens=64, retries=2)
+    registry.record("glm-4.5", 1.5, first_token_s=0.25, error=True)
+    registry.record('odd"model', 0.1, cache_hit=True)
+    text = registry.prometheus()
+    assert '# TYPE drone_llm_prompt_tokens_total counter' in text
+    assert 'drone_llm_prompt_tokens_total{model="glm-4.5"} 100' in text
+    assert 'drone_llm_cached_prompt_tokens_total{model="glm-4.5"} 64' in text
+    assert 'drone_llm_retries_total{model="glm-4.5"} 2' in text
+    assert 'drone_llm_errors_total{model="glm-4.5"} 1' in text
+    assert 'drone_llm_cache_hits_total{model="odd\\"model"} 1' in text
+    assert 'drone_llm_latency_seconds_sum{model="glm-4.5"} 2.0' in text
+    assert 'drone_llm_latency_seconds_count{model="glm-4.5"} 2' in text
+    assert 'drone_llm_first_token_seconds{model="glm-4.5",quantile="0.5"} 0.25' in text
+    assert 'drone_llm_first_token_seconds{model="odd\\"model",quantile="0.5"} NaN' in text
+    for line in text.splitlines():
+        assert line.startswith("#") or len(line.rsplit(" ", 1)) == 2
+
+if __name__ == "__main__":
+    test_glm_calls_are_recorded()
+    test_deepseek_calls_are_recorded()
+    test_labels_follow_calls_into_worker_threads()
+    test_assistant_runs_are_aggregated()
+    test_prometheus_dump()
+    print("\nAll model metrics tests passed!")
+    sys.exit(0)
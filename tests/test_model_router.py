@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Test the model router offline with stub backends: latency-based selection,
+failover on errors and deadlines, health tracking, streaming and the
+response cache bypass.
+"""
+
+import sys
+import time
+import asyncio
+from drone.model_router import ModelRouter, StubModel, is_error_reply
+from drone.response_cache import ResponseCache
+from drone.streaming import MessageDelta
+from tests.test_glm_transport import CompletionsStandIn, make_model
+
+def test_fastest_backend_is_preferred():
+    """Once latencies are known, requests go to the backend with the lowest p50."""
+    slow, fast = StubModel("slow", latency_s=0.05), StubModel("fast", latency_s=0.0)
+    router = ModelRouter({"slow": slow, "fast": fast})
+    assert router.generate("warm up").content == "slow"  # nothing measured yet: declared order
+    assert router.ranked() == ["slow", "fast"]  # measured before unmeasured
+    router.health["fast"].record(0.001, True)
+    for _ in range(5):
+        assert router.generate("hello").content == "fast"
+    assert router.ranked() == ["fast", "slow"]
+    stats = router.stats()["backends"]
+    assert stats["fast"]["requests"] == 6 and stats["slow"]["requests"] == 1
+    assert stats["slow"]["latency_p50_s"] >= 0.05
+
+def test_failing_backends_rank_last():
+    """Healthy measured backends come first, then untried ones, then those that have only failed."""
+    router = ModelRouter({"broken": StubModel(), "new": StubModel(), "measured": StubModel()}, failure_threshold=5)
+    router.health["broken"].record(0.0, False)
+    router.health["measured"].record(0.5, True)
+    assert router.ranked() == ["measured", "new", "broken"]
+
+def test_fails_over_on_error_replies():
+    """An adapter's error message moves the request to the next backend."""
+    primary, backup = StubModel("primary", failing=True), StubModel("backup")
+    router = ModelRouter({"primary": primary, "backup": backup}, failure_threshold=1, cooldown_s=0.2)
+    assert router.generate("hello").content == "backup"
+    assert router.generate("hello").content == "backup"
+    # A backend that has only failed is tried after one that answers
+    assert router.stats()["failovers"] == 1 and primary.calls == 1
+    assert not router.stats()["backends"]["primary"]["healthy"]
+
+    # Out of rotation during the cooldown, a fallback again after it
+    backup.failing = True
+    assert is_error_reply(router.generate("hello").content)
+    assert primary.calls == 1
+    primary.failing = False
+    time.sleep(0.25)
+    assert router.generate("hello").content == "primary"
+    assert primary.calls == 2
+    assert router.stats()["backends"]["primary"]["healthy"]
+
+def test_deadline_bounds_a_slow_backend():
+    """A backend that has not answered by the deadline is abandoned for the next one."""
+    hung, backup = StubModel("hung", latency_s=1.0), StubModel("backup")
+    router = ModelRouter({"hung": hung, "backup": backup}, deadline_s=0.3)
+    start = time.monotonic()
+    reply = router.generate("hello")
+    assert time.monotonic() - start < 0.6
+    # The deadline is spent waiting on the hung backend, so nothing is left for the backup
+    assert is_error_reply(reply.content) and "no reply within" in reply.content
+
+    router = ModelRouter({"hung": StubModel("hung", latency_s=0.2), "backup": backup}, deadline_s=1.0)
+    router.health["hung"].record(0.0, True)  # looks fast from earlier requests
+    router.health["backup"].record(0.01, True)
+    assert router.generate("hello").content == "hung"
+
+def test_all_backends_failing_returns_error():
+    """With every backend down the caller gets one error message naming each failure."""
+    router = ModelRouter({"a": StubModel(failing=True), "b": StubModel(failing=True)})
+    reply = router.generate("hello")
+    assert reply.content.startswith("Error generating response: all model backends failed")
+    assert "a: Error in API request" in reply.content and "b: Error in API request" in reply.content
+
+def test_stream_fails_over_before_first_token():
+    """Streams move to the next backend if the first one errors before sending text."""
+    router = ModelRouter({"down": StubModel(failing=True), "up": StubModel("streamed reply")})
+    deltas = list(router.stream("hello"))
+    assert "".join(delta.content for delta in deltas) == "streamed reply"
+    assert deltas[-1].token_usage is not None
+    assert router.last_backend == "up"
+
+def test_stream_deadline():
+    """A stalled stream is abandoned at the deadline: failed over before text, ended with an error after."""
+    hung, backup = StubModel("hung", latency_s=1.0), StubModel("backup")
+    router = ModelRouter({"hung": hung, "backup": backup}, deadline_s=0.3)
+    start = time.monotonic()
+    text = "".join(delta.content for delta in router.stream("hello"))
+    assert time.monotonic() - start < 0.6
+    assert text.startswith("Error generating response") and "deadline" in text
+
+    class Stalling(StubModel):
+        def stream(self, prompt, **kwargs):
+            yield MessageDelta("partial ")
+            time.sleep(1.0)
+            yield MessageDelta("never")
+
+    router = ModelRouter({"stalling": Stalling()}, deadline_s=0.3)
+    start = time.monotonic()
+    text = "".join(delta.content for delta in router.stream("hello"))
+    assert time.monotonic() - start < 0.6
+    assert text.startswith("partial \nError generating response") and "never" not in text
+
+def test_agenerate_fans_out():
+    """agenerate runs requests concurrently up to max_concurrency."""
+    router = ModelRouter({"stub": StubModel("ok", latency_s=0.1)}, max_concurrency=4)
+
+    async def fan_out():
+        return await asyncio.gather(*(router.agenerate(f"case {idx}") for idx in range(8)))
+
+    start = time.monotonic()
+    replies = asyncio.run(fan_out())
+    assert [reply.content for reply in replies] == ["ok"] * 8
+    assert time.monotonic() - start < 0.5
+
+def test_cache_bypass_reaches_backends():
+    """A bypass entered by the caller applies to the attempt threads too."""
+    with CompletionsStandIn() as server:
+        glm = make_model(server.url, cache=ResponseCache())
+        router = ModelRouter({"glm": glm})
+        question = [{"role": "user", "content": "check sensor imu"}]
+        router.generate(question)
+        router.generate(question)
+        assert len(server.requests) == 1
+        with router.cache.bypass():
+            router.generate(question)
+        assert len(server.requests) == 2
+
+if __name__ == "__main__":
+    test_fastest_backend_is_preferred()
+    test_failing_backends_rank_last()
+    test_fails_over_on_error_replies()
+    test_deadline_bounds_a_slow_backend()
+    test_all_backends_failing_returns_error()
+    test_stream_fails_over_before_first_token()
+    test_stream_deadline()
+    test_agenerate_fans_out()
+    test_cache_bypass_reaches_backends()
+    print("\nAll model router tests passed!")
+    sys.exit(0)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test that DroneAssistant requests start with a byte-identical system prefix,
+and that the cached prompt tokens providers report end up in
+Message.token_usage.
+"""
+
+import sys
+from drone.drone_chat import DroneAssistant, get_drone_battery, generate_mission_plan
+from drone.glm_model import Message
+from drone.prompts import AGENT_INSTRUCTIONS, chat_messages, token_usage
+from tests.test_glm_transport import CompletionsStandIn, make_model
+
+class RecordingModel:
+    """Model that records the messages of every step and answers at once"""
+
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, messages, **kwargs):
+        return self.generate(messages)
+
+    def generate(self, messages, **kwargs):
+        self.requests.append(chat_messages(messages))
+        return Message('Thought: done\n```py\nfinal_answer("ok")\n```<end_code>')
+
+def test_agent_runs_share_the_system_prefix():
+    """Only the user turn changes between runs; the static text sits in the system prompt."""
+    model = RecordingModel()
+    assistant = DroneAssistant(tools=[get_drone_battery, generate_mission_plan], model=model,
+                               max_steps=2, verbosity_level=0)
+    assistant.run("plan a survey mission")
+    assistant.run("check the battery")
+
+    first, second = model.requests
+    assert first[0]["role"] == "system" and first[0] == second[0]
+    assert AGENT_INSTRUCTIONS in first[0]["content"]
+    assert first[1]["role"] == "user" and "plan a survey mission" in first[1]["content"]
+    assert "check the battery" in second[1]["content"]
+    assert "EXAMPLE OF COMPLETE WORKING MISSION" not in second[1]["content"]
+
+def test_chat_messages_converts_agent_messages():
+    """smolagents ChatMessages become API messages with their roles and plain text."""
+    from smolagents.models import ChatMessage, MessageRole
+    messages = chat_messages([
+        ChatMessage(role=MessageRole.SYSTEM, content=[{"type": "text", "text": "system text"}]),
+        ChatMessage(role=MessageRole.TOOL_RESPONSE, content=[{"type": "text", "text": "Observation: 1"}]),
+    ])
+    assert messages == [{"role": "system", "content": "system text"},
+                        {"role": "user", "content": "Observation: 1"}]
+    assert chat_messages("hi") == [{"role": "user", "content": "hi"}]
+
+def test_cached_tokens_are_recorded():
+    """Cached prompt tokens are read from GLM/OpenAI and DeepSeek usage objects."""
+    usage = token_usage({"prompt_tokens": 1200, "completion_tokens": 40,
+                         "prompt_tokens_details": {"cached_tokens": 1024}})
+    assert (usage.input_tokens, usage.output_tokens, usage.cached_input_tokens) == (1200, 40, 1024)
+    assert token_usage({"prompt_tokens": 900, "completion_tokens": 10,
+                        "prompt_cache_hit_tokens": 768, "prompt_cache_miss_tokens": 132}).cached_input_tokens == 768
+    assert token_usage(None).total_tokens == 0
+
+    with CompletionsStandIn() as server:
+        reply = CompletionsStandIn.completion("ok")
+        reply["usage"]["prompt_tokens_details"] = {"cached_tokens": 8}
+        server.script = [(200, reply, {}, 0.0)]
+        message = make_model(server.url).generate([{"role": "system", "content": "prefix"},
+                                                   {"role": "user", "content": "hi"}])
+        assert message.token_usage.input_tokens == 10
+        assert message.token_usage.cached_input_tokens == 8
+        assert server.requests[0]["body"]["messages"][0] == {"role": "system", "content": "prefix"}
+
+if __name__ == "__main__":
+    test_agent_runs_share_the_system_prefix()
+    test_chat_messages_converts_agent_messages()
+    test_cached_tokens_are_recorded()
+    print("\nAll prompt prefix tests passed!")
+    sys.exit(0)
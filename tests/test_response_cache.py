@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Test the LLM response cache: key normalisation, eviction, expiry, the disk
+tier, and GLMModel skipping the API on a hit but never for vehicle control.
+"""
+
+import sys
+import time
+import tempfile
+import threading
+import contextvars
+from drone.response_cache import ResponseCache, cache_key, is_vehicle_control, request_text
+from tests.test_glm_transport import CompletionsStandIn, make_model
+
+def test_key_covers_request_parameters():
+    """Identical requests share a key; any parameter that changes the reply changes it."""
+    messages = [{"role": "system", "content": "be brief"}, {"role": "user", "content": "analyze flight_001"}]
+    base = cache_key(messages, "glm-4.5", 0.5, ["Observation:"], 2096)
+    assert base == cache_key([dict(message) for message in messages], "glm-4.5", 0.5, ["Observation:"], 2096)
+    assert base != cache_key(messages, "glm-4.5", 0.7, ["Observation:"], 2096)
+    assert base != cache_key(messages, "glm-4.5-air", 0.5, ["Observation:"], 2096)
+    assert base != cache_key(messages, "glm-4.5", 0.5, None, 2096)
+    assert base != cache_key(messages, "glm-4.5", 0.5, ["Observation:"], 1024)
+    assert base != cache_key(messages[1:], "glm-4.5", 0.5, ["Observation:"], 2096)
+
+def test_lru_eviction_and_ttl():
+    """The memory tier drops the least recently used entry and expires old ones."""
+    cache = ResponseCache(max_entries=2, ttl_s=0.2)
+    cache.put("a", "reply a")
+    cache.put("b", "reply b")
+    assert cache.get("a") == "reply a"  # "b" is now least recently used
+    cache.put("c", "reply c")
+    assert cache.get("b") is None
+    assert cache.get("a") == "reply a" and cache.get("c") == "reply c"
+
+    time.sleep(0.25)
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["expired"] == 1
+    assert stats["hits"] == 3 and stats["misses"] == 2
+
+def test_disk_tier_survives_restart():
+    """Entries written to disk are served by a fresh cache over the same directory."""
+    with tempfile.TemporaryDirectory() as directory:
+        ResponseCache(directory=directory).put("key", "stored reply")
+        restarted = ResponseCache(directory=directory)
+        assert restarted.stats()["disk_entries"] == 1
+        assert restarted.get("key") == "stored reply"
+        assert restarted.stats()["disk_hits"] == 1
+        restarted.clear()
+        assert ResponseCache(directory=directory).get("key") is None
+
+def test_vehicle_control_is_never_cached():
+    """Control questions bypass the cache and replies calling control tools are not stored."""
+    assert is_vehicle_control("Take off to 30 meters")
+    assert is_vehicle_control("请起飞到30米")
+    assert not is_vehicle_control("Analyze flight path for flight_001")
+
+    # Only the question in DroneAssistant's prompt template is classified, not its tool reference
+    prompt = "Example: drone_takeoff(30)\n\nUser question: check sensor imu\n\nUse the provided tools."
+    assert request_text([{"role": "user", "content": prompt}]).strip() == "check sensor imu"
+
+    cache = ResponseCache()
+    assert cache.should_bypass([{"role": "user", "content": "land now"}])
+    assert not cache.put("key", "Code:\n```py\ndrone_takeoff(30)\n```")
+    assert cache.get("key") is None
+    with cache.bypass():
+        assert cache.should_bypass([{"role": "user", "content": "battery status"}])
+        assert not ResponseCache().bypassing
+    assert not cache.should_bypass([{"role": "user", "content": "battery status"}])
+
+def test_agent_steps_are_classified_by_their_task():
+    """Later steps of an agent run are classified by the task, not the newest tool observation."""
+    task = "New task:\nExample: drone_takeoff(30)\n\nUser question: take off to 30 m\n\nUse the provided tools."
+    step = [{"role": "system", "content": "You are a drone assistant"},
+            {"role": "user", "content": task},
+            {"role": "assistant", "content": "Code:\n```py\nget_drone_battery()\n```"},
+            {"role": "user", "content": "Observation: battery 87%"}]
+    assert request_text(step).strip() == "take off to 30 m"
+    assert ResponseCache().should_bypass(step)
+    assert request_text([{"role": "user", "content": "check sensor imu"}]) == "check sensor imu"
+
+def test_bypass_follows_the_context():
+    """A bypass reaches work run in a copy of the caller's context, not other threads."""
+    cache = ResponseCache()
+    seen = {}
+    with cache.bypass():
+        seen["copied"] = contextvars.copy_context().run(lambda: cache.bypassing)
+        worker = threading.Thread(target=lambda: seen.update(thread=cache.bypassing))
+        worker.start()
+        worker.join()
+    assert seen == {"copied": True, "thread": False}
+
+def test_model_serves_repeats_from_cache():
+    """A repeated question is answered without reaching the API; control questions always reach it."""
+    with CompletionsStandIn() as server:
+        model = make_model(server.url, cache=ResponseCache())
+        question = [{"role": "user", "content": "Analyze flight path for flight_001"}]
+        first = model.generate(question)
+        second = model.generate(question)
+        assert first.content == second.content
+        assert len(server.requests) == 1
+
+        control = [{"role": "user", "content": "Take off to 30 meters"}]
+        model.generate(control)
+        model.generate(control)
+        assert len(server.requests) == 3
+
+        # A reply that commands the vehicle is sent again rather than replayed
+        takeoff = CompletionsStandIn.completion("Code:\n```py\ndrone_takeoff(30)\n```")
+        server.script = [(200, takeoff, {}, 0.0), (200, takeoff, {}, 0.0)]
+        question = [{"role": "user", "content": "What should happen next?"}]
+        model.generate(question)
+        model.generate(question)
+        assert len(server.requests) == 5
+
+        # Failed requests are not cached either
+        server.script = [(400, {"error": "bad request"}, {}, 0.0)]
+        question = [{"role": "user", "content": "check sensor imu"}]
+        assert model.generate(question).content.startswith("Error in API request")
+        assert model.generate(question).content == "echo: check sensor imu"
+        assert len(server.requests) == 7
+
+if __name__ == "__main__":
+    test_key_covers_request_parameters()
+    test_lru_eviction_and_ttl()
+    test_disk_tier_survives_restart()
+    test_vehicle_control_is_never_cached()
+    test_agent_steps_are_classified_by_their_task()
+    test_bypass_follows_the_context()
+    test_model_serves_repeats_from_cache()
+    print("\nAll response cache tests passed!")
+    sys.exit(0)
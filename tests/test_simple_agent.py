@@ -6,7 +6,7 @@ Simplified test for the DroneAssistant with proper smolagents format support
 import os
 import sys
 from drone.drone_chat import DroneAssistant, generate_mission_plan
-from drone.hf_model import Message
+from drone.glm_model import Message
 
 def final_answer(answer):
     """Final answer function for smolagents"""
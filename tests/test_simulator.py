@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test DroneController end to end against the in-process MAVLink simulator.
+
+These tests go through the real DroneKit connection stack over local TCP,
+so they cover what tests/test_mission.py covers without ArduPilot SITL.
+"""
+
+import sys
+import time
+from drone import compatibility_fix  # Import for Python 3.10+ compatibility
+from drone.drone_control import DroneController, FleetManager, distance_meters
+from drone.simulator import SimulatedVehicle, SimulatedFleet
+
+def test_connect_takeoff_mission_and_rtl():
+    """A full flight: connect, take off, fly a mission, return and land."""
+    with SimulatedVehicle(time_scale=20) as sim:
+        controller = DroneController(sim.connection_string)
+        try:
+            assert controller.connect_to_drone(timeout=20)
+            assert controller.wait_ready("parameters", 10)
+            location = controller.get_current_location()
+            assert abs(location["latitude"] - sim.home[0]) < 1e-6
+
+            assert controller.arm_and_takeoff(10, timeout=30)
+            assert sim.armed and sim.alt >= 9.5
+
+            lat, lon, _ = sim.location
+            waypoints = [
+                {"lat": lat + 0.0003, "lon": lon, "alt": 10},
+                {"lat": lat + 0.0003, "lon": lon + 0.0003, "alt": 15},
+            ]
+            assert controller.upload_mission(waypoints)
+            assert controller.last_upload["verified"]
+            assert controller.execute_mission()
+            events = list(controller.mission_tracker.events(timeout=10))
+            assert events[-1]["complete"]
+
+            lat, lon, alt = sim.location
+            assert distance_meters(lat, lon, waypoints[1]["lat"], waypoints[1]["lon"]) < 2.0
+
+            assert controller.return_to_launch()
+            deadline = time.monotonic() + 20
+            while sim.armed and time.monotonic() < deadline:
+                time.sleep(0.1)
+            assert not sim.armed
+            assert distance_meters(*sim.location[:2], sim.home[0], sim.home[1]) < 1.0
+        finally:
+            controller.disconnect()
+
+def test_partial_mission_rewrite():
+    """A second upload with one changed waypoint only rewrites that item."""
+    with SimulatedVehicle() as sim:
+        controller = DroneController(sim.connection_string)
+        try:
+            assert controller.connect_to_drone(timeout=20)
+            waypoints = [{"lat": sim.home[0] + idx * 1e-4, "lon": sim.home[1], "alt": 20} for idx in range(10)]
+            assert controller.upload_mission(waypoints)
+            waypoints[4] = dict(waypoints[4], alt=40)
+            assert controller.upload_mission(waypoints)
+            assert controller.last_upload["mode"] == "partial"
+            assert sim.mission[5]["z"] == 40
+        finally:
+            controller.disconnect()
+
+def test_fleet_of_simulated_vehicles():
+    """FleetManager connects to and commands several simulated vehicles at once."""
+    with SimulatedFleet(6, time_scale=20) as sims:
+        fleet = FleetManager(max_workers=6)
+        try:
+            results = fleet.connect_all(sims.connection_strings(), timeout=20)
+            assert all(results.values())
+
+            results = fleet.run_all("arm_and_takeoff", 5, timeout=30)
+            assert all(results.values())
+            assert all(sim.alt >= 4.75 for sim in sims.vehicles.values())
+
+            status = fleet.telemetry()
+            assert set(status) == set(sims.vehicles)
+            assert all(snapshot["armed"] for snapshot in status.values())
+        finally:
+            fleet.disconnect_all()
+
+if __name__ == "__main__":
+    test_connect_takeoff_mission_and_rtl()
+    test_partial_mission_rewrite()
+    test_fleet_of_simulated_vehicles()
+    print("\nAll simulator tests passed!")
+    sys.exit(0)
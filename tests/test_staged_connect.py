@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test the staged connect mode of DroneController.
+
+dronekit.connect is replaced by a stand-in whose attribute groups become
+ready after scripted delays, so no simulator is needed.
+"""
+
+import sys
+import time
+from drone import compatibility_fix  # Import for Python 3.10+ compatibility
+from drone import drone_control
+from drone.drone_control import DroneController
+from tests.test_telemetry_cache import FakeVehicle
+
+class FakeMode:
+    name = "STABILIZE"
+
+class FakeSystemStatus:
+    state = "STANDBY"
+
+class SlowLinkVehicle(FakeVehicle):
+    """Vehicle whose parameters arrive much later than flight attributes."""
+
+    delays = {"parameters": 0.5}
+
+    def __init__(self):
+        super().__init__()
+        self.created = time.monotonic()
+        self.mode = FakeMode()
+        self.gps_0 = "GPSInfo:fix=3,num_sat=10"
+        self.system_status = FakeSystemStatus()
+        self.version = "APM:Copter-4.5.0"
+        self.closed = False
+
+    def wait_ready(self, *names, timeout=30, raise_exception=True):
+        delay = max(self.delays.get(name, 0.0) for name in names)
+        remaining = self.created + delay - time.monotonic()
+        if remaining > timeout:
+            time.sleep(timeout)
+            if raise_exception:
+                raise TimeoutError("wait_ready experienced a timeout")
+            return False
+        time.sleep(max(remaining, 0.0))
+        return True
+
+    def close(self):
+        self.closed = True
+
+def connect_with(vehicle_class):
+    def fake_connect(connection_string, wait_ready=None, **kwargs):
+        vehicle = vehicle_class()
+        if wait_ready:
+            vehicle.wait_ready("parameters")
+        return vehicle
+    return fake_connect
+
+def test_staged_connect_returns_early():
+    """Staged connect returns before the parameter download finishes."""
+    original = drone_control.connect
+    drone_control.connect = connect_with(SlowLinkVehicle)
+    try:
+        controller = DroneController("tcp:127.0.0.1:5762")
+        start = time.monotonic()
+        assert controller.connect_to_drone()
+        assert time.monotonic() - start < 0.3
+
+        assert controller.wait_ready("flight", 0)
+        assert not controller.wait_ready("parameters", 0)
+        assert controller.wait_ready("parameters", 2)
+
+        metrics = controller.get_connect_metrics()
+        assert metrics["heartbeat_s"] <= metrics["flight_s"] < metrics["parameters_s"]
+        assert metrics["parameters_s"] >= 0.5
+    finally:
+        drone_control.connect = original
+
+def test_full_connect_waits_for_everything():
+    """staged=False keeps the wait-for-everything behaviour."""
+    original = drone_control.connect
+    drone_control.connect = connect_with(SlowLinkVehicle)
+    try:
+        controller = DroneController("tcp:127.0.0.1:5762")
+        start = time.monotonic()
+        assert controller.connect_to_drone(staged=False)
+        assert time.monotonic() - start >= 0.5
+        assert controller.wait_ready("parameters", 0)
+    finally:
+        drone_control.connect = original
+
+def test_flight_group_timeout_closes_link():
+    """A vehicle that never reports flight attributes is not kept open."""
+    class NoGpsVehicle(SlowLinkVehicle):
+        delays = {"gps_0": 10.0}
+
+    original = drone_control.connect
+    drone_control.connect = connect_with(NoGpsVehicle)
+    try:
+        controller = DroneController("tcp:127.0.0.1:5762")
+        assert not controller.connect_to_drone(timeout=0.2)
+        assert controller.vehicle.closed
+        assert not controller.connected
+    finally:
+        drone_control.connect = original
+
+if __name__ == "__main__":
+    test_staged_connect_returns_early()
+    test_full_connect_waits_for_everything()
+    test_flight_group_timeout_closes_link()
+    print("\nAll staged connect tests passed!")
+    sys.exit(0)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test streamed generation: SSE parsing, tool call assembly and GLMModel.stream
+against the local completions stand-in.
+"""
+
+import sys
+import json
+import time
+from drone.streaming import iter_deltas, iter_sse_data
+from tests.test_glm_transport import CompletionsStandIn, make_model
+
+TOOL_CALL_CHUNKS = [
+    {"choices": [{"index": 0, "delta": {"role": "assistant", "tool_calls": [
+        {"index": 0, "id": "call-1", "type": "function", "function": {"name": "drone_takeoff", "arguments": ""}}]}}]},
+    {"choices": [{"index": 0, "delta": {"tool_calls": [{"index": 0, "function": {"arguments": '{"altit'}}]}}]},
+    {"choices": [{"index": 0, "delta": {"tool_calls": [{"index": 0, "function": {"arguments": 'ude": 10}'}}]}}]},
+    {"choices": [{"index": 0, "delta": {"tool_calls": [
+        {"index": 1, "id": "call-2", "type": "function", "function": {"name": "get_drone_location", "arguments": "{}"}}]}}]},
+    {"choices": [{"index": 0, "delta": {}, "finish_reason": "tool_calls"}]},
+]
+
+# The same reply as one non-streamed message
+TOOL_CALL_MESSAGE = {"choices": [{"message": {"role": "assistant", "content": "", "tool_calls": [
+    {"id": "call-1", "type": "function", "function": {"name": "drone_takeoff", "arguments": '{"altitude": 10}'}},
+    {"id": "call-2", "type": "function", "function": {"name": "get_drone_location", "arguments": "{}"}},
+]}}]}
+
+def test_sse_parsing():
+    """Comments, CRLF endings and multi-line data are handled; [DONE] ends the stream."""
+    lines = [b": keep-alive", b"", b'data: {"a": 1}\r', b"", b"event: message", b"data: line one",
+             b"data: line two", b"", b"data: [DONE]", b"", b'data: {"ignored": true}', b""]
+    assert list(iter_sse_data(lines)) == ['{"a": 1}', "line one\nline two"]
+
+def test_tool_call_fragments_match_non_streaming():
+    """Streamed tool call fragments produce the code block a whole reply produces."""
+    streamed = "".join(delta.content for delta in iter_deltas(TOOL_CALL_CHUNKS))
+    with CompletionsStandIn() as server:
+        server.script = [(200, TOOL_CALL_MESSAGE, {}, 0.0), (200, TOOL_CALL_CHUNKS, {}, 0.0)]
+        model = make_model(server.url)
+        assert model.generate("take off").content == streamed
+        assert "".join(delta.content for delta in model.stream("take off")) == streamed
+    assert "drone_takeoff_result_call_1 = drone_takeoff(altitude=10)" in streamed
+    assert "final_answer(get_drone_location_result_call_2)" in streamed
+
+def test_tokens_arrive_incrementally():
+    """The first delta arrives long before the stream ends, and usage comes last."""
+    with CompletionsStandIn() as server:
+        content = "Battery at 87%, all systems nominal."
+        server.script = [(200, CompletionsStandIn.stream_chunks(content), {}, 0.05)]
+        model = make_model(server.url)
+
+        start = time.monotonic()
+        arrivals, deltas = [], []
+        for delta in model.stream([{"role": "user", "content": "status?"}]):
+            arrivals.append(time.monotonic() - start)
+            deltas.append(delta)
+        assert "".join(delta.content for delta in deltas) == content
+        assert len(deltas) > 5
+        assert arrivals[0] < arrivals[-1] / 3
+        assert deltas[-1].token_usage["total_tokens"] == 15
+        assert deltas[-1].finish_reason == "stop"
+        assert model.last_stream["first_token_s"] < model.last_stream["total_s"] / 3
+        assert server.requests[0]["body"]["stream"] is True
+
+def test_stream_errors_become_text():
+    """A failed streamed request yields the same error text as generate()."""
+    with CompletionsStandIn() as server:
+        server.script = [(400, {"error": "bad request"}, {}, 0.0)]
+        deltas = list(make_model(server.url).stream("hi"))
+        assert len(deltas) == 1 and deltas[0].content.startswith("Error in API request")
+
+if __name__ == "__main__":
+    test_sse_parsing()
+    test_tool_call_fragments_match_non_streaming()
+    test_tokens_arrive_incrementally()
+    test_stream_errors_become_text()
+    print("\nAll streaming tests passed!")
+    sys.exit(0)
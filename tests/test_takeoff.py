@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Test the non-blocking takeoff sequence in DroneController.
+
+A scripted stand-in vehicle answers mode, arm and takeoff commands through
+attribute listeners, the same way DroneKit reports them.
+"""
+
+import sys
+import time
+import asyncio
+import threading
+from drone import compatibility_fix  # Import for Python 3.10+ compatibility
+from drone.drone_control import DroneController
+from tests.test_telemetry_cache import FakeBattery, FakeVehicle, FakeLocation
+
+class FakeMode:
+    def __init__(self, name):
+        self.name = name
+
+class ScriptedVehicle(FakeVehicle):
+    """Vehicle that obeys commands and climbs 5 m per position update."""
+
+    def __init__(self, arms=True):
+        super().__init__()
+        self.arms = arms
+        self._mode = FakeMode("STABILIZE")
+        self._armed = False
+
+    @property
+    def mode(self):
+        return self._mode
+
+    @mode.setter
+    def mode(self, value):
+        self._mode = FakeMode(value.name)
+        self.notify("mode", self._mode)
+
+    @property
+    def armed(self):
+        return self._armed
+
+    @armed.setter
+    def armed(self, value):
+        if self.arms:
+            self._armed = value
+            self.notify("armed", value)
+
+    def simple_takeoff(self, altitude):
+        def climb():
+            current = 0.0
+            while current < altitude:
+                current += 5.0
+                self.notify("location.global_relative_frame", FakeLocation(1.0, 2.0, current))
+        threading.Thread(target=climb, daemon=True).start()
+
+def make_controller(vehicle):
+    controller = DroneController()
+    controller.vehicle = vehicle
+    controller.connected = True
+    controller.telemetry.attach(vehicle)
+    return controller
+
+def test_takeoff_completes_from_events():
+    """The future resolves once the target altitude is reported."""
+    controller = make_controller(ScriptedVehicle())
+    stages = []
+
+    handle = controller.arm_and_takeoff_async(20, timeout=5,
+                                              progress_callback=lambda stage, alt: stages.append(stage))
+    assert handle.result(timeout=5) is True
+    assert handle.stage == "done"
+    assert handle.altitude >= 19
+    for stage in ("mode", "arming", "climbing", "done"):
+        assert stage in stages
+
+def test_takeoff_deadline():
+    """A vehicle that never arms fails the handle at the arming deadline, not the climb's."""
+    controller = make_controller(ScriptedVehicle(arms=False))
+
+    handle = controller.arm_and_takeoff_async(20, timeout=60, stage_timeout=0.2)
+    assert handle.wait(2)
+    assert handle.result() is False
+    assert handle.error == "Failed to arm"
+
+def test_takeoff_is_awaitable():
+    """The handle can be awaited from asyncio code."""
+    controller = make_controller(ScriptedVehicle())
+
+    async def fly():
+        return await controller.arm_and_takeoff_async(10, timeout=5)
+
+    assert asyncio.run(fly()) is True
+
+class HoveringVehicle(ScriptedVehicle):
+    """Vehicle that arms and accepts the takeoff, then climbs only when told to."""
+
+    def simple_takeoff(self, altitude):
+        pass
+
+    def climb_to(self, altitude):
+        self.notify("location.global_relative_frame", FakeLocation(1.0, 2.0, altitude))
+
+def test_climb_progress_follows_altitude_only():
+    """While climbing, only altitude updates reach the progress callback, at most every progress_interval."""
+    vehicle = HoveringVehicle()
+    controller = make_controller(vehicle)
+    stages = []
+    handle = controller.arm_and_takeoff_async(20, timeout=5,
+                                              progress_callback=lambda stage, alt: stages.append(stage))
+    assert handle.wait_accepted(1) and stages.count("climbing") == 1
+    for _ in range(50):
+        vehicle.notify("battery", FakeBattery(12.4, 87, 1.2))
+    assert stages.count("climbing") == 1
+
+    handle.progress_interval = 0.05
+    for altitude in (5.0, 6.0):
+        time.sleep(0.06)
+        vehicle.climb_to(altitude)
+    vehicle.climb_to(7.0)  # within the interval: not reported
+    assert stages.count("climbing") == 3
+    vehicle.climb_to(20.0)
+    assert handle.result(timeout=1) is True
+
+def test_takeoff_tool_returns_once_climbing():
+    """drone_takeoff returns when the climb starts; the climb is reported on the telemetry bridge."""
+    from drone import drone_control
+    from drone.drone_chat import drone_takeoff
+    from drone.telemetry_bridge import shared_bridge
+
+    vehicle = HoveringVehicle()
+    controller = drone_control.get_fleet().add_vehicle("climber")
+    controller.vehicle = vehicle
+    controller.connected = True
+    controller.telemetry.attach(vehicle)
+    channel = shared_bridge().channel()
+    cursor = channel.head
+    try:
+        reply = drone_takeoff(altitude=20, vehicle_id="climber")
+        assert "正在爬升" in reply
+        time.sleep(0.55)  # past the progress interval
+        vehicle.climb_to(12.0)
+        vehicle.climb_to(20.0)
+        events, _, _ = channel.read(cursor)
+        assert [event.status for event in events if not event.is_log][0] == "TAKING OFF"
+        assert events[-1].status == "AIRBORNE"
+        assert any(event.telemetry.get("altitude") == 12.0 for event in events if event.is_progress)
+    finally:
+        drone_control.get_fleet().remove_vehicle("climber")
+
+def test_takeoff_not_connected():
+    """Without a vehicle no handle is created."""
+    controller = DroneController()
+    assert controller.arm_and_takeoff_async(10) is None
+    assert controller.arm_and_takeoff(10) is False
+
+if __name__ == "__main__":
+    test_takeoff_completes_from_events()
+    test_takeoff_deadline()
+    test_takeoff_is_awaitable()
+    test_climb_progress_follows_altitude_only()
+    test_takeoff_tool_returns_once_climbing()
+    test_takeoff_not_connected()
+    print("\nAll takeoff tests passed!")
+    sys.exit(0)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test the telemetry bridge: bounded per-vehicle channels that any thread can
+publish to and several sessions can read with their own cursors, and the
+drain that applies the events to a Streamlit session.
+"""
+
+import sys
+import logging
+import threading
+from drone.mission_log import MissionLog, log_record, status_record
+from drone.telemetry_bridge import TelemetryBridge, VehicleChannel, shared_bridge, vehicle_context
+
+def test_readers_keep_their_own_cursor():
+    """Two readers see every event once each; a reader that falls behind is told what it missed."""
+    channel = VehicleChannel("uav", capacity=4)
+    first = second = 0
+    for idx in range(3):
+        channel.publish(status_record("AIRBORNE", f"step {idx}"))
+    events, first, missed = channel.read(first)
+    assert [event.phase for event in events] == ["step 0", "step 1", "step 2"] and missed == 0
+    assert channel.read(first) == ([], 3, 0)
+
+    for idx in range(3, 8):
+        channel.publish(status_record("AIRBORNE", f"step {idx}"))
+    events, second, missed = channel.read(second)
+    assert [event.phase for event in events] == ["step 4", "step 5", "step 6", "step 7"] and missed == 4
+    events, first, missed = channel.read(first)
+    assert len(events) == 4 and missed == 1 and first == second == channel.head == 8
+
+def test_session_events_stay_with_their_session():
+    """Vehicle events fan out to every reader; events tagged with a session reach that session only."""
+    channel = VehicleChannel("uav")
+    channel.publish(status_record("TAKING OFF", session="alice"))
+    channel.publish(log_record("Altitude: 4.2"))
+    channel.publish(status_record("LANDED", session="bob"))
+    for session, statuses in (("alice", ["TAKING OFF", "LOG"]), ("bob", ["LOG", "LANDED"]), (None, ["LOG"])):
+        events, cursor, missed = channel.read(0, session)
+        assert [event.status for event in events] == statuses and (cursor, missed) == (3, 0)
+
+def test_publishing_from_many_threads():
+    """Producers on other threads publish without losing or reordering a thread's events."""
+    bridge = TelemetryBridge(capacity=10_000)
+
+    def produce(name):
+        for idx in range(500):
+            bridge.publish(log_record(f"{name} {idx}"), vehicle_id=name)
+
+    threads = [threading.Thread(target=produce, args=(f"uav{idx}",)) for idx in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(bridge.vehicle_ids()) == ["uav0", "uav1", "uav2", "uav3"]
+    events, cursor, _ = bridge.channel("uav2").read()
+    assert cursor == 500 and [event.phase for event in events] == [f"uav2 {idx}" for idx in range(500)]
+
+    # Work run in a vehicle's context publishes to that vehicle's channel
+    vehicle_context("uav9").run(bridge.publish, status_record("LANDED"))
+    assert bridge.channel("uav9").head == 1
+
+def test_fleet_commands_are_labelled_with_their_vehicle():
+    """drone_control logs from fleet pool threads reach the channel of the vehicle being commanded."""
+    from drone.drone_chat import drone_control
+    fleet = drone_control.FleetManager(max_workers=2)
+    for vehicle_id in ("alpha", "bravo"):
+        controller = fleet.add_vehicle(vehicle_id)
+        controller.report = lambda vehicle_id=vehicle_id: logging.getLogger('drone_control').warning(f"{vehicle_id} ok")
+    before = {vehicle_id: shared_bridge().channel(vehicle_id).head for vehicle_id in ("alpha", "bravo")}
+    fleet.run_all("report")
+    for vehicle_id in ("alpha", "bravo"):
+        events, _, _ = shared_bridge().channel(vehicle_id).read(before[vehicle_id])
+        assert [event.phase for event in events] == [f"{vehicle_id} ok"]
+
+def test_sessions_drain_the_vehicle_channel():
+    """Status, log and progress events reach the session state and chat only when the session drains."""
+    import streamlit as st
+    from drone.drone_chat import drain_mission_events, update_mission_phase, update_mission_status
+
+    st.session_state.mission_log = MissionLog(capacity=4, chat_retention=2)
+    st.session_state['chat_history'] = []
+    st.session_state.bridge_cursor = shared_bridge().channel().head
+    logger = logging.getLogger('drone_control')
+    level = logger.level
+    logger.setLevel(logging.INFO)
+    try:
+        update_mission_status("TAKING OFF", "起飞到 10 米")
+        for message in ("Altitude: 4.2", "Taking off!"):
+            producer = threading.Thread(target=logger.info, args=(message,))
+            producer.start()
+            producer.join()
+        update_mission_phase("起飞到 10 米（当前 4.2 米）", altitude=4.2)
+    finally:
+        logger.setLevel(level)
+    assert st.session_state['chat_history'] == []
+
+    events = drain_mission_events()
+    assert len(events) == 4
+    assert [record.status for record in st.session_state.mission_log.records()] == ["TAKING OFF", "LOG", "LOG"]
+    assert st.session_state.mission_status == "TAKING OFF"
+    assert st.session_state.mission_phase == "起飞到 10 米（当前 4.2 米）"
+    visible = [message for message in st.session_state['chat_history'] if not message.get("expired")]
+    assert len(visible) == 2 and all("content" not in message for message in visible)
+    assert drain_mission_events() == []
+
+    # Another session's status changes are not applied here; vehicle logs are
+    import drone.drone_chat as drone_chat
+    session_id = drone_chat._session_id
+    # Stands in for the other session's script thread; the producer thread has no session
+    drone_chat._session_id = lambda: "other" if threading.current_thread() is threading.main_thread() else None
+    try:
+        update_mission_status("LANDED", "elsewhere")
+        producer = threading.Thread(target=logger.warning, args=("Altitude: 0.0",))
+        producer.start()
+        producer.join()
+    finally:
+        drone_chat._session_id = session_id
+    assert [event.status for event in drain_mission_events()] == ["LOG"]
+    assert st.session_state.mission_status == "TAKING OFF"
+
+if __name__ == "__main__":
+    test_readers_keep_their_own_cursor()
+    test_session_events_stay_with_their_session()
+    test_publishing_from_many_threads()
+    test_fleet_commands_are_labelled_with_their_vehicle()
+    test_sessions_drain_the_vehicle_channel()
+    print("\nAll telemetry bridge tests passed!")
+    sys.exit(0)
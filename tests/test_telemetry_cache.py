@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test the TelemetryCache used by DroneController.
+
+The cache is fed through a minimal stand-in for a DroneKit vehicle, so this
+test runs without a simulator.
+"""
+
+import sys
+import time
+from drone import compatibility_fix  # Import for Python 3.10+ compatibility
+from drone.drone_control import DroneController, TelemetryCache
+
+class FakeLocation:
+    def __init__(self, lat, lon, alt):
+        self.lat = lat
+        self.lon = lon
+        self.alt = alt
+
+class FakeBattery:
+    def __init__(self, voltage, level, current):
+        self.voltage = voltage
+        self.level = level
+        self.current = current
+
+class FakeVehicle:
+    """Just enough of dronekit.Vehicle for attribute listener tests."""
+
+    def __init__(self):
+        self.listeners = {}
+        self.airspeed = 3.5
+        self.groundspeed = 4.0
+        self.battery = FakeBattery(12.4, 87, 1.2)
+
+    def add_attribute_listener(self, attr_name, observer):
+        self.listeners.setdefault(attr_name, []).append(observer)
+
+    def remove_attribute_listener(self, attr_name, observer):
+        self.listeners[attr_name].remove(observer)
+
+    def notify(self, attr_name, value):
+        for observer in self.listeners.get(attr_name, []):
+            observer(self, attr_name, value)
+
+    def close(self):
+        pass
+
+def test_cache_seeds_and_updates():
+    """Attaching seeds available values and listeners keep them current."""
+    vehicle = FakeVehicle()
+    cache = TelemetryCache()
+    cache.attach(vehicle)
+
+    battery, age = cache.read("voltage", "level", "current")
+    assert battery == {"voltage": 12.4, "level": 87, "current": 1.2}
+    assert age is not None and age < 1.0
+
+    # No position has been seen yet
+    location, age = cache.read("latitude", "longitude", "altitude")
+    assert age is None
+
+    vehicle.notify("location.global_relative_frame", FakeLocation(37.77, -122.41, 30.0))
+    location, age = cache.read("latitude", "longitude", "altitude")
+    assert location == {"latitude": 37.77, "longitude": -122.41, "altitude": 30.0}
+    assert age < 1.0
+
+    cache.detach()
+    assert all(not observers for observers in vehicle.listeners.values())
+
+def test_cache_reports_staleness():
+    """The reported age grows while no update arrives."""
+    cache = TelemetryCache()
+    cache.update(groundspeed=5.0)
+    time.sleep(0.05)
+    assert cache.age("groundspeed") >= 0.05
+    assert cache.get("groundspeed") == 5.0
+    assert cache.get("airspeed", -1.0) == -1.0
+
+def test_controller_reads_from_cache():
+    """DroneController getters are served from the cache."""
+    vehicle = FakeVehicle()
+    controller = DroneController()
+    controller.vehicle = vehicle
+    controller.connected = True
+    controller.telemetry.attach(vehicle)
+
+    vehicle.notify("location.global_relative_frame", FakeLocation(1.0, 2.0, 3.0))
+    vehicle.notify("groundspeed", 7.5)
+
+    location = controller.get_current_location()
+    assert location["latitude"] == 1.0
+    assert location["age_seconds"] is not None
+    assert controller.get_groundspeed() == 7.5
+
+    controller.disconnect()
+    assert not controller.connected
+
+if __name__ == "__main__":
+    test_cache_seeds_and_updates()
+    test_cache_reports_staleness()
+    test_controller_reads_from_cache()
+    print("\nAll telemetry cache tests passed!")
+    sys.exit(0)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test the live telemetry dashboard: the fields are read from the telemetry
+cache and the mission tracker, reused between refreshes, and formatted into
+the sidebar panel.
+"""
+
+import sys
+from drone.drone_chat import TELEMETRY_MAX_HZ, TELEMETRY_REFRESH_HZ, telemetry_html
+from drone.drone_control import DroneController, distance_meters
+from tests.test_telemetry_cache import FakeLocation, FakeVehicle
+
+class FakeGPS:
+    fix_type = 3
+    satellites_visible = 11
+
+class FakeTracker:
+    def latest(self):
+        return {"waypoint": 2, "total": 5, "complete": False}
+
+    def stop(self):
+        pass
+
+def connected_controller():
+    vehicle = FakeVehicle()
+    controller = DroneController()
+    controller.vehicle = vehicle
+    controller.connected = True
+    controller.telemetry.attach(vehicle)
+    return controller, vehicle
+
+def test_dashboard_from_cache():
+    """Altitude, speed, battery, GPS, distance to home and waypoint come from cached telemetry."""
+    controller, vehicle = connected_controller()
+    assert controller.get_dashboard()["distance_home_m"] is None
+
+    vehicle.notify("home_location", FakeLocation(37.0, -122.0, 5.0))
+    vehicle.notify("location.global_relative_frame", FakeLocation(37.001, -122.0, 25.0))
+    vehicle.notify("gps_0", FakeGPS())
+    controller.mission_tracker = FakeTracker()
+    dashboard = controller.get_dashboard(max_age=0)
+    assert dashboard["altitude"] == 25.0 and dashboard["groundspeed"] == 4.0
+    assert (dashboard["battery_level"], dashboard["voltage"]) == (87, 12.4)
+    assert (dashboard["gps_fix"], dashboard["satellites"]) == (3, 11)
+    assert dashboard["distance_home_m"] == round(distance_meters(37.0, -122.0, 37.001, -122.0), 1)
+    assert (dashboard["waypoint"], dashboard["waypoints"]) == (2, 5)
+
+    # Viewers refreshing within max_age share one snapshot
+    vehicle.notify("groundspeed", 9.0)
+    assert controller.get_dashboard(max_age=60) is dashboard
+    assert controller.get_dashboard(max_age=0)["groundspeed"] == 9.0
+
+    controller.disconnect()
+    assert controller.get_dashboard() == {"error": "Not connected to drone"}
+
+def test_panel_html():
+    """The panel shows every field, dashes for missing ones, and a disconnected notice."""
+    html = telemetry_html({"altitude": 25.04, "groundspeed": 4.0, "battery_level": 87, "voltage": 12.4,
+                           "gps_fix": 3, "satellites": 11, "distance_home_m": 111.2,
+                           "waypoint": 2, "waypoints": 5, "age_seconds": 0.1})
+    for text in ("25.0 m", "4.0 m/s", "87% · 12.4 V", "3D (11 星)", "111.2 m", "2/5"):
+        assert text in html
+    assert "未更新" not in html
+    sparse = telemetry_html({"altitude": None, "gps_fix": None, "age_seconds": 12.0})
+    assert "<b>高度:</b> -" in sparse and "遥测已 12 秒未更新" in sparse
+    assert "未连接无人机" in telemetry_html({"error": "Not connected to drone"})
+    assert 0 < TELEMETRY_REFRESH_HZ <= TELEMETRY_MAX_HZ
+
+if __name__ == "__main__":
+    test_dashboard_from_cache()
+    test_panel_html()
+    print("\nAll telemetry dashboard tests passed!")
+    sys.exit(0)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test the native tool-calling path: schemas from @tool functions, direct
+dispatch of returned calls, parallel reads and ordered vehicle commands.
+"""
+
+import sys
+import time
+import logging
+import threading
+from smolagents import tool
+from drone.drone_chat import drone_takeoff, execute_drone_mission, get_fleet_status
+from drone.tool_calling import ToolCallLoop, tool_schema
+from drone.telemetry_bridge import shared_bridge
+from tests.test_glm_transport import CompletionsStandIn, make_model
+
+calls_in_flight = []
+call_log = []
+_log_lock = threading.Lock()
+
+def _traced(name, delay):
+    with _log_lock:
+        calls_in_flight.append(name)
+        call_log.append(("start", name, len(calls_in_flight)))
+    time.sleep(delay)
+    with _log_lock:
+        calls_in_flight.remove(name)
+        call_log.append(("end", name, len(calls_in_flight)))
+
+@tool
+def read_position() -> str:
+    """Read the vehicle position.
+
+    Returns:
+        str: Position
+    """
+    _traced("read_position", 0.2)
+    return "lat 37.7749, lon -122.4194"
+
+@tool
+def read_battery() -> str:
+    """Read the battery level.
+
+    Returns:
+        str: Battery level
+    """
+    _traced("read_battery", 0.2)
+    return "battery 87%"
+
+@tool
+def climb_to(altitude: float = None) -> str:
+    """Climb to an altitude.
+
+    Args:
+        altitude: Target altitude in meters
+
+    Returns:
+        str: Status
+    """
+    _traced("climb_to", 0.05)
+    return f"climbed to {altitude} m"
+
+TOOLS = [read_position, read_battery, climb_to]
+READS = frozenset({"read_position", "read_battery"})
+
+def test_schemas_from_tools():
+    """Schemas carry the tool's description and parameter types."""
+    schema = tool_schema(drone_takeoff)
+    assert schema["type"] == "function"
+    function = schema["function"]
+    assert function["name"] == "drone_takeoff"
+    assert function["parameters"]["properties"]["altitude"] == {
+        "type": "number", "description": "Target altitude in meters"}
+    assert function["parameters"]["required"] == []  # the drone tools report missing values themselves
+    waypoints = tool_schema(execute_drone_mission)["function"]["parameters"]["properties"]["waypoints"]
+    assert waypoints["type"] == "array" and waypoints["items"]["type"] == "object"
+    assert tool_schema(get_fleet_status)["function"]["parameters"]["properties"] == {}
+
+def test_reads_run_in_parallel_and_results_are_fed_back():
+    """Independent reads in one step overlap; their results go back as tool messages."""
+    call_log.clear()
+    with CompletionsStandIn() as server:
+        server.script = [
+            (200, CompletionsStandIn.tool_call_completion([("read_position", {}), ("read_battery", {})]), {}, 0.0),
+            (200, CompletionsStandIn.completion("At 37.7749, -122.4194 with 87% battery."), {}, 0.0),
+        ]
+        loop = ToolCallLoop(make_model(server.url), TOOLS, read_only=READS)
+        answer = loop.run([{"role": "user", "content": "Where are you and how is the battery?"}])
+
+        assert answer == "At 37.7749, -122.4194 with 87% battery."
+        assert max(in_flight for _, _, in_flight in call_log) == 2
+        first_step = loop.last_run["steps"][0]
+        assert first_step["calls"] == ["read_position", "read_battery"]
+        assert first_step["tools_s"] < 0.35
+
+        first, second = (request["body"] for request in server.requests)
+        assert [schema["function"]["name"] for schema in first["tools"]] == ["read_position", "read_battery", "climb_to"]
+        assert second["messages"][1]["tool_calls"][0]["function"]["name"] == "read_position"
+        assert second["messages"][2] == {"role": "tool", "content": "lat 37.7749, lon -122.4194", "tool_call_id": "call_0"}
+        assert second["messages"][3]["content"] == "battery 87%"
+
+def test_commands_run_in_order():
+    """A step with a vehicle command runs its calls one at a time, in the model's order."""
+    call_log.clear()
+    with CompletionsStandIn() as server:
+        server.script = [
+            (200, CompletionsStandIn.tool_call_completion(
+                [("read_battery", {}), ("climb_to", {"altitude": 30}), ("read_position", {})]), {}, 0.0),
+            (200, CompletionsStandIn.completion("Climbed to 30 m."), {}, 0.0),
+        ]
+        loop = ToolCallLoop(make_model(server.url), TOOLS, read_only=READS)
+        assert loop.run([{"role": "user", "content": "take off to 30 m"}]) == "Climbed to 30 m."
+        assert [name for event, name, _ in call_log if event == "start"] == ["read_battery", "climb_to", "read_position"]
+        assert max(in_flight for _, _, in_flight in call_log) == 1
+        assert server.requests[1]["body"]["messages"][3]["content"] == "climbed to 30 m"
+
+def test_bad_calls_are_reported_to_the_model():
+    """Unknown tools and malformed arguments come back as error results, not exceptions."""
+    with CompletionsStandIn() as server:
+        bad_arguments = CompletionsStandIn.tool_call_completion([("climb_to", {})])
+        bad_arguments["choices"][0]["message"]["tool_calls"][0]["function"]["arguments"] = "{altitude: 30"
+        server.script = [
+            (200, CompletionsStandIn.tool_call_completion([("self_destruct", {})]), {}, 0.0),
+            (200, bad_arguments, {}, 0.0),
+            (200, CompletionsStandIn.completion("Could not do that."), {}, 0.0),
+        ]
+        loop = ToolCallLoop(make_model(server.url), TOOLS)
+        assert loop.run([{"role": "user", "content": "do something odd"}]) == "Could not do that."
+        assert server.requests[1]["body"]["messages"][-1]["content"] == "Error: unknown tool self_destruct"
+        assert "not valid JSON" in server.requests[2]["body"]["messages"][-1]["content"]
+
+def test_step_limit():
+    """A model that never stops calling tools is cut off at max_steps, without flooding the mission feed."""
+    head = shared_bridge().channel().head
+    feed = logging.getLogger('drone_control')
+    level = feed.level
+    feed.setLevel(logging.INFO)
+    try:
+        with CompletionsStandIn() as server:
+            server.script = [(200, CompletionsStandIn.tool_call_completion([("read_battery", {})]), {}, 0.0)] * 3
+            loop = ToolCallLoop(make_model(server.url), TOOLS, max_steps=3)
+            assert loop.run([{"role": "user", "content": "battery forever"}]) == "battery 87%"
+            assert len(server.requests) == 3
+    finally:
+        feed.setLevel(level)
+    assert shared_bridge().channel().head == head
+
+if __name__ == "__main__":
+    test_schemas_from_tools()
+    test_reads_run_in_parallel_and_results_are_fed_back()
+    test_commands_run_in_order()
+    test_bad_calls_are_reported_to_the_model()
+    test_step_limit()
+    print("\nAll tool calling tests passed!")
+    sys.exit(0)